@@ -0,0 +1,218 @@
+"""
+Corpus synthétique de documents KYC/AML pour les benchmarks
+
+Tous les documents sont générés hors ligne à partir d'une graine fixe:
+deux exécutions avec la même graine produisent exactement le même corpus.
+"""
+import io
+import random
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+# Résolutions (largeur, hauteur) en pixels par taille de corpus
+IMAGE_SIZES: Dict[str, Dict[str, Tuple[int, int]]] = {
+    'small': {'card': (640, 404), 'page': (620, 877)},
+    'medium': {'card': (1280, 808), 'page': (1240, 1754)},
+    'large': {'card': (2560, 1616), 'page': (2480, 3508)},
+}
+
+# Longueur approximative (en caractères) des mémos AML par taille de corpus
+TEXT_SIZES: Dict[str, int] = {
+    'small': 500,
+    'medium': 5000,
+    'large': 50000,
+}
+
+FIRST_NAMES = ['Jean', 'Marie', 'Pierre', 'Sophie', 'Ahmed', 'Fatima', 'Lucas', 'Camille', 'Olga', 'Ivan']
+LAST_NAMES = ['Dupont', 'Martin', 'Bernard', 'Petit', 'Benali', 'Moreau', 'Lefebvre', 'Garcia', 'Petrov', 'Leroy']
+CITIES = ['Paris', 'Lyon', 'Marseille', 'Toulouse', 'Nantes', 'Lille', 'Bordeaux', 'Strasbourg']
+BANKS = ['Société Générale', 'BNP Paribas', 'Crédit Agricole', 'La Banque Postale', 'Crédit Mutuel']
+COMPANIES = ['Alpha Trading SARL', 'Bêta Invest SA', 'Gamma Holding SAS', 'Delta Import Export', 'Omega Consulting']
+COUNTRIES = ['France', 'Belgique', 'Suisse', 'Luxembourg', 'Chypre', 'Panama', 'Émirats arabes unis']
+RISK_SENTENCES = [
+    "Le client a effectué plusieurs dépôts en espèces juste sous le seuil de déclaration.",
+    "Les fonds ont transité par une société offshore sans activité économique apparente.",
+    "Le bénéficiaire effectif est une personne politiquement exposée.",
+    "Des virements urgents ont été demandés vers une juridiction à haut risque.",
+    "L'origine des fonds n'a pas pu être justifiée par le client.",
+]
+
+
+@dataclass
+class ImageDocument:
+    """Document image du corpus"""
+
+    name: str
+    document_type: str
+    size: str
+    content: bytes
+    width: int
+    height: int
+
+
+@dataclass
+class TextDocument:
+    """Document texte du corpus"""
+
+    name: str
+    size: str
+    text: str
+
+
+class CorpusGenerator:
+    """Générateur déterministe de passeports, cartes d'identité, relevés et mémos AML"""
+
+    def __init__(self, seed: int = 42):
+        """
+        Initialiser le générateur
+
+        Args:
+            seed: Graine du générateur aléatoire
+        """
+        self.random = random.Random(seed)
+
+    def images(self, sizes: List[str], count: int = 1) -> List[ImageDocument]:
+        """
+        Générer les documents image
+
+        Args:
+            sizes: Tailles à générer (small, medium, large)
+            count: Nombre de documents par type et par taille
+
+        Returns:
+            Liste des documents encodés en PNG
+        """
+        documents = []
+        for size in sizes:
+            for index in range(count):
+                documents.append(self._render('passport', size, index, self._passport_lines()))
+                documents.append(self._render('id_card', size, index, self._id_card_lines()))
+                documents.append(self._render('bank_statement', size, index, self._statement_lines()))
+        return documents
+
+    def texts(self, sizes: List[str], count: int = 1) -> List[TextDocument]:
+        """
+        Générer les mémos AML
+
+        Args:
+            sizes: Tailles à générer (small, medium, large)
+            count: Nombre de mémos par taille
+
+        Returns:
+            Liste des mémos
+        """
+        return [
+            TextDocument(f"aml_memo_{size}_{index}", size, self._aml_memo(TEXT_SIZES[size]))
+            for size in sizes
+            for index in range(count)
+        ]
+
+    def _person(self) -> Tuple[str, str]:
+        return self.random.choice(FIRST_NAMES), self.random.choice(LAST_NAMES)
+
+    def _date(self) -> str:
+        return f"{self.random.randint(1, 28):02d}/{self.random.randint(1, 12):02d}/{self.random.randint(1950, 2024)}"
+
+    def _amount(self) -> str:
+        return f"{self.random.randint(10, 250000)},{self.random.randint(0, 99):02d} EUR"
+
+    def _iban(self) -> str:
+        return 'FR76' + ''.join(str(self.random.randint(0, 9)) for _ in range(23))
+
+    def _passport_lines(self) -> List[str]:
+        first_name, last_name = self._person()
+        number = f"{self.random.randint(10, 99)}AB{self.random.randint(10000, 99999)}"
+        return [
+            "RÉPUBLIQUE FRANÇAISE",
+            "PASSEPORT / PASSPORT",
+            f"Nom: {last_name.upper()}",
+            f"Prénoms: {first_name}",
+            f"Date de naissance: {self._date()}",
+            f"Lieu de naissance: {self.random.choice(CITIES)}",
+            f"Passeport N°: {number}",
+            f"Date d'expiration: {self._date()}",
+            f"P<FRA{last_name.upper()}<<{first_name.upper()}<<<<<<<<<<<<<<<<<<<<",
+        ]
+
+    def _id_card_lines(self) -> List[str]:
+        first_name, last_name = self._person()
+        return [
+            "RÉPUBLIQUE FRANÇAISE",
+            "CARTE NATIONALE D'IDENTITÉ",
+            f"Nom: {last_name.upper()}",
+            f"Prénom: {first_name}",
+            f"Né(e) le: {self._date()}",
+            f"à: {self.random.choice(CITIES)}",
+            f"N° {self.random.randint(100000000000, 999999999999)}",
+        ]
+
+    def _statement_lines(self) -> List[str]:
+        first_name, last_name = self._person()
+        lines = [
+            self.random.choice(BANKS).upper(),
+            "RELEVÉ DE COMPTE",
+            f"Titulaire: {first_name} {last_name}",
+            f"IBAN: {self._iban()}",
+            "Date        Libellé                         Montant",
+        ]
+        for _ in range(self.random.randint(12, 24)):
+            label = self.random.choice(['VIR SEPA', 'CB', 'PRLV', 'RETRAIT DAB', 'REMISE CHQ'])
+            lines.append(f"{self._date()}  {label} {self.random.choice(COMPANIES)}  {self._amount()}")
+        return lines
+
+    def _aml_memo(self, length: int) -> str:
+        paragraphs = []
+        while sum(len(paragraph) for paragraph in paragraphs) < length:
+            first_name, last_name = self._person()
+            paragraphs.append(
+                f"Le {self._date()}, {first_name} {last_name}, domicilié à {self.random.choice(CITIES)}, "
+                f"a reçu {self._amount()} de {self.random.choice(COMPANIES)} sur le compte {self._iban()} "
+                f"ouvert auprès de {self.random.choice(BANKS)}. Les fonds proviennent de "
+                f"{self.random.choice(COUNTRIES)}. {self.random.choice(RISK_SENTENCES)}"
+            )
+        return '\n\n'.join(paragraphs)
+
+    def _render(self, document_type: str, size: str, index: int, lines: List[str]) -> ImageDocument:
+        """Dessiner un document sur fond clair, avec un cadre et un léger bruit"""
+        layout = 'page' if document_type == 'bank_statement' else 'card'
+        width, height = IMAGE_SIZES[size][layout]
+
+        image = Image.new('RGB', (width, height), (244, 241, 232))
+        draw = ImageDraw.Draw(image)
+        margin = width // 20
+        draw.rectangle([margin // 2, margin // 2, width - margin // 2, height - margin // 2], outline=(60, 60, 90), width=3)
+
+        font_size = max(12, height // (len(lines) * 2 + 4))
+        font = _load_font(font_size)
+        y = margin
+        for line in lines:
+            draw.text((margin, y), line, fill=(20, 20, 20), font=font)
+            y += int(font_size * 1.6)
+
+        # Bruit de numérisation déterministe
+        for _ in range(width * height // 400):
+            x, y = self.random.randrange(width), self.random.randrange(height)
+            draw.point((x, y), fill=(self.random.randint(150, 230),) * 3)
+
+        buffer = io.BytesIO()
+        image.save(buffer, format='PNG')
+        return ImageDocument(
+            name=f"{document_type}_{size}_{index}",
+            document_type=document_type,
+            size=size,
+            content=buffer.getvalue(),
+            width=width,
+            height=height,
+        )
+
+
+def _load_font(size: int):
+    """Charger une police vectorielle si disponible (sinon la police bitmap de Pillow)"""
+    for name in ('DejaVuSans.ttf', 'Arial.ttf', 'LiberationSans-Regular.ttf'):
+        try:
+            return ImageFont.truetype(name, size)
+        except OSError:
+            continue
+    return ImageFont.load_default()
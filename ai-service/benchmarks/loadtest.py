@@ -0,0 +1,345 @@
+"""
+Test de charge HTTP du service IA avec des profils de trafic mixtes
+
+Exemples (depuis ai-service/):
+    python -m benchmarks.loadtest benchmarks/profiles/kyc_mix.json
+    python -m benchmarks.loadtest benchmarks/profiles/kyc_mix.json --workers 2 \\
+        --env SCHEDULER_MAX_CONCURRENCY=4 --output loadtest.json
+    python -m benchmarks.loadtest benchmarks/profiles/kyc_mix.json --url http://localhost:8000
+
+Sans --url, une instance est démarrée localement avec la configuration demandée
+(--server uvicorn|prefork, --workers, --env) et arrêtée à la fin. Les requêtes
+sont envoyées en boucle ouverte (arrivées de Poisson au débit de chaque palier,
+indépendamment des réponses) pour ne pas masquer la latence quand le service sature.
+
+Un profil décrit la répartition des requêtes, les paliers de débit, les pics
+et l'objectif de service:
+    {
+        "name": "kyc_mix",
+        "mix": {"ner_kyc": 0.7, "ocr": 0.2, "verify": 0.1},
+        "stages": [{"rate": 2, "duration": 20}, {"rate": 4, "duration": 20}],
+        "bursts": [{"at": 10, "duration": 3, "multiplier": 5}],
+        "headers": {"X-Request-Priority": "interactive"},
+        "slo": {"p95_ms": 2000, "error_rate": 0.01}
+    }
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.corpus import CorpusGenerator  # noqa: E402
+
+AI_SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Types de requêtes disponibles dans les profils: route et nature de l'entrée
+REQUEST_KINDS = {
+    'ner_kyc': ('/api/v1/ner/extract-kyc-entities', 'text'),
+    'ner_aml': ('/api/v1/ner/extract-aml-entities', 'text'),
+    'ner_entities': ('/api/v1/ner/extract-entities', 'text'),
+    'nlp_analyze': ('/api/v1/nlp/analyze', 'text'),
+    'ocr': ('/api/v1/ocr/extract-document-data', 'image'),
+    'verify': ('/api/v1/document/verify', 'image'),
+    'detect_edges': ('/api/v1/document/detect-edges', 'image'),
+}
+
+
+class LoadGenerator:
+    """Générateur de charge en boucle ouverte"""
+
+    def __init__(self, base_url: str, profile: Dict, api_key: str, seed: int, max_connections: int, timeout: float):
+        """
+        Initialiser le générateur
+
+        Args:
+            base_url: URL de l'instance testée
+            profile: Profil de trafic
+            api_key: Token d'authentification
+            seed: Graine (arrivées, choix des requêtes et corpus)
+            max_connections: Nombre maximal de connexions HTTP simultanées
+            timeout: Délai maximal d'une requête en secondes
+        """
+        unknown = set(profile['mix']) - set(REQUEST_KINDS)
+        if unknown:
+            raise ValueError(f"Types de requêtes inconnus: {sorted(unknown)}")
+
+        self.base_url = base_url
+        self.profile = profile
+        self.random = random.Random(seed)
+        self.headers = {'Authorization': f"Bearer {api_key}", **profile.get('headers', {})}
+        self.limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+        self.timeout = timeout
+
+        sizes = profile.get('sizes', ['small'])
+        generator = CorpusGenerator(seed=seed)
+        self.images = generator.images(sizes, count=2)
+        self.texts = generator.texts(sizes, count=4)
+        self.kinds = list(profile['mix'])
+        self.weights = [profile['mix'][kind] for kind in self.kinds]
+
+    async def run(self) -> List[Dict]:
+        """
+        Rejouer tous les paliers du profil
+
+        Returns:
+            Résultats par palier
+        """
+        results = []
+        async with httpx.AsyncClient(base_url=self.base_url, limits=self.limits, timeout=self.timeout) as client:
+            offset = 0.0
+            for index, stage in enumerate(self.profile['stages']):
+                samples, wall = await self._run_stage(client, stage, offset)
+                results.append(summarize(index, stage, samples, wall))
+                offset += stage['duration']
+        return results
+
+    def _arrivals(self, stage: Dict, offset: float) -> List[float]:
+        """Instants d'arrivée (relatifs au début du palier) selon un processus de Poisson"""
+        arrivals = []
+        elapsed = 0.0
+        while True:
+            rate = stage['rate'] * self._burst_multiplier(offset + elapsed)
+            elapsed += self.random.expovariate(rate)
+            if elapsed >= stage['duration']:
+                return arrivals
+            arrivals.append(elapsed)
+
+    def _burst_multiplier(self, at: float) -> float:
+        """Multiplicateur de débit à un instant du test (pics définis dans le profil)"""
+        for burst in self.profile.get('bursts', []):
+            if burst['at'] <= at < burst['at'] + burst['duration']:
+                return burst['multiplier']
+        return 1.0
+
+    async def _run_stage(self, client: httpx.AsyncClient, stage: Dict, offset: float) -> Tuple[List[Dict], float]:
+        """Envoyer les requêtes d'un palier sans attendre les réponses précédentes (mesures, durée réelle)"""
+        started = time.perf_counter()
+        tasks = []
+        for arrival in self._arrivals(stage, offset):
+            delay = started + arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            kind = self.random.choices(self.kinds, weights=self.weights)[0]
+            tasks.append(asyncio.create_task(self._send(client, kind)))
+        samples = await asyncio.gather(*tasks)
+        return list(samples), time.perf_counter() - started
+
+    async def _send(self, client: httpx.AsyncClient, kind: str) -> Dict:
+        """Envoyer une requête et mesurer sa latence"""
+        route, input_kind = REQUEST_KINDS[kind]
+        started = time.perf_counter()
+        try:
+            if input_kind == 'image':
+                document = self.random.choice(self.images)
+                params = {'document_type': document.document_type} if kind == 'verify' else {}
+                response = await client.post(
+                    route,
+                    params=params,
+                    files={'file': (f"{document.name}.png", document.content, 'image/png')},
+                    headers=self.headers,
+                )
+            else:
+                document = self.random.choice(self.texts)
+                response = await client.post(route, json={'text': document.text}, headers=self.headers)
+            outcome = str(response.status_code)
+        except httpx.TimeoutException:
+            outcome = 'timeout'
+        except httpx.HTTPError as e:
+            outcome = type(e).__name__
+        return {'kind': kind, 'outcome': outcome, 'latency': time.perf_counter() - started}
+
+
+def percentile(values: List[float], p: float) -> Optional[float]:
+    """Percentile (méthode du rang le plus proche) en millisecondes"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[max(0, math.ceil(p * len(ordered)) - 1)] * 1000, 2)
+
+
+def summarize(index: int, stage: Dict, samples: List[Dict], wall: float) -> Dict:
+    """Agréger les mesures d'un palier (wall: durée jusqu'à la dernière réponse)"""
+    latencies = [sample['latency'] for sample in samples if sample['outcome'] == '200']
+    errors = [sample for sample in samples if sample['outcome'] != '200']
+
+    by_kind = {}
+    for kind in sorted({sample['kind'] for sample in samples}):
+        kind_samples = [sample for sample in samples if sample['kind'] == kind]
+        kind_latencies = [sample['latency'] for sample in kind_samples if sample['outcome'] == '200']
+        by_kind[kind] = {
+            'requests': len(kind_samples),
+            'errors': sum(1 for sample in kind_samples if sample['outcome'] != '200'),
+            'p50_ms': percentile(kind_latencies, 0.50),
+            'p95_ms': percentile(kind_latencies, 0.95),
+        }
+
+    return {
+        'stage': index,
+        'offered_rate': stage['rate'],
+        'duration': stage['duration'],
+        'requests': len(samples),
+        'achieved_rate': round(len(latencies) / wall, 3) if wall else 0.0,
+        'error_rate': round(len(errors) / len(samples), 4) if samples else 0.0,
+        'outcomes': dict(Counter(sample['outcome'] for sample in samples)),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'max_ms': percentile(latencies, 1.0),
+        'by_kind': by_kind,
+    }
+
+
+def find_saturation(stages: List[Dict], slo: Dict) -> Dict:
+    """
+    Déterminer le point de saturation
+
+    Un palier est tenu si le taux d'erreur et le p95 respectent l'objectif de
+    service et si le débit servi suit le débit offert (à 10% près).
+
+    Args:
+        stages: Résultats par palier (débits croissants)
+        slo: Objectif de service (p95_ms, error_rate)
+
+    Returns:
+        Dernier débit tenu et premier palier en échec avec sa cause
+    """
+    sustained = None
+    for stage in stages:
+        reasons = []
+        if stage['error_rate'] > slo.get('error_rate', 0.01):
+            reasons.append(f"taux d'erreur {stage['error_rate']:.2%}")
+        if stage['p95_ms'] is None or stage['p95_ms'] > slo.get('p95_ms', 2000):
+            reasons.append(f"p95 {stage['p95_ms']} ms")
+        if stage['achieved_rate'] < 0.9 * stage['offered_rate']:
+            reasons.append(f"débit servi {stage['achieved_rate']}/s")
+        if reasons:
+            return {'sustained_rate': sustained, 'saturated_at': stage['offered_rate'], 'reasons': reasons}
+        sustained = stage['offered_rate']
+    return {'sustained_rate': sustained, 'saturated_at': None, 'reasons': []}
+
+
+def start_server(port: int, workers: int, env: Dict[str, str], server: str = 'uvicorn') -> subprocess.Popen:
+    """Démarrer une instance locale (uvicorn --workers ou serveur pre-fork)"""
+    if server == 'prefork':
+        command = [sys.executable, 'prefork.py']
+    else:
+        command = [sys.executable, '-m', 'uvicorn', 'main:app']
+    command += [
+        '--host', '127.0.0.1', '--port', str(port),
+        '--workers', str(workers), '--log-level', 'warning',
+    ]
+    # WEB_CONCURRENCY: nombre de processus pour la répartition des threads de chaque worker
+    return subprocess.Popen(command, cwd=AI_SERVICE_DIR, env={**os.environ, 'WEB_CONCURRENCY': str(workers), **env})
+
+
+def wait_until_ready(base_url: str, server: Optional[subprocess.Popen], timeout: float):
+    """Attendre que /health/ready réponde 200 (modèles chargés et préchauffés)"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server is not None and server.poll() is not None:
+            raise RuntimeError(f"Le serveur s'est arrêté (code {server.returncode})")
+        try:
+            if httpx.get(f"{base_url}/health/ready", timeout=2).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"Le service n'est pas prêt après {timeout}s")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def print_report(stages: List[Dict], saturation: Dict):
+    """Afficher les résultats par palier et le point de saturation"""
+    header = f"{'palier':>6}{'offert/s':>10}{'servi/s':>10}{'erreurs':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  statuts"
+    print(header)
+    print('-' * (len(header) + 20))
+    for stage in stages:
+        print(
+            f"{stage['stage']:>6}{stage['offered_rate']:>10}{stage['achieved_rate']:>10}"
+            f"{stage['error_rate']:>10.2%}{str(stage['p50_ms']):>10}{str(stage['p95_ms']):>10}"
+            f"{str(stage['p99_ms']):>10}  {stage['outcomes']}"
+        )
+
+    if saturation['saturated_at'] is None:
+        print(f"\nAucune saturation jusqu'à {saturation['sustained_rate']} req/s")
+    else:
+        print(
+            f"\nDébit soutenu: {saturation['sustained_rate']} req/s; saturation à "
+            f"{saturation['saturated_at']} req/s ({', '.join(saturation['reasons'])})"
+        )
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Test de charge HTTP du service IA")
+    parser.add_argument('profile', help="Fichier JSON du profil de trafic")
+    parser.add_argument('--url', help="Instance déjà démarrée (sinon une instance est lancée localement)")
+    parser.add_argument('--workers', type=int, default=1, help="Workers de l'instance locale")
+    parser.add_argument('--server', choices=('uvicorn', 'prefork'), default='uvicorn', help="Serveur de l'instance locale")
+    parser.add_argument('--env', action='append', default=[], help="Variable KEY=VALUE de l'instance locale")
+    parser.add_argument('--api-key', default=os.environ.get('BACKEND_API_KEY') or 'loadtest')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--max-connections', type=int, default=256)
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--ready-timeout', type=float, default=600.0)
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    args = parser.parse_args(argv)
+
+    with open(args.profile, encoding='utf-8') as f:
+        profile = json.load(f)
+
+    env = dict(item.split('=', 1) for item in args.env)
+    server = None
+    base_url = args.url
+    if base_url is None:
+        port = free_port()
+        base_url = f"http://127.0.0.1:{port}"
+        server = start_server(port, args.workers, env, args.server)
+
+    try:
+        wait_until_ready(base_url, server, args.ready_timeout)
+        generator = LoadGenerator(base_url, profile, args.api_key, args.seed, args.max_connections, args.timeout)
+        stages = asyncio.run(generator.run())
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    saturation = find_saturation(stages, profile.get('slo', {}))
+    print_report(stages, saturation)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'profile': profile,
+                'server': {
+                    'url': args.url,
+                    'type': args.server if args.url is None else None,
+                    'workers': args.workers if args.url is None else None,
+                    'env': env,
+                },
+                'stages': stages,
+                'saturation': saturation,
+            }, f, indent=2, ensure_ascii=False)
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
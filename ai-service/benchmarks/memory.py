@@ -0,0 +1,188 @@
+"""
+Mémoire par worker: uvicorn --workers comparé au serveur pre-fork
+
+Exemples (depuis ai-service/):
+    python -m benchmarks.memory --workers 4
+    python -m benchmarks.memory --workers 4 --servers prefork --rate 4 --duration 60 --output memory.json
+
+Chaque serveur est démarré localement, préchauffé, soumis à un trafic mixte
+(les pages partagées se copient au fil des requêtes) puis mesuré via
+/proc/<pid>/smaps_rollup (Linux uniquement):
+    - RSS: mémoire résidente du processus, pages partagées comprises
+    - PSS: pages partagées réparties entre les processus qui les utilisent;
+      la somme des PSS est la mémoire réellement consommée par le serveur
+    - Shared / Private: pages partagées avec d'autres processus ou propres au processus
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.loadtest import LoadGenerator, free_port, start_server, wait_until_ready  # noqa: E402
+
+SERVERS = ('uvicorn', 'prefork')
+SMAPS_FIELDS = ('Rss', 'Pss', 'Shared_Clean', 'Shared_Dirty', 'Private_Clean', 'Private_Dirty')
+TRAFFIC_MIX = {'ner_kyc': 0.4, 'nlp_analyze': 0.2, 'ocr': 0.3, 'verify': 0.1}
+
+
+def child_pids(pid: int) -> List[int]:
+    """Processus descendants d'un processus (parcours de /proc)"""
+    parents: Dict[int, List[int]] = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Le nom du processus (2e champ) peut contenir des espaces: lire après la parenthèse
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        parents.setdefault(ppid, []).append(int(entry))
+
+    descendants, pending = [], [pid]
+    while pending:
+        children = parents.get(pending.pop(), [])
+        descendants.extend(children)
+        pending.extend(children)
+    return sorted(descendants)
+
+
+def memory_usage(pid: int) -> Optional[Dict]:
+    """
+    Lire la mémoire d'un processus
+
+    Args:
+        pid: Identifiant du processus
+
+    Returns:
+        Valeurs de smaps_rollup en Mo (rss, pss, shared, private), None si le processus a disparu
+    """
+    values = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                name, _, rest = line.partition(':')
+                if name in SMAPS_FIELDS:
+                    values[name] = int(rest.split()[0]) / 1024
+        with open(f"/proc/{pid}/cmdline", 'rb') as f:
+            command = f.read().replace(b'\0', b' ').decode(errors='replace').strip()
+    except OSError:
+        return None
+
+    return {
+        'pid': pid,
+        'command': command,
+        'rss_mb': round(values.get('Rss', 0.0), 1),
+        'pss_mb': round(values.get('Pss', 0.0), 1),
+        'shared_mb': round(values.get('Shared_Clean', 0.0) + values.get('Shared_Dirty', 0.0), 1),
+        'private_mb': round(values.get('Private_Clean', 0.0) + values.get('Private_Dirty', 0.0), 1),
+    }
+
+
+def snapshot(root: int) -> Dict:
+    """
+    Mesurer le processus principal et ses workers
+
+    Les processus auxiliaires de multiprocessing (resource_tracker) sont
+    comptés dans le total mais pas comme workers.
+    """
+    parent = memory_usage(root)
+    workers, auxiliary = [], []
+    for pid in child_pids(root):
+        usage = memory_usage(pid)
+        if usage is None:
+            continue
+        (auxiliary if 'resource_tracker' in usage['command'] else workers).append(usage)
+
+    processes = [parent] + workers + auxiliary
+    count = len(workers) or 1
+    return {
+        'parent': parent,
+        'workers': workers,
+        'auxiliary': auxiliary,
+        'worker_rss_mb': round(sum(w['rss_mb'] for w in workers) / count, 1),
+        'worker_pss_mb': round(sum(w['pss_mb'] for w in workers) / count, 1),
+        'worker_private_mb': round(sum(w['private_mb'] for w in workers) / count, 1),
+        'total_rss_mb': round(sum(p['rss_mb'] for p in processes), 1),
+        'total_pss_mb': round(sum(p['pss_mb'] for p in processes), 1),
+    }
+
+
+def measure(server: str, args: argparse.Namespace, env: Dict[str, str]) -> Dict:
+    """Démarrer un serveur, le solliciter puis mesurer sa mémoire"""
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    process = start_server(port, args.workers, env, server)
+    try:
+        wait_until_ready(base_url, process, args.ready_timeout)
+        # Laisser tous les workers terminer leur préchauffage
+        time.sleep(args.settle)
+        result = {'server': server, 'idle': snapshot(process.pid)}
+
+        if args.duration > 0:
+            profile = {'mix': TRAFFIC_MIX, 'stages': [{'rate': args.rate, 'duration': args.duration}]}
+            generator = LoadGenerator(base_url, profile, args.api_key, args.seed, max_connections=64, timeout=120)
+            stages = asyncio.run(generator.run())
+            result['traffic'] = {'requests': stages[0]['requests'], 'outcomes': stages[0]['outcomes']}
+            result['loaded'] = snapshot(process.pid)
+        return result
+    finally:
+        process.terminate()
+        process.wait(timeout=60)
+
+
+def print_report(results: List[Dict]):
+    """Afficher la mémoire par worker et le total de chaque serveur"""
+    header = f"{'serveur':<10}{'mesure':<8}{'workers':>8}{'RSS/worker':>12}{'PSS/worker':>12}{'privé/worker':>14}{'RSS total':>12}{'PSS total':>12}"
+    print(header)
+    print('-' * len(header))
+    for result in results:
+        for moment in ('idle', 'loaded'):
+            if moment not in result:
+                continue
+            s = result[moment]
+            print(
+                f"{result['server']:<10}{moment:<8}{len(s['workers']):>8}{s['worker_rss_mb']:>12}"
+                f"{s['worker_pss_mb']:>12}{s['worker_private_mb']:>14}{s['total_rss_mb']:>12}{s['total_pss_mb']:>12}"
+            )
+    print("(Mo; PSS total = mémoire réellement consommée, le RSS compte plusieurs fois les pages partagées)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Mémoire par worker: uvicorn --workers et serveur pre-fork")
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--servers', default=','.join(SERVERS), help="uvicorn, prefork")
+    parser.add_argument('--env', action='append', default=[], help="Variable KEY=VALUE des instances")
+    parser.add_argument('--rate', type=float, default=2.0, help="Requêtes par seconde avant la seconde mesure")
+    parser.add_argument('--duration', type=float, default=30.0, help="Durée du trafic en secondes (0 = aucune)")
+    parser.add_argument('--settle', type=float, default=5.0, help="Attente après /health/ready en secondes")
+    parser.add_argument('--api-key', default=os.environ.get('BACKEND_API_KEY') or 'loadtest')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ready-timeout', type=float, default=600.0)
+    parser.add_argument('--output', help="Fichier JSON des mesures")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists('/proc/self/smaps_rollup'):
+        parser.error("/proc/<pid>/smaps_rollup est nécessaire (Linux 4.14+)")
+    servers = [server.strip() for server in args.servers.split(',') if server.strip()]
+    unknown = set(servers) - set(SERVERS)
+    if unknown:
+        parser.error(f"Serveurs inconnus: {sorted(unknown)}")
+
+    env = dict(item.split('=', 1) for item in args.env)
+    results = [measure(server, args, env) for server in servers]
+    print_report(results)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'workers': args.workers, 'env': env, 'results': results}, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
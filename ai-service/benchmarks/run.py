@@ -0,0 +1,356 @@
+"""
+Benchmark des moteurs IA sur un corpus synthétique
+
+Exemples (depuis ai-service/):
+    python -m benchmarks.run --mode direct --sizes small,medium
+    python -m benchmarks.run --mode api --iterations 20 --output results.json
+    python -m benchmarks.run --save-baseline baseline.json
+    python -m benchmarks.run --baseline baseline.json --tolerance 0.15
+
+Le mode direct appelle les services (OCRService, NLPService, NERService,
+DocumentVerificationService) sans passer par HTTP; le mode api passe par
+l'application FastAPI (authentification, ordonnanceur, sérialisation).
+Chaque scénario est mesuré dans un processus neuf: le pic de mémoire
+résidente (ru_maxrss, qui ne fait que croître) est celui du scénario seul,
+chargement de son moteur compris, et non celui des scénarios précédents.
+Le code de sortie est 1 si une régression dépasse la tolérance par rapport
+à la référence. Une référence n'a de valeur que mesurée sur la machine de
+référence, avec les versions épinglées de requirements.txt et tous les
+moteurs (machine et versions dans meta, signalées si elles diffèrent); les
+scénarios absents de la référence ne sont pas comparés.
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from benchmarks.corpus import CorpusGenerator, ImageDocument, TextDocument  # noqa: E402
+
+logger = logging.getLogger('benchmarks')
+
+# Type de document transmis au moteur de vérification pour chaque document généré
+VERIFICATION_TYPES = {
+    'passport': 'passport',
+    'id_card': 'id_card',
+    'bank_statement': 'generic',
+}
+
+
+@dataclass
+class Scenario:
+    """Scénario de benchmark: un moteur, une méthode et le type de document d'entrée"""
+
+    name: str
+    engine: str
+    method: str
+    input_kind: str  # 'image' ou 'text'
+    route: str
+
+
+SCENARIOS = [
+    Scenario('ocr.extract_from_file', 'ocr', 'extract_from_file', 'image', '/api/v1/ocr/extract-document-data'),
+    Scenario('document_verification.verify_from_file', 'document_verification', 'verify_from_file', 'image',
+             '/api/v1/document/verify'),
+    Scenario('nlp.analyze_text', 'nlp', 'analyze_text', 'text', '/api/v1/nlp/analyze'),
+    Scenario('ner.extract_kyc_entities', 'ner', 'extract_kyc_entities', 'text', '/api/v1/ner/extract-kyc-entities'),
+    Scenario('ner.extract_aml_entities', 'ner', 'extract_aml_entities', 'text', '/api/v1/ner/extract-aml-entities'),
+]
+
+
+def peak_rss_mb() -> float:
+    """Pic de mémoire résidente du processus depuis son démarrage (Mo)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss est en kilo-octets sous Linux et en octets sous macOS
+    divisor = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return round(peak / divisor, 1)
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Percentile (méthode du rang le plus proche) en millisecondes"""
+    ordered = sorted(samples)
+    index = max(0, math.ceil(p * len(ordered)) - 1)
+    return round(ordered[index] * 1000, 2)
+
+
+class DirectTarget:
+    """Appels directs aux services, chargés via le registre des moteurs"""
+
+    def __init__(self):
+        from services.engine_registry import engine_registry
+        self.registry = engine_registry
+
+    def prepare(self, scenario: Scenario):
+        started = time.perf_counter()
+        self.registry.get(scenario.engine)
+        return time.perf_counter() - started
+
+    def call(self, scenario: Scenario, document):
+        if scenario.engine == 'document_verification':
+            return self.registry.call(
+                scenario.engine, scenario.method, document.content, VERIFICATION_TYPES[document.document_type]
+            )
+        if scenario.input_kind == 'image':
+            return self.registry.call(scenario.engine, scenario.method, document.content)
+        return self.registry.call(scenario.engine, scenario.method, document.text)
+
+    def close(self):
+        pass
+
+
+class ApiTarget:
+    """Appels HTTP à l'application FastAPI (en processus, via TestClient)"""
+
+    def __init__(self):
+        from fastapi.testclient import TestClient
+        import main
+        self.client = TestClient(main.app)
+        self.client.__enter__()
+        self.headers = {'Authorization': f"Bearer {settings.BACKEND_API_KEY or 'benchmark'}"}
+
+    def prepare(self, scenario: Scenario):
+        started = time.perf_counter()
+        while self.client.get('/health/ready').status_code != 200:
+            health = self.client.get('/health').json()
+            if health['status'] == 'unhealthy':
+                raise RuntimeError(f"Service indisponible: {health['engines']}")
+            time.sleep(0.1)
+        return time.perf_counter() - started
+
+    def call(self, scenario: Scenario, document):
+        if scenario.input_kind == 'image':
+            params = {}
+            if scenario.engine == 'document_verification':
+                params['document_type'] = VERIFICATION_TYPES[document.document_type]
+            response = self.client.post(
+                scenario.route,
+                params=params,
+                files={'file': (f"{document.name}.png", document.content, 'image/png')},
+                headers=self.headers,
+            )
+        else:
+            response = self.client.post(scenario.route, json={'text': document.text}, headers=self.headers)
+        response.raise_for_status()
+        return response.json()
+
+    def close(self):
+        self.client.__exit__(None, None, None)
+
+
+def run_scenario(target, scenario: Scenario, documents: List, iterations: int, warmup: int) -> Dict:
+    """
+    Mesurer un scénario
+
+    Args:
+        target: Cible des appels (DirectTarget ou ApiTarget)
+        scenario: Scénario à exécuter
+        documents: Documents d'entrée
+        iterations: Nombre de passages sur les documents
+        warmup: Nombre d'appels de préchauffage non mesurés
+
+    Returns:
+        Débit, percentiles de latence et pic de mémoire
+    """
+    load_seconds = target.prepare(scenario)
+    for index in range(warmup):
+        target.call(scenario, documents[index % len(documents)])
+
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(iterations):
+        for document in documents:
+            call_started = time.perf_counter()
+            target.call(scenario, document)
+            latencies.append(time.perf_counter() - call_started)
+    elapsed = time.perf_counter() - started
+
+    return {
+        'calls': len(latencies),
+        'throughput_per_s': round(len(latencies) / elapsed, 3),
+        'p50_ms': percentile(latencies, 0.50),
+        'p95_ms': percentile(latencies, 0.95),
+        'p99_ms': percentile(latencies, 0.99),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 2),
+        'load_seconds': round(load_seconds, 3),
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def measure(mode: str, scenario: Scenario, documents: List, iterations: int, warmup: int) -> Tuple[Dict, Dict]:
+    """
+    Mesurer un scénario dans un processus neuf (voir run_scenario)
+
+    Returns:
+        Mesures du scénario et versions des modèles chargés (mode direct)
+    """
+    logging.basicConfig(level=logging.WARNING, format=settings.LOG_FORMAT)
+    target = ApiTarget() if mode == 'api' else DirectTarget()
+    try:
+        stats = run_scenario(target, scenario, documents, iterations, warmup)
+    except Exception as e:
+        # Les exceptions des moteurs ne sont pas toutes transmissibles au processus parent
+        raise RuntimeError(f"{scenario.name}: {type(e).__name__}: {str(e)}") from None
+    finally:
+        target.close()
+
+    engines = {}
+    if mode == 'direct':
+        engines = {
+            name: state['model_version'] for name, state in target.registry.status().items() if state['model_version']
+        }
+    return stats, engines
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Comparer les résultats à une référence
+
+    Args:
+        results: Résultats de l'exécution
+        baseline: Résultats de référence
+        tolerance: Écart relatif toléré (0.1 = 10%)
+
+    Returns:
+        Liste des régressions détectées
+    """
+    regressions = []
+    for name, reference in baseline['scenarios'].items():
+        current = results['scenarios'].get(name)
+        if current is None:
+            continue
+        checks = [
+            ('p95_ms', current['p95_ms'] > reference['p95_ms'] * (1 + tolerance)),
+            ('throughput_per_s', current['throughput_per_s'] < reference['throughput_per_s'] * (1 - tolerance)),
+            ('peak_rss_mb', current['peak_rss_mb'] > reference['peak_rss_mb'] * (1 + tolerance)),
+        ]
+        for metric, regressed in checks:
+            if regressed:
+                regressions.append(f"{name}: {metric} {reference[metric]} -> {current[metric]}")
+    return regressions
+
+
+def print_report(results: Dict, baseline: Optional[Dict]):
+    """Afficher les résultats sous forme de tableau"""
+    header = f"{'scénario':<48}{'débit/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'RSS Mo':>10}"
+    print(header)
+    print('-' * len(header))
+    for name, stats in results['scenarios'].items():
+        line = (
+            f"{name:<48}{stats['throughput_per_s']:>10}{stats['p50_ms']:>10}"
+            f"{stats['p95_ms']:>10}{stats['p99_ms']:>10}{stats['peak_rss_mb']:>10}"
+        )
+        reference = (baseline or {}).get('scenarios', {}).get(name)
+        if reference:
+            delta = (stats['p95_ms'] - reference['p95_ms']) / reference['p95_ms'] * 100 if reference['p95_ms'] else 0
+            line += f"   p95 {delta:+.1f}%"
+        print(line)
+
+
+def scenario_key(scenario: Scenario, size: str) -> str:
+    return f"{scenario.name}[{size}]"
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark des moteurs IA sur un corpus synthétique")
+    parser.add_argument('--mode', choices=('direct', 'api'), default='direct')
+    parser.add_argument('--sizes', default='small,medium', help="Tailles du corpus: small, medium, large")
+    parser.add_argument('--engines', default='ocr,document_verification,nlp,ner')
+    parser.add_argument('--documents', type=int, default=2, help="Documents par type et par taille")
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--warmup', type=int, default=2)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    parser.add_argument('--baseline', help="Fichier JSON de référence à comparer")
+    parser.add_argument('--save-baseline', help="Enregistrer les résultats comme nouvelle référence")
+    parser.add_argument('--tolerance', type=float, default=0.15)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING, format=settings.LOG_FORMAT)
+    sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    engines = {engine.strip() for engine in args.engines.split(',')}
+
+    generator = CorpusGenerator(seed=args.seed)
+    images: List[ImageDocument] = generator.images(sizes, args.documents)
+    texts: List[TextDocument] = generator.texts(sizes, args.documents)
+
+    results: Dict[str, Any] = {
+        'meta': {
+            'mode': args.mode,
+            'seed': args.seed,
+            'sizes': sizes,
+            'documents': args.documents,
+            'iterations': args.iterations,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'scenarios': {},
+    }
+
+    # spawn: chaque scénario part d'un interpréteur neuf, sans les moteurs des précédents
+    context = multiprocessing.get_context('spawn')
+    engine_versions: Dict[str, str] = {}
+    for scenario in SCENARIOS:
+        if scenario.engine not in engines:
+            continue
+        corpus = images if scenario.input_kind == 'image' else texts
+        for size in sizes:
+            documents = [document for document in corpus if document.size == size]
+            key = scenario_key(scenario, size)
+            logger.warning(f"Scénario {key} ({len(documents)} documents x {args.iterations})")
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                stats, versions = pool.submit(
+                    measure, args.mode, scenario, documents, args.iterations, args.warmup
+                ).result()
+            results['scenarios'][key] = stats
+            engine_versions.update(versions)
+
+    if args.mode == 'direct':
+        results['meta']['engines'] = engine_versions
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print_report(results, baseline)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if baseline is not None:
+        if baseline['meta'].get('mode') != args.mode:
+            print(f"Attention: la référence a été mesurée en mode {baseline['meta'].get('mode')}")
+        if baseline['meta'].get('cpu_count') != results['meta']['cpu_count']:
+            print(f"Attention: la référence a été mesurée sur {baseline['meta'].get('cpu_count')} coeur(s)")
+        for engine, version in results['meta'].get('engines', {}).items():
+            reference_version = baseline['meta'].get('engines', {}).get(engine)
+            if reference_version is not None and reference_version != version:
+                print(f"Attention: la référence a été mesurée avec {reference_version} ({engine}: {version})")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} régression(s) au-delà de {args.tolerance:.0%}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\nAucune régression au-delà de {args.tolerance:.0%}")
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+Recherche de la meilleure répartition des threads sur le nœud courant
+
+Exemples (depuis ai-service/):
+    python -m benchmarks.threads
+    python -m benchmarks.threads --engines ocr,document_verification --duration 30
+    python -m benchmarks.threads --layouts 1x16x1,4x2x2,16x1x1 --compare-defaults
+    python -m benchmarks.threads --max-p95-ms 1500 --output threads.json
+
+Une répartition PxCxT correspond à P processus (workers), C appels de moteurs
+simultanés par processus et T threads intra-opération par appel. Chaque
+répartition est mesurée sur la même charge: les P processus (spawn) appliquent
+thread_budget_service, chargent les moteurs puis démarrent ensemble; dans
+chacun, C threads appellent les moteurs en boucle pendant --duration secondes.
+
+Par défaut, toutes les répartitions P x C x T = nombre de coeurs sont testées.
+Avec --compare-defaults, chaque répartition est aussi mesurée sans limite
+(threads choisis par chaque bibliothèque) pour chiffrer la sursouscription.
+La meilleure répartition est celle du débit le plus élevé dont le p95 respecte
+--max-p95-ms; les paramètres correspondants sont affichés.
+"""
+import argparse
+import json
+import logging
+import math
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Les bibliothèques de calcul ne sont importées qu'après l'application de la
+# répartition, dans chaque processus (les variables OMP/BLAS sont lues au chargement)
+from services.thread_budget import available_cores  # noqa: E402
+
+logger = logging.getLogger('benchmarks')
+
+
+@dataclass
+class Layout:
+    """Répartition testée: processus, appels simultanés et threads par appel (0 = sans limite)"""
+
+    processes: int
+    concurrency: int
+    threads: int
+
+    @property
+    def name(self) -> str:
+        threads = self.threads or 'défaut'
+        return f"{self.processes}x{self.concurrency}x{threads}"
+
+
+def parse_layout(value: str) -> Layout:
+    """Lire une répartition PxCxT (T = 0 ou 'default' pour les valeurs des bibliothèques)"""
+    processes, concurrency, threads = value.lower().split('x')
+    return Layout(int(processes), int(concurrency), 0 if threads in ('0', 'default') else int(threads))
+
+
+def candidate_layouts(cores: int) -> List[Layout]:
+    """Répartitions utilisant exactement tous les coeurs (puissances de deux, plus le total)"""
+    counts = sorted({2 ** i for i in range(int(math.log2(cores)) + 1)} | {cores})
+    layouts = []
+    for processes in counts:
+        for concurrency in counts:
+            if cores % (processes * concurrency) == 0 and processes * concurrency <= cores:
+                layouts.append(Layout(processes, concurrency, cores // (processes * concurrency)))
+    return layouts
+
+
+def _worker(layout: Layout, engines: List[str], sizes: List[str], duration: float, seed: int, barrier, results):
+    """Processus de mesure: répartition, chargement des moteurs puis charge pendant duration secondes"""
+    logging.basicConfig(level=logging.WARNING)
+    if layout.threads:
+        from services.thread_budget import thread_budget_service
+        thread_budget_service.configure(
+            processes=layout.processes,
+            concurrency=layout.concurrency,
+            cores=layout.processes * layout.concurrency * layout.threads,
+        )
+
+    from benchmarks.corpus import CorpusGenerator
+    from benchmarks.run import SCENARIOS, DirectTarget
+
+    target = DirectTarget()
+    generator = CorpusGenerator(seed=seed)
+    corpus = {'image': generator.images(sizes, 1), 'text': generator.texts(sizes, 1)}
+    calls = []
+    for scenario in SCENARIOS:
+        if scenario.engine in engines:
+            target.prepare(scenario)
+            for document in corpus[scenario.input_kind]:
+                target.call(scenario, document)  # préchauffage
+                calls.append((scenario, document))
+
+    latencies: List[float] = []
+    errors = []
+    lock = threading.Lock()
+
+    def load(offset: int, deadline: float):
+        index = offset
+        while time.perf_counter() < deadline:
+            scenario, document = calls[index % len(calls)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                target.call(scenario, document)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - started)
+
+    barrier.wait()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=load, args=(offset, deadline)) for offset in range(layout.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results.put({'latencies': latencies, 'errors': len(errors)})
+
+
+def measure(layout: Layout, args: argparse.Namespace) -> Dict:
+    """
+    Mesurer une répartition
+
+    Args:
+        layout: Répartition à mesurer
+        args: Arguments de la ligne de commande
+
+    Returns:
+        Débit total, percentiles de latence et erreurs
+    """
+    from benchmarks.run import percentile
+
+    context = multiprocessing.get_context('spawn')
+    barrier = context.Barrier(layout.processes + 1)
+    results = context.Queue()
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(layout, args.engines, args.sizes, args.duration, args.seed + index, barrier, results),
+        )
+        for index in range(layout.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    try:
+        # Tous les processus ont chargé leurs moteurs: la charge démarre simultanément
+        barrier.wait(timeout=args.ready_timeout)
+        outputs = [results.get(timeout=args.duration + args.ready_timeout) for _ in processes]
+    finally:
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.terminate()
+
+    latencies = [latency for output in outputs for latency in output['latencies']]
+    return {
+        'layout': layout.name,
+        'processes': layout.processes,
+        'concurrency': layout.concurrency,
+        'threads': layout.threads or None,
+        'calls': len(latencies),
+        'errors': sum(output['errors'] for output in outputs),
+        'throughput_per_s': round(len(latencies) / args.duration, 3),
+        'p50_ms': percentile(latencies, 0.50) if latencies else None,
+        'p95_ms': percentile(latencies, 0.95) if latencies else None,
+        'p99_ms': percentile(latencies, 0.99) if latencies else None,
+    }
+
+
+def best_layout(results: List[Dict], max_p95_ms: Optional[float]) -> Optional[Dict]:
+    """Répartition limitée de plus haut débit respectant le p95 maximal"""
+    eligible = [
+        result for result in results
+        if result['threads'] and result['calls'] and not result['errors']
+        and (max_p95_ms is None or result['p95_ms'] <= max_p95_ms)
+    ]
+    return max(eligible, key=lambda result: result['throughput_per_s'], default=None)
+
+
+def print_report(results: List[Dict], best: Optional[Dict]):
+    """Afficher les mesures et la répartition recommandée"""
+    header = f"{'répartition':<14}{'appels':>8}{'débit/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'erreurs':>9}"
+    print(header)
+    print('-' * len(header))
+    for result in sorted(results, key=lambda result: -result['throughput_per_s']):
+        marker = '  <-' if result is best else ''
+        print(
+            f"{result['layout']:<14}{result['calls']:>8}{result['throughput_per_s']:>10}{str(result['p50_ms']):>10}"
+            f"{str(result['p95_ms']):>10}{str(result['p99_ms']):>10}{result['errors']:>9}{marker}"
+        )
+
+    if best is None:
+        print("\nAucune répartition ne respecte les contraintes")
+        return
+    cores = best['processes'] * best['concurrency'] * best['threads']
+    print(f"\nRépartition recommandée pour {cores} coeurs: {best['layout']} (processus x appels x threads)")
+    print(f"  WEB_CONCURRENCY={best['processes']}  (ou python prefork.py --workers {best['processes']})")
+    print(f"  THREAD_BUDGET_CORES={cores}")
+    print(f"  THREAD_BUDGET_CONCURRENCY={best['concurrency']}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Recherche de la meilleure répartition des threads")
+    parser.add_argument('--cores', type=int, default=0, help="Coeurs à répartir (0 = coeurs disponibles)")
+    parser.add_argument('--layouts', help="Répartitions PxCxT séparées par des virgules (sinon toutes)")
+    parser.add_argument('--compare-defaults', action='store_true', help="Mesurer aussi chaque répartition sans limite")
+    parser.add_argument('--engines', default='ocr,document_verification,ner')
+    parser.add_argument('--sizes', default='small,medium')
+    parser.add_argument('--duration', type=float, default=20.0, help="Durée de la charge par répartition (s)")
+    parser.add_argument('--max-p95-ms', type=float, help="p95 maximal de la répartition recommandée")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--ready-timeout', type=float, default=600.0)
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.WARNING)
+    args.engines = [engine.strip() for engine in args.engines.split(',') if engine.strip()]
+    args.sizes = [size.strip() for size in args.sizes.split(',') if size.strip()]
+    cores = args.cores or available_cores()
+
+    if args.layouts:
+        layouts = [parse_layout(value.strip()) for value in args.layouts.split(',') if value.strip()]
+    else:
+        layouts = candidate_layouts(cores)
+    if args.compare_defaults:
+        layouts += [Layout(layout.processes, layout.concurrency, 0) for layout in layouts if layout.threads]
+
+    results = []
+    for layout in layouts:
+        logger.warning(f"Répartition {layout.name} ({args.duration:.0f}s)")
+        results.append(measure(layout, args))
+
+    best = best_layout(results, args.max_p95_ms)
+    print_report(results, best)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'cores': cores, 'engines': args.engines, 'results': results, 'best': best}, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
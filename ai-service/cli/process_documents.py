@@ -0,0 +1,297 @@
+"""
+Traitement hors ligne de documents (OCR, vérification, entités KYC)
+
+Exemples (depuis ai-service/):
+    python -m cli.process_documents /data/kyc --output results.jsonl
+    python -m cli.process_documents archive.zip --stages ocr,kyc_entities --workers 8 --output results.jsonl
+    python -m cli.process_documents /data/kyc --output results.jsonl --resume
+    python -m cli.process_documents /data/kyc --format parquet --output results/ --resume
+
+Les documents d'un répertoire (parcours récursif) ou d'une archive (.zip, .tar,
+.tar.gz, .tgz) sont traités par un pool de processus, chacun chargeant ses
+propres moteurs. Chaque résultat est ajouté au fichier JSONL dès qu'il est
+disponible; ce fichier sert aussi de point de reprise: avec --resume, les
+documents déjà traités avec succès sont ignorés.
+
+Avec --format parquet ou arrow, --output est un répertoire: chaque exécution y
+ajoute des parties documents-NNNNN (une ligne par document) et entities-NNNNN
+(une ligne par entité: document, type, position, valeur normalisée), une
+nouvelle partie toutes les --row-groups-per-part groupes de lignes.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import tarfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from services.columnar_export import COLUMNAR_FORMATS, ColumnarResultWriter, read_processed_ids  # noqa: E402
+from services.document_pipeline import PIPELINE_STAGES, resolve_stages  # noqa: E402
+
+logger = logging.getLogger('process_documents')
+
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.tif', '.tiff', '.bmp', '.webp')
+ENGINES_BY_STAGE = {'ocr': 'ocr', 'verification': 'document_verification', 'kyc_entities': 'ner'}
+
+
+def iter_documents(source: str, extensions: Tuple[str, ...]) -> Iterator[Tuple[str, Callable[[], bytes]]]:
+    """
+    Parcourir les documents d'un répertoire ou d'une archive
+
+    Le contenu n'est lu que si la fonction de lecture est appelée: les
+    documents ignorés à la reprise ne sont pas lus. Pour une archive tar, la
+    fonction doit être appelée avant de passer au document suivant.
+
+    Args:
+        source: Répertoire ou archive
+        extensions: Extensions de fichiers à traiter
+
+    Yields:
+        Identifiant du document (chemin relatif, ou archive!membre) et fonction de lecture du contenu
+    """
+    def accepted(name: str) -> bool:
+        return name.lower().endswith(extensions)
+
+    def read_file(path: str) -> bytes:
+        with open(path, 'rb') as f:
+            return f.read()
+
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for name in sorted(files):
+                if accepted(name):
+                    path = os.path.join(root, name)
+                    yield os.path.relpath(path, source), partial(read_file, path)
+    elif zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for info in sorted(archive.infolist(), key=lambda info: info.filename):
+                if not info.is_dir() and accepted(info.filename):
+                    yield f"{os.path.basename(source)}!{info.filename}", partial(archive.read, info)
+    elif tarfile.is_tarfile(source):
+        # Lecture séquentielle: les archives compressées ne permettent pas d'accès direct
+        with tarfile.open(source, 'r:*') as archive:
+            for member in archive:
+                if member.isfile() and accepted(member.name):
+                    yield f"{os.path.basename(source)}!{member.name}", lambda member=member: archive.extractfile(member).read()
+    else:
+        raise ValueError(f"{source} n'est ni un répertoire ni une archive zip/tar")
+
+
+def load_checkpoint(output: str, retry_failed: bool) -> Set[str]:
+    """
+    Lire les documents déjà traités dans un fichier de résultats existant
+
+    Une dernière ligne tronquée (arrêt brutal pendant l'écriture) est ignorée.
+
+    Args:
+        output: Fichier JSONL des résultats
+        retry_failed: Retraiter les documents en échec
+
+    Returns:
+        Identifiants des documents à ne pas retraiter
+    """
+    done = set()
+    if not os.path.exists(output):
+        return done
+
+    with open(output, encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('success') or not retry_failed:
+                done.add(record['id'])
+    return done
+
+
+def _init_worker(engines: List[str], log_level: str, workers: int):
+    """Charger les moteurs nécessaires dans un processus du pool"""
+    logging.basicConfig(level=log_level, format=settings.LOG_FORMAT)
+    from services.thread_budget import thread_budget_service
+    # Un document à la fois par processus, les coeurs sont partagés entre les processus du pool
+    thread_budget_service.configure(processes=workers, concurrency=1)
+    from services.engine_registry import engine_registry
+    for engine in engines:
+        engine_registry.get(engine)
+
+
+def _process(document_id: str, file_bytes: bytes, stages: List[str], document_type: Optional[str]) -> Dict:
+    """Traiter un document dans un processus du pool"""
+    from services.document_pipeline import process_local
+
+    started = time.perf_counter()
+    try:
+        data = process_local(file_bytes, stages, document_type)
+        record = {'id': document_id, 'success': True, 'data': data}
+    except Exception as e:
+        record = {'id': document_id, 'success': False, 'error': f"{type(e).__name__}: {str(e)}"}
+    record['duration_seconds'] = round(time.perf_counter() - started, 3)
+    return record
+
+
+class ResultWriter:
+    """Écriture incrémentale des résultats (une ligne JSON par document)"""
+
+    def __init__(self, path: str, append: bool, fsync_every: int):
+        if append:
+            self._truncate_partial_line(path)
+        self.file = open(path, 'a' if append else 'w', encoding='utf-8')
+        self.fsync_every = fsync_every
+        self.pending = 0
+
+    def write(self, record: Dict):
+        self.file.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+        self.file.flush()
+        self.pending += 1
+        if self.pending >= self.fsync_every:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+
+    def close(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.file.close()
+
+    @staticmethod
+    def _truncate_partial_line(path: str, block_size: int = 65536):
+        """Retirer une dernière ligne tronquée (arrêt brutal) avant d'ajouter de nouveaux résultats"""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as f:
+            size = end = f.seek(0, os.SEEK_END)
+            # Recherche du dernier saut de ligne en partant de la fin du fichier
+            while end > 0:
+                start = max(end - block_size, 0)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b'\n')
+                if newline >= 0:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end < size:
+                logger.warning(f"Dernière ligne tronquée retirée de {path} ({size - end} octets)")
+                f.truncate(end)
+
+
+def run(args: argparse.Namespace) -> Dict:
+    """
+    Traiter tous les documents de la source
+
+    Args:
+        args: Arguments de la ligne de commande
+
+    Returns:
+        Compteurs du traitement
+    """
+    stages = resolve_stages(stage.strip() for stage in args.stages.split(',') if stage.strip())
+    engines = [ENGINES_BY_STAGE[stage] for stage in stages]
+    extensions = tuple(ext if ext.startswith('.') else f".{ext}" for ext in args.extensions.split(','))
+
+    done = set()
+    if args.resume and args.format == 'jsonl':
+        done = load_checkpoint(args.output, args.retry_failed)
+    elif args.resume:
+        done = read_processed_ids(args.output, args.format, args.retry_failed)
+    if done:
+        logger.warning(f"Reprise: {len(done)} documents déjà traités seront ignorés")
+
+    if args.format == 'jsonl':
+        writer = ResultWriter(args.output, append=args.resume, fsync_every=args.fsync_every)
+    else:
+        writer = ColumnarResultWriter(args.output, args.format, args.row_group_size, args.row_groups_per_part)
+    counters = {'processed': 0, 'succeeded': 0, 'failed': 0, 'skipped': 0}
+    started = time.perf_counter()
+
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(engines, args.log_level, args.workers),
+    )
+    pending = set()
+
+    def collect(futures):
+        for future in futures:
+            record = future.result()
+            writer.write(record)
+            counters['processed'] += 1
+            counters['succeeded' if record['success'] else 'failed'] += 1
+            if counters['processed'] % args.progress_every == 0:
+                rate = counters['processed'] / (time.perf_counter() - started)
+                logger.warning(
+                    f"{counters['processed']} documents traités ({counters['failed']} en échec), {rate:.2f} docs/s"
+                )
+
+    try:
+        for document_id, load in iter_documents(args.source, extensions):
+            if document_id in done:
+                counters['skipped'] += 1
+                continue
+            if args.limit and counters['processed'] + len(pending) >= args.limit:
+                break
+
+            # Limiter les documents en mémoire: au plus deux par processus
+            if len(pending) >= args.workers * 2:
+                completed, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(completed)
+            pending.add(pool.submit(_process, document_id, load(), stages, args.document_type))
+
+        collect(wait(pending).done)
+        pending = set()
+    finally:
+        # Interruption: abandonner les documents non démarrés; ils seront repris avec --resume
+        pool.shutdown(wait=True, cancel_futures=True)
+        writer.close()
+
+    counters['duration_seconds'] = round(time.perf_counter() - started, 1)
+    return counters
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Traitement hors ligne de documents KYC")
+    parser.add_argument('source', help="Répertoire ou archive (.zip, .tar, .tar.gz, .tgz)")
+    parser.add_argument('--output', required=True, help="Fichier JSONL (ou répertoire Parquet/Arrow) des résultats")
+    parser.add_argument('--format', choices=('jsonl',) + tuple(COLUMNAR_FORMATS), default='jsonl')
+    parser.add_argument('--row-group-size', type=int, default=1000, help="Documents par groupe de lignes (Parquet/Arrow)")
+    parser.add_argument(
+        '--row-groups-per-part', type=int, default=10,
+        help="Groupes de lignes par partie (Parquet/Arrow): un arrêt brutal ne fait perdre que la partie en cours",
+    )
+    parser.add_argument('--stages', default=','.join(PIPELINE_STAGES), help="ocr, verification, kyc_entities")
+    parser.add_argument('--document-type', help="Type de document (sinon détecté par l'OCR)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--extensions', default=','.join(IMAGE_EXTENSIONS))
+    parser.add_argument('--resume', action='store_true', help="Reprendre à partir du fichier de résultats existant")
+    parser.add_argument('--retry-failed', action='store_true', help="Avec --resume, retraiter les documents en échec")
+    parser.add_argument('--limit', type=int, default=0, help="Nombre maximal de documents à traiter")
+    parser.add_argument('--progress-every', type=int, default=100)
+    parser.add_argument('--fsync-every', type=int, default=100)
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format=settings.LOG_FORMAT)
+
+    existing = os.path.isfile(args.output) if args.format == 'jsonl' else bool(
+        os.path.isdir(args.output) and os.listdir(args.output)
+    )
+    if existing and not args.resume:
+        parser.error(f"{args.output} existe déjà: utiliser --resume pour reprendre ou choisir une autre destination")
+
+    counters = run(args)
+    print(json.dumps(counters))
+    return 0 if counters['failed'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,90 @@
+"""
+Scoring hors ligne du risque AML de fichiers de transactions (CSV ou Parquet)
+
+Exemples (depuis ai-service/):
+    python -m cli.score_transactions transactions.csv --output scores.jsonl
+    python -m cli.score_transactions /data/transactions-2024-03.parquet --min-score 40 --output alerts.jsonl
+    python -m cli.score_transactions transactions.csv --chunk-rows 200000 --output -
+
+Le fichier est lu par blocs de --chunk-rows transactions: la mémoire utilisée
+ne dépend pas de sa taille. Chaque bloc est scoré puis écrit immédiatement
+(une ligne JSON par transaction dont le score atteint --min-score); la
+synthèse est affichée à la fin sur la sortie d'erreur. Avec --update-profiles,
+les profils clients du journal CLIENT_PROFILE_LOG_PATH sont mis à jour.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from typing import List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import settings  # noqa: E402
+from services.client_profile_service import client_profile_service  # noqa: E402
+from services.transaction_scoring import (  # noqa: E402
+    AMOUNT_LOCALES,
+    TRANSACTION_FORMATS,
+    TransactionScorer,
+    iter_transaction_chunks,
+    transaction_format,
+)
+
+logger = logging.getLogger('score_transactions')
+
+
+def run(args: argparse.Namespace) -> dict:
+    """
+    Scorer toutes les transactions du fichier
+
+    Args:
+        args: Arguments de la ligne de commande
+
+    Returns:
+        Synthèse du scoring
+    """
+    file_format = args.format or transaction_format(args.source)
+    scorer = TransactionScorer(
+        args.min_score, client_profile_service if args.update_profiles else None, args.amount_locale
+    )
+    output = sys.stdout if args.output == '-' else open(args.output, 'w', encoding='utf-8')
+    try:
+        for chunk in iter_transaction_chunks(args.source, file_format, args.chunk_rows):
+            results = scorer.score_chunk(chunk)
+            output.write(''.join(json.dumps(result, ensure_ascii=False) + '\n' for result in results))
+            output.flush()
+            logger.info(f"{scorer.rows} transactions scorées, {scorer.returned} retournées")
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return scorer.summary()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Scoring AML de fichiers de transactions")
+    parser.add_argument('source', help="Fichier de transactions (.csv ou .parquet)")
+    parser.add_argument('--output', required=True, help="Fichier JSONL des scores (- pour la sortie standard)")
+    parser.add_argument('--format', choices=sorted(set(TRANSACTION_FORMATS.values())), help="Format (sinon d'après l'extension)")
+    parser.add_argument('--min-score', type=float, default=0.0, help="Score minimal des transactions écrites (0-100)")
+    parser.add_argument('--chunk-rows', type=int, default=settings.AML_SCORING_CHUNK_ROWS)
+    parser.add_argument('--amount-locale', choices=AMOUNT_LOCALES, default=settings.AML_AMOUNT_LOCALE,
+                        help="Écriture des montants texte: auto (par valeur), fr (1.234,56) ou en (1,234.56)")
+    parser.add_argument('--update-profiles', action='store_true', help="Mettre à jour les profils clients (CLIENT_PROFILE_LOG_PATH)")
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=args.log_level, format=settings.LOG_FORMAT)
+
+    if args.update_profiles and not settings.CLIENT_PROFILE_LOG_PATH:
+        parser.error("--update-profiles nécessite CLIENT_PROFILE_LOG_PATH (journal partagé avec le service)")
+    if not (args.format or transaction_format(args.source)):
+        parser.error(f"Format de {args.source} non reconnu: utiliser --format ({', '.join(sorted(set(TRANSACTION_FORMATS.values())))})")
+
+    summary = run(args)
+    print(json.dumps(summary), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -35,16 +35,126 @@ class Settings(BaseSettings):
         "image/tiff",
     ]
 
+    # Document Storage (MinIO, partagé avec le backend)
+    MINIO_ENDPOINT: str = "localhost"
+    MINIO_PORT: int = 9000
+    MINIO_ACCESS_KEY: Optional[str] = None
+    MINIO_SECRET_KEY: Optional[str] = None
+    MINIO_SECURE: bool = False
+    MINIO_BUCKET: str = "regtech-documents"
+
+    # Document Verification
+    VERIFICATION_CHECK_WORKERS: int = 4  # Threads par image pour les vérifications (1 = séquentiel)
+    VERIFICATION_BATCH_PROCESSES: int = 0  # Processus pour la vérification par lot (0 = SCHEDULER_BATCH_CONCURRENCY, qui le plafonne)
+    VERIFICATION_BATCH_MAX_ITEMS: int = 500  # Documents maximum par lot
+
+    # Bank Statements (tableau des opérations reconstruit à partir des boîtes OCR)
+    STATEMENT_ROW_GAP: float = 0.6  # Écart entre rangées, relatif à la hauteur médiane des lignes
+    STATEMENT_MAX_PAGES: int = 200  # Pages maximum par relevé
+
+    # AML Transaction Scoring (fichiers CSV/Parquet scorés par blocs)
+    AML_SCORING_CHUNK_ROWS: int = 50000  # Transactions lues et scorées par bloc
+    AML_SCORING_MAX_UPLOAD_MB: int = 1024  # Taille maximale d'un fichier envoyé à l'API (413 au-delà)
+    AML_AMOUNT_LOCALE: str = "auto"  # Écriture des montants texte: auto (par valeur), fr (1.234,56) ou en (1,234.56)
+    AML_HIGH_AMOUNT: float = 10000.0  # Seuil de montant élevé (fractionnement: 90 % à 100 % du seuil)
+    AML_HIGH_RISK_COUNTRIES: list[str] = ["KP", "IR", "MM", "SY", "YE", "AF", "VE", "HT", "SS"]  # Codes ISO 3166-1
+
+    # Client Risk Profiles (agrégats incrémentaux par client)
+    CLIENT_PROFILE_LOG_PATH: Optional[str] = None  # Journal des incréments partagé entre processus (None = mémoire)
+    CLIENT_PROFILE_MAX_KEYS: int = 200  # Valeurs conservées par compteur (termes, contreparties, pays)
+    CLIENT_PROFILE_TOP: int = 20  # Valeurs les plus fréquentes retournées par compteur
+    CLIENT_PROFILE_SNAPSHOT_BYTES: int = 64 * 1024 * 1024  # Taille du journal déclenchant un instantané (0 = jamais)
+
+    # Near-duplicate Detection (empreintes perceptuelles des documents vérifiés)
+    NEAR_DUPLICATE_ENABLED: bool = True
+    NEAR_DUPLICATE_RADIUS: int = 8  # Distance de Hamming maximale (bits sur 64)
+    NEAR_DUPLICATE_MAX_MATCHES: int = 10  # Soumissions proches retournées
+    NEAR_DUPLICATE_INDEX_PATH: Optional[str] = None  # Fichier partagé entre processus (None = mémoire)
+
     # Spacy Configuration
     SPACY_MODEL: str = "fr_core_news_lg"
 
+    # Text Similarity (signatures MinHash et index LSH du corpus)
+    SIMILARITY_SHINGLE_SIZE: int = 5  # Mots par shingle
+    SIMILARITY_NUM_PERM: int = 128  # Permutations MinHash (taille de la signature)
+    SIMILARITY_LSH_BANDS: int = 32  # Bandes LSH (SIMILARITY_NUM_PERM doit en être un multiple)
+    SIMILARITY_THRESHOLD: float = 0.5  # Similarité de Jaccard estimée minimale
+    SIMILARITY_MAX_MATCHES: int = 20  # Documents proches retournés
+    SIMILARITY_MAX_DOCUMENTS: int = 1000  # Documents maximum par requête d'indexation
+    SIMILARITY_INDEX_PATH: Optional[str] = None  # Fichier partagé entre processus (None = mémoire)
+    SIMILARITY_MATRIX_MAX_DOCUMENTS: int = 200  # Textes maximum par matrice de similarité
+    SIMILARITY_MATRIX_TOP_K: int = 5  # Voisins les plus proches retournés par texte
+    NLP_PIPE_BATCH_SIZE: int = 32  # Textes analysés par lot avec nlp.pipe
+
+    # Spacy Doc Cache (Doc analysés sérialisés avec DocBin, par modèle et texte)
+    DOC_CACHE_ENABLED: bool = True
+    DOC_CACHE_DIR: str = "./cache/spacy_docs"
+    DOC_CACHE_MAX_MB: int = 512  # Taille maximale (fichiers les moins récemment utilisés supprimés)
+    DOC_CACHE_MIN_CHARS: int = 1000  # Textes plus courts analysés directement
+
+    # Normalisation des valeurs extraites (dates, montants, téléphones, IBAN)
+    NORMALIZATION_CACHE_SIZE: int = 100000  # Valeurs distinctes mémorisées par type
+
+    # Entity Resolution (rattachement des mentions à des entités canoniques)
+    ENTITY_RESOLUTION_ENABLED: bool = True
+    ENTITY_RESOLUTION_THRESHOLD: float = 0.78  # Similarité cosinus minimale pour rattacher une variante
+    ENTITY_RESOLUTION_LABEL_THRESHOLDS: dict[str, float] = {"PER": 0.7}  # Par type (PER: candidats, tranchés mot à mot)
+    ENTITY_RESOLUTION_TYPO_LENGTH: int = 5  # Longueur minimale d'un mot pour tolérer une faute de frappe
+    ENTITY_RESOLUTION_VECTOR_WEIGHT: float = 0.3  # Poids des vecteurs Spacy (le reste: trigrammes de caractères)
+    ENTITY_RESOLUTION_TABLES: int = 24  # Tables de hachage de l'index approché
+    ENTITY_RESOLUTION_HASH_BITS: int = 10  # Hyperplans par table
+    ENTITY_RESOLUTION_MAX_CANDIDATES: int = 256  # Candidats comparés par mention (borne la latence)
+    ENTITY_RESOLUTION_MAX_MENTIONS: int = 1000  # Mentions maximum par requête
+    ENTITY_RESOLUTION_INDEX_PATH: Optional[str] = None  # Fichier partagé entre processus (None = mémoire)
+    ENTITY_RESOLUTION_MAX_ENTITIES: int = 500000  # Entités indexées (~2,2 Ko chacune avec le modèle lg)
+
+    # Watchlist Screening (noms translittérés, clés phonétiques et index de blocage)
+    WATCHLIST_PATH: Optional[str] = None  # Liste JSONL partagée entre processus (None = mémoire)
+    WATCHLIST_THRESHOLD: float = 0.85  # Similarité minimale d'un nom pour signaler une correspondance
+    WATCHLIST_MAX_BLOCK: int = 5000  # Blocs plus grands ignorés (clés trop fréquentes)
+    WATCHLIST_MAX_MATCHES: int = 5  # Correspondances retournées par nom
+    WATCHLIST_MAX_NAMES: int = 1000  # Noms maximum par requête de filtrage
+
     # Transformers Configuration
     TRANSFORMERS_MODEL: str = "bert-base-multilingual-cased"
 
+    # Engine Loading
+    ENGINE_LOADING: str = "eager"  # eager (au démarrage, en parallèle) ou lazy (au premier appel, sinon un à un)
+    ENGINE_WARMUP: bool = True  # Inférence de préchauffage sur une entrée synthétique
+
+    # Thread Budget (threads intra-opération de Paddle, OpenCV, BLAS et torch)
+    THREAD_BUDGET_ENABLED: bool = True
+    THREAD_BUDGET_CORES: int = 0  # Coeurs du nœud (0 = affinité CPU et quota cgroup)
+    THREAD_BUDGET_PROCESSES: int = 0  # Processus servant sur le nœud (0 = WEB_CONCURRENCY, sinon 1)
+    THREAD_BUDGET_CONCURRENCY: int = 0  # Appels de moteurs simultanés par processus (0 = ordonnanceur)
+    THREAD_BUDGET_OVERRIDES: dict[str, int] = {}  # Surcharge par bibliothèque, ex: {"opencv": 1}
+
+    # Pre-fork Server (python prefork.py)
+    PREFORK_WORKERS: int = 0  # Workers forkés après le chargement des modèles (0 = nombre de coeurs)
+    PREFORK_BACKLOG: int = 2048  # File d'attente des connexions du socket partagé
+
+    # Scheduler Configuration
+    SCHEDULER_MAX_CONCURRENCY: int = 2  # Traitements simultanés par moteur
+    SCHEDULER_ENGINE_CONCURRENCY: dict[str, int] = {}  # Surcharge par moteur, ex: {"ocr": 4}
+    SCHEDULER_BATCH_CONCURRENCY: int = 1  # Créneaux maximum pour la classe batch
+    SCHEDULER_MAX_QUEUED: int = 32  # Requêtes en attente par moteur avant rejet (503), file interactive réservée
+    SCHEDULER_ENGINE_MAX_QUEUED: dict[str, int] = {}  # Surcharge par moteur
+    SCHEDULER_INTERACTIVE_WEIGHT: int = 4
+    SCHEDULER_BATCH_WEIGHT: int = 1
+    SCHEDULER_LATENCY_WINDOW: int = 1024  # Nombre de requêtes pour les percentiles de latence
+
     # Celery Configuration
     CELERY_BROKER_URL: str = "redis://localhost:6379/0"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/0"
 
+    # Metrics
+    METRICS_ENABLED: bool = True
+
+    # Profiling (X-Debug-Profile, réservé aux administrateurs)
+    ADMIN_API_KEY: Optional[str] = None
+    PROFILE_DIR: str = "./profiles"
+    PROFILE_MAX_FILES: int = 50
+
     # Logging
     LOG_LEVEL: str = "INFO"
     LOG_FORMAT: str = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
@@ -1,16 +1,64 @@
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, status
+from fastapi import FastAPI, File, Form, UploadFile, HTTPException, Depends, Header, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from pydantic import BaseModel
 from typing import Optional, List, Dict, Any
+from contextlib import asynccontextmanager
+import asyncio
+import functools
+import json
+import secrets
+import time
 import logging
 import uvicorn
 
 from config import settings
-from services.ocr_service import ocr_service
-from services.nlp_service import nlp_service
-from services.ner_service import ner_service
-from services.document_verification_service import DocumentVerificationService
+from services.thread_budget import thread_budget_service
+
+# Répartition des threads avant l'import des bibliothèques de calcul (numpy, OpenCV, Paddle)
+thread_budget_service.configure()
+
+from services.document_image import decode_image, decode_pages
+from services.document_pipeline import document_pipeline, resolve_stages, PIPELINE_STAGES
+from services.batch_verification_service import batch_verification_service, BatchItem
+from services.client_profile_service import client_profile_service, aml_entities_delta, risk_indicators_delta
+from services.engine_registry import engine_registry, EngineUnavailableError
+from services.entity_resolution_service import entity_resolution_service
+from services.metrics_service import metrics_service
+from services.profiling_service import RequestTrace, profile_store
+from services.response_format import (
+    ResponseOptions,
+    RESPONSE_MODES,
+    MEDIA_TYPE_JSON,
+    MEDIA_TYPE_MSGPACK,
+    MSGPACK_MEDIA_TYPES,
+    encode,
+    format_payload,
+    msgpack_available,
+    parse_field_paths,
+)
+from services.statement_table import StatementTableParser
+from services.storage_service import storage_service
+from services.text_similarity_service import text_similarity_service
+from services.transaction_scoring import (
+    AMOUNT_LOCALES,
+    TRANSACTION_FORMATS,
+    TransactionScorer,
+    iter_transaction_chunks,
+    transaction_format,
+)
+from services.watchlist_service import watchlist_service
+from services.scheduler_service import (
+    scheduler_service,
+    ExecutionContext,
+    SchedulerError,
+    EngineSaturatedError,
+    DeadlineExceededError,
+    PRIORITY_BATCH,
+    PRIORITY_CLASSES,
+    PRIORITY_INTERACTIVE,
+)
 
 # Configuration du logging
 logging.basicConfig(
@@ -19,6 +67,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cycle de vie: les modèles sont chargés en arrière-plan après le démarrage (en
+# parallèle, ou un à un en mode lazy), le serveur répond immédiatement et
+# /health/ready passe à true une fois tous les moteurs préchauffés
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.ENGINE_LOADING == 'eager':
+        loading_task = asyncio.create_task(engine_registry.load_all())
+    else:
+        loading_task = asyncio.create_task(engine_registry.load_sequentially())
+    yield
+    if not loading_task.done():
+        loading_task.cancel()
+    scheduler_service.shutdown()
+    batch_verification_service.shutdown()
+
 # Initialiser FastAPI
 app = FastAPI(
     title="RegTech AI Service",
@@ -26,6 +89,7 @@ app = FastAPI(
     version="1.0.0",
     docs_url="/api/docs",
     redoc_url="/api/redoc",
+    lifespan=lifespan,
 )
 
 # Configuration CORS
@@ -40,13 +104,12 @@ app.add_middleware(
 # Sécurité
 security = HTTPBearer()
 
-# Initialiser les services
-doc_verification_service = DocumentVerificationService()
-
 # Modèles Pydantic
 class TextAnalysisRequest(BaseModel):
     text: str
     extract_risk_indicators: Optional[bool] = False
+    client_id: Optional[str] = None
+    register_entities: Optional[bool] = False
 
 class DocumentVerificationRequest(BaseModel):
     document_type: str
@@ -55,9 +118,56 @@ class DocumentComparisonRequest(BaseModel):
     text1: str
     text2: str
 
+class DocumentSetComparisonRequest(BaseModel):
+    texts: List[str]
+    top_k: Optional[int] = None
+
+class CorpusDocument(BaseModel):
+    document_id: str
+    text: str
+
+class SimilarityIndexRequest(BaseModel):
+    documents: List[CorpusDocument]
+    threshold: Optional[float] = None
+    limit: Optional[int] = None
+
+class SimilaritySearchRequest(BaseModel):
+    text: str
+    threshold: Optional[float] = None
+    limit: Optional[int] = None
+
+class EntityMention(BaseModel):
+    text: str
+    type: str
+
+class EntityResolutionRequest(BaseModel):
+    mentions: List[EntityMention]
+    register_entities: Optional[bool] = False
+
+class WatchlistEntry(BaseModel):
+    name: str
+    aliases: Optional[List[str]] = None
+    entry_id: Optional[str] = None
+    list_name: Optional[str] = None
+    entity_type: Optional[str] = None
+
+class WatchlistEntriesRequest(BaseModel):
+    entries: List[WatchlistEntry]
+
+class WatchlistScreeningRequest(BaseModel):
+    names: List[str]
+    threshold: Optional[float] = None
+    limit: Optional[int] = None
+
+class StorageReference(BaseModel):
+    object_name: str
+    bucket: Optional[str] = None
+    document_type: Optional[str] = None
+
 class HealthResponse(BaseModel):
     status: str
     services: Dict[str, str]
+    engines: Dict[str, Dict[str, Any]]
 
 # Dépendances
 async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)) -> bool:
@@ -71,25 +181,230 @@ async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(secur
             )
     return True
 
+def _is_enabled(value: Optional[str]) -> bool:
+    """Interpréter la valeur d'un en-tête booléen"""
+    return value is not None and value.strip().lower() in ('1', 'true', 'yes', 'on')
+
+def _is_admin(x_admin_key: Optional[str]) -> bool:
+    """Vérifier la clé d'administration (profilage désactivé si ADMIN_API_KEY n'est pas défini)"""
+    return bool(
+        settings.ADMIN_API_KEY
+        and x_admin_key
+        and secrets.compare_digest(x_admin_key, settings.ADMIN_API_KEY)
+    )
+
+async def verify_admin(x_admin_key: Optional[str] = Header(None)) -> bool:
+    """Vérifier que l'appelant est administrateur"""
+    if not _is_admin(x_admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Accès réservé aux administrateurs"
+        )
+    return True
+
+async def get_execution_context(
+    x_request_priority: Optional[str] = Header(None),
+    x_request_deadline: Optional[str] = Header(None),
+    x_debug_timing: Optional[str] = Header(None),
+    x_debug_profile: Optional[str] = Header(None),
+    x_admin_key: Optional[str] = Header(None),
+) -> ExecutionContext:
+    """
+    Déterminer la priorité (interactive par défaut) et l'échéance de la requête
+
+    L'échéance est un timestamp Unix en millisecondes fixé par le client:
+    au-delà, le traitement est abandonné avant de solliciter les moteurs.
+
+    X-Debug-Timing ajoute à la réponse la durée de chaque étape; X-Debug-Profile
+    (administrateurs uniquement) profile les appels aux moteurs. Sans ces en-têtes,
+    aucune trace n'est créée.
+    """
+    priority = PRIORITY_INTERACTIVE
+    if x_request_priority:
+        priority = x_request_priority.strip().lower()
+        if priority not in PRIORITY_CLASSES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Priorité invalide. Valeurs acceptées: {list(PRIORITY_CLASSES)}"
+            )
+
+    deadline = None
+    if x_request_deadline:
+        try:
+            deadline = float(x_request_deadline) / 1000
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="X-Request-Deadline doit être un timestamp Unix en millisecondes"
+            )
+        if deadline <= time.time():
+            raise DeadlineExceededError('api')
+
+    trace = None
+    timings = _is_enabled(x_debug_timing)
+    profile = _is_enabled(x_debug_profile)
+    if profile and not _is_admin(x_admin_key):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="X-Debug-Profile est réservé aux administrateurs"
+        )
+    if timings or profile:
+        trace = RequestTrace(timings=timings, profile=profile)
+
+    return ExecutionContext(priority=priority, deadline=deadline, trace=trace)
+
+async def get_response_options(
+    accept: Optional[str] = Header(None),
+    x_response_mode: Optional[str] = Header(None),
+    x_response_exclude: Optional[str] = Header(None),
+) -> ResponseOptions:
+    """
+    Déterminer le format de la réponse
+
+    X-Response-Mode: compact produit des boîtes englobantes plates
+    ([x1, y1, ..., x4, y4] en entiers), omet les valeurs nulles et les champs
+    redondants (full_text, lines.type) et arrondit les décimaux.
+    X-Response-Exclude omet des champs supplémentaires (ex: "lines.bbox,extracted_fields").
+    Accept: application/msgpack encode la réponse en MessagePack au lieu de JSON.
+    """
+    mode = (x_response_mode or 'full').strip().lower()
+    if mode not in RESPONSE_MODES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Mode de réponse invalide. Valeurs acceptées: {list(RESPONSE_MODES)}"
+        )
+
+    media_type = MEDIA_TYPE_JSON
+    if accept and any(media in accept.lower() for media in MSGPACK_MEDIA_TYPES):
+        if not msgpack_available():
+            raise HTTPException(
+                status_code=status.HTTP_406_NOT_ACCEPTABLE,
+                detail="Encodage MessagePack indisponible sur ce serveur"
+            )
+        media_type = MEDIA_TYPE_MSGPACK
+
+    exclude = parse_field_paths(x_response_exclude.split(',')) if x_response_exclude else frozenset()
+    return ResponseOptions(compact=mode == 'compact', exclude=exclude, media_type=media_type)
+
+def build_response(result: Any, execution: ExecutionContext, output: Optional[ResponseOptions] = None) -> Response:
+    """
+    Construire la réponse, avec le diagnostic demandé par les en-têtes X-Debug-*
+
+    La réponse est encodée directement (orjson ou MessagePack), sans passer par
+    l'encodeur générique de FastAPI.
+    """
+    output = output or ResponseOptions()
+    response = {
+        "success": True,
+        "data": format_payload(result, output)
+    }
+    if execution.trace is not None:
+        response["debug"] = execution.trace.report()
+    return Response(
+        content=encode(response, output.media_type),
+        media_type=output.media_type,
+        headers={"Vary": "Accept, X-Response-Mode, X-Response-Exclude"},
+    )
+
+async def run_engine(engine: str, method: str, execution: ExecutionContext, *args: Any) -> Any:
+    """Exécuter une méthode d'un moteur via l'ordonnanceur"""
+    return await scheduler_service.run(engine, execution, engine_registry.call, engine, method, *args)
+
+def _score_next_chunk(chunks, scorer: TransactionScorer) -> Optional[List[Dict]]:
+    """Lire et scorer le bloc suivant d'un fichier de transactions (None à la fin du fichier)"""
+    chunk = next(chunks, None)
+    return None if chunk is None else scorer.score_chunk(chunk)
+
+def _detect_edges_from_file(file_bytes: bytes) -> Dict:
+    """Charger une image et détecter les bords du document"""
+    return engine_registry.get('document_verification').detect_document_edges(decode_image(file_bytes))
+
+# Gestion des rejets de l'ordonnanceur
+@app.exception_handler(EngineSaturatedError)
+async def engine_saturated_handler(request, exc: EngineSaturatedError):
+    """Rejeter immédiatement la requête quand un moteur est saturé"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.exception_handler(DeadlineExceededError)
+async def deadline_exceeded_handler(request, exc: DeadlineExceededError):
+    """Signaler qu'une requête expirée a été abandonnée sans traitement"""
+    return JSONResponse(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        content={"detail": str(exc)},
+    )
+
+@app.exception_handler(EngineUnavailableError)
+async def engine_unavailable_handler(request, exc: EngineUnavailableError):
+    """Signaler qu'un moteur n'a pas pu être chargé"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": str(exc)},
+    )
+
+def _engines_health() -> Dict[str, Dict[str, Any]]:
+    """Fusionner l'état de chargement et les statistiques d'ordonnancement de chaque moteur"""
+    loading = engine_registry.status()
+    scheduling = scheduler_service.snapshot()
+    return {
+        engine: {**loading.get(engine, {}), **scheduling.get(engine, {})}
+        for engine in loading
+    }
+
+metrics_service.register_engine_stats(_engines_health)
+
 # Routes de santé
 @app.get("/health", response_model=HealthResponse, tags=["Health"])
 async def health_check():
-    """Vérifier la santé du service"""
+    """Vérifier la santé du service et de chaque moteur"""
+    engines = _engines_health()
+    if any(engine['status'] == 'failed' for engine in engines.values()):
+        overall = "unhealthy"
+    elif engine_registry.is_ready():
+        overall = "healthy"
+    else:
+        overall = "starting"
+
     return {
-        "status": "healthy",
+        "status": overall,
         "services": {
-            "ocr": "operational",
-            "nlp": "operational",
-            "ner": "operational",
-            "document_verification": "operational",
-        }
+            name: "operational" if engine['status'] == 'ready' else engine['status']
+            for name, engine in engines.items()
+        },
+        "engines": engines,
     }
 
+@app.get("/metrics", tags=["Health"], include_in_schema=False)
+@app.get("/health/metrics", tags=["Health"], include_in_schema=False)
+async def metrics():
+    """Exposer les métriques au format Prometheus"""
+    content, content_type = metrics_service.export()
+    return Response(content=content, headers={"Content-Type": content_type})
+
+@app.get("/health/live", tags=["Health"])
+async def liveness_check():
+    """Vérifier que le processus répond (sans solliciter les moteurs)"""
+    return {"status": "alive"}
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness_check():
+    """Vérifier que les moteurs sont chargés et préchauffés"""
+    ready = engine_registry.is_ready()
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"ready": ready, "engines": _engines_health()},
+    )
+
 # Routes OCR
 @app.post("/api/v1/ocr/extract-text", tags=["OCR"])
 async def extract_text_from_image(
     file: UploadFile = File(...),
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Extraire le texte d'une image"""
     try:
@@ -104,12 +419,11 @@ async def extract_text_from_image(
         file_bytes = await file.read()
 
         # Extraire le texte
-        result = ocr_service.extract_from_file(file_bytes)
+        result = await run_engine('ocr', 'extract_from_file', execution, file_bytes)
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction de texte: {str(e)}")
         raise HTTPException(
@@ -120,7 +434,9 @@ async def extract_text_from_image(
 @app.post("/api/v1/ocr/extract-document-data", tags=["OCR"])
 async def extract_document_data(
     file: UploadFile = File(...),
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Extraire les données structurées d'un document"""
     try:
@@ -135,12 +451,11 @@ async def extract_document_data(
         file_bytes = await file.read()
 
         # Extraire les données
-        result = ocr_service.extract_from_file(file_bytes)
+        result = await run_engine('ocr', 'extract_from_file', execution, file_bytes)
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction de données: {str(e)}")
         raise HTTPException(
@@ -148,23 +463,84 @@ async def extract_document_data(
             detail=str(e)
         )
 
+@app.post("/api/v1/ocr/extract-statement", tags=["OCR"])
+async def extract_bank_statement(
+    files: List[UploadFile] = File(...),
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context)
+):
+    """
+    Extraire le tableau des opérations d'un relevé bancaire
+
+    Les pages (un fichier par page, dans l'ordre, ou un TIFF multipage) sont
+    analysées une à une et envoyées en NDJSON au fur et à mesure: une ligne par
+    page avec ses opérations (date, libellé, débit, crédit, solde), suivie d'une
+    ligne de synthèse (totaux, ancien et nouveau solde, contrôle de cohérence).
+    """
+    try:
+        for file in files:
+            if file.content_type not in settings.ALLOWED_FILE_TYPES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Type de fichier non supporté ({file.filename}). Types acceptés: {settings.ALLOWED_FILE_TYPES}"
+                )
+
+        # Un parseur par relevé: colonnes, année et solde reportés d'une page à l'autre
+        parser = StatementTableParser()
+
+        async def stream():
+            try:
+                for file in files:
+                    pages = decode_pages(await file.read())
+                    while True:
+                        image = await asyncio.to_thread(next, pages, None)
+                        if image is None:
+                            break
+                        if parser.pages >= settings.STATEMENT_MAX_PAGES:
+                            raise ValueError(f"Relevé limité à {settings.STATEMENT_MAX_PAGES} pages")
+                        result = await run_engine('ocr', 'extract_statement_page', execution, image, parser)
+                        yield json.dumps(result, ensure_ascii=False) + "\n"
+            except Exception as e:
+                # Réponse déjà commencée: l'erreur est signalée dans le flux
+                logger.error(f"Erreur lors de l'extraction du relevé bancaire: {str(e)}")
+                yield json.dumps({'error': str(e), 'page': parser.pages}, ensure_ascii=False) + "\n"
+            yield json.dumps({'summary': parser.summary()}, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de l'extraction du relevé bancaire: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 # Routes NLP
 @app.post("/api/v1/nlp/analyze", tags=["NLP"])
 async def analyze_text(
     request: TextAnalysisRequest,
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Analyser un texte"""
     try:
-        result = nlp_service.analyze_text(request.text)
+        result = await run_engine('nlp', 'analyze_text', execution, request.text)
 
         if request.extract_risk_indicators:
-            result['risk_indicators'] = nlp_service.extract_risk_indicators(request.text)
+            result['risk_indicators'] = await run_engine(
+                'nlp', 'extract_risk_indicators', execution, request.text
+            )
+            if request.client_id:
+                # Verrou, lecture et ajout au journal (voire instantané) hors de la boucle d'événements
+                await asyncio.to_thread(
+                    client_profile_service.update, request.client_id, risk_indicators_delta(result['risk_indicators'])
+                )
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'analyse NLP: {str(e)}")
         raise HTTPException(
@@ -175,16 +551,17 @@ async def analyze_text(
 @app.post("/api/v1/nlp/compare-documents", tags=["NLP"])
 async def compare_documents(
     request: DocumentComparisonRequest,
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Comparer deux documents"""
     try:
-        result = nlp_service.compare_documents(request.text1, request.text2)
+        result = await run_engine('nlp', 'compare_documents', execution, request.text1, request.text2)
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la comparaison de documents: {str(e)}")
         raise HTTPException(
@@ -192,20 +569,125 @@ async def compare_documents(
             detail=str(e)
         )
 
+@app.post("/api/v1/nlp/similarity-matrix", tags=["NLP"])
+async def document_similarity_matrix(
+    request: DocumentSetComparisonRequest,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
+):
+    """Comparer un ensemble de documents deux à deux (matrice de similarité et plus proches voisins)"""
+    try:
+        if not 2 <= len(request.texts) <= settings.SIMILARITY_MATRIX_MAX_DOCUMENTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La comparaison porte sur 2 à {settings.SIMILARITY_MATRIX_MAX_DOCUMENTS} textes"
+            )
+        if request.top_k is not None and request.top_k < 1:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="top_k doit être positif")
+
+        result = await run_engine('nlp', 'similarity_matrix', execution, request.texts, request.top_k)
+
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors du calcul de la matrice de similarité: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/nlp/similarity/index", tags=["NLP"])
+async def index_similar_documents(
+    request: SimilarityIndexRequest,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
+):
+    """
+    Ajouter des documents à l'index de similarité du corpus
+
+    Chaque document est comparé aux documents déjà indexés (lot compris):
+    ses quasi-doublons sont retournés avant son ajout.
+    """
+    try:
+        if not request.documents:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucun document à indexer")
+        if len(request.documents) > settings.SIMILARITY_MAX_DOCUMENTS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Requête limitée à {settings.SIMILARITY_MAX_DOCUMENTS} documents"
+            )
+        if any(not document.document_id or len(document.document_id.encode()) > 64 for document in request.documents):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="document_id doit contenir entre 1 et 64 octets"
+            )
+
+        documents = [(document.document_id, document.text) for document in request.documents]
+        result = await scheduler_service.run(
+            'nlp', execution, text_similarity_service.index_documents, documents, request.threshold, request.limit
+        )
+
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de l'indexation des documents: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/nlp/similarity/search", tags=["NLP"])
+async def search_similar_documents(
+    request: SimilaritySearchRequest,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
+):
+    """Rechercher les documents indexés proches d'un texte (sans l'indexer)"""
+    try:
+        result = await scheduler_service.run(
+            'nlp', execution, text_similarity_service.search, request.text, request.threshold, request.limit
+        )
+
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la recherche de documents similaires: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/nlp/similarity/status", tags=["NLP"])
+async def similarity_index_status(
+    auth: bool = Depends(verify_token)
+):
+    """Taille et paramètres de l'index de similarité"""
+    return {
+        "success": True,
+        "data": text_similarity_service.status()
+    }
+
 # Routes NER
 @app.post("/api/v1/ner/extract-entities", tags=["NER"])
 async def extract_entities(
     request: TextAnalysisRequest,
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Extraire les entités nommées d'un texte"""
     try:
-        result = ner_service.extract_entities(request.text)
+        result = await run_engine('ner', 'extract_entities', execution, request.text, request.register_entities)
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction d'entités: {str(e)}")
         raise HTTPException(
@@ -216,16 +698,17 @@ async def extract_entities(
 @app.post("/api/v1/ner/extract-kyc-entities", tags=["NER"])
 async def extract_kyc_entities(
     request: TextAnalysisRequest,
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Extraire les entités KYC d'un texte"""
     try:
-        result = ner_service.extract_kyc_entities(request.text)
+        result = await run_engine('ner', 'extract_kyc_entities', execution, request.text)
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction d'entités KYC: {str(e)}")
         raise HTTPException(
@@ -236,16 +719,19 @@ async def extract_kyc_entities(
 @app.post("/api/v1/ner/extract-aml-entities", tags=["NER"])
 async def extract_aml_entities(
     request: TextAnalysisRequest,
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Extraire les entités AML d'un texte"""
     try:
-        result = ner_service.extract_aml_entities(request.text)
+        result = await run_engine('ner', 'extract_aml_entities', execution, request.text, request.register_entities)
+        if request.client_id:
+            await asyncio.to_thread(client_profile_service.update, request.client_id, aml_entities_delta(result))
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de l'extraction d'entités AML: {str(e)}")
         raise HTTPException(
@@ -253,14 +739,283 @@ async def extract_aml_entities(
             detail=str(e)
         )
 
+@app.post("/api/v1/ner/resolve-entities", tags=["NER"])
+async def resolve_entities(
+    request: EntityResolutionRequest,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
+):
+    """
+    Rattacher des mentions (type PER ou ORG) à leurs entités canoniques
+
+    Les mentions inconnues ne créent une entité qu'avec register_entities à true.
+    """
+    try:
+        if not 1 <= len(request.mentions) <= settings.ENTITY_RESOLUTION_MAX_MENTIONS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La requête porte sur 1 à {settings.ENTITY_RESOLUTION_MAX_MENTIONS} mentions"
+            )
+        if any(mention.type not in ('PER', 'ORG') for mention in request.mentions):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Types acceptés: PER, ORG")
+
+        mentions = [(mention.text, mention.type) for mention in request.mentions]
+        resolutions = await scheduler_service.run(
+            'ner', execution, entity_resolution_service.resolve, mentions, request.register_entities
+        )
+        result = [
+            {'text': mention.text, 'type': mention.type, **resolution}
+            for mention, resolution in zip(request.mentions, resolutions)
+        ]
+
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la résolution des entités: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/ner/entities/{entity_id}", tags=["NER"])
+async def get_entity(
+    entity_id: str,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context)
+):
+    """Retourner une entité canonique et ses variantes"""
+    try:
+        entity = await scheduler_service.run('ner', execution, entity_resolution_service.get_entity, entity_id)
+        if entity is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Entité introuvable"
+            )
+
+        return build_response(entity, execution)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de l'entité: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+# Routes AML
+@app.post("/api/v1/aml/score-transactions", tags=["AML"])
+async def score_transactions(
+    file: UploadFile = File(...),
+    min_score: float = 0.0,
+    chunk_rows: Optional[int] = None,
+    update_profiles: bool = False,
+    amount_locale: Optional[str] = None,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context)
+):
+    """
+    Scorer le risque AML d'un fichier de transactions (CSV ou Parquet)
+
+    Colonnes reconnues: transaction_id, client_id, date, amount (obligatoire),
+    currency, country, counterparty, memo. Le fichier est lu par blocs et les
+    scores sont envoyés en NDJSON au fur et à mesure (transactions dont le
+    score atteint min_score), suivis d'une ligne de synthèse. Avec
+    update_profiles, chaque bloc met à jour les profils des clients (client_id).
+    Les montants texte sont lus selon amount_locale (auto, fr ou en). Chaque
+    bloc est scoré par le moteur nlp dans la classe batch de l'ordonnanceur
+    (après les requêtes interactives), quelle que soit la priorité demandée.
+    """
+    try:
+        if file.size is not None and file.size > settings.AML_SCORING_MAX_UPLOAD_MB * 1024 * 1024:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"Fichier limité à {settings.AML_SCORING_MAX_UPLOAD_MB} Mo"
+            )
+        file_format = transaction_format(file.filename)
+        if file_format is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Format de fichier non supporté. Extensions acceptées: {list(TRANSACTION_FORMATS)}"
+            )
+        if not 0 <= min_score <= 100:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="min_score doit être compris entre 0 et 100")
+        if chunk_rows is not None and chunk_rows < 1:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="chunk_rows doit être positif")
+        if amount_locale is not None and amount_locale not in AMOUNT_LOCALES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"amount_locale doit valoir {', '.join(AMOUNT_LOCALES)}"
+            )
+
+        scorer = TransactionScorer(min_score, client_profile_service if update_profiles else None, amount_locale)
+        chunks = iter_transaction_chunks(file.file, file_format, chunk_rows or settings.AML_SCORING_CHUNK_ROWS)
+        batch = ExecutionContext(priority=PRIORITY_BATCH, deadline=execution.deadline)
+
+        async def stream():
+            try:
+                while True:
+                    try:
+                        results = await scheduler_service.run('nlp', batch, _score_next_chunk, chunks, scorer)
+                    except EngineSaturatedError as e:
+                        # File du moteur pleine (pic interactif): le scoring attend au lieu d'échouer
+                        await asyncio.sleep(e.retry_after)
+                        continue
+                    if results is None:
+                        break
+                    if results:
+                        yield "".join(json.dumps(result, ensure_ascii=False) + "\n" for result in results)
+            except Exception as e:
+                # Réponse déjà commencée: l'erreur est signalée dans le flux
+                logger.error(f"Erreur lors du scoring des transactions: {str(e)}")
+                yield json.dumps({'error': str(e), 'row': scorer.rows}, ensure_ascii=False) + "\n"
+            yield json.dumps({'summary': scorer.summary()}, ensure_ascii=False) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors du scoring des transactions: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/aml/profiles/{client_id}", tags=["AML"])
+async def get_client_profile(
+    client_id: str,
+    top: Optional[int] = None,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
+):
+    """
+    Retourner le profil de risque agrégé d'un client
+
+    Le profil cumule les analyses envoyées avec ce client_id (indicateurs de
+    risque, entités AML, transactions scorées): termes de risque,
+    contreparties, pays, statistiques des montants et des scores.
+    """
+    try:
+        if top is not None and top < 1:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="top doit être positif")
+        profile = await asyncio.to_thread(client_profile_service.get, client_id, top)
+        if profile is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Profil client introuvable"
+            )
+
+        return build_response(profile, execution, output)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture du profil client: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/aml/watchlist/screen", tags=["AML"])
+async def screen_watchlist(
+    request: WatchlistScreeningRequest,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
+):
+    """
+    Rechercher des noms dans les listes de surveillance
+
+    Les noms sont comparés quel que soit leur alphabet (latin, cyrillique,
+    arabe) et leur translittération: "Владимир Путин", "Vladimir Poutine"
+    et "Wladimir Putin" correspondent à la même entrée.
+    """
+    try:
+        if not 1 <= len(request.names) <= settings.WATCHLIST_MAX_NAMES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"La requête porte sur 1 à {settings.WATCHLIST_MAX_NAMES} noms"
+            )
+        if request.threshold is not None and not 0 < request.threshold <= 1:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="threshold doit être compris entre 0 et 1")
+        if request.limit is not None and request.limit < 1:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="limit doit être positif")
+
+        matches = await scheduler_service.run(
+            'ner', execution, watchlist_service.screen, request.names, request.threshold, request.limit
+        )
+        result = [{'name': name, 'matches': found} for name, found in zip(request.names, matches)]
+
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors du filtrage par listes de surveillance: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/aml/watchlist/entries", tags=["AML"])
+async def add_watchlist_entries(
+    request: WatchlistEntriesRequest,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context)
+):
+    """
+    Ajouter des entrées (nom et alias) aux listes de surveillance
+
+    Avec WATCHLIST_PATH, les entrées sont ajoutées au fichier partagé par
+    tous les processus.
+    """
+    try:
+        if not request.entries:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucune entrée fournie")
+
+        added = watchlist_service.add_entries([entry.model_dump(exclude_none=True) for entry in request.entries])
+
+        return build_response({'added': added, **watchlist_service.status()}, execution)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de l'ajout à la liste de surveillance: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.get("/api/v1/aml/watchlist/status", tags=["AML"])
+async def watchlist_status(
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context)
+):
+    """Retourner la taille des listes de surveillance et de l'index de blocage"""
+    try:
+        return build_response(watchlist_service.status(), execution)
+    except Exception as e:
+        logger.error(f"Erreur lors de la lecture de la liste de surveillance: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 # Routes Vérification de documents
 @app.post("/api/v1/document/verify", tags=["Document Verification"])
 async def verify_document(
     file: UploadFile = File(...),
     document_type: str = "generic",
-    auth: bool = Depends(verify_token)
+    document_id: Optional[str] = None,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
-    """Vérifier l'authenticité d'un document"""
+    """
+    Vérifier l'authenticité d'un document
+
+    Le document est enregistré comme nouvelle soumission dans l'index des
+    doublons (une seule fois par document_id s'il est fourni).
+    """
     try:
         # Vérifier le type de fichier
         if file.content_type not in settings.ALLOWED_FILE_TYPES:
@@ -273,12 +1028,13 @@ async def verify_document(
         file_bytes = await file.read()
 
         # Vérifier le document
-        result = doc_verification_service.verify_from_file(file_bytes, document_type)
+        result = await run_engine(
+            'document_verification', 'verify_from_file', execution, file_bytes, document_type, True, document_id
+        )
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la vérification du document: {str(e)}")
         raise HTTPException(
@@ -286,10 +1042,143 @@ async def verify_document(
             detail=str(e)
         )
 
+@app.post("/api/v1/document/process", tags=["Document Verification"])
+async def process_document(
+    file: UploadFile = File(...),
+    stages: str = ",".join(PIPELINE_STAGES),
+    document_type: Optional[str] = None,
+    document_id: Optional[str] = None,
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
+):
+    """
+    Traiter un document en une seule requête (OCR, vérification, entités KYC)
+
+    L'image est décodée une seule fois et partagée entre les moteurs; le texte
+    OCR alimente directement l'extraction des entités KYC. stages est une liste
+    séparée par des virgules (ocr, verification, kyc_entities). Avec l'étape
+    verification, le document est enregistré comme nouvelle soumission dans
+    l'index des doublons (une seule fois par document_id s'il est fourni).
+    """
+    try:
+        # Vérifier le type de fichier
+        if file.content_type not in settings.ALLOWED_FILE_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Type de fichier non supporté. Types acceptés: {settings.ALLOWED_FILE_TYPES}"
+            )
+
+        try:
+            selected_stages = resolve_stages(stage.strip() for stage in stages.split(",") if stage.strip())
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+        if not selected_stages:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucune étape demandée")
+
+        # Lire le fichier
+        file_bytes = await file.read()
+
+        # Traiter le document
+        result = await document_pipeline.process(
+            file_bytes, selected_stages, execution, document_type, document_id
+        )
+
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors du traitement du document: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
+@app.post("/api/v1/document/verify-batch", tags=["Document Verification"])
+async def verify_documents_batch(
+    files: List[UploadFile] = File(None),
+    references: Optional[str] = Form(None),
+    document_type: str = "generic",
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context)
+):
+    """
+    Vérifier un lot de documents (fichiers et/ou références MinIO)
+
+    references est une liste JSON de {"object_name", "bucket", "document_type"}.
+    Les résultats sont envoyés en NDJSON au fur et à mesure, une ligne par
+    document, suivie d'une ligne de synthèse.
+    """
+    try:
+        files = files or []
+        for file in files:
+            if file.content_type not in settings.ALLOWED_FILE_TYPES:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Type de fichier non supporté ({file.filename}). Types acceptés: {settings.ALLOWED_FILE_TYPES}"
+                )
+
+        try:
+            storage_references = [StorageReference(**reference) for reference in json.loads(references or '[]')]
+        except (ValueError, TypeError) as e:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"references doit être une liste JSON de références de stockage: {str(e)}"
+            )
+
+        total = len(files) + len(storage_references)
+        if total == 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Aucun document à vérifier")
+        if total > settings.VERIFICATION_BATCH_MAX_ITEMS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Lot limité à {settings.VERIFICATION_BATCH_MAX_ITEMS} documents"
+            )
+
+        items = [
+            BatchItem(index, file.filename, document_type, file.read)
+            for index, file in enumerate(files)
+        ]
+        for reference in storage_references:
+            items.append(BatchItem(
+                len(items),
+                reference.object_name,
+                reference.document_type or document_type,
+                functools.partial(asyncio.to_thread, storage_service.fetch, reference.object_name, reference.bucket),
+                document_id=reference.object_name,
+            ))
+
+        async def stream():
+            failed = 0
+            started = time.perf_counter()
+            async for result in batch_verification_service.verify(items, execution.deadline):
+                failed += 0 if result['success'] else 1
+                yield json.dumps(result, ensure_ascii=False) + "\n"
+            yield json.dumps({
+                'summary': {
+                    'total': total,
+                    'succeeded': total - failed,
+                    'failed': failed,
+                    'duration_seconds': round(time.perf_counter() - started, 3),
+                }
+            }) + "\n"
+
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Erreur lors de la vérification par lot: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=str(e)
+        )
+
 @app.post("/api/v1/document/detect-edges", tags=["Document Verification"])
 async def detect_document_edges(
     file: UploadFile = File(...),
-    auth: bool = Depends(verify_token)
+    auth: bool = Depends(verify_token),
+    execution: ExecutionContext = Depends(get_execution_context),
+    output: ResponseOptions = Depends(get_response_options)
 ):
     """Détecter les bords d'un document"""
     try:
@@ -303,19 +1192,12 @@ async def detect_document_edges(
         # Lire le fichier
         file_bytes = await file.read()
 
-        # Charger l'image
-        from PIL import Image
-        import numpy as np
-        image = Image.open(io.BytesIO(file_bytes))
-        image_np = np.array(image)
-
-        # Détecter les bords
-        result = doc_verification_service.detect_document_edges(image_np)
+        # Charger l'image et détecter les bords
+        result = await scheduler_service.run('document_verification', execution, _detect_edges_from_file, file_bytes)
 
-        return {
-            "success": True,
-            "data": result
-        }
+        return build_response(result, execution, output)
+    except (HTTPException, SchedulerError, EngineUnavailableError):
+        raise
     except Exception as e:
         logger.error(f"Erreur lors de la détection des bords: {str(e)}")
         raise HTTPException(
@@ -323,6 +1205,21 @@ async def detect_document_edges(
             detail=str(e)
         )
 
+# Routes Administration
+@app.get("/api/v1/admin/profiles/{profile_id}", tags=["Administration"])
+async def download_profile(
+    profile_id: str,
+    admin: bool = Depends(verify_admin)
+):
+    """Télécharger un profil capturé avec X-Debug-Profile (format pstats)"""
+    path = profile_store.path(profile_id)
+    if path is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profil introuvable"
+        )
+    return FileResponse(path, media_type="application/octet-stream", filename=f"{profile_id}.prof")
+
 # Point d'entrée
 if __name__ == "__main__":
     uvicorn.run(
@@ -0,0 +1,184 @@
+"""
+Serveur pre-fork: modèles chargés une seule fois, partagés par tous les workers
+
+Exemples (depuis ai-service/):
+    python prefork.py --workers 4
+    python prefork.py --host 0.0.0.0 --port 8000
+
+Avec uvicorn --workers, chaque worker importe les services et construit ses
+propres modèles (PaddleOCR, spaCy): la mémoire est multipliée par le nombre de
+workers. Ici, le processus parent construit tous les moteurs, fige les objets
+Python (gc.freeze) puis crée les workers par fork(): les pages des modèles,
+en lecture seule, restent partagées en copie à l'écriture. Les workers
+partagent le socket d'écoute et préchauffent les moteurs après le fork (les
+pools de threads OpenMP/BLAS ne survivent pas à un fork).
+
+Un worker arrêté brutalement est recréé immédiatement à partir du parent,
+sans recharger les modèles. SIGTERM ou SIGINT arrête tous les workers.
+
+Linux uniquement (fork); voir benchmarks/memory.py pour mesurer la mémoire.
+"""
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from typing import Dict, List, Optional
+
+import uvicorn
+
+from config import settings
+
+logger = logging.getLogger('prefork')
+
+
+def bind_socket(host: str, port: int, backlog: int) -> socket.socket:
+    """Ouvrir le socket d'écoute partagé par les workers"""
+    family = socket.AF_INET6 if ':' in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def preload():
+    """
+    Charger l'application et les moteurs dans le processus parent
+
+    Le ramasse-miettes est désactivé pendant le chargement (pas de trous dans
+    les pages partagées) puis les objets sont figés: les collections des
+    workers ne modifient plus leurs en-têtes, donc ne copient pas leurs pages.
+    """
+    gc.disable()
+    from main import app  # noqa: F401  (routes et services importés avant le fork)
+    from services.engine_registry import engine_registry
+    engine_registry.preload()
+
+    gc.collect()
+    gc.freeze()
+    logger.info(f"{gc.get_freeze_count()} objets figés avant le fork")
+
+    threads = [thread.name for thread in threading.enumerate() if thread is not threading.main_thread()]
+    if threads:
+        logger.warning(f"Threads actifs avant le fork (non copiés dans les workers): {threads}")
+
+
+def run_worker(sock: socket.socket, log_level: str):
+    """Servir les requêtes dans un worker (ne retourne pas)"""
+    gc.enable()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    from main import app
+    code = 0
+    try:
+        server = uvicorn.Server(uvicorn.Config(app, log_level=log_level.lower(), lifespan='on'))
+        server.run(sockets=[sock])
+    except BaseException as e:
+        if not isinstance(e, KeyboardInterrupt):
+            logger.error(f"Erreur dans le worker {os.getpid()}: {str(e)}")
+            code = 1
+    finally:
+        logging.shutdown()
+        os._exit(code)
+
+
+class PreforkServer:
+    """Processus parent: création, surveillance et arrêt des workers"""
+
+    def __init__(self, sock: socket.socket, workers: int, log_level: str):
+        """
+        Initialiser le serveur
+
+        Args:
+            sock: Socket d'écoute partagé
+            workers: Nombre de workers
+            log_level: Niveau de log des workers
+        """
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        self.children: Dict[int, float] = {}  # pid -> démarrage
+        self.stopping = False
+
+    def spawn(self):
+        """Créer un worker par fork du processus parent"""
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.log_level)
+        self.children[pid] = time.monotonic()
+        logger.info(f"Worker {pid} démarré")
+
+    def stop(self, signum, frame):
+        """Arrêter les workers (SIGTERM / SIGINT)"""
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def serve(self) -> int:
+        """
+        Démarrer les workers et les remplacer s'ils s'arrêtent
+
+        Returns:
+            Code de sortie
+        """
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+        for _ in range(self.workers):
+            self.spawn()
+
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+
+            logger.error(f"Worker {pid} arrêté (code {os.waitstatus_to_exitcode(status)}), redémarrage")
+            # Éviter une boucle de redémarrages si le worker échoue dès son démarrage
+            if time.monotonic() - started < 1:
+                time.sleep(1)
+            self.spawn()
+
+        self.sock.close()
+        return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Serveur pre-fork du service IA")
+    parser.add_argument('--host', default=settings.API_HOST)
+    parser.add_argument('--port', type=int, default=settings.API_PORT)
+    parser.add_argument('--workers', type=int, default=settings.PREFORK_WORKERS or os.cpu_count() or 1)
+    parser.add_argument('--backlog', type=int, default=settings.PREFORK_BACKLOG)
+    parser.add_argument('--log-level', default=settings.LOG_LEVEL)
+    args = parser.parse_args(argv)
+    args.log_level = args.log_level.upper()
+
+    logging.basicConfig(level=args.log_level, format=settings.LOG_FORMAT)
+    if not hasattr(os, 'fork'):
+        parser.error("Le serveur pre-fork nécessite fork() (Linux)")
+
+    # Nombre de processus du nœud pour la répartition des threads (même convention qu'uvicorn)
+    os.environ['WEB_CONCURRENCY'] = str(args.workers)
+
+    sock = bind_socket(args.host, args.port, args.backlog)
+    preload()
+    logger.info(f"Démarrage de {args.workers} workers sur {args.host}:{args.port}")
+    return PreforkServer(sock, args.workers, args.log_level).serve()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
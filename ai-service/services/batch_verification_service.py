@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from config import settings
+from services.scheduler_service import PRIORITY_BATCH, EngineSaturatedError, ExecutionContext, scheduler_service
+
+logger = logging.getLogger(__name__)
+
+# Service de vérification propre à chaque processus du pool
+_worker_service = None
+
+
+def _init_worker(processes: int):
+    """Charger le service de vérification dans un processus du pool"""
+    global _worker_service
+    from services.thread_budget import check_workers, node_processes, thread_budget_service
+    # Un document à la fois par processus; les coeurs sont partagés avec les
+    # processus qui servent les requêtes interactives
+    budget = thread_budget_service.configure(processes=node_processes() + processes, concurrency=1)
+    from services.document_verification_service import DocumentVerificationService
+    # Sans fichier d'index partagé, l'index d'un processus du pool serait vide:
+    # la recherche des soumissions antérieures n'y aurait pas de sens
+    _worker_service = DocumentVerificationService(
+        check_workers=check_workers(budget),
+        near_duplicates=settings.NEAR_DUPLICATE_ENABLED and settings.NEAR_DUPLICATE_INDEX_PATH is not None,
+    )
+
+
+def _verify_in_worker(file_bytes: bytes, document_type: str, document_id: Optional[str]) -> Dict:
+    """Re-vérifier un document dans un processus du pool (jamais enregistré comme nouvelle soumission)"""
+    return _worker_service.verify_from_file(file_bytes, document_type, False, document_id)
+
+
+class BatchItem:
+    """Document d'un lot: nom, type et fonction de lecture du contenu"""
+
+    def __init__(
+        self,
+        index: int,
+        name: str,
+        document_type: str,
+        load: Callable[[], Awaitable[bytes]],
+        document_id: Optional[str] = None,
+    ):
+        """
+        Initialiser l'élément
+
+        Args:
+            index: Position dans le lot
+            name: Nom du fichier ou référence de stockage
+            document_type: Type de document
+            load: Coroutine retournant le contenu (lu seulement au moment du traitement)
+            document_id: Identifiant stable du document (sa propre soumission n'est pas signalée comme doublon)
+        """
+        self.index = index
+        self.name = name
+        self.document_type = document_type
+        self.load = load
+        self.document_id = document_id
+
+
+class BatchVerificationService:
+    """
+    Vérification de documents par lot, répartie sur plusieurs processus
+
+    Chaque document occupe un créneau de la classe batch du moteur
+    document_verification: les lots passent après l'onboarding interactif et
+    n'utilisent jamais plus de processus que la limite de la classe.
+    """
+
+    def __init__(self):
+        """Initialiser le service (le pool est créé au premier lot)"""
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    @property
+    def processes(self) -> int:
+        """Nombre de processus du pool (au plus la limite de la classe batch)"""
+        limit = scheduler_service.engines['document_verification'].class_limits[PRIORITY_BATCH]
+        return min(settings.VERIFICATION_BATCH_PROCESSES or limit, limit)
+
+    async def verify(self, items: List[BatchItem], deadline: Optional[float] = None) -> AsyncIterator[Dict]:
+        """
+        Vérifier un lot de documents
+
+        Les résultats sont produits dans l'ordre où les vérifications se terminent.
+        Au plus deux documents par processus sont lus en mémoire à la fois.
+
+        Args:
+            items: Documents du lot
+            deadline: Échéance (timestamp Unix) au-delà de laquelle les documents
+                restants ne sont plus soumis
+
+        Yields:
+            Résultat de chaque document (index, name, success, data ou error)
+        """
+        pool = self._get_pool()
+        execution = ExecutionContext(priority=PRIORITY_BATCH, deadline=deadline)
+        semaphore = asyncio.Semaphore(self.processes * 2)
+
+        async def process(item: BatchItem) -> Dict:
+            async with semaphore:
+                result = {'index': item.index, 'name': item.name, 'document_type': item.document_type}
+                if deadline is not None and time.time() >= deadline:
+                    return {**result, 'success': False, 'error': "Échéance de la requête dépassée"}
+                try:
+                    file_bytes = await item.load()
+                    data = await self._run(pool, execution, file_bytes, item)
+                    return {**result, 'success': True, 'data': data}
+                except BrokenProcessPool as e:
+                    # Processus arrêté brutalement (mémoire): le pool sera recréé au prochain lot
+                    logger.error(f"Pool de vérification interrompu pendant {item.name}: {str(e)}")
+                    self._discard_pool(pool)
+                    return {**result, 'success': False, 'error': "Processus de vérification interrompu"}
+                except Exception as e:
+                    logger.error(f"Erreur lors de la vérification de {item.name}: {str(e)}")
+                    return {**result, 'success': False, 'error': str(e)}
+
+        tasks = [asyncio.create_task(process(item)) for item in items]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            # Client déconnecté: ne pas traiter les documents restants
+            for task in tasks:
+                task.cancel()
+
+    async def _run(self, pool: ProcessPoolExecutor, execution: ExecutionContext, file_bytes: bytes, item: BatchItem) -> Dict:
+        """Vérifier un document dans le pool, dans un créneau batch de l'ordonnanceur"""
+        while True:
+            try:
+                async with scheduler_service.slot('document_verification', execution):
+                    return await asyncio.wrap_future(pool.submit(_verify_in_worker, file_bytes, item.document_type, item.document_id))
+            except EngineSaturatedError as e:
+                # File du moteur pleine (pic interactif): le lot attend au lieu d'échouer
+                await asyncio.sleep(e.retry_after)
+
+    def shutdown(self):
+        """Arrêter le pool de processus"""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+    def _discard_pool(self, pool: ProcessPoolExecutor):
+        """Abandonner un pool devenu inutilisable"""
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Créer le pool de processus au premier lot"""
+        with self._lock:
+            if self._pool is None:
+                # spawn: le processus parent est multi-thread (asyncio, ordonnanceur),
+                # fork pourrait dupliquer des verrous tenus
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker,
+                    initargs=(self.processes,),
+                )
+                logger.info(f"Pool de vérification par lot démarré ({self.processes} processus)")
+            return self._pool
+
+
+# Instance globale du service de vérification par lot
+batch_verification_service = BatchVerificationService()
@@ -0,0 +1,374 @@
+import fcntl
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Compteurs d'un profil (valeur -> nombre d'occurrences)
+COUNTER_FIELDS = ('risk_terms', 'counterparties', 'countries', 'flags')
+
+
+class ClientProfile:
+    """
+    Agrégats de risque d'un client, mis à jour par incréments
+
+    Les montants et les scores sont résumés par leurs nombre, somme, somme des
+    carrés, minimum et maximum (moyenne et écart-type sans historique). Les
+    compteurs sont bornés: au-delà de max_keys valeurs, les moins fréquentes
+    sont retirées.
+    """
+
+    def __init__(self, client_id: str, max_keys: int):
+        self.client_id = client_id
+        self.max_keys = max_keys
+        self.texts = 0
+        self.transactions = 0
+        self.counters: Dict[str, Counter] = {field: Counter() for field in COUNTER_FIELDS}
+        self.amounts = {'count': 0, 'total': 0.0, 'sum_squares': 0.0, 'min': None, 'max': None}
+        self.scores = {'count': 0, 'total': 0.0, 'max': None}
+        self.created_at: Optional[float] = None
+        self.updated_at: Optional[float] = None
+
+    def apply(self, delta: Dict, timestamp: float):
+        """Intégrer un incrément (voir ClientProfileService.update)"""
+        self.created_at = self.created_at or timestamp
+        self.updated_at = max(self.updated_at or timestamp, timestamp)
+        self.texts += delta.get('texts', 0)
+        self.transactions += delta.get('transactions', 0)
+
+        for field in COUNTER_FIELDS:
+            values = delta.get(field)
+            if not values:
+                continue
+            counter = self.counters[field]
+            counter.update(values)
+            if len(counter) > 2 * self.max_keys:
+                # Élagage par lots: coût amorti constant par mise à jour
+                self.counters[field] = Counter(dict(counter.most_common(self.max_keys)))
+
+        amounts = delta.get('amounts')
+        if amounts and amounts['count']:
+            self.amounts['count'] += amounts['count']
+            self.amounts['total'] += amounts['total']
+            self.amounts['sum_squares'] += amounts['sum_squares']
+            self.amounts['min'] = _merge(min, self.amounts['min'], amounts['min'])
+            self.amounts['max'] = _merge(max, self.amounts['max'], amounts['max'])
+
+        scores = delta.get('scores')
+        if scores and scores['count']:
+            self.scores['count'] += scores['count']
+            self.scores['total'] += scores['total']
+            self.scores['max'] = _merge(max, self.scores['max'], scores['max'])
+
+    def state(self) -> Dict:
+        """État complet du profil (instantané du journal)"""
+        return {
+            'texts': self.texts,
+            'transactions': self.transactions,
+            **{field: dict(self.counters[field]) for field in COUNTER_FIELDS},
+            'amounts': self.amounts,
+            'scores': self.scores,
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+
+    @classmethod
+    def from_state(cls, client_id: str, state: Dict, max_keys: int) -> 'ClientProfile':
+        """Reconstruire un profil depuis son état (voir state)"""
+        profile = cls(client_id, max_keys)
+        profile.texts = state['texts']
+        profile.transactions = state['transactions']
+        profile.counters = {field: Counter(state[field]) for field in COUNTER_FIELDS}
+        profile.amounts = dict(state['amounts'])
+        profile.scores = dict(state['scores'])
+        profile.created_at = state['created_at']
+        profile.updated_at = state['updated_at']
+        return profile
+
+    def to_dict(self, top: int) -> Dict:
+        """Profil exposé: compteurs (top valeurs), statistiques des montants et des scores"""
+        count = self.amounts['count']
+        mean = self.amounts['total'] / count if count else None
+        variance = max(self.amounts['sum_squares'] / count - mean * mean, 0.0) if count else None
+        return {
+            'client_id': self.client_id,
+            'texts': self.texts,
+            'transactions': self.transactions,
+            **{
+                field: [{'value': value, 'count': total} for value, total in self.counters[field].most_common(top)]
+                for field in COUNTER_FIELDS
+            },
+            'amounts': {
+                'count': count,
+                'total': round(self.amounts['total'], 2),
+                'mean': round(mean, 2) if mean is not None else None,
+                'std': round(math.sqrt(variance), 2) if variance is not None else None,
+                'min': self.amounts['min'],
+                'max': self.amounts['max'],
+            },
+            'risk_score': {
+                'count': self.scores['count'],
+                'mean': round(self.scores['total'] / self.scores['count'], 2) if self.scores['count'] else None,
+                'max': self.scores['max'],
+            },
+            'created_at': self.created_at,
+            'updated_at': self.updated_at,
+        }
+
+
+def _merge(function, current: Optional[float], value: Optional[float]) -> Optional[float]:
+    """Minimum ou maximum de deux valeurs éventuellement absentes"""
+    if current is None:
+        return value
+    if value is None:
+        return current
+    return function(current, value)
+
+
+def amount_summary(values: Iterable[float]) -> Dict:
+    """Résumé d'une série de montants pour un incrément de profil"""
+    values = [float(value) for value in values]
+    return {
+        'count': len(values),
+        'total': sum(values),
+        'sum_squares': sum(value * value for value in values),
+        'min': min(values) if values else None,
+        'max': max(values) if values else None,
+    }
+
+
+def risk_indicators_delta(risk_indicators: Dict) -> Dict:
+    """Incrément de profil d'un texte analysé par NLPService.extract_risk_indicators"""
+    terms = Counter()
+    for category in ('suspicious_keywords', 'money_laundering_terms', 'terrorist_finance_terms', 'sanctions_terms'):
+        terms.update(risk_indicators.get(category, []))
+    score = risk_indicators.get('risk_score')
+    return {
+        'texts': 1,
+        'risk_terms': dict(terms),
+        'scores': {'count': 1, 'total': score, 'max': score} if score is not None else None,
+    }
+
+
+def aml_entities_delta(entities: Dict) -> Dict:
+    """Incrément de profil d'un texte analysé par NERService.extract_aml_entities"""
+    amounts = [item['amount'] for item in entities.get('transaction_amounts', []) if item.get('amount') is not None]
+    return {
+        'texts': 1,
+        'counterparties': dict(Counter(item['text'] for item in entities.get('transaction_parties', []))),
+        'countries': dict(Counter(item['text'] for item in entities.get('countries', []))),
+        'amounts': amount_summary(amounts),
+    }
+
+
+class ClientProfileService:
+    """
+    Profils de risque par client, agrégés au fil des textes et des transactions
+
+    Chaque analyse rattachée à un client ajoute un incrément (termes de
+    risque, contreparties, pays, montants, scores) à son profil: la lecture
+    d'un profil ne dépend pas de la taille de l'historique. Si
+    CLIENT_PROFILE_LOG_PATH est défini, les incréments sont ajoutés à un
+    journal partagé par tous les processus (une ligne JSON par incrément):
+    chaque lecture intègre d'abord les incréments écrits par les autres.
+
+    Quand le journal dépasse CLIENT_PROFILE_SNAPSHOT_BYTES, l'état de tous les
+    profils est écrit dans un instantané (<journal>.snapshot) et le journal
+    est remplacé par un journal vide: le démarrage lit l'instantané puis les
+    seuls incréments écrits depuis. Un verrou de fichier (<journal>.lock)
+    empêche les écritures et les lectures du journal pendant ce remplacement.
+
+    Tous les profils sont gardés en mémoire: chaque compteur est borné à
+    2 * CLIENT_PROFILE_MAX_KEYS valeurs, soit au plus ~250 Ko par profil avec
+    les valeurs par défaut, et en pratique ~1 à 2 Ko pour un client avec
+    quelques contreparties et pays.
+    """
+
+    def __init__(self, path: Optional[str] = None, snapshot_bytes: Optional[int] = None):
+        """
+        Initialiser le service
+
+        Args:
+            path: Journal des incréments (None = mémoire uniquement)
+            snapshot_bytes: Taille du journal déclenchant un instantané
+                (CLIENT_PROFILE_SNAPSHOT_BYTES par défaut, 0 = jamais)
+        """
+        self.path = path
+        self.snapshot_path = f"{path}.snapshot" if path else None
+        self.snapshot_bytes = settings.CLIENT_PROFILE_SNAPSHOT_BYTES if snapshot_bytes is None else snapshot_bytes
+        self._profiles: Dict[str, ClientProfile] = {}
+        # Identité (périphérique, inode) du journal lu: change quand un autre processus le remplace
+        self._log_id: Optional[tuple] = None
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def update(self, client_id: str, delta: Dict):
+        """
+        Ajouter un incrément au profil d'un client
+
+        Args:
+            client_id: Identifiant du client
+            delta: Incrément: texts, transactions, compteurs (risk_terms,
+                counterparties, countries, flags: valeur -> nombre), amounts
+                (count, total, sum_squares, min, max), scores (count, total, max)
+        """
+        self.update_many({client_id: delta})
+
+    def update_many(self, deltas: Dict[str, Dict]):
+        """Ajouter des incréments à plusieurs profils (une seule écriture dans le journal)"""
+        if not deltas:
+            return
+        timestamp = time.time()
+        entries = [{'client_id': client_id, 'at': timestamp, **delta} for client_id, delta in deltas.items()]
+
+        with self._lock:
+            if self.path is None:
+                self._apply(entries)
+                return
+
+            # Écriture en ajout de lignes complètes: les incréments des processus ne s'entremêlent pas
+            data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries).encode('utf-8')
+            with self._file_lock(fcntl.LOCK_SH):
+                fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+                try:
+                    os.write(fd, data)
+                finally:
+                    os.close(fd)
+                self._sync()
+            if self.snapshot_bytes and self._offset >= self.snapshot_bytes:
+                self._snapshot()
+
+    def get(self, client_id: str, top: Optional[int] = None) -> Optional[Dict]:
+        """
+        Retourner le profil d'un client
+
+        Args:
+            client_id: Identifiant du client
+            top: Valeurs les plus fréquentes retournées par compteur (CLIENT_PROFILE_TOP par défaut)
+
+        Returns:
+            Profil agrégé, None si le client est inconnu
+        """
+        with self._lock:
+            self._locked_sync()
+            profile = self._profiles.get(client_id)
+            return profile.to_dict(top or settings.CLIENT_PROFILE_TOP) if profile is not None else None
+
+    def status(self) -> Dict:
+        """Retourner le nombre de profils"""
+        with self._lock:
+            self._locked_sync()
+            return {'profiles': len(self._profiles), 'log_offset': self._offset}
+
+    @contextmanager
+    def _file_lock(self, operation: int):
+        """Verrou partagé (ajouts, lectures) ou exclusif (instantané) sur le journal"""
+        fd = os.open(f"{self.path}.lock", os.O_WRONLY | os.O_CREAT, 0o640)
+        try:
+            fcntl.flock(fd, operation)
+            yield
+        finally:
+            os.close(fd)
+
+    def _locked_sync(self):
+        """Intégrer les incréments du journal, sous verrou de fichier partagé"""
+        if self.path is None:
+            return
+        with self._file_lock(fcntl.LOCK_SH):
+            self._sync()
+
+    def _sync(self):
+        """Intégrer les incréments ajoutés au journal depuis la dernière lecture (verrou de fichier détenu)"""
+        if self.path is None or not os.path.exists(self.path):
+            return
+        stat = os.stat(self.path)
+        if (stat.st_dev, stat.st_ino) != self._log_id:
+            # Premier accès, ou journal remplacé par un instantané d'un autre processus
+            self._load_snapshot((stat.st_dev, stat.st_ino))
+        size = stat.st_size
+        if size <= self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # Dernière ligne éventuellement en cours d'écriture: relue à la prochaine synchronisation
+        data = data[:data.rfind(b'\n') + 1]
+        self._offset += len(data)
+
+        entries = []
+        for line in data.splitlines():
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning("Incrément de profil illisible ignoré")
+        self._apply(entries)
+
+    def _load_snapshot(self, log_id: tuple):
+        """Repartir de l'instantané avant de lire le journal log_id"""
+        self._profiles = {}
+        self._log_id = log_id
+        self._offset = 0
+        if not os.path.exists(self.snapshot_path):
+            return
+
+        with open(self.snapshot_path, encoding='utf-8') as f:
+            snapshot = json.load(f)
+        for client_id, state in snapshot['profiles'].items():
+            self._profiles[client_id] = ClientProfile.from_state(client_id, state, settings.CLIENT_PROFILE_MAX_KEYS)
+        # Arrêt entre l'instantané et le remplacement du journal: le début du journal y est déjà intégré
+        if tuple(snapshot['log']) == log_id:
+            self._offset = snapshot['offset']
+        logger.info(f"Instantané des profils clients chargé: {len(self._profiles)} profils")
+
+    def _snapshot(self):
+        """Écrire l'état des profils dans l'instantané et repartir d'un journal vide"""
+        with self._file_lock(fcntl.LOCK_EX):
+            self._sync()
+            # Un autre processus a pu remplacer le journal juste avant
+            if self._offset < self.snapshot_bytes:
+                return
+
+            snapshot = {
+                'log': list(self._log_id),
+                'offset': self._offset,
+                'profiles': {client_id: profile.state() for client_id, profile in self._profiles.items()},
+            }
+            self._write_atomic(self.snapshot_path, json.dumps(snapshot, ensure_ascii=False).encode('utf-8'))
+            self._write_atomic(self.path, b'')
+            stat = os.stat(self.path)
+            self._log_id = (stat.st_dev, stat.st_ino)
+            self._offset = 0
+        logger.info(f"Journal des profils clients compacté: {len(self._profiles)} profils")
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        """Remplacer un fichier par un contenu complet (jamais lu à moitié écrit)"""
+        temporary = f"{path}.tmp"
+        with open(temporary, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+
+    def _apply(self, entries: List[Dict]):
+        """Intégrer des incréments (dans l'ordre du journal)"""
+        for entry in entries:
+            client_id = entry['client_id']
+            profile = self._profiles.get(client_id)
+            if profile is None:
+                profile = self._profiles[client_id] = ClientProfile(client_id, settings.CLIENT_PROFILE_MAX_KEYS)
+            profile.apply(entry, entry['at'])
+
+
+# Instance globale des profils de risque clients
+client_profile_service = ClientProfileService(settings.CLIENT_PROFILE_LOG_PATH)
@@ -0,0 +1,301 @@
+import glob
+import logging
+import os
+import re
+from typing import Any, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Formats colonnaires disponibles et extension des fichiers
+COLUMNAR_FORMATS = {'parquet': 'parquet', 'arrow': 'arrow'}
+
+# Clés des résultats contenant des entités (enregistrées dans la colonne source)
+ENTITY_SOURCES = ('kyc_entities', 'entities', 'aml_entities')
+
+
+def _pyarrow():
+    """Importer pyarrow (dépendance optionnelle, nécessaire uniquement pour l'export colonnaire)"""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise RuntimeError("L'export Parquet/Arrow nécessite le paquet pyarrow")
+
+
+def entity_schema():
+    """Schéma stable des entités: une ligne par entité extraite"""
+    pa = _pyarrow()
+    return pa.schema([
+        ('document_id', pa.string()),
+        ('source', pa.string()),
+        ('entity_type', pa.string()),
+        ('text', pa.string()),
+        ('start', pa.int32()),
+        ('end', pa.int32()),
+        ('normalized', pa.string()),
+        ('label', pa.string()),
+        ('confidence', pa.float32()),
+    ])
+
+
+def document_schema():
+    """Schéma stable des documents: une ligne par document traité"""
+    pa = _pyarrow()
+    return pa.schema([
+        ('document_id', pa.string()),
+        ('success', pa.bool_()),
+        ('error', pa.string()),
+        ('document_type', pa.string()),
+        ('image_width', pa.int32()),
+        ('image_height', pa.int32()),
+        ('ocr_text', pa.string()),
+        ('ocr_lines', pa.int32()),
+        ('ocr_confidence', pa.float32()),
+        ('is_authentic', pa.bool_()),
+        ('verification_confidence', pa.float32()),
+        ('duration_seconds', pa.float32()),
+    ])
+
+
+def _normalized(value: Any) -> Optional[str]:
+    """Valeur normalisée sous forme de texte (les types varient selon l'entité)"""
+    if value is None:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def entity_rows(document_id: str, source: str, entities: Dict) -> List[Dict]:
+    """
+    Aplatir les entités d'un document (listes ou entité unique par type)
+
+    Args:
+        document_id: Identifiant du document
+        source: Résultat d'origine (kyc_entities, entities, aml_entities)
+        entities: Entités par type, telles que retournées par NERService
+
+    Returns:
+        Lignes au format du schéma des entités
+    """
+    rows = []
+    for entity_type, values in entities.items():
+        if values is None:
+            continue
+        for entity in values if isinstance(values, list) else [values]:
+            rows.append({
+                'document_id': document_id,
+                'source': source,
+                'entity_type': entity_type,
+                'text': entity.get('text'),
+                'start': entity.get('start'),
+                'end': entity.get('end'),
+                'normalized': _normalized(entity.get('normalized')),
+                'label': entity.get('type'),
+                'confidence': entity.get('confidence'),
+            })
+    return rows
+
+
+def document_row(record: Dict) -> Dict:
+    """
+    Résumer le résultat d'un document au format du schéma des documents
+
+    Args:
+        record: Résultat d'un document ({id, success, data | error, duration_seconds})
+
+    Returns:
+        Ligne au format du schéma des documents
+    """
+    data = record.get('data') or {}
+    ocr = data.get('ocr') or {}
+    verification = data.get('verification') or {}
+    lines = ocr.get('lines') or []
+    image = data.get('image') or {}
+
+    return {
+        'document_id': record['id'],
+        'success': record['success'],
+        'error': record.get('error'),
+        'document_type': ocr.get('document_type') or verification.get('document_type'),
+        'image_width': image.get('width'),
+        'image_height': image.get('height'),
+        'ocr_text': ocr.get('full_text'),
+        'ocr_lines': len(lines) if ocr else None,
+        'ocr_confidence': sum(line['confidence'] for line in lines) / len(lines) if lines else None,
+        'is_authentic': verification.get('is_authentic'),
+        'verification_confidence': verification.get('confidence'),
+        'duration_seconds': record.get('duration_seconds'),
+    }
+
+
+class _TableWriter:
+    """Écriture d'une table par groupes de lignes (Parquet ou flux Arrow IPC)"""
+
+    def __init__(self, path: str, schema, output_format: str):
+        pa = _pyarrow()
+        self.schema = schema
+        self.sink = pa.OSFile(path, 'wb')
+        if output_format == 'parquet':
+            self.writer = pa.parquet.ParquetWriter(self.sink, schema, compression='zstd')
+        else:
+            self.writer = pa.ipc.new_file(self.sink, schema)
+
+    def write(self, rows: List[Dict]):
+        if rows:
+            self.writer.write_table(_pyarrow().Table.from_pylist(rows, schema=self.schema))
+
+    def close(self):
+        self.writer.close()
+        self.sink.close()
+
+
+class ColumnarResultWriter:
+    """
+    Écriture incrémentale des résultats au format colonnaire
+
+    Les résultats sont écrits dans des parties successives du répertoire de
+    sortie (documents-NNNNN.<ext> et entities-NNNNN.<ext>). Les lignes sont
+    regroupées par lots de row_group_size documents, et une nouvelle partie
+    est commencée tous les row_groups_per_part groupes: une partie n'est
+    lisible qu'une fois finalisée, un arrêt brutal ne fait perdre que la
+    partie en cours.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        output_format: str = 'parquet',
+        row_group_size: int = 1000,
+        row_groups_per_part: int = 10,
+    ):
+        """
+        Initialiser l'écriture
+
+        Args:
+            directory: Répertoire de sortie
+            output_format: parquet ou arrow
+            row_group_size: Nombre de documents par groupe de lignes
+            row_groups_per_part: Nombre de groupes de lignes par partie
+        """
+        if output_format not in COLUMNAR_FORMATS:
+            raise ValueError(f"Format colonnaire inconnu: {output_format}")
+
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.output_format = output_format
+        self.row_group_size = row_group_size
+        self.row_groups_per_part = max(row_groups_per_part, 1)
+        # Numérotation après la plus grande partie existante (une partie illisible n'est jamais écrasée)
+        self.part = next_part(directory, output_format)
+        self.documents: Optional[_TableWriter] = None
+        self.entities: Optional[_TableWriter] = None
+        self.row_groups = 0
+        self._documents: List[Dict] = []
+        self._entities: List[Dict] = []
+
+    def write(self, record: Dict):
+        """
+        Ajouter le résultat d'un document
+
+        Args:
+            record: Résultat d'un document ({id, success, data | error, duration_seconds})
+        """
+        self._documents.append(document_row(record))
+        data = record.get('data') or {}
+        for source in ENTITY_SOURCES:
+            if data.get(source):
+                self._entities.extend(entity_rows(record['id'], source, data[source]))
+
+        if len(self._documents) >= self.row_group_size:
+            self.flush()
+
+    def flush(self):
+        """Écrire les lignes en attente, puis finaliser la partie si elle est complète"""
+        if not self._documents:
+            return
+        if self.documents is None:
+            self._open_part()
+        self.documents.write(self._documents)
+        self.entities.write(self._entities)
+        self._documents = []
+        self._entities = []
+
+        self.row_groups += 1
+        if self.row_groups >= self.row_groups_per_part:
+            self._close_part()
+
+    def close(self):
+        """Écrire les dernières lignes et finaliser les fichiers"""
+        self.flush()
+        self._close_part()
+
+    def _open_part(self):
+        """Commencer une nouvelle partie"""
+        extension = COLUMNAR_FORMATS[self.output_format]
+        self.documents = _TableWriter(
+            os.path.join(self.directory, f"documents-{self.part:05d}.{extension}"), document_schema(), self.output_format
+        )
+        self.entities = _TableWriter(
+            os.path.join(self.directory, f"entities-{self.part:05d}.{extension}"), entity_schema(), self.output_format
+        )
+        self.row_groups = 0
+
+    def _close_part(self):
+        """Finaliser la partie en cours (pied de fichier écrit, lisible à la reprise)"""
+        if self.documents is None:
+            return
+        self.documents.close()
+        self.entities.close()
+        self.documents = None
+        self.entities = None
+        self.part += 1
+
+
+def next_part(directory: str, output_format: str) -> int:
+    """
+    Numéro de la prochaine partie d'un répertoire de sortie
+
+    Args:
+        directory: Répertoire de sortie
+        output_format: parquet ou arrow
+
+    Returns:
+        Plus grand numéro de partie existant plus un (0 pour un répertoire vide)
+    """
+    pattern = re.compile(rf"(?:documents|entities)-(\d+)\.{COLUMNAR_FORMATS[output_format]}$")
+    parts = [int(match.group(1)) for match in map(pattern.match, os.listdir(directory)) if match]
+    return max(parts, default=-1) + 1
+
+
+def read_processed_ids(directory: str, output_format: str, retry_failed: bool) -> Set[str]:
+    """
+    Lire les documents déjà traités dans les parties existantes
+
+    Une partie non finalisée (arrêt brutal) est illisible: ses documents seront retraités.
+
+    Args:
+        directory: Répertoire de sortie
+        output_format: parquet ou arrow
+        retry_failed: Retraiter les documents en échec
+
+    Returns:
+        Identifiants des documents à ne pas retraiter
+    """
+    pa = _pyarrow()
+    done: Set[str] = set()
+    for path in sorted(glob.glob(os.path.join(directory, f"documents-*.{COLUMNAR_FORMATS[output_format]}"))):
+        try:
+            if output_format == 'parquet':
+                table = pa.parquet.read_table(path, columns=['document_id', 'success'])
+            else:
+                with pa.memory_map(path) as source:
+                    table = pa.ipc.open_file(source).read_all().select(['document_id', 'success'])
+        except (OSError, pa.ArrowInvalid) as e:
+            logger.warning(f"Partie {path} illisible, ses documents seront retraités: {str(e)}")
+            continue
+        for document_id, success in zip(table.column('document_id').to_pylist(), table.column('success').to_pylist()):
+            if success or not retry_failed:
+                done.add(document_id)
+    return done
+
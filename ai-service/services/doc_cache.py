@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from typing import Optional
+
+from spacy.tokens import DocBin
+
+from config import settings
+from services.metrics_service import metrics_service
+
+logger = logging.getLogger(__name__)
+
+CACHE_NAME = 'spacy_doc'
+
+
+class DocCache:
+    """
+    Cache local et borné des Doc Spacy analysés
+
+    Les Doc sont sérialisés avec DocBin dans un fichier par texte, sous une clé
+    dérivée du modèle et du texte: un même texte soumis à plusieurs routes
+    (analyse NLP, extraction NER, comparaison) n'est analysé qu'une fois par
+    version du modèle. Les fichiers les moins récemment utilisés sont supprimés
+    au-delà de DOC_CACHE_MAX_MB. Le répertoire peut être partagé par les
+    workers (écriture atomique par renommage).
+    """
+
+    def __init__(self, directory: str, max_bytes: int, min_chars: int):
+        """
+        Initialiser le cache
+
+        Args:
+            directory: Répertoire des fichiers .spacy
+            max_bytes: Taille maximale du cache
+            min_chars: Taille minimale des textes mis en cache (les textes
+                courts sont analysés plus vite qu'ils ne sont relus)
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_chars = min_chars
+        self._size: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def enabled_for(self, text: str) -> bool:
+        """Indiquer si un texte passe par le cache"""
+        return settings.DOC_CACHE_ENABLED and len(text) >= self.min_chars
+
+    def get(self, nlp, model_version: str, text: str):
+        """
+        Lire le Doc d'un texte
+
+        Args:
+            nlp: Pipeline Spacy (vocabulaire de désérialisation)
+            model_version: Version du modèle ayant produit le Doc
+            text: Texte analysé
+
+        Returns:
+            Doc Spacy, ou None s'il n'est pas en cache
+        """
+        path = self._path(model_version, text)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            doc = next(DocBin().from_bytes(data).get_docs(nlp.vocab))
+            # Date d'accès: les fichiers utilisés récemment sont conservés
+            os.utime(path)
+        except FileNotFoundError:
+            metrics_service.record_cache(CACHE_NAME, False)
+            return None
+        except Exception as e:
+            logger.warning(f"Entrée du cache des Doc illisible ({path}): {str(e)}")
+            metrics_service.record_cache(CACHE_NAME, False)
+            return None
+
+        metrics_service.record_cache(CACHE_NAME, True)
+        return doc
+
+    def put(self, model_version: str, text: str, doc):
+        """
+        Enregistrer le Doc d'un texte (sans effet en cas d'erreur)
+
+        Args:
+            model_version: Version du modèle ayant produit le Doc
+            text: Texte analysé
+            doc: Doc Spacy
+        """
+        path = self._path(model_version, text)
+        try:
+            doc_bin = DocBin(store_user_data=False)
+            doc_bin.add(doc)
+            data = doc_bin.to_bytes()
+
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temporary = f"{path}.{uuid.uuid4().hex}.tmp"
+            with open(temporary, 'wb') as f:
+                f.write(data)
+            os.replace(temporary, path)
+        except Exception as e:
+            logger.warning(f"Erreur lors de l'écriture dans le cache des Doc: {str(e)}")
+            return
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._disk_usage()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._prune()
+
+    def _path(self, model_version: str, text: str) -> str:
+        """Fichier d'un texte (clé: empreinte du modèle et du texte)"""
+        digest = hashlib.sha256(f"{model_version}\0{text}".encode('utf-8', errors='surrogatepass')).hexdigest()
+        return os.path.join(self.directory, digest[:2], f"{digest}.spacy")
+
+    def _entries(self):
+        """Fichiers du cache: (date d'accès, taille, chemin)"""
+        entries = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                if not name.endswith('.spacy'):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def _disk_usage(self) -> int:
+        """Taille totale des fichiers du cache"""
+        return sum(size for _, size, _ in self._entries())
+
+    def _prune(self):
+        """Supprimer les fichiers les moins récemment utilisés jusqu'à 90 % de la limite"""
+        entries = sorted(self._entries())
+        size = sum(entry_size for _, entry_size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, entry_size, path in entries:
+            if size <= target:
+                break
+            try:
+                os.remove(path)
+                size -= entry_size
+            except OSError:
+                pass
+        self._size = size
+        logger.info(f"Cache des Doc réduit à {size / 1024 / 1024:.1f} Mo")
+
+
+# Instance globale du cache des Doc analysés
+doc_cache = DocCache(settings.DOC_CACHE_DIR, settings.DOC_CACHE_MAX_MB * 1024 * 1024, settings.DOC_CACHE_MIN_CHARS)
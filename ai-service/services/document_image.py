@@ -0,0 +1,115 @@
+import io
+import threading
+from typing import Iterator, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+from PIL import Image
+
+
+class DocumentImage:
+    """
+    Image de document décodée une seule fois et partagée entre les moteurs
+
+    L'image BGR est calculée au décodage; la version en niveaux de gris est
+    calculée au premier accès puis réutilisée par toutes les vérifications.
+    """
+
+    def __init__(self, bgr: np.ndarray):
+        """
+        Initialiser l'image
+
+        Args:
+            bgr: Image BGR (H x W x 3) ou niveaux de gris (H x W)
+        """
+        self._bgr = bgr
+        self._gray: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def bgr(self) -> np.ndarray:
+        """Image BGR (3 canaux) pour PaddleOCR"""
+        if self._bgr.ndim == 2:
+            return cv2.cvtColor(self._bgr, cv2.COLOR_GRAY2BGR)
+        return self._bgr
+
+    @property
+    def gray(self) -> np.ndarray:
+        """Image en niveaux de gris (calculée une seule fois)"""
+        with self._lock:
+            if self._gray is None:
+                self._gray = self._bgr if self._bgr.ndim == 2 else cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+            return self._gray
+
+    @property
+    def shape(self) -> Tuple[int, ...]:
+        """Dimensions de l'image (hauteur, largeur[, canaux])"""
+        return self._bgr.shape
+
+
+ImageInput = Union[DocumentImage, np.ndarray]
+
+
+def decode_image(file_bytes: bytes) -> DocumentImage:
+    """
+    Décoder un fichier image
+
+    Les images avec transparence (RGBA, LA), à palette ou 16 bits sont
+    converties en RGB ou en niveaux de gris 8 bits avant la conversion BGR.
+
+    Args:
+        file_bytes: Contenu du fichier en bytes
+
+    Returns:
+        Image décodée
+    """
+    return _to_document_image(Image.open(io.BytesIO(file_bytes)))
+
+
+def decode_pages(file_bytes: bytes) -> Iterator[DocumentImage]:
+    """
+    Décoder les pages d'un fichier image, une à la fois (TIFF multipage)
+
+    Args:
+        file_bytes: Contenu du fichier en bytes
+
+    Returns:
+        Itérateur des pages décodées, dans l'ordre du fichier
+    """
+    image = Image.open(io.BytesIO(file_bytes))
+    for page in range(getattr(image, 'n_frames', 1)):
+        image.seek(page)
+        yield _to_document_image(image)
+
+
+def _to_document_image(image: Image.Image) -> DocumentImage:
+    """Convertir une image PIL en image BGR (ou niveaux de gris) 8 bits"""
+    if image.mode in ('I', 'I;16', 'I;16B', 'F'):
+        # Niveaux de gris 16 bits ou flottants: ramener la dynamique sur 8 bits
+        image_np = cv2.normalize(np.array(image, dtype=np.float32), None, 0, 255, cv2.NORM_MINMAX)
+        return DocumentImage(image_np.astype(np.uint8))
+    if image.mode not in ('RGB', 'L'):
+        image = image.convert('L' if image.mode == '1' else 'RGB')
+
+    image_np = np.array(image)
+    if image_np.ndim == 3:
+        image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+    return DocumentImage(image_np)
+
+
+def to_bgr(image: ImageInput) -> np.ndarray:
+    """Retourner l'image BGR d'une image décodée ou d'un tableau numpy"""
+    if isinstance(image, DocumentImage):
+        return image.bgr
+    if image.ndim == 2:
+        return cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return image
+
+
+def to_gray(image: ImageInput) -> np.ndarray:
+    """Retourner l'image en niveaux de gris d'une image décodée ou d'un tableau numpy"""
+    if isinstance(image, DocumentImage):
+        return image.gray
+    if image.ndim == 2:
+        return image
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
@@ -0,0 +1,155 @@
+import asyncio
+import logging
+from typing import Dict, Iterable, List, Optional
+
+from services.document_image import DocumentImage, decode_image
+from services.engine_registry import engine_registry
+from services.metrics_service import metrics_service
+from services.scheduler_service import ExecutionContext, scheduler_service
+
+logger = logging.getLogger(__name__)
+
+# Étapes disponibles, dans l'ordre d'exécution
+PIPELINE_STAGES = ('ocr', 'verification', 'kyc_entities')
+# Les entités KYC sont extraites du texte OCR
+STAGE_DEPENDENCIES = {'kyc_entities': ('ocr',)}
+
+
+def resolve_stages(requested: Iterable[str]) -> List[str]:
+    """
+    Valider les étapes demandées et ajouter leurs dépendances
+
+    Args:
+        requested: Étapes demandées
+
+    Returns:
+        Étapes à exécuter, dans l'ordre du pipeline
+
+    Raises:
+        ValueError: Si une étape est inconnue
+    """
+    stages = set()
+    for stage in requested:
+        if stage not in PIPELINE_STAGES:
+            raise ValueError(f"Étape inconnue: {stage}. Étapes disponibles: {list(PIPELINE_STAGES)}")
+        stages.add(stage)
+        stages.update(STAGE_DEPENDENCIES.get(stage, ()))
+    return [stage for stage in PIPELINE_STAGES if stage in stages]
+
+
+def _decode(file_bytes: bytes) -> DocumentImage:
+    """Décoder le document une seule fois pour tous les moteurs"""
+    with metrics_service.track('pipeline') as track:
+        track.record_bytes(len(file_bytes))
+        with track.stage('decode'):
+            image = decode_image(file_bytes)
+        track.record_image(image)
+        return image
+
+
+class DocumentPipeline:
+    """Traitement complet d'un document KYC: OCR, vérification et entités, sur une seule image décodée"""
+
+    async def process(
+        self,
+        file_bytes: bytes,
+        stages: List[str],
+        execution: ExecutionContext,
+        document_type: Optional[str] = None,
+        document_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Traiter un document
+
+        Chaque moteur reste soumis à l'ordonnanceur. Si le type de document est
+        fourni, l'OCR et la vérification s'exécutent en parallèle; sinon la
+        vérification attend le type détecté par l'OCR. Le document est enregistré
+        comme nouvelle soumission dans l'index des doublons, comme pour
+        /document/verify.
+
+        Args:
+            file_bytes: Contenu du fichier en bytes
+            stages: Étapes à exécuter (voir resolve_stages)
+            execution: Priorité et échéance de la requête
+            document_type: Type de document, s'il est connu
+            document_id: Identifiant du document chez l'appelant (un seul enregistrement par identifiant)
+
+        Returns:
+            Résultat de chaque étape exécutée
+        """
+        first_engine = 'ocr' if 'ocr' in stages else 'document_verification'
+        image = await scheduler_service.run(first_engine, execution, _decode, file_bytes)
+
+        result = {
+            'stages': stages,
+            'image': {'width': int(image.shape[1]), 'height': int(image.shape[0])},
+        }
+
+        if 'ocr' in stages and 'verification' in stages and document_type:
+            result['ocr'], result['verification'] = await asyncio.gather(
+                self._run('ocr', 'extract_document_data', execution, image),
+                self._run(
+                    'document_verification', 'verify_document', execution, image, document_type, True, document_id
+                ),
+            )
+        else:
+            if 'ocr' in stages:
+                result['ocr'] = await self._run('ocr', 'extract_document_data', execution, image)
+            if 'verification' in stages:
+                verification_type = document_type or _detected_type(result.get('ocr'))
+                result['verification'] = await self._run(
+                    'document_verification', 'verify_document', execution, image, verification_type, True, document_id
+                )
+
+        if 'kyc_entities' in stages:
+            result['kyc_entities'] = await self._run(
+                'ner', 'extract_kyc_entities', execution, result['ocr']['full_text']
+            )
+
+        logger.info(f"Traitement du document terminé (étapes: {', '.join(stages)})")
+        return result
+
+    async def _run(self, engine: str, method: str, execution: ExecutionContext, *args):
+        """Exécuter une méthode d'un moteur via l'ordonnanceur"""
+        return await scheduler_service.run(engine, execution, engine_registry.call, engine, method, *args)
+
+
+def _detected_type(ocr_result: Optional[Dict]) -> str:
+    """Type de document détecté par l'OCR (vérifications génériques si inconnu)"""
+    return ocr_result['document_type'] if ocr_result else 'generic'
+
+
+def process_local(file_bytes: bytes, stages: List[str], document_type: Optional[str] = None) -> Dict:
+    """
+    Traiter un document dans le processus courant, sans passer par l'ordonnanceur
+
+    Utilisé par les traitements hors ligne (un processus par coeur, chacun avec
+    ses propres moteurs).
+
+    Args:
+        file_bytes: Contenu du fichier en bytes
+        stages: Étapes à exécuter (voir resolve_stages)
+        document_type: Type de document, s'il est connu
+
+    Returns:
+        Résultat de chaque étape exécutée
+    """
+    image = _decode(file_bytes)
+    result = {
+        'stages': stages,
+        'image': {'width': int(image.shape[1]), 'height': int(image.shape[0])},
+    }
+
+    if 'ocr' in stages:
+        result['ocr'] = engine_registry.call('ocr', 'extract_document_data', image)
+    if 'verification' in stages:
+        result['verification'] = engine_registry.call(
+            'document_verification', 'verify_document', image, document_type or _detected_type(result.get('ocr'))
+        )
+    if 'kyc_entities' in stages:
+        result['kyc_entities'] = engine_registry.call('ner', 'extract_kyc_entities', result['ocr']['full_text'])
+    return result
+
+
+# Instance globale du pipeline de traitement des documents
+document_pipeline = DocumentPipeline()
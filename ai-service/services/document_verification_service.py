@@ -1,37 +1,93 @@
 import cv2
 import numpy as np
 from typing import Dict, List, Optional, Tuple
-from PIL import Image
-import io
 import logging
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
 from config import settings
+from services.document_image import ImageInput, decode_image, to_gray
+from services.metrics_service import metrics_service
+from services.near_duplicate_service import near_duplicate_service
 
 logger = logging.getLogger(__name__)
 
+# Vérifications effectuées pour chaque type de document
+GENERIC_CHECKS = ('edges', 'watermarks', 'tampering')
+DOCUMENT_CHECKS = {
+    'passport': GENERIC_CHECKS + ('mrz',),
+    'id_card': GENERIC_CHECKS + ('hologram',),
+    'driving_license': GENERIC_CHECKS + ('security_features',),
+}
+
 
 class DocumentVerificationService:
     """Service pour la vérification de l'authenticité des documents"""
 
-    def __init__(self):
-        """Initialiser le service de vérification de documents"""
+    def __init__(self, check_workers: Optional[int] = None, near_duplicates: Optional[bool] = None):
+        """
+        Initialiser le service de vérification de documents
+
+        Args:
+            check_workers: Threads par image pour les vérifications (VERIFICATION_CHECK_WORKERS par défaut)
+            near_duplicates: Rechercher les soumissions antérieures (NEAR_DUPLICATE_ENABLED par défaut)
+        """
         try:
             # Charger les modèles de détection de fraudes
             self._load_fraud_detection_models()
+            self.model_version = f"opencv-{cv2.__version__}"
+            self.near_duplicates = settings.NEAR_DUPLICATE_ENABLED if near_duplicates is None else near_duplicates
+
+            # Fonctions de vérification par nom
+            self._checks = {
+                'edges': self.detect_document_edges,
+                'watermarks': self.detect_watermarks,
+                'tampering': self.detect_tampering,
+                'mrz': self._verify_mrz,
+                'hologram': self._verify_hologram,
+                'security_features': self._verify_security_features,
+            }
+
+            # Les vérifications d'une même image sont indépendantes et OpenCV libère
+            # le GIL: elles sont exécutées en parallèle si plusieurs threads sont configurés
+            check_workers = check_workers or settings.VERIFICATION_CHECK_WORKERS
+            self._check_executor = None
+            if check_workers > 1:
+                self._check_executor = ThreadPoolExecutor(
+                    max_workers=check_workers,
+                    thread_name_prefix='verification-check',
+                )
 
             logger.info("Service de vérification de documents initialisé avec succès")
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation du service de vérification: {str(e)}")
             raise
 
-    def verify_document(self, image: np.ndarray, document_type: str) -> Dict:
+    def warmup(self):
+        """Exécuter toutes les vérifications sur une image synthétique"""
+        image = np.full((480, 640, 3), 235, dtype=np.uint8)
+        cv2.rectangle(image, (40, 40), (600, 440), (60, 60, 60), 3)
+        cv2.putText(image, 'P<FRADUPONT<<JEAN', (60, 420), cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 0, 0), 2)
+        for document_type in ('passport', 'id_card', 'driving_license'):
+            self.verify_document(image, document_type)
+
+    def verify_document(
+        self,
+        image: ImageInput,
+        document_type: str,
+        register: bool = False,
+        document_id: Optional[str] = None,
+    ) -> Dict:
         """
         Vérifier l'authenticité d'un document
 
         Args:
-            image: Image du document en format numpy array
+            image: Image du document (numpy array BGR ou image décodée partagée)
             document_type: Type de document (passport, id_card, driving_license, etc.)
+            register: Enregistrer le document dans l'index des soumissions (nouvelle
+                soumission uniquement, pas de re-vérification)
+            document_id: Identifiant du document chez l'appelant, s'il est connu
 
         Returns:
             Dictionnaire contenant les résultats de la vérification
@@ -46,14 +102,23 @@ class DocumentVerificationService:
             }
 
             # Effectuer les vérifications spécifiques au type de document
-            if document_type == 'passport':
-                verification_results['checks'] = self._verify_passport(image)
-            elif document_type == 'id_card':
-                verification_results['checks'] = self._verify_id_card(image)
-            elif document_type == 'driving_license':
-                verification_results['checks'] = self._verify_driving_license(image)
-            else:
-                verification_results['checks'] = self._verify_generic_document(image)
+            with metrics_service.track('document_verification', document_type) as track:
+                track.record_image(image)
+                verification_results['checks'] = self._run_checks(
+                    image, DOCUMENT_CHECKS.get(document_type, GENERIC_CHECKS), track
+                )
+
+                # Document déjà soumis (éventuellement retouché): signalé à part,
+                # sans effet sur le score de confiance
+                if self.near_duplicates:
+                    with track.stage('near_duplicates'):
+                        verification_results['near_duplicates'] = near_duplicate_service.check(
+                            image,
+                            verification_results['checks'].get('edges', {}).get('corners'),
+                            document_type,
+                            register,
+                            document_id,
+                        )
 
             # Calculer le score de confiance global
             verification_results['confidence'] = self._calculate_confidence(verification_results['checks'])
@@ -68,34 +133,41 @@ class DocumentVerificationService:
             logger.error(f"Erreur lors de la vérification du document: {str(e)}")
             raise
 
-    def verify_from_file(self, file_bytes: bytes, document_type: str) -> Dict:
+    def verify_from_file(
+        self,
+        file_bytes: bytes,
+        document_type: str,
+        register: bool = False,
+        document_id: Optional[str] = None,
+    ) -> Dict:
         """
         Vérifier l'authenticité d'un document depuis un fichier
 
         Args:
             file_bytes: Contenu du fichier en bytes
             document_type: Type de document
+            register: Enregistrer le document dans l'index des soumissions
+            document_id: Identifiant du document chez l'appelant, s'il est connu
 
         Returns:
             Dictionnaire contenant les résultats de la vérification
         """
         try:
-            # Charger l'image depuis les bytes
-            image = Image.open(io.BytesIO(file_bytes))
-            image_np = np.array(image)
+            with metrics_service.track('document_verification', document_type) as track:
+                track.record_bytes(len(file_bytes))
 
-            # Convertir en BGR pour OpenCV si nécessaire
-            if len(image_np.shape) == 3:
-                image_np = cv2.cvtColor(image_np, cv2.COLOR_RGB2BGR)
+                with track.stage('decode'):
+                    # Charger l'image depuis les bytes (BGR pour OpenCV)
+                    image = decode_image(file_bytes)
 
-            # Vérifier le document
-            return self.verify_document(image_np, document_type)
+                # Vérifier le document
+                return self.verify_document(image, document_type, register, document_id)
 
         except Exception as e:
             logger.error(f"Erreur lors de la vérification depuis le fichier: {str(e)}")
             raise
 
-    def detect_document_edges(self, image: np.ndarray) -> Dict:
+    def detect_document_edges(self, image: ImageInput) -> Dict:
         """
         Détecter les bords du document
 
@@ -107,7 +179,7 @@ class DocumentVerificationService:
         """
         try:
             # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = to_gray(image)
 
             # Appliquer un flou pour réduire le bruit
             blurred = cv2.GaussianBlur(gray, (5, 5), 0)
@@ -139,13 +211,14 @@ class DocumentVerificationService:
 
         except Exception as e:
             logger.error(f"Erreur lors de la détection des bords: {str(e)}")
+            metrics_service.record_error('document_verification', 'edges')
             return {
                 'detected': False,
                 'corners': None,
                 'confidence': 0.0,
             }
 
-    def detect_watermarks(self, image: np.ndarray) -> Dict:
+    def detect_watermarks(self, image: ImageInput) -> Dict:
         """
         Détecter les filigranes dans le document
 
@@ -157,7 +230,7 @@ class DocumentVerificationService:
         """
         try:
             # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = to_gray(image)
 
             # Appliquer un filtre de seuillage adaptatif
             binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
@@ -189,13 +262,14 @@ class DocumentVerificationService:
 
         except Exception as e:
             logger.error(f"Erreur lors de la détection des filigranes: {str(e)}")
+            metrics_service.record_error('document_verification', 'watermarks')
             return {
                 'detected': False,
                 'regions': [],
                 'confidence': 0.0,
             }
 
-    def detect_tampering(self, image: np.ndarray) -> Dict:
+    def detect_tampering(self, image: ImageInput) -> Dict:
         """
         Détecter les altérations dans le document
 
@@ -207,7 +281,7 @@ class DocumentVerificationService:
         """
         try:
             # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = to_gray(image)
 
             # Calculer l'histogramme
             hist = cv2.calcHist([gray], [0], None, [256], [0, 256])
@@ -231,6 +305,7 @@ class DocumentVerificationService:
 
         except Exception as e:
             logger.error(f"Erreur lors de la détection d'altérations: {str(e)}")
+            metrics_service.record_error('document_verification', 'tampering')
             return {
                 'detected': False,
                 'anomalies': [],
@@ -243,50 +318,38 @@ class DocumentVerificationService:
         # pour détecter les documents falsifiés
         pass
 
-    def _verify_passport(self, image: np.ndarray) -> Dict:
-        """Vérifier un passeport"""
-        checks = {
-            'edges': self.detect_document_edges(image),
-            'watermarks': self.detect_watermarks(image),
-            'tampering': self.detect_tampering(image),
-            'mrz': self._verify_mrz(image),
-        }
-        return checks
-
-    def _verify_id_card(self, image: np.ndarray) -> Dict:
-        """Vérifier une carte d'identité"""
-        checks = {
-            'edges': self.detect_document_edges(image),
-            'watermarks': self.detect_watermarks(image),
-            'tampering': self.detect_tampering(image),
-            'hologram': self._verify_hologram(image),
-        }
-        return checks
-
-    def _verify_driving_license(self, image: np.ndarray) -> Dict:
-        """Vérifier un permis de conduire"""
-        checks = {
-            'edges': self.detect_document_edges(image),
-            'watermarks': self.detect_watermarks(image),
-            'tampering': self.detect_tampering(image),
-            'security_features': self._verify_security_features(image),
-        }
-        return checks
-
-    def _verify_generic_document(self, image: np.ndarray) -> Dict:
-        """Vérifier un document générique"""
-        checks = {
-            'edges': self.detect_document_edges(image),
-            'watermarks': self.detect_watermarks(image),
-            'tampering': self.detect_tampering(image),
+    def _run_checks(self, image: ImageInput, check_names: Tuple[str, ...], track) -> Dict:
+        """
+        Exécuter une liste de vérifications en mesurant la durée de chacune
+
+        Args:
+            image: Image en format numpy array
+            check_names: Noms des vérifications à effectuer
+            track: Suivi des métriques du traitement
+
+        Returns:
+            Résultats par vérification
+        """
+        if self._check_executor is None or len(check_names) < 2:
+            return {name: self._run_check(name, image, track) for name in check_names}
+
+        # Chaque vérification garde le contexte du traitement (métriques, trace de la requête)
+        futures = {
+            name: self._check_executor.submit(contextvars.copy_context().run, self._run_check, name, image, track)
+            for name in check_names
         }
-        return checks
+        return {name: future.result() for name, future in futures.items()}
+
+    def _run_check(self, name: str, image: ImageInput, track) -> Dict:
+        """Exécuter une vérification en mesurant sa durée"""
+        with track.stage(name):
+            return self._checks[name](image)
 
-    def _verify_mrz(self, image: np.ndarray) -> Dict:
+    def _verify_mrz(self, image: ImageInput) -> Dict:
         """Vérifier la zone lisible par machine (MRZ)"""
         try:
             # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = to_gray(image)
 
             # Appliquer un seuillage adaptatif
             binary = cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
@@ -307,16 +370,17 @@ class DocumentVerificationService:
 
         except Exception as e:
             logger.error(f"Erreur lors de la vérification de la MRZ: {str(e)}")
+            metrics_service.record_error('document_verification', 'mrz')
             return {
                 'detected': False,
                 'confidence': 0.0,
             }
 
-    def _verify_hologram(self, image: np.ndarray) -> Dict:
+    def _verify_hologram(self, image: ImageInput) -> Dict:
         """Vérifier la présence d'un hologramme"""
         try:
             # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = to_gray(image)
 
             # Appliquer un filtre de Sobel pour détecter les variations d'intensité
             sobel_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
@@ -331,7 +395,7 @@ class DocumentVerificationService:
             total_pixels = sobel.size
             hologram_ratio = hologram_pixels / total_pixels
 
-            hologram_detected = hologram_ratio > 0.05
+            hologram_detected = bool(hologram_ratio > 0.05)
 
             return {
                 'detected': hologram_detected,
@@ -341,17 +405,18 @@ class DocumentVerificationService:
 
         except Exception as e:
             logger.error(f"Erreur lors de la vérification de l'hologramme: {str(e)}")
+            metrics_service.record_error('document_verification', 'hologram')
             return {
                 'detected': False,
                 'ratio': 0.0,
                 'confidence': 0.0,
             }
 
-    def _verify_security_features(self, image: np.ndarray) -> Dict:
+    def _verify_security_features(self, image: ImageInput) -> Dict:
         """Vérifier les caractéristiques de sécurité"""
         try:
             # Convertir en niveaux de gris
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            gray = to_gray(image)
 
             # Détecter les micro-textures
             laplacian = cv2.Laplacian(gray, cv2.CV_64F)
@@ -361,7 +426,7 @@ class DocumentVerificationService:
             edges = cv2.Canny(gray, 50, 150)
             guilloche_score = np.sum(edges) / edges.size
 
-            security_features_detected = texture_score > 10 and guilloche_score > 0.1
+            security_features_detected = bool(texture_score > 10 and guilloche_score > 0.1)
 
             return {
                 'detected': security_features_detected,
@@ -372,6 +437,7 @@ class DocumentVerificationService:
 
         except Exception as e:
             logger.error(f"Erreur lors de la vérification des caractéristiques de sécurité: {str(e)}")
+            metrics_service.record_error('document_verification', 'security_features')
             return {
                 'detected': False,
                 'texture_score': 0.0,
@@ -387,7 +453,3 @@ class DocumentVerificationService:
         # Calculer la moyenne des confiances de toutes les vérifications
         confidences = [check.get('confidence', 0.0) for check in checks.values()]
         return sum(confidences) / len(confidences)
-
-
-# Instance globale du service de vérification de documents
-document_verification_service = DocumentVerificationService()
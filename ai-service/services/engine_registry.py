@@ -0,0 +1,224 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# États du cycle de vie d'un moteur
+ENGINE_PENDING = 'pending'
+ENGINE_LOADING = 'loading'
+ENGINE_WARMING = 'warming'
+ENGINE_READY = 'ready'
+ENGINE_FAILED = 'failed'
+
+
+class EngineUnavailableError(Exception):
+    """Le moteur n'a pas pu être chargé"""
+
+    def __init__(self, engine: str, reason: str):
+        super().__init__(f"Moteur {engine} indisponible: {reason}")
+        self.engine = engine
+
+
+class EngineState:
+    """État de chargement d'un moteur et instance du service associé"""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self.factory = factory
+        self.instance: Optional[Any] = None
+        self.status = ENGINE_PENDING
+        self.error: Optional[str] = None
+        self.model_version: Optional[str] = None
+        self.load_seconds: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self.lock = threading.Lock()
+
+    def to_dict(self) -> Dict:
+        """Retourner l'état du moteur"""
+        return {
+            'status': self.status,
+            'model_version': self.model_version,
+            'warmed_up': self.warmup_seconds is not None,
+            'error': self.error,
+            'load_seconds': self.load_seconds,
+            'warmup_seconds': self.warmup_seconds,
+        }
+
+
+class EngineRegistry:
+    """Registre des moteurs IA: chargement différé ou parallèle et préchauffage"""
+
+    def __init__(self):
+        """Initialiser le registre"""
+        self._engines: Dict[str, EngineState] = {}
+
+    def register(self, name: str, factory: Callable[[], Any]):
+        """
+        Enregistrer un moteur
+
+        Args:
+            name: Nom du moteur
+            factory: Fonction construisant le service (appelée une seule fois)
+        """
+        self._engines[name] = EngineState(name, factory)
+
+    def get(self, name: str) -> Any:
+        """
+        Obtenir l'instance d'un moteur, en la chargeant au premier appel si nécessaire
+
+        Args:
+            name: Nom du moteur
+
+        Returns:
+            Instance du service
+
+        Raises:
+            EngineUnavailableError: Si le chargement du moteur a échoué
+        """
+        state = self._engines[name]
+        if state.status != ENGINE_READY:
+            self._load(state)
+        if state.status == ENGINE_FAILED:
+            raise EngineUnavailableError(name, state.error)
+        return state.instance
+
+    def call(self, name: str, method: str, *args: Any, **kwargs: Any) -> Any:
+        """
+        Appeler une méthode d'un moteur
+
+        Args:
+            name: Nom du moteur
+            method: Nom de la méthode du service
+            *args: Arguments positionnels
+            **kwargs: Arguments nommés
+
+        Returns:
+            Résultat de la méthode
+        """
+        return getattr(self.get(name), method)(*args, **kwargs)
+
+    async def load_all(self):
+        """Charger et préchauffer tous les moteurs en parallèle"""
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            asyncio.to_thread(self._load, state) for state in self._engines.values()
+        ))
+        logger.info(f"Moteurs IA chargés en {time.perf_counter() - started:.2f}s")
+
+    async def load_sequentially(self):
+        """
+        Charger et préchauffer les moteurs un à un (mode lazy)
+
+        Un moteur sollicité entre-temps est chargé immédiatement par la requête;
+        les autres le sont ensuite en arrière-plan, sans se disputer les coeurs.
+        """
+        started = time.perf_counter()
+        for state in self._engines.values():
+            await asyncio.to_thread(self._load, state)
+        logger.info(f"Moteurs IA chargés en {time.perf_counter() - started:.2f}s")
+
+    def is_ready(self) -> bool:
+        """
+        Indiquer si le service peut recevoir du trafic
+
+        Dans les deux modes, tous les moteurs doivent être chargés et
+        préchauffés: le mode lazy accélère le démarrage et la première
+        requête, pas la disponibilité annoncée.
+        """
+        return all(state.status == ENGINE_READY for state in self._engines.values())
+
+    def status(self) -> Dict[str, Dict]:
+        """Retourner l'état de chargement de chaque moteur"""
+        return {name: state.to_dict() for name, state in self._engines.items()}
+
+    def preload(self):
+        """
+        Construire tous les moteurs sans les préchauffer
+
+        Utilisé par le serveur pre-fork: les modèles sont chargés dans le
+        processus parent puis partagés (copie à l'écriture) par les workers,
+        qui les préchauffent eux-mêmes. Le chargement est séquentiel pour
+        qu'aucun thread ne reste actif au moment du fork.
+        """
+        started = time.perf_counter()
+        for state in self._engines.values():
+            with state.lock:
+                if state.instance is not None or state.status == ENGINE_FAILED:
+                    continue
+                try:
+                    self._construct(state)
+                    state.status = ENGINE_PENDING
+                except Exception as e:
+                    state.status = ENGINE_FAILED
+                    state.error = str(e)
+                    logger.error(f"Erreur lors du chargement du moteur {state.name}: {str(e)}")
+        logger.info(f"Moteurs IA préchargés en {time.perf_counter() - started:.2f}s")
+
+    def _construct(self, state: EngineState):
+        """Construire l'instance d'un moteur (appelé avec state.lock)"""
+        state.status = ENGINE_LOADING
+        started = time.perf_counter()
+        state.instance = state.factory()
+        state.load_seconds = round(time.perf_counter() - started, 3)
+        state.model_version = getattr(state.instance, 'model_version', None)
+
+    def _load(self, state: EngineState):
+        """Construire et préchauffer un moteur (une seule fois, même en concurrence)"""
+        with state.lock:
+            if state.status in (ENGINE_READY, ENGINE_FAILED):
+                return
+
+            try:
+                # Instance déjà construite par preload() dans le processus parent
+                if state.instance is None:
+                    self._construct(state)
+                instance = state.instance
+
+                if settings.ENGINE_WARMUP and hasattr(instance, 'warmup'):
+                    state.status = ENGINE_WARMING
+                    started = time.perf_counter()
+                    instance.warmup()
+                    state.warmup_seconds = round(time.perf_counter() - started, 3)
+
+                state.status = ENGINE_READY
+                logger.info(
+                    f"Moteur {state.name} prêt (chargement: {state.load_seconds}s, "
+                    f"préchauffage: {state.warmup_seconds}s)"
+                )
+            except Exception as e:
+                state.status = ENGINE_FAILED
+                state.error = str(e)
+                logger.error(f"Erreur lors du chargement du moteur {state.name}: {str(e)}")
+
+
+def _create_ocr_service():
+    from services.ocr_service import OCRService
+    return OCRService()
+
+
+def _create_nlp_service():
+    from services.nlp_service import NLPService
+    return NLPService()
+
+
+def _create_ner_service():
+    from services.ner_service import NERService
+    return NERService()
+
+
+def _create_document_verification_service():
+    from services.document_verification_service import DocumentVerificationService
+    return DocumentVerificationService()
+
+
+# Instance globale du registre des moteurs
+engine_registry = EngineRegistry()
+engine_registry.register('ocr', _create_ocr_service)
+engine_registry.register('nlp', _create_nlp_service)
+engine_registry.register('ner', _create_ner_service)
+engine_registry.register('document_verification', _create_document_verification_service)
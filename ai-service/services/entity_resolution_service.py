@@ -0,0 +1,474 @@
+import logging
+import os
+import re
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from services.name_keys import fold_name
+from services.spacy_model import load_spacy_model
+
+logger = logging.getLogger(__name__)
+
+# Formes juridiques ignorées lors de la comparaison ("SARL Dupont" = "Dupont SARL")
+LEGAL_FORMS = {
+    'sarl', 'sa', 'sas', 'sasu', 'eurl', 'snc', 'scop', 'scs', 'sca', 'sci', 'gie',
+    'ltd', 'llc', 'inc', 'gmbh', 'plc', 'bv', 'nv', 'ag', 'spa', 'srl',
+}
+
+# Dimension de la partie trigrammes de caractères de l'embedding
+TRIGRAM_DIMENSIONS = 256
+
+# En-tête d'un enregistrement du fichier d'index: entité de rattachement (-1 = nouvelle
+# entité), type, date, puis longueurs en octets de la clé normalisée et de la forme de
+# surface qui le suivent (UTF-8, jamais tronquées: la clé sert à la recherche exacte)
+HEADER_DTYPE = np.dtype([
+    ('entity', '<i8'),
+    ('label', 'S8'),
+    ('created_at', '<f8'),
+    ('key_length', '<u4'),
+    ('name_length', '<u4'),
+])
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize_mention(text: str) -> str:
+    """
+    Clé de comparaison d'une mention
+
+    Translittérée en latin, minuscules sans accents, '&' lu comme 'et', formes
+    juridiques retirées et mots triés: "SARL Dupont & Fils" et "Dupont et Fils
+    SARL" ont la même clé, "Иван Петров" et "Petrov Ivan" aussi.
+    """
+    stripped = fold_name(text.replace('&', ' et '))
+    tokens = [token for token in _TOKEN_PATTERN.findall(stripped) if token not in LEGAL_FORMS]
+    return ' '.join(sorted(tokens))
+
+
+def within_one_edit(first: str, second: str) -> bool:
+    """Vérifier si deux mots diffèrent d'au plus une insertion, suppression, substitution ou transposition"""
+    if first == second:
+        return True
+    if abs(len(first) - len(second)) > 1:
+        return False
+    prefix = 0
+    while prefix < min(len(first), len(second)) and first[prefix] == second[prefix]:
+        prefix += 1
+    a, b = first[prefix:], second[prefix:]
+    if len(a) == len(b):
+        return a[1:] == b[1:] or (len(a) >= 2 and a[0] == b[1] and a[1] == b[0] and a[2:] == b[2:])
+    return a[1:] == b if len(a) > len(b) else a == b[1:]
+
+
+def tokens_agree(key: str, canonical_key: str, label: str) -> bool:
+    """
+    Vérifier mot à mot qu'une mention peut désigner une entité
+
+    Chaque mot de la clé la plus courte doit correspondre à un mot distinct de
+    l'autre: à l'identique pour les mots courts (Jean / Jeanne), à une faute
+    de frappe près à partir de ENTITY_RESOLUTION_TYPO_LENGTH caractères
+    (Dupond / Dupont). Pour une personne, les deux noms doivent en plus avoir
+    le même nombre de mots (Dupont seul ne désigne pas Jean Dupont).
+    """
+    tokens, canonical_tokens = key.split(), canonical_key.split()
+    if label == 'PER' and len(tokens) != len(canonical_tokens):
+        return False
+    if len(tokens) > len(canonical_tokens):
+        tokens, canonical_tokens = canonical_tokens, tokens
+
+    remaining = list(canonical_tokens)
+    # Mots identiques d'abord, fautes de frappe ensuite
+    for token in sorted(tokens, key=lambda token: token not in remaining):
+        if token in remaining:
+            remaining.remove(token)
+            continue
+        if len(token) < settings.ENTITY_RESOLUTION_TYPO_LENGTH:
+            return False
+        match = next(
+            (other for other in remaining if len(other) >= settings.ENTITY_RESOLUTION_TYPO_LENGTH and within_one_edit(token, other)),
+            None,
+        )
+        if match is None:
+            return False
+        remaining.remove(match)
+    return True
+
+
+def entity_id(position: int) -> str:
+    """Identifiant canonique d'une entité (position de son enregistrement de création)"""
+    return f"ent_{position}"
+
+
+class MentionEmbedder:
+    """
+    Embedding d'une clé de mention
+
+    Moyenne des vecteurs Spacy des mots (sens) concaténée aux trigrammes de
+    caractères hachés (graphie: noms propres absents du vocabulaire, fautes
+    de frappe), chaque partie normalisée puis pondérée.
+    """
+
+    def __init__(self, vocab, vector_weight: float):
+        """
+        Initialiser l'embedding
+
+        Args:
+            vocab: Vocabulaire Spacy (vecteurs du modèle chargé)
+            vector_weight: Poids des vecteurs Spacy (0 à 1, le reste pour les trigrammes)
+        """
+        self.vocab = vocab
+        vectors_length = getattr(vocab, 'vectors_length', 0) or 0
+        self.vector_dimensions = vectors_length if vector_weight > 0 else 0
+        self.vector_weight = np.sqrt(vector_weight) if self.vector_dimensions else 0.0
+        self.trigram_weight = np.sqrt(1 - vector_weight) if self.vector_dimensions else 1.0
+        self.dimensions = self.vector_dimensions + TRIGRAM_DIMENSIONS
+
+    def embed(self, key: str) -> np.ndarray:
+        """Embedding normalisé (produit scalaire = similarité cosinus)"""
+        embedding = np.zeros(self.dimensions, dtype=np.float32)
+
+        if self.vector_dimensions:
+            vectors = [self.vocab.get_vector(word) for word in key.split() if self.vocab.has_vector(word)]
+            if vectors:
+                mean = np.mean(vectors, axis=0)
+                norm = np.linalg.norm(mean)
+                if norm > 0:
+                    embedding[:self.vector_dimensions] = mean / norm * self.vector_weight
+
+        padded = f" {key} "
+        trigrams = np.fromiter(
+            (zlib.crc32(padded[start:start + 3].encode()) % TRIGRAM_DIMENSIONS for start in range(len(padded) - 2)),
+            dtype=np.int64,
+        )
+        counts = np.bincount(trigrams, minlength=TRIGRAM_DIMENSIONS).astype(np.float32)
+        norm = np.linalg.norm(counts)
+        if norm > 0:
+            embedding[self.vector_dimensions:] = counts / norm * self.trigram_weight
+
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+
+
+class HyperplaneIndex:
+    """
+    Index de plus proches voisins approché (similarité cosinus)
+
+    Hachage par hyperplans aléatoires: chaque table range un vecteur dans le
+    seau donné par le signe de ses projections sur hash_bits hyperplans. Deux
+    vecteurs proches partagent un seau dans au moins une table avec une forte
+    probabilité; seuls ces candidats sont comparés exactement.
+    """
+
+    def __init__(self, dimensions: int, tables: int, hash_bits: int, seed: int = 1):
+        """
+        Initialiser l'index
+
+        Args:
+            dimensions: Dimension des vecteurs
+            tables: Nombre de tables de hachage
+            hash_bits: Hyperplans par table
+            seed: Graine des hyperplans
+        """
+        generator = np.random.RandomState(seed)
+        self.planes = generator.standard_normal((dimensions, tables * hash_bits)).astype(np.float32)
+        self.tables = tables
+        self.hash_bits = hash_bits
+        self._powers = (1 << np.arange(hash_bits, dtype=np.int64))
+        self._buckets: List[Dict[int, List[int]]] = [{} for _ in range(tables)]
+        # Vecteurs dans un tableau à capacité doublée (ajout en temps amorti constant)
+        self._vectors = np.empty((1024, dimensions), dtype=np.float32)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _keys(self, vector: np.ndarray) -> List[int]:
+        """Seau du vecteur dans chaque table"""
+        bits = (vector @ self.planes > 0).reshape(self.tables, self.hash_bits)
+        return (bits @ self._powers).tolist()
+
+    def add(self, vector: np.ndarray) -> int:
+        """Ajouter un vecteur et retourner sa position"""
+        if self._size == len(self._vectors):
+            grown = np.empty((2 * len(self._vectors), self._vectors.shape[1]), dtype=np.float32)
+            grown[:self._size] = self._vectors
+            self._vectors = grown
+        position = self._size
+        self._vectors[position] = vector
+        self._size += 1
+        for table, key in enumerate(self._keys(vector)):
+            self._buckets[table].setdefault(key, []).append(position)
+        return position
+
+    def search(self, vector: np.ndarray, max_candidates: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Rechercher les vecteurs proches
+
+        Args:
+            vector: Vecteur normalisé recherché
+            max_candidates: Candidats comparés au maximum (ceux présents dans le plus de tables)
+
+        Returns:
+            Positions et similarités cosinus des candidats, par similarité décroissante
+        """
+        found = [
+            self._buckets[table][key]
+            for table, key in enumerate(self._keys(vector))
+            if key in self._buckets[table]
+        ]
+        if not found:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        positions, counts = np.unique(np.concatenate(found), return_counts=True)
+        if len(positions) > max_candidates:
+            positions = positions[np.argpartition(-counts, max_candidates - 1)[:max_candidates]]
+
+        similarities = self._vectors[positions] @ vector
+        order = np.argsort(-similarities, kind='stable')
+        return positions[order], similarities[order]
+
+
+class EntityResolutionService:
+    """
+    Résolution des mentions d'entités (personnes, organisations) entre documents
+
+    Chaque mention est rattachée à une entité canonique: d'abord par sa clé
+    normalisée (ordre des mots, accents et forme juridique ignorés), sinon par
+    le plus proche voisin de son embedding parmi les noms canoniques d'un index
+    approché, au-dessus du seuil de son type et si les mots concordent (voir
+    tokens_agree). Les variantes rattachées ne sont pas indexées: chaque
+    mention est comparée au nom canonique, jamais à une chaîne de variantes
+    (A proche de B, B proche de C n'entraîne pas A = C).
+
+    Seuls les appels avec register créent des entités: l'index grandit avec
+    les entités enregistrées (environ 2,2 Ko par entité avec les vecteurs du
+    modèle lg), jusqu'à ENTITY_RESOLUTION_MAX_ENTITIES. Si
+    ENTITY_RESOLUTION_INDEX_PATH est défini, les rattachements sont ajoutés à
+    un fichier partagé par tous les processus (identifiants stables entre
+    workers et redémarrages).
+    """
+
+    def __init__(self, path: Optional[str] = None, nlp=None):
+        """
+        Initialiser le service
+
+        Args:
+            path: Fichier d'index (None = mémoire uniquement)
+            nlp: Pipeline Spacy déjà chargé (le modèle partagé est chargé au premier appel sinon)
+        """
+        self.path = path
+        self.nlp = nlp
+        self.embedder: Optional[MentionEmbedder] = None
+        self.index: Optional[HyperplaneIndex] = None
+        # Par position de l'index: entité canonique (seuls les noms canoniques sont indexés)
+        self._index_entities: List[int] = []
+        # Clé canonique (type, clé normalisée) -> entité
+        self._aliases: Dict[Tuple[str, str], int] = {}
+        # Entité canonique -> type, clé, forme de surface, date, variantes
+        self._entities: Dict[int, Dict] = {}
+        self._records = 0
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def resolve(self, mentions: List[Tuple[str, str]], register: bool = False) -> List[Dict]:
+        """
+        Rattacher des mentions à leurs entités canoniques
+
+        Args:
+            mentions: (texte, type PER ou ORG) de chaque mention
+            register: Créer les entités inconnues et enregistrer les nouvelles variantes
+                (par défaut, rattachement aux entités existantes uniquement)
+
+        Returns:
+            Pour chaque mention: identifiant de l'entité (None si inconnue et
+            register désactivé), méthode de rattachement et similarité
+        """
+        with self._lock:
+            self._ensure_loaded()
+            self._sync()
+            return [self._resolve(text, label, register) for text, label in mentions]
+
+    def get_entity(self, identifier: str) -> Optional[Dict]:
+        """
+        Retourner une entité canonique
+
+        Args:
+            identifier: Identifiant de l'entité (ent_<position>)
+
+        Returns:
+            Type, forme de surface et variantes de l'entité, None si inconnue
+        """
+        try:
+            position = int(identifier.split('_', 1)[1])
+        except (IndexError, ValueError):
+            return None
+
+        with self._lock:
+            self._ensure_loaded()
+            self._sync()
+            entity = self._entities.get(position)
+            if entity is None:
+                return None
+            return {
+                'entity_id': identifier,
+                'label': entity['label'],
+                'name': entity['name'],
+                'created_at': datetime.fromtimestamp(entity['created_at'], timezone.utc).isoformat(),
+                'aliases': list(entity['aliases']),
+            }
+
+    def status(self) -> Dict:
+        """Retourner la taille de l'index"""
+        with self._lock:
+            self._sync()
+            return {
+                'entities': len(self._entities),
+                'max_entities': settings.ENTITY_RESOLUTION_MAX_ENTITIES,
+                'indexed_vectors': len(self.index) if self.index is not None else 0,
+            }
+
+    def _ensure_loaded(self):
+        """Construire l'embedding et l'index au premier appel (vecteurs du modèle Spacy)"""
+        if self.index is not None:
+            return
+        if self.nlp is None:
+            self.nlp = load_spacy_model()
+        self.embedder = MentionEmbedder(self.nlp.vocab, settings.ENTITY_RESOLUTION_VECTOR_WEIGHT)
+        self.index = HyperplaneIndex(
+            self.embedder.dimensions,
+            settings.ENTITY_RESOLUTION_TABLES,
+            settings.ENTITY_RESOLUTION_HASH_BITS,
+        )
+
+    def _resolve(self, text: str, label: str, register: bool) -> Dict:
+        """Rattacher une mention (verrou détenu)"""
+        key = normalize_mention(text)
+        if not key:
+            return {'entity_id': None, 'method': None, 'similarity': None}
+
+        entity = self._aliases.get((label, key))
+        if entity is not None:
+            return {'entity_id': entity_id(entity), 'method': 'key', 'similarity': 1.0}
+
+        embedding = self.embedder.embed(key)
+        match, similarity = self._nearest(embedding, label, key)
+        if match is not None:
+            if register and key not in self._entities[match]['aliases']:
+                self._register(match, label, key, text)
+            return {'entity_id': entity_id(match), 'method': 'vector', 'similarity': round(similarity, 4)}
+
+        if not register:
+            return {'entity_id': None, 'method': None, 'similarity': None}
+        if len(self._entities) >= settings.ENTITY_RESOLUTION_MAX_ENTITIES:
+            logger.warning("Index de résolution plein (ENTITY_RESOLUTION_MAX_ENTITIES): entité non enregistrée")
+            return {'entity_id': None, 'method': None, 'similarity': None}
+        self._register(-1, label, key, text)
+        # Rattachement effectif après lecture (une entité créée en parallèle par un autre processus l'emporte)
+        return {'entity_id': entity_id(self._aliases[(label, key)]), 'method': 'new', 'similarity': None}
+
+    def _nearest(self, embedding: np.ndarray, label: str, key: str) -> Tuple[Optional[int], float]:
+        """Entité de même type la plus proche d'un embedding, au-dessus du seuil et dont les mots concordent"""
+        threshold = settings.ENTITY_RESOLUTION_LABEL_THRESHOLDS.get(label, settings.ENTITY_RESOLUTION_THRESHOLD)
+        positions, similarities = self.index.search(embedding, settings.ENTITY_RESOLUTION_MAX_CANDIDATES)
+        for position, similarity in zip(positions.tolist(), similarities.tolist()):
+            if similarity < threshold:
+                break
+            entity = self._entities[self._index_entities[position]]
+            if entity['label'] == label and tokens_agree(key, entity['key'], label):
+                return self._index_entities[position], similarity
+        return None, 0.0
+
+    def _register(self, entity: int, label: str, key: str, name: str):
+        """Enregistrer une entité ou une variante (dans le fichier partagé s'il est configuré)"""
+        created_at = time.time()
+        if self.path is None:
+            self._append([(entity, label, key, name, created_at)])
+            return
+
+        encoded_key, encoded_name = key.encode(), name.encode()
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['entity'] = entity
+        header['label'] = label.encode()[:8]
+        header['created_at'] = created_at
+        header['key_length'] = len(encoded_key)
+        header['name_length'] = len(encoded_name)
+
+        # Un seul write en ajout par enregistrement: atomique entre processus
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            os.write(fd, header.tobytes() + encoded_key + encoded_name)
+        finally:
+            os.close(fd)
+        self._sync()
+
+    def _sync(self):
+        """Intégrer les enregistrements ajoutés au fichier depuis la dernière lecture"""
+        if self.path is None or self.index is None or not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        if size <= self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+
+        records = []
+        position = 0
+        while position + HEADER_DTYPE.itemsize <= len(data):
+            header = np.frombuffer(data, dtype=HEADER_DTYPE, count=1, offset=position)[0]
+            key_start = position + HEADER_DTYPE.itemsize
+            name_start = key_start + int(header['key_length'])
+            end = name_start + int(header['name_length'])
+            # Enregistrement en cours d'écriture: relu à la prochaine synchronisation
+            if end > len(data):
+                break
+            records.append((
+                int(header['entity']),
+                header['label'].decode(),
+                data[key_start:name_start].decode(),
+                data[name_start:end].decode(),
+                float(header['created_at']),
+            ))
+            position = end
+        self._offset += position
+        self._append(records)
+
+    def _append(self, records: List[Tuple[int, str, str, str, float]]):
+        """Intégrer des enregistrements (entité, type, clé, forme de surface, date), dans l'ordre du fichier"""
+        for entity, label, key, name, created_at in records:
+            position = self._records
+            self._records += 1
+
+            if entity >= 0:
+                # Variante rattachée par similarité: conservée pour information, ni indexée
+                # ni utilisée pour les rattachements suivants
+                aliases = self._entities.get(entity, {}).get('aliases')
+                if aliases is not None and key not in aliases:
+                    aliases.append(key)
+                continue
+
+            # Clé déjà rattachée (entité créée en parallèle par un autre processus): la première l'emporte
+            if (label, key) in self._aliases:
+                continue
+            entity = position
+            self._entities[entity] = {
+                'label': label,
+                'key': key,
+                'name': name,
+                'created_at': created_at,
+                'aliases': [key],
+            }
+            self._aliases[(label, key)] = entity
+            self.index.add(self.embedder.embed(key))
+            self._index_entities.append(entity)
+
+
+# Instance globale de la résolution d'entités
+entity_resolution_service = EntityResolutionService(settings.ENTITY_RESOLUTION_INDEX_PATH)
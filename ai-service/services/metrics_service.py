@@ -0,0 +1,213 @@
+import contextvars
+import logging
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from prometheus_client import CollectorRegistry, Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from prometheus_client.core import GaugeMetricFamily
+
+from config import settings
+from services.profiling_service import record_stages
+
+logger = logging.getLogger(__name__)
+
+# Traitement en cours dans le contexte courant (requête ou thread d'exécution)
+_current_track: contextvars.ContextVar = contextvars.ContextVar('metrics_track', default=None)
+
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+DIMENSION_BUCKETS = (256, 512, 768, 1024, 1536, 2048, 3072, 4096, 6144, 8192)
+
+
+class StageTrack:
+    """Mesures d'un traitement: durées par étape, taille et dimensions des entrées"""
+
+    def __init__(self, engine: str, document_type: str):
+        self.engine = engine
+        self.document_type = document_type
+        self.stages: List[Tuple[str, float]] = []
+        self.bytes_processed = 0
+        self.image_size: Optional[Tuple[int, int]] = None
+        self.failed_stage: Optional[str] = None
+        self.started = time.perf_counter()
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """
+        Mesurer la durée d'une étape du traitement
+
+        Args:
+            name: Nom de l'étape (decode, detection, recognition...)
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            if self.failed_stage is None:
+                self.failed_stage = name
+            raise
+        finally:
+            self.stages.append((name, time.perf_counter() - started))
+
+    def add(self, name: str, seconds: float):
+        """Ajouter une durée mesurée par ailleurs (ex: chronométrage interne de PaddleOCR)"""
+        self.stages.append((name, seconds))
+
+    def record_bytes(self, size: int):
+        """Enregistrer le nombre d'octets traités"""
+        self.bytes_processed += size
+
+    def record_image(self, image):
+        """Enregistrer les dimensions d'une image (numpy array)"""
+        self.image_size = (int(image.shape[1]), int(image.shape[0]))
+
+
+class MetricsService:
+    """Instrumentation des moteurs au format Prometheus"""
+
+    def __init__(self):
+        """Initialiser le registre et les métriques"""
+        self.registry = CollectorRegistry()
+        self.stage_duration = Histogram(
+            'regtech_ai_stage_duration_seconds',
+            "Durée de chaque étape des traitements IA",
+            ['engine', 'stage', 'document_type'],
+            buckets=STAGE_BUCKETS,
+            registry=self.registry,
+        )
+        self.bytes_processed = Counter(
+            'regtech_ai_bytes_processed_total',
+            "Octets de documents traités",
+            ['engine', 'document_type'],
+            registry=self.registry,
+        )
+        self.image_width = Histogram(
+            'regtech_ai_image_width_pixels',
+            "Largeur des images traitées",
+            ['engine'],
+            buckets=DIMENSION_BUCKETS,
+            registry=self.registry,
+        )
+        self.image_height = Histogram(
+            'regtech_ai_image_height_pixels',
+            "Hauteur des images traitées",
+            ['engine'],
+            buckets=DIMENSION_BUCKETS,
+            registry=self.registry,
+        )
+        self.cache_events = Counter(
+            'regtech_ai_cache_events_total',
+            "Accès aux caches (hit ou miss)",
+            ['cache', 'result'],
+            registry=self.registry,
+        )
+        self.errors = Counter(
+            'regtech_ai_errors_total',
+            "Erreurs par moteur, étape et type de document",
+            ['engine', 'stage', 'document_type'],
+            registry=self.registry,
+        )
+
+    @contextmanager
+    def track(self, engine: str, document_type: str = 'unknown') -> Iterator[StageTrack]:
+        """
+        Suivre un traitement d'un moteur
+
+        Les mesures sont publiées à la fin du traitement, avec le type de document
+        connu à ce moment (il peut être détecté en cours de traitement). Les appels
+        imbriqués sur le même moteur partagent le même suivi.
+
+        Args:
+            engine: Nom du moteur
+            document_type: Type de document, s'il est déjà connu
+        """
+        current = _current_track.get()
+        if current is not None and current.engine == engine:
+            yield current
+            return
+
+        track = StageTrack(engine, document_type)
+        token = _current_track.set(track)
+        try:
+            yield track
+        except Exception:
+            self.errors.labels(engine, track.failed_stage or 'unknown', track.document_type).inc()
+            raise
+        finally:
+            _current_track.reset(token)
+            track.add('total', time.perf_counter() - track.started)
+            self._publish(track)
+            record_stages(track.engine, track.stages)
+
+    def record_error(self, engine: str, stage: str):
+        """
+        Compter une erreur absorbée par un moteur (vérification en échec par exemple)
+
+        Args:
+            engine: Nom du moteur
+            stage: Étape en erreur
+        """
+        current = _current_track.get()
+        document_type = current.document_type if current is not None else 'unknown'
+        self.errors.labels(engine, stage, document_type).inc()
+
+    def record_cache(self, cache: str, hit: bool):
+        """
+        Compter un accès à un cache
+
+        Args:
+            cache: Nom du cache
+            hit: True si la valeur était en cache
+        """
+        self.cache_events.labels(cache, 'hit' if hit else 'miss').inc()
+
+    def register_engine_stats(self, snapshot: Callable[[], Dict[str, Dict]]):
+        """
+        Exposer l'état des moteurs (file d'attente, traitements en cours) à chaque collecte
+
+        Args:
+            snapshot: Fonction retournant l'état de chaque moteur
+        """
+        self.registry.register(_EngineStatsCollector(snapshot))
+
+    def export(self) -> Tuple[bytes, str]:
+        """Générer l'exposition texte Prometheus et son type de contenu"""
+        return generate_latest(self.registry), CONTENT_TYPE_LATEST
+
+    def _publish(self, track: StageTrack):
+        """Publier les mesures d'un traitement terminé"""
+        if not settings.METRICS_ENABLED:
+            return
+
+        for stage, seconds in track.stages:
+            self.stage_duration.labels(track.engine, stage, track.document_type).observe(seconds)
+        if track.bytes_processed:
+            self.bytes_processed.labels(track.engine, track.document_type).inc(track.bytes_processed)
+        if track.image_size is not None:
+            self.image_width.labels(track.engine).observe(track.image_size[0])
+            self.image_height.labels(track.engine).observe(track.image_size[1])
+
+
+class _EngineStatsCollector:
+    """Collecteur calculé uniquement au moment de la collecte (coût nul sans scrape)"""
+
+    def __init__(self, snapshot: Callable[[], Dict[str, Dict]]):
+        self.snapshot = snapshot
+
+    def collect(self):
+        ready = GaugeMetricFamily('regtech_ai_engine_ready', "Moteur chargé et préchauffé", labels=['engine'])
+        in_flight = GaugeMetricFamily('regtech_ai_engine_in_flight', "Traitements en cours", labels=['engine'])
+        queued = GaugeMetricFamily('regtech_ai_engine_queue_depth', "Requêtes en attente", labels=['engine'])
+
+        for engine, stats in self.snapshot().items():
+            ready.add_metric([engine], 1.0 if stats.get('status') == 'ready' else 0.0)
+            in_flight.add_metric([engine], stats.get('in_flight', 0))
+            queued.add_metric([engine], stats.get('queue_depth', 0))
+
+        yield ready
+        yield in_flight
+        yield queued
+
+
+# Instance globale du service de métriques
+metrics_service = MetricsService()
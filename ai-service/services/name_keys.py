@@ -0,0 +1,151 @@
+import re
+import unicodedata
+from typing import Dict, List, Tuple
+
+# Translittération du cyrillique (russe, ukrainien, serbe) en latin, proche de BGN/PCGN
+CYRILLIC = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'g', 'д': 'd', 'е': 'e', 'ё': 'e', 'ж': 'zh', 'з': 'z',
+    'и': 'i', 'й': 'y', 'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh',
+    'щ': 'shch', 'ъ': '', 'ы': 'y', 'ь': '', 'э': 'e', 'ю': 'yu', 'я': 'ya', 'і': 'i',
+    'ї': 'yi', 'є': 'ye', 'ґ': 'g', 'ў': 'u', 'ј': 'j', 'љ': 'lj', 'њ': 'nj', 'ћ': 'c',
+    'ђ': 'dj', 'џ': 'dz',
+}
+
+# Translittération de l'arabe (consonnes; les voyelles brèves ne sont pas écrites)
+ARABIC = {
+    'ا': 'a', 'أ': 'a', 'إ': 'i', 'آ': 'a', 'ٱ': 'a', 'ب': 'b', 'ت': 't', 'ث': 'th', 'ج': 'j',
+    'ح': 'h', 'خ': 'kh', 'د': 'd', 'ذ': 'dh', 'ر': 'r', 'ز': 'z', 'س': 's', 'ش': 'sh',
+    'ص': 's', 'ض': 'd', 'ط': 't', 'ظ': 'z', 'ع': '', 'غ': 'gh', 'ف': 'f', 'ق': 'q',
+    'ك': 'k', 'ل': 'l', 'م': 'm', 'ن': 'n', 'ه': 'h', 'ة': 'a', 'ى': 'a', 'ء': '',
+    'ئ': '', 'ؤ': '', 'پ': 'p', 'چ': 'ch', 'ژ': 'zh', 'گ': 'g', 'ک': 'k', 'ی': 'i',
+}
+# Semi-voyelles: consonnes en début de mot (Walid, Yasmina), voyelles ailleurs (Youssef, Karim)
+ARABIC_SEMIVOWELS = {'و': ('w', 'u'), 'ي': ('y', 'i')}
+
+# Lettres latines sans décomposition Unicode
+LATIN_LIGATURES = {'ß': 'ss', 'æ': 'ae', 'œ': 'oe', 'ø': 'o', 'ł': 'l', 'đ': 'd', 'ð': 'd', 'þ': 'th', 'ı': 'i'}
+
+# Particules et titres ignorés pour la comparaison des noms
+NAME_PARTICLES = {
+    'al', 'el', 'ul', 'bin', 'ben', 'ibn', 'bint', 'de', 'du', 'des', 'da', 'di', 'del', 'van', 'von',
+    'der', 'den', 'la', 'le', 'mr', 'mrs', 'ms', 'm', 'mme', 'mlle', 'dr', 'sir',
+}
+
+# Règles phonétiques appliquées dans l'ordre (graphies des translittérations)
+_PHONETIC_RULES = [
+    (re.compile(r'x'), 'ks'),
+    (re.compile(r'shch|sch|tsch|tch|sh|zh'), 'x'),
+    (re.compile(r'dzh|dj|dz|j'), 'j'),
+    (re.compile(r'kh'), 'h'),
+    (re.compile(r'gh'), 'g'),
+    (re.compile(r'ph|v|w'), 'f'),
+    (re.compile(r'th'), 't'),
+    (re.compile(r'dh'), 'd'),
+    (re.compile(r'ck|qu|q|c(?![eiy])'), 'k'),
+    (re.compile(r'ts|tz|z|c'), 's'),
+]
+_TRANSLITERATION = {**LATIN_LIGATURES, **CYRILLIC, **ARABIC}
+# Article arabe accolé au mot (البغدادي): séparé pour être traité comme la particule "al"
+_ARABIC_ARTICLE = re.compile(r'(?<!\w)ال(?=\w)')
+_CH = re.compile(r'ch')
+_VOWELS_AND_H = re.compile(r'[aeiouyh]')
+_REPEATS = re.compile(r'(.)\1+')
+_TOKENS = re.compile(r'[^\W\d_]+')
+
+
+def transliterate(text: str) -> str:
+    """Translittérer les lettres cyrilliques et arabes d'un texte en latin (minuscules)"""
+    text = _ARABIC_ARTICLE.sub('ال ', text.lower())
+    result = []
+    previous_letter = False
+    for char in text:
+        if char in ARABIC_SEMIVOWELS:
+            consonant, vowel = ARABIC_SEMIVOWELS[char]
+            result.append(vowel if previous_letter else consonant)
+        else:
+            result.append(_TRANSLITERATION.get(char, char))
+        previous_letter = char.isalpha()
+    return ''.join(result)
+
+
+def fold_name(text: str) -> str:
+    """Nom translittéré, en minuscules et sans accents"""
+    decomposed = unicodedata.normalize('NFKD', transliterate(text))
+    return ''.join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def name_tokens(text: str) -> List[str]:
+    """Mots d'un nom translittéré et sans accents, particules et titres retirés"""
+    tokens = _TOKENS.findall(fold_name(text))
+    significant = [token for token in tokens if token not in NAME_PARTICLES]
+    return significant or tokens
+
+
+def phonetic_keys(token: str) -> Tuple[str, ...]:
+    """
+    Clés phonétiques d'un mot translittéré
+
+    Les consonnes de même prononciation selon la translittération sont
+    regroupées (kh/h, ph/v/w/f, ts/z/s, dj/j, sh/sch/zh...), les voyelles et
+    les h supprimés, les répétitions fusionnées: Mohammed, Muhammad et
+    Mukhammad ont la même clé. Comme pour Double Metaphone, une seconde clé
+    couvre l'ambiguïté de "ch" (kh en allemand: Michail / Mikhail).
+    """
+    keys = []
+    for source in (token, _CH.sub('kh', token)):
+        for pattern, replacement in _PHONETIC_RULES:
+            source = pattern.sub(replacement, source)
+        key = _REPEATS.sub(r'\1', _VOWELS_AND_H.sub('', source))
+        if key and key not in keys:
+            keys.append(key)
+    return tuple(keys) or (token,)
+
+
+def name_keys(text: str) -> Dict:
+    """
+    Clés d'un nom, calculées une seule fois par nom
+
+    Returns:
+        tokens: mots comparés; phonetic: clés phonétiques de chaque mot;
+        key: mots triés (correspondance exacte, ordre des mots ignoré)
+    """
+    tokens = name_tokens(text)
+    return {
+        'tokens': tokens,
+        'phonetic': [phonetic_keys(token) for token in tokens],
+        'key': ' '.join(sorted(tokens)),
+    }
+
+
+def jaro_winkler(first: str, second: str) -> float:
+    """Similarité de Jaro-Winkler entre deux mots (1.0 = identiques)"""
+    if first == second:
+        return 1.0
+    if not first or not second:
+        return 0.0
+
+    window = max(max(len(first), len(second)) // 2 - 1, 0)
+    first_matched = [False] * len(first)
+    second_matched = [False] * len(second)
+    matches = 0
+    for index, char in enumerate(first):
+        for other in range(max(0, index - window), min(len(second), index + window + 1)):
+            if not second_matched[other] and second[other] == char:
+                first_matched[index] = second_matched[other] = True
+                matches += 1
+                break
+    if not matches:
+        return 0.0
+
+    first_chars = [char for char, matched in zip(first, first_matched) if matched]
+    second_chars = [char for char, matched in zip(second, second_matched) if matched]
+    transpositions = sum(a != b for a, b in zip(first_chars, second_chars)) / 2
+    jaro = (matches / len(first) + matches / len(second) + (matches - transpositions) / matches) / 3
+
+    prefix = 0
+    for a, b in zip(first[:4], second[:4]):
+        if a != b:
+            break
+        prefix += 1
+    return jaro + prefix * 0.1 * (1 - jaro)
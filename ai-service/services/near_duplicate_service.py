@@ -0,0 +1,329 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from array import array
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from config import settings
+from services.document_image import ImageInput, to_gray
+
+logger = logging.getLogger(__name__)
+
+# Taille du document redressé avant le calcul des empreintes (format ID-1, paysage)
+WARP_SIZE = (512, 320)
+
+# Enregistrement du fichier d'index: empreintes pHash et dHash, date, type de document,
+# identifiant du document chez l'appelant (vide si inconnu)
+RECORD_DTYPE = np.dtype([
+    ('phash', '<u8'),
+    ('dhash', '<u8'),
+    ('submitted_at', '<f8'),
+    ('document_type', 'S16'),
+    ('document_id', 'S48'),
+])
+
+# Nombre de bits à 1 de chaque octet (distance de Hamming vectorisée)
+_POPCOUNT = np.array([bin(value).count('1') for value in range(256)], dtype=np.uint8)
+
+
+def hamming_distances(value: int, hashes: np.ndarray) -> np.ndarray:
+    """Distances de Hamming entre une empreinte 64 bits et un tableau d'empreintes"""
+    xor = np.bitwise_xor(hashes, np.uint64(value))
+    return _POPCOUNT[xor.view(np.uint8)].reshape(-1, 8).sum(axis=1)
+
+
+def _order_corners(corners: np.ndarray) -> np.ndarray:
+    """Ordonner les coins: haut-gauche, haut-droit, bas-droit, bas-gauche"""
+    sums = corners.sum(axis=1)
+    diffs = np.diff(corners, axis=1).ravel()
+    return np.array([
+        corners[np.argmin(sums)],
+        corners[np.argmin(diffs)],
+        corners[np.argmax(sums)],
+        corners[np.argmax(diffs)],
+    ], dtype=np.float32)
+
+
+def document_quad(image: ImageInput, corners: Optional[List] = None) -> np.ndarray:
+    """
+    Redresser le document à partir des coins détectés par detect_document_edges
+
+    Args:
+        image: Image du document
+        corners: Coins du document ([[[x, y]], ...]), None pour l'image entière
+
+    Returns:
+        Document redressé en niveaux de gris
+    """
+    gray = to_gray(image)
+    if not corners or len(corners) != 4:
+        return cv2.resize(gray, WARP_SIZE, interpolation=cv2.INTER_AREA)
+
+    source = _order_corners(np.array(corners, dtype=np.float32).reshape(4, 2))
+    width, height = WARP_SIZE
+    target = np.array([[0, 0], [width - 1, 0], [width - 1, height - 1], [0, height - 1]], dtype=np.float32)
+    return cv2.warpPerspective(gray, cv2.getPerspectiveTransform(source, target), WARP_SIZE)
+
+
+def _bits_to_int(bits: np.ndarray) -> int:
+    """Convertir 64 booléens en entier (bit de poids fort en premier)"""
+    return int.from_bytes(np.packbits(bits.astype(np.uint8)).tobytes(), 'big')
+
+
+def dhash(gray: np.ndarray) -> int:
+    """Empreinte par différence: comparaison des pixels voisins d'une vignette 9x8"""
+    small = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA).astype(np.int16)
+    return _bits_to_int(small[:, 1:] > small[:, :-1])
+
+
+def phash(gray: np.ndarray) -> int:
+    """Empreinte perceptuelle: basses fréquences de la DCT d'une vignette 32x32 comparées à leur médiane"""
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].ravel()
+    # La composante continue (luminosité moyenne) est exclue du calcul de la médiane
+    return _bits_to_int(low > np.median(low[1:]))
+
+
+class HammingIndex:
+    """
+    Index d'empreintes 64 bits avec recherche par rayon de Hamming
+
+    Recherche multi-index: l'empreinte est découpée en 4 blocs de 16 bits. Deux
+    empreintes à distance <= r ont au moins un bloc à distance <= r // 4: seules
+    les entrées dont un bloc est proche sont comparées. Chaque bloc est indexé
+    par un tableau trié (numpy), les ajouts récents sont conservés dans une
+    file parcourue exhaustivement puis fusionnés par lots.
+    """
+
+    CHUNKS = 4
+    CHUNK_BITS = 16
+
+    def __init__(self, merge_threshold: int = 4096):
+        """
+        Initialiser l'index
+
+        Args:
+            merge_threshold: Taille minimale de la file d'ajouts avant fusion
+        """
+        self.merge_threshold = merge_threshold
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._sorted = [np.empty(0, dtype=np.uint16) for _ in range(self.CHUNKS)]
+        self._order = [np.empty(0, dtype=np.int64) for _ in range(self.CHUNKS)]
+        self._pending: List[int] = []
+        self._masks: Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._pending)
+
+    def add(self, values: np.ndarray):
+        """Ajouter des empreintes (positions attribuées dans l'ordre d'ajout)"""
+        self._pending.extend(values.tolist())
+        # Fusion par lots proportionnels à l'index: coût amorti constant par ajout
+        if len(self._pending) >= max(self.merge_threshold, len(self._hashes) // 32):
+            self._merge()
+
+    def search(self, value: int, radius: int) -> List[Tuple[int, int]]:
+        """
+        Rechercher les empreintes à distance de Hamming <= radius
+
+        Args:
+            value: Empreinte recherchée
+            radius: Distance maximale (bits)
+
+        Returns:
+            (position, distance) triés par distance croissante
+        """
+        positions = self._candidates(value, radius)
+        distances = hamming_distances(value, self._hashes[positions])
+        if self._pending:
+            # Ajouts récents non encore indexés: comparaison exhaustive
+            positions = np.concatenate([positions, np.arange(len(self._hashes), len(self), dtype=np.int64)])
+            distances = np.concatenate([distances, hamming_distances(value, np.array(self._pending, dtype=np.uint64))])
+
+        keep = distances <= radius
+        return sorted(zip(positions[keep].tolist(), distances[keep].tolist()), key=lambda match: match[1])
+
+    def _candidates(self, value: int, radius: int) -> np.ndarray:
+        """Positions indexées dont au moins un bloc est à distance <= radius // 4"""
+        if not len(self._hashes):
+            return np.empty(0, dtype=np.int64)
+
+        masks = self._chunk_masks(radius // self.CHUNKS)
+        found = []
+        for chunk in range(self.CHUNKS):
+            target = (value >> (chunk * self.CHUNK_BITS)) & 0xFFFF
+            neighbours = np.bitwise_xor(masks, np.uint16(target))
+            starts = np.searchsorted(self._sorted[chunk], neighbours, side='left')
+            ends = np.searchsorted(self._sorted[chunk], neighbours, side='right')
+            found.extend(self._order[chunk][start:end] for start, end in zip(starts, ends) if end > start)
+        return np.unique(np.concatenate(found)) if found else np.empty(0, dtype=np.int64)
+
+    def _chunk_masks(self, chunk_radius: int) -> np.ndarray:
+        """Masques XOR de tous les blocs de 16 bits à distance <= chunk_radius"""
+        if chunk_radius not in self._masks:
+            masks = [0]
+            for distance in range(1, chunk_radius + 1):
+                for bits in itertools.combinations(range(self.CHUNK_BITS), distance):
+                    masks.append(sum(1 << bit for bit in bits))
+            self._masks[chunk_radius] = np.array(masks, dtype=np.uint16)
+        return self._masks[chunk_radius]
+
+    def _merge(self):
+        """Intégrer la file d'ajouts aux tableaux triés"""
+        self._hashes = np.concatenate([self._hashes, np.array(self._pending, dtype=np.uint64)])
+        self._pending = []
+        for chunk in range(self.CHUNKS):
+            values = ((self._hashes >> np.uint64(chunk * self.CHUNK_BITS)) & np.uint64(0xFFFF)).astype(np.uint16)
+            self._order[chunk] = np.argsort(values, kind='stable')
+            self._sorted[chunk] = values[self._order[chunk]]
+
+
+class NearDuplicateService:
+    """
+    Détection des documents déjà soumis, éventuellement retouchés
+
+    Chaque document vérifié est redressé (coins de detect_document_edges) puis
+    résumé par deux empreintes de 64 bits (pHash indexé, dHash en confirmation).
+    Les empreintes sont conservées en mémoire et, si NEAR_DUPLICATE_INDEX_PATH
+    est défini, ajoutées à un fichier partagé par tous les processus: chaque
+    recherche intègre d'abord les soumissions enregistrées par les autres.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialiser le service
+
+        Args:
+            path: Fichier d'index (None = mémoire uniquement)
+        """
+        self.path = path
+        self.index = HammingIndex()
+        # Métadonnées par position (tableaux compacts, ajout en temps constant)
+        self._dhashes = array('Q')
+        self._submitted_at = array('d')
+        self._document_types: List[str] = []
+        self._document_ids: List[Optional[str]] = []
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def check(
+        self,
+        image: ImageInput,
+        corners: Optional[List],
+        document_type: str,
+        register: bool = False,
+        document_id: Optional[str] = None,
+    ) -> Dict:
+        """
+        Rechercher les soumissions antérieures proches d'un document
+
+        Seules les nouvelles soumissions doivent être enregistrées: une
+        re-vérification enregistrée serait signalée comme doublon d'elle-même
+        à la vérification suivante. Les soumissions portant le même
+        document_id ne sont pas signalées, et un document déjà enregistré
+        (mêmes empreintes, même document_id) n'est pas enregistré à nouveau.
+
+        Args:
+            image: Image du document
+            corners: Coins détectés par detect_document_edges (None = image entière)
+            document_type: Type de document
+            register: Enregistrer le document après la recherche (nouvelle soumission)
+            document_id: Identifiant du document chez l'appelant, s'il est connu
+
+        Returns:
+            Empreintes du document et soumissions proches (distance en bits)
+        """
+        gray = document_quad(image, corners)
+        document_phash, document_dhash = phash(gray), dhash(gray)
+        # Identifiant tel qu'il est conservé dans l'enregistrement
+        document_id = document_id.encode()[:48].decode(errors='ignore') or None if document_id else None
+        radius = settings.NEAR_DUPLICATE_RADIUS
+
+        with self._lock:
+            self._sync()
+            matches = []
+            stored = False
+            for position, distance in self.index.search(document_phash, radius):
+                dhash_distance = bin(document_dhash ^ self._dhashes[position]).count('1')
+                if dhash_distance > radius:
+                    continue
+                if document_id is not None and self._document_ids[position] == document_id:
+                    # Le même document soumis à nouveau n'est pas son propre doublon
+                    stored = stored or (distance == 0 and dhash_distance == 0)
+                    continue
+                if document_id is None and distance == 0 and dhash_distance == 0 and self._document_ids[position] is None:
+                    stored = True
+                matches.append({
+                    'submission': position,
+                    'phash_distance': distance,
+                    'dhash_distance': dhash_distance,
+                    'document_type': self._document_types[position],
+                    'document_id': self._document_ids[position],
+                    'submitted_at': datetime.fromtimestamp(self._submitted_at[position], timezone.utc).isoformat(),
+                })
+                if len(matches) >= settings.NEAR_DUPLICATE_MAX_MATCHES:
+                    break
+
+            if register and not stored:
+                self._register(document_phash, document_dhash, document_type, document_id)
+            indexed = len(self.index)
+
+        return {
+            'detected': bool(matches),
+            'phash': f"{document_phash:016x}",
+            'dhash': f"{document_dhash:016x}",
+            'quad_detected': bool(corners),
+            'matches': matches,
+            'indexed_submissions': indexed,
+        }
+
+    def _register(self, document_phash: int, document_dhash: int, document_type: str, document_id: Optional[str]):
+        """Enregistrer une soumission (dans le fichier partagé s'il est configuré)"""
+        record = np.array(
+            [(document_phash, document_dhash, time.time(), document_type.encode()[:16], (document_id or '').encode())],
+            dtype=RECORD_DTYPE,
+        )
+        if self.path is None:
+            self._append(record)
+            return
+
+        # Écriture en ajout d'un enregistrement de taille fixe: atomique entre processus
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            os.write(fd, record.tobytes())
+        finally:
+            os.close(fd)
+        self._sync()
+
+    def _sync(self):
+        """Intégrer les enregistrements ajoutés au fichier depuis la dernière lecture"""
+        if self.path is None or not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        size -= size % RECORD_DTYPE.itemsize
+        if size <= self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            records = np.frombuffer(f.read(size - self._offset), dtype=RECORD_DTYPE)
+        self._offset = size
+        self._append(records)
+
+    def _append(self, records: np.ndarray):
+        """Ajouter des enregistrements à l'index en mémoire"""
+        self.index.add(records['phash'])
+        self._dhashes.extend(records['dhash'].tolist())
+        self._submitted_at.extend(records['submitted_at'].tolist())
+        self._document_types.extend(value.decode(errors='replace') for value in records['document_type'])
+        self._document_ids.extend(value.decode(errors='replace') or None for value in records['document_id'])
+
+
+# Instance globale de l'index des documents déjà soumis
+near_duplicate_service = NearDuplicateService(settings.NEAR_DUPLICATE_INDEX_PATH)
@@ -1,22 +1,56 @@
-import spacy
 from typing import Dict, List, Optional, Tuple
 import logging
 import re
-from datetime import datetime
 
 from config import settings
+from services.entity_resolution_service import entity_resolution_service
+from services.metrics_service import metrics_service
+from services.normalization import value_normalizer
+from services.watchlist_service import watchlist_service
+from services.spacy_model import load_spacy_model, spacy_model_version, parse_text, WARMUP_TEXT
 
 logger = logging.getLogger(__name__)
 
+# Catégories dont les mentions sont rattachées à une entité canonique (type fixe, ou type de la mention)
+RESOLVED_CATEGORIES = {
+    'persons': 'PER',
+    'organizations': 'ORG',
+    'companies': 'ORG',
+    'legal_entities': 'ORG',
+    'transaction_parties': None,
+}
+
+# Catégories dont les noms de personnes sont filtrés par les listes de surveillance
+SCREENED_CATEGORIES = ('persons', 'full_name')
+
+# Catégories dont la valeur est normalisée (type de valeur): les extracteurs placent
+# la valeur brute dans 'normalized', remplacée ensuite en un seul lot par document
+NORMALIZED_FIELDS = {
+    'dates': 'date',
+    'phone_numbers': 'phone',
+    'iban': 'iban',
+    'date_of_birth': 'date',
+    'phone_number': 'phone',
+    'transaction_amounts': 'amount',
+    'transaction_dates': 'date',
+    'bank_accounts': 'iban',
+}
+
 
 class NERService:
     """Service NER pour l'extraction d'entités nommées spécifiques à la conformité"""
 
-    def __init__(self):
-        """Initialiser le service NER avec Spacy"""
+    def __init__(self, nlp=None):
+        """
+        Initialiser le service NER avec Spacy
+
+        Args:
+            nlp: Pipeline Spacy déjà chargé (le modèle partagé est chargé sinon)
+        """
         try:
             # Charger le modèle Spacy français
-            self.nlp = spacy.load(settings.SPACY_MODEL)
+            self.nlp = nlp if nlp is not None else load_spacy_model()
+            self.model_version = spacy_model_version(self.nlp)
 
             # Définir les patterns personnalisés pour les entités spécifiques à la conformité
             self._setup_custom_patterns()
@@ -26,34 +60,45 @@ class NERService:
             logger.error(f"Erreur lors de l'initialisation du service NER: {str(e)}")
             raise
 
-    def extract_entities(self, text: str) -> Dict:
+    def warmup(self):
+        """Effectuer une extraction de préchauffage sur un texte synthétique"""
+        self.extract_entities(WARMUP_TEXT)
+        self.extract_aml_entities(WARMUP_TEXT)
+
+    def extract_entities(self, text: str, register_entities: bool = False) -> Dict:
         """
         Extraire toutes les entités nommées du texte
 
         Args:
             text: Texte à analyser
+            register_entities: Enregistrer les entités inconnues dans l'index de résolution (sinon
+                rattachement aux entités existantes uniquement)
 
         Returns:
             Dictionnaire contenant les entités extraites par catégorie
         """
         try:
-            doc = self.nlp(text)
-
-            entities = {
-                'persons': self._extract_persons(doc),
-                'organizations': self._extract_organizations(doc),
-                'locations': self._extract_locations(doc),
-                'dates': self._extract_dates(doc),
-                'emails': self._extract_emails(text),
-                'phone_numbers': self._extract_phone_numbers(text),
-                'iban': self._extract_iban(text),
-                'bic': self._extract_bic(text),
-                'passport_numbers': self._extract_passport_numbers(text),
-                'id_numbers': self._extract_id_numbers(text),
-                'addresses': self._extract_addresses(doc),
-                'companies': self._extract_companies(doc),
-                'legal_entities': self._extract_legal_entities(doc),
-            }
+            with metrics_service.track('ner') as track:
+                doc = parse_text(self.nlp, text, track)
+
+                entities = self._run_extractors({
+                    'persons': (self._extract_persons, doc),
+                    'organizations': (self._extract_organizations, doc),
+                    'locations': (self._extract_locations, doc),
+                    'dates': (self._extract_dates, doc),
+                    'emails': (self._extract_emails, text),
+                    'phone_numbers': (self._extract_phone_numbers, text),
+                    'iban': (self._extract_iban, text),
+                    'bic': (self._extract_bic, text),
+                    'passport_numbers': (self._extract_passport_numbers, text),
+                    'id_numbers': (self._extract_id_numbers, text),
+                    'addresses': (self._extract_addresses, doc),
+                    'companies': (self._extract_companies, doc),
+                    'legal_entities': (self._extract_legal_entities, doc),
+                }, track)
+                self._normalize_values(entities, track)
+                self._resolve_entities(entities, track, register_entities)
+                self._screen_names(entities, track)
 
             logger.info(f"Extraction d'entités réussie: {sum(len(v) for v in entities.values())} entités trouvées")
             return entities
@@ -73,21 +118,24 @@ class NERService:
             Dictionnaire contenant les entités KYC extraites
         """
         try:
-            doc = self.nlp(text)
-
-            kyc_entities = {
-                'full_name': self._extract_full_name(doc),
-                'date_of_birth': self._extract_date_of_birth(text),
-                'place_of_birth': self._extract_place_of_birth(doc),
-                'nationality': self._extract_nationality(doc),
-                'address': self._extract_address(doc),
-                'phone_number': self._extract_phone_number(text),
-                'email': self._extract_email(text),
-                'id_number': self._extract_id_number(text),
-                'passport_number': self._extract_passport_number(text),
-                'profession': self._extract_profession(doc),
-                'employer': self._extract_employer(doc),
-            }
+            with metrics_service.track('ner') as track:
+                doc = parse_text(self.nlp, text, track)
+
+                kyc_entities = self._run_extractors({
+                    'full_name': (self._extract_full_name, doc),
+                    'date_of_birth': (self._extract_date_of_birth, text),
+                    'place_of_birth': (self._extract_place_of_birth, doc),
+                    'nationality': (self._extract_nationality, doc),
+                    'address': (self._extract_address, doc),
+                    'phone_number': (self._extract_phone_number, text),
+                    'email': (self._extract_email, text),
+                    'id_number': (self._extract_id_number, text),
+                    'passport_number': (self._extract_passport_number, text),
+                    'profession': (self._extract_profession, doc),
+                    'employer': (self._extract_employer, doc),
+                }, track)
+                self._normalize_values(kyc_entities, track)
+                self._screen_names(kyc_entities, track)
 
             logger.info(f"Extraction d'entités KYC réussie")
             return kyc_entities
@@ -96,29 +144,34 @@ class NERService:
             logger.error(f"Erreur lors de l'extraction des entités KYC: {str(e)}")
             raise
 
-    def extract_aml_entities(self, text: str) -> Dict:
+    def extract_aml_entities(self, text: str, register_entities: bool = False) -> Dict:
         """
         Extraire les entités spécifiques à l'AML
 
         Args:
             text: Texte à analyser
+            register_entities: Enregistrer les entités inconnues dans l'index de résolution (sinon
+                rattachement aux entités existantes uniquement)
 
         Returns:
             Dictionnaire contenant les entités AML extraites
         """
         try:
-            doc = self.nlp(text)
-
-            aml_entities = {
-                'transaction_parties': self._extract_transaction_parties(doc),
-                'transaction_amounts': self._extract_transaction_amounts(text),
-                'transaction_dates': self._extract_transaction_dates(text),
-                'bank_accounts': self._extract_bank_accounts(text),
-                'countries': self._extract_countries(doc),
-                'currencies': self._extract_currencies(doc),
-                'sanctions_entities': self._extract_sanctions_entities(doc),
-                'watchlist_entities': self._extract_watchlist_entities(doc),
-            }
+            with metrics_service.track('ner') as track:
+                doc = parse_text(self.nlp, text, track)
+
+                aml_entities = self._run_extractors({
+                    'transaction_parties': (self._extract_transaction_parties, doc),
+                    'transaction_amounts': (self._extract_transaction_amounts, text),
+                    'transaction_dates': (self._extract_transaction_dates, text),
+                    'bank_accounts': (self._extract_bank_accounts, text),
+                    'countries': (self._extract_countries, doc),
+                    'currencies': (self._extract_currencies, doc),
+                    'sanctions_entities': (self._extract_sanctions_entities, doc),
+                    'watchlist_entities': (self._extract_watchlist_entities, doc),
+                }, track)
+                self._normalize_values(aml_entities, track)
+                self._resolve_entities(aml_entities, track, register_entities)
 
             logger.info(f"Extraction d'entités AML réussie")
             return aml_entities
@@ -127,25 +180,110 @@ class NERService:
             logger.error(f"Erreur lors de l'extraction des entités AML: {str(e)}")
             raise
 
+    def _run_extractors(self, extractors: Dict, track) -> Dict:
+        """
+        Exécuter des extracteurs en mesurant la durée de chacun
+
+        Args:
+            extractors: Extracteurs par nom, sous la forme (fonction, argument)
+            track: Suivi des métriques du traitement
+
+        Returns:
+            Résultats par nom d'extracteur
+        """
+        results = {}
+        for name, (extractor, source) in extractors.items():
+            with track.stage(f'extract.{name}'):
+                results[name] = extractor(source)
+        return results
+
+    def _normalize_values(self, results: Dict, track):
+        """
+        Normaliser en lots, par type de valeur, les dates, montants, téléphones et IBAN extraits
+
+        Args:
+            results: Résultats des extracteurs (complétés sur place)
+            track: Suivi des métriques du traitement
+        """
+        items_by_kind: Dict[str, List[Dict]] = {}
+        for category, kind in NORMALIZED_FIELDS.items():
+            found = results.get(category)
+            if isinstance(found, dict):
+                found = [found]
+            items_by_kind.setdefault(kind, []).extend(item for item in found or [] if 'normalized' in item)
+
+        with track.stage('normalize'):
+            for kind, items in items_by_kind.items():
+                if not items:
+                    continue
+                values = value_normalizer.normalize(kind, [item['normalized'] for item in items])
+                for item, fields in zip(items, values):
+                    item.update(fields)
+
+    def _resolve_entities(self, entities: Dict, track, register: bool):
+        """
+        Ajouter aux mentions de personnes et d'organisations l'identifiant de leur entité canonique
+
+        Args:
+            entities: Résultats des extracteurs (complétés sur place)
+            track: Suivi des métriques du traitement
+            register: Enregistrer les entités inconnues
+        """
+        if not settings.ENTITY_RESOLUTION_ENABLED:
+            return
+        mentions = [
+            (label or item['type'], item)
+            for category, label in RESOLVED_CATEGORIES.items()
+            for item in entities.get(category, [])
+        ]
+        if not mentions:
+            return
+
+        with track.stage('entity_resolution'):
+            resolutions = entity_resolution_service.resolve([(item['text'], label) for label, item in mentions], register)
+        for (_, item), resolution in zip(mentions, resolutions):
+            item['entity_id'] = resolution['entity_id']
+            item['entity_similarity'] = resolution['similarity']
+
+    def _screen_names(self, results: Dict, track):
+        """
+        Ajouter aux noms de personnes extraits leurs correspondances dans les listes de surveillance
+
+        Args:
+            results: Résultats des extracteurs (complétés sur place)
+            track: Suivi des métriques du traitement
+        """
+        items = []
+        for category in SCREENED_CATEGORIES:
+            found = results.get(category)
+            items.extend([found] if isinstance(found, dict) else found or [])
+        if not items or watchlist_service.is_empty():
+            return
+
+        with track.stage('watchlist'):
+            matches = watchlist_service.screen([item['text'] for item in items])
+        for item, found in zip(items, matches):
+            item['watchlist_matches'] = found
+
     def _setup_custom_patterns(self):
         """Configurer les patterns personnalisés pour les entités spécifiques"""
         # Patterns pour les numéros de passeport
-        self.passport_pattern = re.compile(r'[A-Z]{2}\d{7}')
+        self.passport_pattern = re.compile(r'\b[A-Z]{2}\d{7}\b')
 
         # Pattern pour les IBAN
-        self.iban_pattern = re.compile(r'[A-Z]{2}\d{2}[A-Z0-9]{11,30}')
+        self.iban_pattern = re.compile(r'\b[A-Z]{2}\d{2}[A-Z0-9]{11,30}\b')
 
         # Pattern pour les BIC
-        self.bic_pattern = re.compile(r'[A-Z]{6}[A-Z0-9]{2}([A-Z0-9]{3})?')
+        self.bic_pattern = re.compile(r'\b[A-Z]{6}[A-Z0-9]{2}([A-Z0-9]{3})?\b')
 
         # Pattern pour les emails
-        self.email_pattern = re.compile(r'[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}')
+        self.email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
 
         # Pattern pour les numéros de téléphone
-        self.phone_pattern = re.compile(r'(?:\+?33|0)[1-9](?:[\s.-]?\d{2}){4}')
+        self.phone_pattern = re.compile(r'\b(?:\+?33|0)[1-9](?:[\s.-]?\d{2}){4}\b')
 
         # Pattern pour les montants
-        self.amount_pattern = re.compile(r'(\d+[.,]\d{2})\s*(?:EUR|€|\$|USD|GBP|£)')
+        self.amount_pattern = re.compile(r'\b(\d{1,3}(?:[ .,\u00a0\u202f]\d{3})+|\d+)(?:[.,]\d{2})?\s*(?:EUR|€|\$|USD|GBP|£)(?!\w)')
 
     def _extract_persons(self, doc) -> List[Dict]:
         """Extraire les personnes"""
@@ -193,7 +331,7 @@ class NERService:
                 'text': ent.text,
                 'start': ent.start_char,
                 'end': ent.end_char,
-                'normalized': self._normalize_date(ent.text),
+                'normalized': ent.text,
                 'confidence': 1.0,
             }
             for ent in doc.ents
@@ -221,7 +359,7 @@ class NERService:
                 'text': match.group(),
                 'start': match.start(),
                 'end': match.end(),
-                'normalized': self._normalize_phone_number(match.group()),
+                'normalized': match.group(),
                 'confidence': 1.0,
             }
             for match in matches
@@ -235,7 +373,7 @@ class NERService:
                 'text': match.group(),
                 'start': match.start(),
                 'end': match.end(),
-                'normalized': self._normalize_iban(match.group()),
+                'normalized': match.group(),
                 'confidence': 1.0,
             }
             for match in matches
@@ -270,7 +408,7 @@ class NERService:
     def _extract_id_numbers(self, text: str) -> List[Dict]:
         """Extraire les numéros d'identité"""
         # Pattern pour les numéros de carte d'identité française
-        id_pattern = re.compile(r'\d{12}')
+        id_pattern = re.compile(r'\b\d{12}\b')
         matches = id_pattern.finditer(text)
         return [
             {
@@ -361,7 +499,7 @@ class NERService:
                     'text': match.group(),
                     'start': match.start(),
                     'end': match.end(),
-                    'normalized': self._normalize_date(match.group(1)),
+                    'normalized': match.group(1),
                     'confidence': 0.9,
                 }
 
@@ -416,7 +554,7 @@ class NERService:
                 'text': match.group(),
                 'start': match.start(),
                 'end': match.end(),
-                'normalized': self._normalize_phone_number(match.group()),
+                'normalized': match.group(),
                 'confidence': 1.0,
             }
         return None
@@ -435,7 +573,7 @@ class NERService:
 
     def _extract_id_number(self, text: str) -> Optional[Dict]:
         """Extraire le numéro d'identité"""
-        id_pattern = re.compile(r'\d{12}')
+        id_pattern = re.compile(r'\b\d{12}\b')
         match = id_pattern.search(text)
         if match:
             return {
@@ -516,7 +654,7 @@ class NERService:
                 'text': match.group(),
                 'start': match.start(),
                 'end': match.end(),
-                'normalized': self._normalize_amount(match.group()),
+                'normalized': match.group(),
                 'confidence': 1.0,
             }
             for match in matches
@@ -526,8 +664,8 @@ class NERService:
         """Extraire les dates de transaction"""
         # Pattern pour les dates de transaction
         date_patterns = [
-            r'(\d{1,2}[/-]\d{1,2}[/-]\d{4})',
-            r'(\d{1,2}\s*(?:janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre)\s*\d{4})',
+            r'\b(\d{1,2}[/-]\d{1,2}[/-]\d{4})\b',
+            r'\b(\d{1,2}\s*(?:janvier|février|mars|avril|mai|juin|juillet|août|septembre|octobre|novembre|décembre)\s*\d{4})\b',
         ]
 
         dates = []
@@ -538,7 +676,7 @@ class NERService:
                     'text': match.group(),
                     'start': match.start(),
                     'end': match.end(),
-                    'normalized': self._normalize_date(match.group()),
+                    'normalized': match.group(),
                     'confidence': 1.0,
                 })
 
@@ -556,7 +694,7 @@ class NERService:
                 'text': match.group(),
                 'start': match.start(),
                 'end': match.end(),
-                'normalized': self._normalize_iban(match.group()),
+                'normalized': match.group(),
                 'confidence': 1.0,
             })
 
@@ -611,47 +749,21 @@ class NERService:
 
     def _extract_watchlist_entities(self, doc) -> List[Dict]:
         """Extraire les entités sur les listes de surveillance"""
-        # Dans une implémentation complète, cela interrogerait des watchlists
-        # Pour l'instant, on retourne une liste vide
-        return []
-
-    def _normalize_date(self, date_str: str) -> Optional[str]:
-        """Normaliser une date"""
-        # Tenter de parser et reformater la date
-        date_formats = [
-            '%d/%m/%Y',
-            '%d-%m-%Y',
-            '%d/%m/%y',
-            '%d-%m-%y',
-        ]
-
-        for fmt in date_formats:
-            try:
-                date = datetime.strptime(date_str, fmt)
-                return date.strftime('%Y-%m-%d')
-            except ValueError:
-                continue
-
-        return None
-
-    def _normalize_phone_number(self, phone_str: str) -> str:
-        """Normaliser un numéro de téléphone"""
-        # Supprimer tous les caractères non numériques sauf le +
-        normalized = re.sub(r'[^\d+]', '', phone_str)
-        return normalized
-
-    def _normalize_iban(self, iban_str: str) -> str:
-        """Normaliser un IBAN"""
-        # Supprimer les espaces et mettre en majuscules
-        normalized = re.sub(r'\s', '', iban_str).upper()
-        return normalized
-
-    def _normalize_amount(self, amount_str: str) -> str:
-        """Normaliser un montant"""
-        # Remplacer la virgule par un point et supprimer les espaces
-        normalized = re.sub(r'[,\s]', '', amount_str)
-        return normalized
+        # Personnes et organisations recherchées par translittération et clés phonétiques
+        mentions = [ent for ent in doc.ents if ent.label_ in ('PER', 'ORG')]
+        if not mentions or watchlist_service.is_empty():
+            return []
 
+        watchlist_entities = []
+        for ent, matches in zip(mentions, watchlist_service.screen([ent.text for ent in mentions])):
+            for match in matches:
+                watchlist_entities.append({
+                    'text': ent.text,
+                    'start': ent.start_char,
+                    'end': ent.end_char,
+                    'type': ent.label_,
+                    **match,
+                    'confidence': match['score'],
+                })
 
-# Instance globale du service NER
-ner_service = NERService()
+        return watchlist_entities
@@ -1,34 +1,55 @@
 import spacy
-from typing import Dict, List, Optional
+import numpy as np
+from typing import Dict, List, Optional, Set
 import logging
 from collections import Counter
-import re
 
 from config import settings
+from services.metrics_service import metrics_service
+from services.risk_lexicon import RISK_LEXICON, RISK_SCORE_MAX, RISK_WEIGHTS
+from services.spacy_model import load_spacy_model, spacy_model_version, parse_text, parse_texts, WARMUP_TEXT
 
 logger = logging.getLogger(__name__)
 
 
+def cosine_similarity_matrix(vectors: np.ndarray) -> np.ndarray:
+    """
+    Similarités cosinus de toutes les paires de vecteurs
+
+    Args:
+        vectors: Vecteurs des documents (une ligne par document)
+
+    Returns:
+        Matrice N x N (0 pour un document sans vecteur, comme Doc.similarity)
+    """
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    normalized = vectors / np.where(norms > 0, norms, 1)
+    return np.clip(normalized @ normalized.T, -1.0, 1.0)
+
+
 class NLPService:
     """Service NLP pour l'analyse de texte et la détection de sentiments"""
 
-    def __init__(self):
-        """Initialiser le service NLP avec Spacy"""
+    def __init__(self, nlp=None):
+        """
+        Initialiser le service NLP avec Spacy
+
+        Args:
+            nlp: Pipeline Spacy déjà chargé (le modèle partagé est chargé sinon)
+        """
         try:
             # Charger le modèle Spacy français
-            self.nlp = spacy.load(settings.SPACY_MODEL)
+            self.nlp = nlp if nlp is not None else load_spacy_model()
+            self.model_version = spacy_model_version(self.nlp)
             logger.info(f"Service NLP initialisé avec le modèle {settings.SPACY_MODEL}")
         except Exception as e:
             logger.error(f"Erreur lors de l'initialisation du service NLP: {str(e)}")
-            logger.info("Téléchargement du modèle Spacy...")
-            try:
-                import subprocess
-                subprocess.run(["python", "-m", "spacy", "download", settings.SPACY_MODEL], check=True)
-                self.nlp = spacy.load(settings.SPACY_MODEL)
-                logger.info(f"Service NLP initialisé avec succès après téléchargement")
-            except Exception as download_error:
-                logger.error(f"Erreur lors du téléchargement du modèle: {str(download_error)}")
-                raise
+            raise
+
+    def warmup(self):
+        """Effectuer une analyse de préchauffage sur un texte synthétique"""
+        self.analyze_text(WARMUP_TEXT)
+        self.extract_risk_indicators(WARMUP_TEXT)
 
     def analyze_text(self, text: str) -> Dict:
         """
@@ -41,16 +62,18 @@ class NLPService:
             Dictionnaire contenant les résultats de l'analyse
         """
         try:
-            doc = self.nlp(text)
-
-            analysis = {
-                'language': self._detect_language(doc),
-                'sentiment': self._analyze_sentiment(doc),
-                'keywords': self._extract_keywords(doc),
-                'entities': self._extract_entities(doc),
-                'phrases': self._extract_phrases(doc),
-                'statistics': self._compute_statistics(doc),
-            }
+            with metrics_service.track('nlp') as track:
+                doc = parse_text(self.nlp, text, track)
+
+                with track.stage('analysis'):
+                    analysis = {
+                        'language': self._detect_language(doc),
+                        'sentiment': self._analyze_sentiment(doc),
+                        'keywords': self._extract_keywords(doc),
+                        'entities': self._extract_entities(doc),
+                        'phrases': self._extract_phrases(doc),
+                        'statistics': self._compute_statistics(doc),
+                    }
 
             logger.info(f"Analyse NLP réussie pour texte de {len(text)} caractères")
             return analysis
@@ -70,18 +93,20 @@ class NLPService:
             Dictionnaire contenant les indicateurs de risque
         """
         try:
-            doc = self.nlp(text)
-
-            risk_indicators = {
-                'suspicious_keywords': self._find_suspicious_keywords(doc),
-                'money_laundering_terms': self._find_money_laundering_terms(doc),
-                'terrorist_finance_terms': self._find_terrorist_finance_terms(doc),
-                'sanctions_terms': self._find_sanctions_terms(doc),
-                'risk_score': 0,
-            }
+            with metrics_service.track('nlp') as track:
+                doc = parse_text(self.nlp, text, track)
 
-            # Calculer le score de risque global
-            risk_indicators['risk_score'] = self._calculate_risk_score(risk_indicators)
+                with track.stage('risk_indicators'):
+                    risk_indicators = {
+                        'suspicious_keywords': self._find_suspicious_keywords(doc),
+                        'money_laundering_terms': self._find_money_laundering_terms(doc),
+                        'terrorist_finance_terms': self._find_terrorist_finance_terms(doc),
+                        'sanctions_terms': self._find_sanctions_terms(doc),
+                        'risk_score': 0,
+                    }
+
+                    # Calculer le score de risque global
+                    risk_indicators['risk_score'] = self._calculate_risk_score(risk_indicators)
 
             logger.info(f"Extraction d'indicateurs de risque réussie, score: {risk_indicators['risk_score']}")
             return risk_indicators
@@ -102,15 +127,18 @@ class NLPService:
             Dictionnaire contenant les résultats de la comparaison
         """
         try:
-            doc1 = self.nlp(text1)
-            doc2 = self.nlp(text2)
-
-            comparison = {
-                'similarity': doc1.similarity(doc2),
-                'common_keywords': self._find_common_keywords(doc1, doc2),
-                'common_entities': self._find_common_entities(doc1, doc2),
-                'differences': self._find_differences(doc1, doc2),
-            }
+            with metrics_service.track('nlp') as track:
+                doc1 = parse_text(self.nlp, text1, track)
+                doc2 = parse_text(self.nlp, text2, track)
+
+                with track.stage('comparison'):
+                    keywords1, keywords2 = self._keyword_set(doc1), self._keyword_set(doc2)
+                    comparison = {
+                        'similarity': doc1.similarity(doc2),
+                        'common_keywords': self._find_common_keywords(keywords1, keywords2),
+                        'common_entities': self._find_common_entities(self._entity_map(doc1), self._entity_map(doc2)),
+                        'differences': self._find_differences(keywords1, keywords2),
+                    }
 
             logger.info(f"Comparaison de documents réussie, similarité: {comparison['similarity']:.2f}")
             return comparison
@@ -119,6 +147,73 @@ class NLPService:
             logger.error(f"Erreur lors de la comparaison des documents: {str(e)}")
             raise
 
+    def similarity_matrix(self, texts: List[str], top_k: Optional[int] = None) -> Dict:
+        """
+        Comparer un ensemble de documents deux à deux
+
+        Chaque texte est analysé une seule fois (nlp.pipe, ou relu depuis le
+        cache des Doc): les vecteurs des
+        documents forment une matrice dont toutes les similarités cosinus sont
+        obtenues par un seul produit matriciel. Les mots-clés communs et les
+        différences avec les plus proches voisins sont calculés à partir des
+        ensembles de lemmes de chaque document, extraits une seule fois.
+
+        Args:
+            texts: Textes à comparer
+            top_k: Voisins retournés par texte (SIMILARITY_MATRIX_TOP_K par défaut)
+
+        Returns:
+            Matrice de similarité et plus proches voisins de chaque texte
+        """
+        try:
+            with metrics_service.track('nlp') as track:
+                docs = parse_texts(self.nlp, texts, track)
+
+                with track.stage('similarity_matrix'):
+                    matrix = cosine_similarity_matrix(np.vstack([doc.vector for doc in docs]))
+
+                with track.stage('neighbours'):
+                    keywords = [self._keyword_set(doc) for doc in docs]
+                    entities = [self._entity_map(doc) for doc in docs]
+                    neighbours = []
+                    for index, candidates in enumerate(self._nearest(matrix, top_k or settings.SIMILARITY_MATRIX_TOP_K)):
+                        neighbours.append({
+                            'index': index,
+                            'neighbours': [
+                                {
+                                    'index': other,
+                                    'similarity': float(matrix[index, other]),
+                                    'common_keywords': self._find_common_keywords(keywords[index], keywords[other]),
+                                    'common_entities': self._find_common_entities(entities[index], entities[other]),
+                                    'differences': self._find_differences(keywords[index], keywords[other]),
+                                }
+                                for other in candidates
+                            ],
+                        })
+
+            logger.info(f"Matrice de similarité calculée pour {len(texts)} documents")
+            return {
+                'documents': len(texts),
+                'matrix': matrix.tolist(),
+                'neighbours': neighbours,
+            }
+
+        except Exception as e:
+            logger.error(f"Erreur lors du calcul de la matrice de similarité: {str(e)}")
+            raise
+
+    def _nearest(self, matrix: np.ndarray, top_k: int) -> List[List[int]]:
+        """Indices des top_k documents les plus similaires à chaque document (hors lui-même)"""
+        count = min(top_k, len(matrix) - 1)
+        if count <= 0:
+            return [[] for _ in range(len(matrix))]
+
+        scores = matrix.copy()
+        np.fill_diagonal(scores, -np.inf)
+        candidates = np.argpartition(-scores, count - 1, axis=1)[:, :count]
+        order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind='stable')
+        return np.take_along_axis(candidates, order, axis=1).tolist()
+
     def _detect_language(self, doc) -> str:
         """Détecter la langue du texte"""
         return doc.lang_
@@ -193,92 +288,59 @@ class NLPService:
             'tokens': len(doc),
             'words': len([token for token in doc if token.is_alpha]),
             'sentences': len(list(doc.sents)),
-            'paragraphs': len([p for p in doc.text.split('
-
-') if p.strip()]),
+            'paragraphs': len([p for p in doc.text.split('\n\n') if p.strip()]),
             'avg_sentence_length': sum(len(sent) for sent in doc.sents) / len(list(doc.sents)) if len(list(doc.sents)) > 0 else 0,
         }
 
     def _find_suspicious_keywords(self, doc) -> List[str]:
         """Trouver les mots-clés suspects"""
-        suspicious_keywords = {
-            'argent', 'cash', 'liquide', 'secret', 'caché', 'offshore',
-            'paradis fiscal', 'évasion', 'fraude', 'blanchiment', 'lavage',
-        }
-
-        return [
-            token.text.lower()
-            for token in doc
-            if token.text.lower() in suspicious_keywords
-        ]
+        return self._find_terms(doc, 'suspicious_keywords')
 
     def _find_money_laundering_terms(self, doc) -> List[str]:
         """Trouver les termes liés au blanchiment d'argent"""
-        ml_terms = {
-            'blanchiment', 'lavage', 'argent', 'cash', 'liquide',
-            'transfert', 'mouvement', 'compte', 'banque',
-        }
-
-        return [
-            token.text.lower()
-            for token in doc
-            if token.text.lower() in ml_terms
-        ]
+        return self._find_terms(doc, 'money_laundering_terms')
 
     def _find_terrorist_finance_terms(self, doc) -> List[str]:
         """Trouver les termes liés au financement du terrorisme"""
-        tf_terms = {
-            'terroriste', 'terrorisme', 'financement', 'financer',
-            'organisation', 'groupe', 'cellule', 'réseau',
-        }
-
-        return [
-            token.text.lower()
-            for token in doc
-            if token.text.lower() in tf_terms
-        ]
+        return self._find_terms(doc, 'terrorist_finance_terms')
 
     def _find_sanctions_terms(self, doc) -> List[str]:
         """Trouver les termes liés aux sanctions"""
-        sanctions_terms = {
-            'sanction', 'embargo', 'liste', 'interdit', 'bloqué',
-            'gel', 'actifs', 'ressources',
-        }
+        return self._find_terms(doc, 'sanctions_terms')
 
+    def _find_terms(self, doc, category: str) -> List[str]:
+        """Trouver les tokens d'un lexique de risque"""
+        terms = RISK_LEXICON[category]
         return [
             token.text.lower()
             for token in doc
-            if token.text.lower() in sanctions_terms
+            if token.text.lower() in terms
         ]
 
     def _calculate_risk_score(self, risk_indicators: Dict) -> float:
         """Calculer le score de risque global"""
-        score = 0
-
-        # Ponderer chaque type d'indicateur
-        score += len(risk_indicators['suspicious_keywords']) * 2
-        score += len(risk_indicators['money_laundering_terms']) * 3
-        score += len(risk_indicators['terrorist_finance_terms']) * 5
-        score += len(risk_indicators['sanctions_terms']) * 4
+        # Pondérer chaque type d'indicateur
+        score = sum(len(risk_indicators[category]) * weight for category, weight in RISK_WEIGHTS.items())
 
         # Normaliser entre 0 et 100
-        max_score = 50  # Score maximum possible
-        normalized_score = min(score / max_score * 100, 100)
+        normalized_score = min(score / RISK_SCORE_MAX * 100, 100)
 
         return round(normalized_score, 2)
 
-    def _find_common_keywords(self, doc1, doc2) -> List[str]:
-        """Trouver les mots-clés communs entre deux documents"""
-        keywords1 = {token.lemma_.lower() for token in doc1 if not token.is_stop and not token.is_punct and token.is_alpha}
-        keywords2 = {token.lemma_.lower() for token in doc2 if not token.is_stop and not token.is_punct and token.is_alpha}
+    def _keyword_set(self, doc) -> Set[str]:
+        """Lemmes des mots significatifs d'un document"""
+        return {token.lemma_.lower() for token in doc if not token.is_stop and not token.is_punct and token.is_alpha}
+
+    def _entity_map(self, doc) -> Dict[str, str]:
+        """Entités d'un document (texte en minuscules -> label)"""
+        return {ent.text.lower(): ent.label_ for ent in doc.ents}
 
+    def _find_common_keywords(self, keywords1: Set[str], keywords2: Set[str]) -> List[str]:
+        """Trouver les mots-clés communs entre deux documents"""
         return list(keywords1 & keywords2)
 
-    def _find_common_entities(self, doc1, doc2) -> List[Dict]:
+    def _find_common_entities(self, entities1: Dict[str, str], entities2: Dict[str, str]) -> List[Dict]:
         """Trouver les entités communes entre deux documents"""
-        entities1 = {ent.text.lower(): ent.label_ for ent in doc1.ents}
-        entities2 = {ent.text.lower(): ent.label_ for ent in doc2.ents}
-
         common = []
         for entity, label in entities1.items():
             if entity in entities2 and entities2[entity] == label:
@@ -289,16 +351,9 @@ class NLPService:
 
         return common
 
-    def _find_differences(self, doc1, doc2) -> Dict:
+    def _find_differences(self, keywords1: Set[str], keywords2: Set[str]) -> Dict:
         """Trouver les différences entre deux documents"""
-        keywords1 = {token.lemma_.lower() for token in doc1 if not token.is_stop and not token.is_punct and token.is_alpha}
-        keywords2 = {token.lemma_.lower() for token in doc2 if not token.is_stop and not token.is_punct and token.is_alpha}
-
         return {
             'unique_in_doc1': list(keywords1 - keywords2),
             'unique_in_doc2': list(keywords2 - keywords1),
         }
-
-
-# Instance globale du service NLP
-nlp_service = NLPService()
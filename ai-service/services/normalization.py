@@ -0,0 +1,196 @@
+import logging
+import re
+import threading
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Mois en toutes lettres (avec et sans accents, abréviations usuelles)
+FRENCH_MONTHS = {
+    'janvier': 1, 'janv': 1, 'février': 2, 'fevrier': 2, 'févr': 2, 'fevr': 2, 'fév': 2, 'fev': 2,
+    'mars': 3, 'avril': 4, 'avr': 4, 'mai': 5, 'juin': 6, 'juillet': 7, 'juil': 7,
+    'août': 8, 'aout': 8, 'septembre': 9, 'sept': 9, 'octobre': 10, 'oct': 10,
+    'novembre': 11, 'nov': 11, 'décembre': 12, 'decembre': 12, 'déc': 12, 'dec': 12,
+}
+
+# Devises reconnues (symbole ou code) -> code ISO 4217
+CURRENCIES = {'€': 'EUR', 'EUR': 'EUR', '$': 'USD', 'USD': 'USD', '£': 'GBP', 'GBP': 'GBP'}
+
+_NUMERIC_DATE = re.compile(r'(\d{1,2})([/.-])(\d{1,2})\2(\d{4}|\d{2})')
+_TEXT_DATE = re.compile(
+    r'(\d{1,2})(?:er)?\s+(' + '|'.join(sorted(FRENCH_MONTHS, key=len, reverse=True)) + r')\.?\s+(\d{4})',
+    re.IGNORECASE,
+)
+_AMOUNT = re.compile(r'(\d[\d\s.,]*?)(?:[.,](\d{2}))?\s*(EUR|USD|GBP|€|\$|£)', re.IGNORECASE)
+_DAYS_IN_MONTH = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _parse_date(value: str) -> Optional[tuple]:
+    """Jour, mois et année d'une date (chiffres ou mois en toutes lettres), sans validation"""
+    match = _NUMERIC_DATE.search(value)
+    if match:
+        day, _, month, year = match.groups()
+        year = int(year)
+        if len(match.group(4)) == 2:
+            # Même pivot que strptime %y: 69-99 -> 1969-1999, 00-68 -> 2000-2068
+            year += 1900 if year >= 69 else 2000
+        return int(day), int(month), year
+
+    match = _TEXT_DATE.search(value)
+    if match:
+        return int(match.group(1)), FRENCH_MONTHS[match.group(2).lower()], int(match.group(3))
+    return None
+
+
+def normalize_dates(values: List[str]) -> List[Dict]:
+    """
+    Normaliser des dates au format ISO (AAAA-MM-JJ)
+
+    Les dates sont analysées puis validées ensemble (jours par mois et années
+    bissextiles calculés sur des tableaux numpy).
+
+    Args:
+        values: Dates brutes ("05/01/2024", "5 janvier 2024", "05-01-24"...)
+
+    Returns:
+        {'normalized': date ISO ou None} pour chaque valeur
+    """
+    parsed = [_parse_date(value) for value in values]
+    found = [index for index, parts in enumerate(parsed) if parts is not None]
+    results = [{'normalized': None} for _ in values]
+    if not found:
+        return results
+
+    days, months, years = np.array([parsed[index] for index in found]).T
+    leap = ((years % 4 == 0) & (years % 100 != 0)) | (years % 400 == 0)
+    valid_month = (months >= 1) & (months <= 12)
+    limits = _DAYS_IN_MONTH[np.where(valid_month, months, 0)] + ((months == 2) & leap)
+    valid = valid_month & (days >= 1) & (days <= limits)
+
+    for index, ok, day, month, year in zip(found, valid.tolist(), days.tolist(), months.tolist(), years.tolist()):
+        if ok:
+            results[index]['normalized'] = f"{year:04d}-{month:02d}-{day:02d}"
+    return results
+
+
+def normalize_amounts(values: List[str]) -> List[Dict]:
+    """
+    Normaliser des montants: valeur décimale et code de devise
+
+    Les séparateurs de milliers (espace, point, virgule) sont retirés; les
+    deux derniers chiffres après une virgule ou un point sont les décimales.
+
+    Args:
+        values: Montants bruts ("1500,00 EUR", "1 500,00 €", "1,500.00 USD"...)
+
+    Returns:
+        {'normalized': "1500.00 EUR", 'amount': 1500.0, 'currency': 'EUR'} pour chaque valeur
+    """
+    integers, decimals, currencies = [], [], []
+    for value in values:
+        match = _AMOUNT.search(value)
+        if match is None:
+            integers.append('')
+            decimals.append('')
+            currencies.append(None)
+            continue
+        integers.append(re.sub(r'\D', '', match.group(1)))
+        decimals.append(match.group(2) or '00')
+        currencies.append(CURRENCIES.get(match.group(3).upper()))
+
+    valid = [bool(integer) for integer in integers]
+    amounts = np.array(
+        [f"{integer}.{decimal}" if ok else 'nan' for integer, decimal, ok in zip(integers, decimals, valid)],
+        dtype=np.float64,
+    )
+
+    results = []
+    for amount, currency, ok in zip(amounts.tolist(), currencies, valid):
+        if not ok:
+            results.append({'normalized': None, 'amount': None, 'currency': None})
+            continue
+        normalized = f"{amount:.2f} {currency}" if currency else f"{amount:.2f}"
+        results.append({'normalized': normalized, 'amount': amount, 'currency': currency})
+    return results
+
+
+def _strip_batch(values: List[str], pattern: str, transform: Callable[[str], str] = str) -> List[Dict]:
+    """Retirer les caractères d'un motif de toutes les valeurs en un seul appel (valeurs jointes)"""
+    joined = re.sub(pattern, '', '\0'.join(values))
+    return [{'normalized': value} for value in transform(joined).split('\0')]
+
+
+def normalize_phone_numbers(values: List[str]) -> List[Dict]:
+    """Normaliser des numéros de téléphone (chiffres et + uniquement)"""
+    return _strip_batch(values, r'[^\d+\0]')
+
+
+def normalize_ibans(values: List[str]) -> List[Dict]:
+    """Normaliser des IBAN (sans espaces, en majuscules)"""
+    return _strip_batch(values, r'\s', str.upper)
+
+
+NORMALIZERS: Dict[str, Callable[[List[str]], List[Dict]]] = {
+    'date': normalize_dates,
+    'amount': normalize_amounts,
+    'phone': normalize_phone_numbers,
+    'iban': normalize_ibans,
+}
+
+
+class ValueNormalizer:
+    """
+    Normalisation par lots des valeurs extraites (dates, montants, téléphones, IBAN)
+
+    Les valeurs d'un document sont normalisées ensemble, par type; seules les
+    valeurs distinctes jamais vues sont traitées (mémoïsation bornée, partagée
+    entre les requêtes: un relevé répète les mêmes dates et montants).
+    """
+
+    def __init__(self, max_entries: int):
+        """
+        Initialiser le normaliseur
+
+        Args:
+            max_entries: Valeurs mémorisées par type (mémoire vidée au-delà)
+        """
+        self.max_entries = max_entries
+        self._memo: Dict[str, Dict[str, Dict]] = {kind: {} for kind in NORMALIZERS}
+        self._lock = threading.Lock()
+
+    def normalize(self, kind: str, values: List[str]) -> List[Dict]:
+        """
+        Normaliser des valeurs d'un même type
+
+        Args:
+            kind: date, amount, phone ou iban
+            values: Valeurs brutes
+
+        Returns:
+            Champs normalisés de chaque valeur (à ne pas modifier: partagés par la mémoïsation)
+        """
+        memo = self._memo[kind]
+        found, missing = {}, []
+        for value in set(values):
+            cached = memo.get(value)
+            if cached is None:
+                missing.append(value)
+            else:
+                found[value] = cached
+
+        if missing:
+            normalized = dict(zip(missing, NORMALIZERS[kind](missing)))
+            found.update(normalized)
+            with self._lock:
+                if len(memo) + len(missing) > self.max_entries:
+                    memo.clear()
+                memo.update(normalized)
+        return [found[value] for value in values]
+
+
+# Instance globale du normaliseur de valeurs
+value_normalizer = ValueNormalizer(settings.NORMALIZATION_CACHE_SIZE)
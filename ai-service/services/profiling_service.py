@@ -0,0 +1,178 @@
+import contextvars
+import cProfile
+import logging
+import os
+import re
+import uuid
+from typing import Any, Callable, Dict, List, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Trace de la requête en cours (définie uniquement si un en-tête de diagnostic est présent)
+_current_trace: contextvars.ContextVar = contextvars.ContextVar('request_trace', default=None)
+
+PROFILE_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def current_trace() -> Optional['RequestTrace']:
+    """Retourner la trace de la requête en cours, s'il y en a une"""
+    return _current_trace.get()
+
+
+class RequestTrace:
+    """Décomposition des temps d'une requête et profilage à la demande"""
+
+    def __init__(self, timings: bool = False, profile: bool = False):
+        """
+        Initialiser la trace
+
+        Args:
+            timings: Collecter la durée de chaque étape
+            profile: Profiler (cProfile) chaque appel de moteur
+        """
+        self.timings_enabled = timings
+        self.profile_enabled = profile
+        self.timings: List[Dict] = []
+        self.profile_ids: List[str] = []
+
+    def record(self, engine: str, stage: str, seconds: float):
+        """
+        Enregistrer la durée d'une étape
+
+        Args:
+            engine: Nom du moteur
+            stage: Nom de l'étape
+            seconds: Durée en secondes
+        """
+        if self.timings_enabled:
+            self.timings.append({
+                'engine': engine,
+                'stage': stage,
+                'duration_ms': round(seconds * 1000, 3),
+            })
+
+    def run(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        Exécuter un appel de moteur avec la trace active (dans le thread d'exécution)
+
+        Args:
+            func: Fonction à exécuter
+            *args: Arguments positionnels
+            **kwargs: Arguments nommés
+
+        Returns:
+            Résultat de la fonction
+        """
+        token = _current_trace.set(self)
+        try:
+            if not self.profile_enabled:
+                return func(*args, **kwargs)
+
+            # cProfile ne suit que le thread courant: il est activé ici, dans le thread du moteur
+            profiler = cProfile.Profile()
+            try:
+                return profiler.runcall(func, *args, **kwargs)
+            finally:
+                self.profile_ids.append(profile_store.save(profiler))
+        finally:
+            _current_trace.reset(token)
+
+    def report(self) -> Dict:
+        """Retourner les informations de diagnostic à ajouter à la réponse"""
+        report = {}
+        if self.timings_enabled:
+            report['timings'] = self.timings
+        if self.profile_enabled:
+            report['profiles'] = [
+                {
+                    'profile_id': profile_id,
+                    'url': f"{settings.API_PREFIX}/admin/profiles/{profile_id}",
+                }
+                for profile_id in self.profile_ids
+            ]
+        return report
+
+
+class ProfileStore:
+    """Stockage local et borné des profils capturés"""
+
+    def __init__(self, directory: str, max_profiles: int):
+        """
+        Initialiser le stockage
+
+        Args:
+            directory: Répertoire des fichiers .prof
+            max_profiles: Nombre maximal de profils conservés
+        """
+        self.directory = directory
+        self.max_profiles = max_profiles
+
+    def save(self, profiler: cProfile.Profile) -> str:
+        """
+        Enregistrer un profil (format pstats)
+
+        Args:
+            profiler: Profileur arrêté
+
+        Returns:
+            Identifiant du profil
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        profile_id = uuid.uuid4().hex
+        profiler.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+        self._prune()
+        logger.info(f"Profil {profile_id} enregistré")
+        return profile_id
+
+    def path(self, profile_id: str) -> Optional[str]:
+        """
+        Retourner le chemin d'un profil
+
+        Args:
+            profile_id: Identifiant du profil
+
+        Returns:
+            Chemin du fichier, ou None s'il n'existe pas
+        """
+        if not PROFILE_ID_PATTERN.match(profile_id):
+            return None
+        path = os.path.join(self.directory, f"{profile_id}.prof")
+        return path if os.path.exists(path) else None
+
+    def _prune(self):
+        """Supprimer les profils les plus anciens au-delà de la limite"""
+        files = [
+            os.path.join(self.directory, name)
+            for name in os.listdir(self.directory)
+            if name.endswith('.prof')
+        ]
+        if len(files) <= self.max_profiles:
+            return
+
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_profiles]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def record_stages(engine: str, stages: List):
+    """
+    Transmettre les durées d'un traitement à la trace de la requête, si elle existe
+
+    Args:
+        engine: Nom du moteur
+        stages: Liste de (étape, durée en secondes)
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        return
+    for stage, seconds in stages:
+        trace.record(engine, stage, seconds)
+
+
+# Instance globale du stockage des profils
+profile_store = ProfileStore(settings.PROFILE_DIR, settings.PROFILE_MAX_FILES)
@@ -0,0 +1,176 @@
+import json
+from dataclasses import dataclass, field
+from typing import Any, FrozenSet, Iterable, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # Repli sur le module json standard (plus lent)
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+MEDIA_TYPE_JSON = 'application/json'
+MEDIA_TYPE_MSGPACK = 'application/msgpack'
+# Types acceptés dans l'en-tête Accept pour une réponse MessagePack
+MSGPACK_MEDIA_TYPES = ('application/msgpack', 'application/x-msgpack')
+
+RESPONSE_MODES = ('full', 'compact')
+# Champs omis par défaut en mode compact: le texte complet se reconstruit avec
+# ' '.join(line['text'] for line in lines), le type de ligne avec le texte
+COMPACT_EXCLUDED_FIELDS = ('full_text', 'lines.type')
+# Précision des nombres décimaux en mode compact (confiances, scores)
+COMPACT_FLOAT_DIGITS = 4
+
+
+def msgpack_available() -> bool:
+    """Vérifier si l'encodage MessagePack est disponible"""
+    return msgpack is not None
+
+
+def parse_field_paths(value: Iterable[str]) -> FrozenSet[Tuple[str, ...]]:
+    """
+    Convertir des chemins de champs ('lines.type') en tuples de clés
+
+    Args:
+        value: Chemins séparés par des points
+
+    Returns:
+        Chemins sous forme de tuples
+    """
+    return frozenset(tuple(path.strip().split('.')) for path in value if path.strip())
+
+
+@dataclass
+class ResponseOptions:
+    """Format de réponse demandé par le client (mode, champs omis, encodage)"""
+
+    compact: bool = False
+    exclude: FrozenSet[Tuple[str, ...]] = field(default_factory=frozenset)
+    media_type: str = MEDIA_TYPE_JSON
+
+
+def _default(value: Any) -> Any:
+    """Convertir les types non sérialisables nativement (numpy, ensembles)"""
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(f"Type non sérialisable: {type(value).__name__}")
+
+
+def _flat_bbox(bbox: Any) -> Any:
+    """Aplatir une boîte [[x, y], ...] en tableau d'entiers [x1, y1, x2, y2, ...]"""
+    if isinstance(bbox, np.ndarray):
+        return np.rint(bbox).astype(int).ravel().tolist()
+    if isinstance(bbox, (list, tuple)) and bbox and isinstance(bbox[0], (list, tuple, np.ndarray)):
+        return [int(round(float(coordinate))) for point in bbox for coordinate in point]
+    return bbox
+
+
+class _Compactor:
+    """Transformation d'un résultat en représentation compacte"""
+
+    def __init__(self, exclude: FrozenSet[Tuple[str, ...]]):
+        self.exclude = exclude
+        self.depth = max((len(path) for path in exclude), default=0)
+        # Dernière clé des chemins exclus: seuls ces champs nécessitent de comparer le chemin
+        self.names = frozenset(path[-1] for path in exclude)
+
+    def excluded(self, path: Tuple[str, ...]) -> bool:
+        """Un champ est omis si son chemin se termine par un chemin exclu"""
+        if path[-1] not in self.names:
+            return False
+        for size in range(1, min(self.depth, len(path)) + 1):
+            if path[-size:] in self.exclude:
+                return True
+        return False
+
+    def convert(self, value: Any, path: Tuple[str, ...]) -> Any:
+        if isinstance(value, dict):
+            result = {}
+            for key, item in value.items():
+                if item is None:
+                    continue
+                item_path = path + (str(key),)
+                if self.excluded(item_path):
+                    continue
+                if key == 'bbox':
+                    result[key] = _flat_bbox(item)
+                elif isinstance(item, (str, int)):
+                    result[key] = item
+                else:
+                    result[key] = self.convert(item, item_path)
+            return result
+        if isinstance(value, (list, tuple)):
+            # Les listes sont transparentes pour les chemins: lines.type désigne le type de chaque ligne
+            return [self.convert(item, path) for item in value]
+        if isinstance(value, float):
+            return round(value, COMPACT_FLOAT_DIGITS)
+        if isinstance(value, np.floating):
+            return round(float(value), COMPACT_FLOAT_DIGITS)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+
+def _exclude_fields(value: Any, compactor: _Compactor, path: Tuple[str, ...]) -> Any:
+    """Omettre les champs exclus sans autre transformation (mode complet)"""
+    if isinstance(value, dict):
+        return {
+            key: _exclude_fields(item, compactor, path + (str(key),))
+            for key, item in value.items()
+            if not compactor.excluded(path + (str(key),))
+        }
+    if isinstance(value, list):
+        return [_exclude_fields(item, compactor, path) for item in value]
+    return value
+
+
+def format_payload(payload: Any, options: ResponseOptions) -> Any:
+    """
+    Appliquer le mode de réponse à un résultat
+
+    En mode compact, les boîtes englobantes deviennent des tableaux plats
+    d'entiers, les valeurs nulles et les champs redondants sont omis et les
+    décimaux sont arrondis. Dans les deux modes, les champs demandés par le
+    client sont omis.
+
+    Args:
+        payload: Résultat d'un moteur
+        options: Format de réponse demandé
+
+    Returns:
+        Résultat transformé
+    """
+    if options.compact:
+        return _Compactor(options.exclude | parse_field_paths(COMPACT_EXCLUDED_FIELDS)).convert(payload, ())
+    if options.exclude:
+        return _exclude_fields(payload, _Compactor(options.exclude), ())
+    return payload
+
+
+def encode(payload: Any, media_type: str = MEDIA_TYPE_JSON) -> bytes:
+    """
+    Encoder une réponse en JSON (orjson si disponible) ou en MessagePack
+
+    Args:
+        payload: Contenu de la réponse
+        media_type: application/json ou application/msgpack
+
+    Returns:
+        Corps de la réponse
+    """
+    if media_type == MEDIA_TYPE_MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("L'encodage MessagePack nécessite le paquet msgpack")
+        return msgpack.packb(payload, default=_default, use_bin_type=True)
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
@@ -0,0 +1,41 @@
+from typing import Dict
+
+# Lexiques des indicateurs de risque (analyse NLP et scoring des transactions)
+RISK_LEXICON = {
+    'suspicious_keywords': frozenset({
+        'argent', 'cash', 'liquide', 'secret', 'caché', 'offshore',
+        'paradis fiscal', 'évasion', 'fraude', 'blanchiment', 'lavage',
+    }),
+    'money_laundering_terms': frozenset({
+        'blanchiment', 'lavage', 'argent', 'cash', 'liquide',
+        'transfert', 'mouvement', 'compte', 'banque',
+    }),
+    'terrorist_finance_terms': frozenset({
+        'terroriste', 'terrorisme', 'financement', 'financer',
+        'organisation', 'groupe', 'cellule', 'réseau',
+    }),
+    'sanctions_terms': frozenset({
+        'sanction', 'embargo', 'liste', 'interdit', 'bloqué',
+        'gel', 'actifs', 'ressources',
+    }),
+}
+
+# Poids de chaque occurrence dans le score de risque
+RISK_WEIGHTS = {
+    'suspicious_keywords': 2,
+    'money_laundering_terms': 3,
+    'terrorist_finance_terms': 5,
+    'sanctions_terms': 4,
+}
+
+# Score brut correspondant à un risque de 100
+RISK_SCORE_MAX = 50
+
+
+def term_weights() -> Dict[str, int]:
+    """Poids cumulé de chaque terme (un terme peut appartenir à plusieurs lexiques)"""
+    weights = {}
+    for category, terms in RISK_LEXICON.items():
+        for term in terms:
+            weights[term] = weights.get(term, 0) + RISK_WEIGHTS[category]
+    return weights
@@ -0,0 +1,393 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from config import settings
+from services.profiling_service import RequestTrace
+
+logger = logging.getLogger(__name__)
+
+# Classes de priorité: les requêtes interactives (onboarding en cours)
+# passent avant les traitements de masse (re-screening nocturne)
+PRIORITY_INTERACTIVE = 'interactive'
+PRIORITY_BATCH = 'batch'
+PRIORITY_CLASSES = (PRIORITY_INTERACTIVE, PRIORITY_BATCH)
+
+ENGINES = ('ocr', 'nlp', 'ner', 'document_verification')
+
+
+class SchedulerError(Exception):
+    """Erreur de base de l'ordonnanceur"""
+
+
+class EngineSaturatedError(SchedulerError):
+    """Le moteur est saturé: la requête est rejetée sans être mise en file"""
+
+    def __init__(self, engine: str, retry_after: int):
+        super().__init__(f"Moteur {engine} saturé, réessayer dans {retry_after}s")
+        self.engine = engine
+        self.retry_after = retry_after
+
+
+class DeadlineExceededError(SchedulerError):
+    """L'échéance fixée par le client est dépassée: le traitement est abandonné"""
+
+    def __init__(self, engine: str):
+        super().__init__(f"Échéance de la requête dépassée avant traitement par le moteur {engine}")
+        self.engine = engine
+
+
+@dataclass
+class ExecutionContext:
+    """Paramètres d'exécution d'une requête (priorité, échéance et diagnostic)"""
+
+    priority: str = PRIORITY_INTERACTIVE
+    deadline: Optional[float] = None  # Timestamp Unix en secondes
+    trace: Optional[RequestTrace] = None  # Uniquement si un en-tête de diagnostic est présent
+
+    def expired(self) -> bool:
+        """Vérifier si l'échéance de la requête est dépassée"""
+        return self.deadline is not None and time.time() >= self.deadline
+
+
+class EngineScheduler:
+    """Ordonnanceur d'un moteur: concurrence par classe et file équitable pondérée"""
+
+    def __init__(
+        self,
+        engine: str,
+        max_concurrency: int,
+        max_queued: int,
+        class_limits: Dict[str, int],
+        class_weights: Dict[str, int],
+    ):
+        """
+        Initialiser l'ordonnanceur d'un moteur
+
+        Args:
+            engine: Nom du moteur (ocr, nlp, ner, document_verification)
+            max_concurrency: Nombre maximal de traitements simultanés
+            max_queued: Nombre maximal de requêtes en attente avant rejet (toutes classes
+                confondues pour le batch, file interactive seule pour l'interactif)
+            class_limits: Nombre maximal de traitements simultanés par classe
+            class_weights: Poids de chaque classe pour le partage équitable
+        """
+        self.engine = engine
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queued = max(0, max_queued)
+        self.class_limits = {
+            cls: max(1, min(class_limits.get(cls, self.max_concurrency), self.max_concurrency))
+            for cls in PRIORITY_CLASSES
+        }
+        self.class_weights = {cls: max(1, class_weights.get(cls, 1)) for cls in PRIORITY_CLASSES}
+        self._running = {cls: 0 for cls in PRIORITY_CLASSES}
+        self._queues = {cls: deque() for cls in PRIORITY_CLASSES}
+        # Compteurs du round-robin pondéré lissé (smooth weighted round-robin)
+        self._current_weights = {cls: 0 for cls in PRIORITY_CLASSES}
+        # Moyenne mobile exponentielle du temps de traitement (estimation du Retry-After)
+        self._service_time: Optional[float] = None
+        # Fenêtre glissante des latences (attente + traitement) pour les percentiles
+        self._latencies = deque(maxlen=settings.SCHEDULER_LATENCY_WINDOW)
+
+    @property
+    def in_flight(self) -> int:
+        """Nombre de traitements en cours"""
+        return sum(self._running.values())
+
+    @property
+    def queue_depth(self) -> int:
+        """Nombre de requêtes en attente"""
+        return sum(len(queue) for queue in self._queues.values())
+
+    @property
+    def retry_after(self) -> int:
+        """Estimer le délai (en secondes) avant qu'un créneau se libère"""
+        if self._service_time is None:
+            return 1
+        estimate = self._service_time * (self.queue_depth + 1) / self.max_concurrency
+        return min(60, max(1, math.ceil(estimate)))
+
+    async def acquire(self, priority: str, deadline: Optional[float] = None):
+        """
+        Attendre un créneau d'exécution pour une classe de priorité
+
+        Args:
+            priority: Classe de priorité de la requête
+            deadline: Échéance de la requête (timestamp Unix), optionnelle
+
+        Raises:
+            EngineSaturatedError: Si la file d'attente de la classe est pleine
+            DeadlineExceededError: Si l'échéance est dépassée avant l'obtention d'un créneau
+        """
+        if deadline is not None and time.time() >= deadline:
+            raise DeadlineExceededError(self.engine)
+
+        if not self._queues[priority] and self._has_capacity(priority):
+            self._running[priority] += 1
+            return
+
+        # Le batch en attente ne prend jamais la place des requêtes interactives
+        if priority == PRIORITY_INTERACTIVE:
+            queued = len(self._queues[priority])
+        else:
+            queued = self.queue_depth
+        if queued >= self.max_queued:
+            raise EngineSaturatedError(self.engine, self.retry_after)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._queues[priority].append(waiter)
+        try:
+            if deadline is None:
+                await waiter
+            else:
+                # Ne pas occuper la file pour une requête que plus personne n'attend
+                await asyncio.wait_for(waiter, timeout=max(0.0, deadline - time.time()))
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                self.release(priority)
+            else:
+                self._discard(priority, waiter)
+            raise DeadlineExceededError(self.engine)
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Le créneau a été attribué juste avant l'annulation: le rendre
+                self.release(priority)
+            else:
+                self._discard(priority, waiter)
+            raise
+
+    def release(self, priority: str):
+        """
+        Libérer un créneau d'exécution et réveiller la requête suivante
+
+        Args:
+            priority: Classe de priorité de la requête terminée
+        """
+        self._running[priority] -= 1
+        self._dispatch()
+
+    def record(self, elapsed: float, latency: float):
+        """
+        Enregistrer la durée d'un traitement terminé
+
+        Args:
+            elapsed: Durée du traitement en secondes
+            latency: Durée totale (attente en file comprise) en secondes
+        """
+        if self._service_time is None:
+            self._service_time = elapsed
+        else:
+            self._service_time = 0.8 * self._service_time + 0.2 * elapsed
+        self._latencies.append(latency)
+
+    def latency_percentiles(self) -> Dict[str, Optional[float]]:
+        """Calculer les percentiles p50/p95/p99 (en millisecondes) sur la fenêtre glissante"""
+        samples = sorted(self._latencies)
+        if not samples:
+            return {'p50': None, 'p95': None, 'p99': None, 'samples': 0}
+
+        def percentile(p: float) -> float:
+            index = max(0, math.ceil(p * len(samples)) - 1)
+            return round(samples[index] * 1000, 2)
+
+        return {
+            'p50': percentile(0.50),
+            'p95': percentile(0.95),
+            'p99': percentile(0.99),
+            'samples': len(samples),
+        }
+
+    def snapshot(self) -> Dict:
+        """Retourner l'état courant de l'ordonnanceur"""
+        return {
+            'max_concurrency': self.max_concurrency,
+            'max_queued': self.max_queued,
+            'in_flight': self.in_flight,
+            'queue_depth': self.queue_depth,
+            'latency_ms': self.latency_percentiles(),
+            'classes': {
+                cls: {
+                    'limit': self.class_limits[cls],
+                    'weight': self.class_weights[cls],
+                    'in_flight': self._running[cls],
+                    'queued': len(self._queues[cls]),
+                }
+                for cls in PRIORITY_CLASSES
+            },
+        }
+
+    def _has_capacity(self, priority: str) -> bool:
+        """Vérifier si un créneau est disponible pour une classe"""
+        return (
+            self.in_flight < self.max_concurrency
+            and self._running[priority] < self.class_limits[priority]
+        )
+
+    def _discard(self, priority: str, waiter: asyncio.Future):
+        """Retirer une requête abandonnée de la file"""
+        try:
+            self._queues[priority].remove(waiter)
+        except ValueError:
+            pass
+
+    def _dispatch(self):
+        """Attribuer les créneaux libres aux files selon leurs poids"""
+        while self.in_flight < self.max_concurrency:
+            eligible = [
+                cls for cls in PRIORITY_CLASSES
+                if self._queues[cls] and self._running[cls] < self.class_limits[cls]
+            ]
+            if not eligible:
+                return
+
+            priority = self._pick_class(eligible)
+            waiter = self._queues[priority].popleft()
+            if waiter.done():
+                continue
+
+            self._running[priority] += 1
+            waiter.set_result(None)
+
+    def _pick_class(self, eligible: List[str]) -> str:
+        """Choisir la prochaine classe servie (round-robin pondéré lissé)"""
+        if len(eligible) == 1:
+            return eligible[0]
+
+        total_weight = 0
+        for cls in eligible:
+            self._current_weights[cls] += self.class_weights[cls]
+            total_weight += self.class_weights[cls]
+
+        selected = max(eligible, key=lambda cls: self._current_weights[cls])
+        self._current_weights[selected] -= total_weight
+        return selected
+
+
+class SchedulerService:
+    """Ordonnanceur placé devant les moteurs OCR, NLP, NER et de vérification"""
+
+    def __init__(self):
+        """Initialiser les ordonnanceurs de chaque moteur et le pool d'exécution"""
+        self.engines: Dict[str, EngineScheduler] = {}
+        for engine in ENGINES:
+            max_concurrency = settings.SCHEDULER_ENGINE_CONCURRENCY.get(engine, settings.SCHEDULER_MAX_CONCURRENCY)
+            self.engines[engine] = EngineScheduler(
+                engine,
+                max_concurrency=max_concurrency,
+                max_queued=settings.SCHEDULER_ENGINE_MAX_QUEUED.get(engine, settings.SCHEDULER_MAX_QUEUED),
+                class_limits={
+                    PRIORITY_INTERACTIVE: max_concurrency,
+                    PRIORITY_BATCH: settings.SCHEDULER_BATCH_CONCURRENCY,
+                },
+                class_weights={
+                    PRIORITY_INTERACTIVE: settings.SCHEDULER_INTERACTIVE_WEIGHT,
+                    PRIORITY_BATCH: settings.SCHEDULER_BATCH_WEIGHT,
+                },
+            )
+
+        # Les moteurs sont bloquants (PaddleOCR, Spacy, OpenCV): ils sont exécutés
+        # hors de la boucle asyncio, dans un pool dimensionné sur la concurrence totale
+        self.executor = ThreadPoolExecutor(
+            max_workers=sum(scheduler.max_concurrency for scheduler in self.engines.values()),
+            thread_name_prefix='engine',
+        )
+        logger.info("Ordonnanceur des moteurs IA initialisé")
+
+    async def run(
+        self,
+        engine: str,
+        execution: ExecutionContext,
+        func: Callable,
+        *args: Any,
+        **kwargs: Any,
+    ) -> Any:
+        """
+        Exécuter un traitement bloquant sur un moteur en respectant sa priorité
+
+        Args:
+            engine: Nom du moteur sollicité
+            execution: Priorité et échéance de la requête
+            func: Fonction bloquante à exécuter
+            *args: Arguments positionnels de la fonction
+            **kwargs: Arguments nommés de la fonction
+
+        Returns:
+            Résultat de la fonction
+
+        Raises:
+            EngineSaturatedError: Si le moteur ne peut pas accepter la requête
+            DeadlineExceededError: Si l'échéance est dépassée avant le début du traitement
+        """
+        async with self.slot(engine, execution):
+            # Propager le contexte (contextvars) de la requête dans le thread d'exécution
+            context = contextvars.copy_context()
+            call = functools.partial(context.run, _run_before_deadline, engine, execution, func, args, kwargs)
+            return await asyncio.get_running_loop().run_in_executor(self.executor, call)
+
+    @asynccontextmanager
+    async def slot(self, engine: str, execution: ExecutionContext) -> AsyncIterator[None]:
+        """
+        Occuper un créneau d'un moteur pendant un traitement exécuté ailleurs
+
+        Pour les traitements qui ne passent pas par le pool de threads de
+        l'ordonnanceur (pool de processus de la vérification par lot): la
+        priorité, l'admission et la limite de concurrence par classe
+        s'appliquent de la même façon qu'avec run.
+
+        Args:
+            engine: Nom du moteur sollicité
+            execution: Priorité et échéance de la requête
+
+        Raises:
+            EngineSaturatedError: Si le moteur ne peut pas accepter la requête
+            DeadlineExceededError: Si l'échéance est dépassée avant l'obtention d'un créneau
+        """
+        if execution.priority not in PRIORITY_CLASSES:
+            raise ValueError(f"Classe de priorité inconnue: {execution.priority}")
+
+        scheduler = self.engines[engine]
+        admitted = time.perf_counter()
+        try:
+            await scheduler.acquire(execution.priority, execution.deadline)
+        except SchedulerError as e:
+            logger.warning(f"Requête rejetée par l'ordonnanceur: {str(e)}")
+            raise
+
+        try:
+            started = time.perf_counter()
+            if execution.trace is not None:
+                execution.trace.record(engine, 'queue_wait', started - admitted)
+            yield
+            finished = time.perf_counter()
+            scheduler.record(finished - started, finished - admitted)
+        finally:
+            scheduler.release(execution.priority)
+
+    def snapshot(self) -> Dict:
+        """Retourner l'état de tous les ordonnanceurs"""
+        return {engine: scheduler.snapshot() for engine, scheduler in self.engines.items()}
+
+    def shutdown(self):
+        """Arrêter le pool d'exécution"""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _run_before_deadline(engine: str, execution: ExecutionContext, func: Callable, args: tuple, kwargs: dict) -> Any:
+    """Exécuter la fonction seulement si l'échéance n'est pas dépassée au démarrage du thread"""
+    if execution.expired():
+        raise DeadlineExceededError(engine)
+    if execution.trace is not None:
+        return execution.trace.run(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+
+# Instance globale de l'ordonnanceur
+scheduler_service = SchedulerService()
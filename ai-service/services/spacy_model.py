@@ -0,0 +1,135 @@
+import spacy
+import logging
+import subprocess
+import sys
+import threading
+from typing import List
+
+from config import settings
+from services.doc_cache import doc_cache
+
+logger = logging.getLogger(__name__)
+
+# Texte synthétique utilisé pour le préchauffage des pipelines Spacy
+WARMUP_TEXT = (
+    "Jean Dupont, né le 12/03/1980 à Lyon, réside au 10 rue de la Paix à Paris. "
+    "Il a transféré 1500,00 EUR depuis la Société Générale le 05/01/2024 "
+    "vers le compte FR7630006000011234567890189."
+)
+
+_lock = threading.Lock()
+_nlp = None
+
+
+def load_spacy_model():
+    """
+    Charger le modèle Spacy partagé par les services NLP et NER
+
+    Le modèle n'est chargé qu'une seule fois par processus, même si plusieurs
+    moteurs le demandent en parallèle.
+
+    Returns:
+        Pipeline Spacy chargé
+    """
+    global _nlp
+
+    with _lock:
+        if _nlp is not None:
+            return _nlp
+
+        try:
+            _nlp = spacy.load(settings.SPACY_MODEL)
+        except Exception as e:
+            logger.error(f"Erreur lors du chargement du modèle Spacy: {str(e)}")
+            logger.info("Téléchargement du modèle Spacy...")
+            try:
+                subprocess.run([sys.executable, "-m", "spacy", "download", settings.SPACY_MODEL], check=True)
+                _nlp = spacy.load(settings.SPACY_MODEL)
+            except Exception as download_error:
+                logger.error(f"Erreur lors du téléchargement du modèle: {str(download_error)}")
+                raise
+
+        logger.info(f"Modèle Spacy {settings.SPACY_MODEL} chargé")
+        return _nlp
+
+
+def spacy_model_version(nlp) -> str:
+    """
+    Retourner l'identifiant versionné d'un pipeline Spacy
+
+    Args:
+        nlp: Pipeline Spacy
+
+    Returns:
+        Identifiant du modèle (ex: fr_core_news_lg-3.7.0)
+    """
+    meta = nlp.meta
+    return f"{meta.get('lang', '')}_{meta.get('name', '')}-{meta.get('version', 'unknown')}"
+
+
+def parse_text(nlp, text: str, track):
+    """
+    Analyser un texte avec Spacy en mesurant chaque composant du pipeline
+
+    Équivalent à nlp(text), composant par composant. Les textes longs déjà
+    analysés par le même modèle sont relus depuis le cache des Doc.
+
+    Args:
+        nlp: Pipeline Spacy
+        text: Texte à analyser
+        track: Suivi des métriques du traitement
+
+    Returns:
+        Doc Spacy
+    """
+    cached = doc_cache.enabled_for(text)
+    if cached:
+        model_version = spacy_model_version(nlp)
+        with track.stage('spacy.cache_read'):
+            doc = doc_cache.get(nlp, model_version, text)
+        if doc is not None:
+            return doc
+
+    with track.stage('spacy.tokenizer'):
+        doc = nlp.make_doc(text)
+    for name, component in nlp.pipeline:
+        with track.stage(f'spacy.{name}'):
+            doc = component(doc)
+
+    if cached:
+        with track.stage('spacy.cache_write'):
+            doc_cache.put(model_version, text, doc)
+    return doc
+
+
+def parse_texts(nlp, texts: List[str], track) -> List:
+    """
+    Analyser plusieurs textes par lots (nlp.pipe), en relisant ceux qui sont en cache
+
+    Args:
+        nlp: Pipeline Spacy
+        texts: Textes à analyser
+        track: Suivi des métriques du traitement
+
+    Returns:
+        Doc Spacy de chaque texte, dans l'ordre
+    """
+    model_version = spacy_model_version(nlp)
+    cached = [doc_cache.enabled_for(text) for text in texts]
+    docs = [None] * len(texts)
+    with track.stage('spacy.cache_read'):
+        for index, text in enumerate(texts):
+            if cached[index]:
+                docs[index] = doc_cache.get(nlp, model_version, text)
+
+    missing = [index for index, doc in enumerate(docs) if doc is None]
+    with track.stage('spacy.pipe'):
+        parsed = nlp.pipe([texts[index] for index in missing], batch_size=settings.NLP_PIPE_BATCH_SIZE)
+        for index, doc in zip(missing, parsed):
+            docs[index] = doc
+
+    with track.stage('spacy.cache_write'):
+        for index in missing:
+            if cached[index]:
+                doc_cache.put(model_version, texts[index], docs[index])
+    return docs
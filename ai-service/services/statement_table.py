@@ -0,0 +1,394 @@
+import logging
+import re
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import settings
+from services.normalization import CURRENCIES, FRENCH_MONTHS, value_normalizer
+
+logger = logging.getLogger(__name__)
+
+# Mots-clés des en-têtes de colonnes d'un relevé (testés dans cet ordre: "date de valeur" avant "date")
+COLUMN_KEYWORDS = (
+    ('value_date', ('valeur',)),
+    ('date', ('date',)),
+    ('label', ('libellé', 'libelle', 'opération', 'operation', 'désignation', 'designation', 'nature', 'détail')),
+    ('debit', ('débit', 'debit')),
+    ('credit', ('crédit', 'credit')),
+    ('balance', ('solde',)),
+)
+
+# Lignes de solde hors tableau ("Ancien solde", "Nouveau solde au 31/01/2024") et de totaux
+_BALANCE_LINE = re.compile(r'\bsolde\b', re.IGNORECASE)
+_TOTAL_LINE = re.compile(r'\btotaux?\b', re.IGNORECASE)
+
+_DATE_CELL = re.compile(r'^(\d{1,2})[/.-](\d{1,2})(?:[/.-](\d{4}|\d{2}))?$')
+_AMOUNT_CELL = re.compile(
+    r'^([+-]?)\s*(\d{1,3}(?:[ .\u00a0\u202f]\d{3})+|\d+)[.,](\d{2})\s*(€|EUR)?\s*([+-]|CR|DB|DR)?$',
+    re.IGNORECASE,
+)
+# Mois et année du relevé: première date complète ou mois en toutes lettres ("Relevé de janvier 2024")
+_YEAR = re.compile(r'\b\d{1,2}[/.-](\d{1,2})[/.-](\d{4})\b')
+_MONTH_YEAR = re.compile(
+    r'\b(' + '|'.join(sorted(FRENCH_MONTHS, key=len, reverse=True)) + r')\.?\s+(\d{4})\b',
+    re.IGNORECASE,
+)
+
+
+def line_boxes(lines: List[Dict]) -> np.ndarray:
+    """
+    Rectangles englobants des lignes OCR
+
+    Args:
+        lines: Lignes de OCRService.extract_text (bbox: 4 points [x, y])
+
+    Returns:
+        Tableau (n, 4): x0, y0, x1, y1
+    """
+    points = np.array([line['bbox'] for line in lines], dtype=np.float64).reshape(len(lines), -1, 2)
+    return np.concatenate([points.min(axis=1), points.max(axis=1)], axis=1)
+
+
+def cluster_rows(boxes: np.ndarray, gap: float) -> np.ndarray:
+    """
+    Regrouper les lignes OCR en rangées du tableau
+
+    Les centres verticaux sont triés: une nouvelle rangée commence quand l'écart
+    entre deux centres consécutifs dépasse gap fois la hauteur médiane des lignes.
+
+    Args:
+        boxes: Rectangles (n, 4)
+        gap: Écart relatif entre rangées
+
+    Returns:
+        Numéro de rangée de chaque ligne (croissant de haut en bas)
+    """
+    centers = (boxes[:, 1] + boxes[:, 3]) / 2
+    height = max(float(np.median(boxes[:, 3] - boxes[:, 1])), 1.0)
+    order = np.argsort(centers, kind='stable')
+    breaks = np.diff(centers[order]) > gap * height
+    rows = np.empty(len(boxes), dtype=np.int64)
+    rows[order] = np.concatenate([[0], np.cumsum(breaks)])
+    return rows
+
+
+def assign_columns(boxes: np.ndarray, columns: np.ndarray) -> np.ndarray:
+    """
+    Rattacher chaque cellule à la colonne d'en-tête qu'elle recouvre le plus
+
+    Les montants étant alignés à droite et les libellés à gauche, le
+    recouvrement horizontal est plus fiable que la distance entre centres,
+    utilisée seulement pour les cellules qui ne recouvrent aucun en-tête.
+
+    Args:
+        boxes: Rectangles des cellules (n, 4)
+        columns: Étendue horizontale des en-têtes (m, 2): x0, x1
+
+    Returns:
+        Indice de colonne de chaque cellule
+    """
+    overlap = (
+        np.minimum(boxes[:, None, 2], columns[None, :, 1]) - np.maximum(boxes[:, None, 0], columns[None, :, 0])
+    )
+    distance = np.abs(
+        (boxes[:, None, 0] + boxes[:, None, 2]) / 2 - (columns[None, :, 0] + columns[None, :, 1]) / 2
+    )
+    return np.where(overlap.max(axis=1) > 0, overlap.argmax(axis=1), distance.argmin(axis=1))
+
+
+def _column_name(text: str) -> Optional[str]:
+    """Colonne désignée par une cellule d'en-tête"""
+    lower = text.lower()
+    for name, keywords in COLUMN_KEYWORDS:
+        if any(keyword in lower for keyword in keywords):
+            return name
+    return None
+
+
+def parse_amount(text: str) -> Optional[Dict]:
+    """
+    Analyser une cellule de montant ("1 234,56", "-12,00 €", "45,10 CR")
+
+    Returns:
+        {'value': montant positif, 'sign': -1, 1 ou None si non indiqué}, ou None
+    """
+    match = _AMOUNT_CELL.match(text.strip())
+    if match is None:
+        return None
+    prefix, integer, decimals, _, suffix = match.groups()
+    digits = re.sub(r'\D', '', integer)
+    value = float(f"{digits}.{decimals}")
+    suffix = (suffix or '').upper()
+    if prefix == '-' or suffix in ('-', 'DB', 'DR'):
+        sign = -1
+    elif prefix == '+' or suffix in ('+', 'CR'):
+        sign = 1
+    else:
+        sign = None
+    return {'value': value, 'sign': sign}
+
+
+class StatementTableParser:
+    """
+    Reconstruction du tableau des opérations d'un relevé bancaire à partir des lignes OCR
+
+    Les boîtes OCR sont regroupées en rangées (centres verticaux) puis en
+    colonnes (recouvrement avec les en-têtes Date / Libellé / Débit / Crédit /
+    Solde). Le parseur conserve son état d'une page à l'autre: les colonnes
+    détectées sur une page s'appliquent aux suivantes (en-tête non répété),
+    l'année des dates courtes (JJ/MM) et le dernier solde sont reportés.
+    L'année change avec le mois des dates lues (décembre puis janvier: année
+    suivante). Les rangées avec montants mais sans date lisible sont ignorées
+    et comptées dans la synthèse (dropped_rows).
+    Sans en-tête, le sens des montants est déduit du signe ou de l'évolution
+    du solde.
+    """
+
+    def __init__(self, row_gap: Optional[float] = None):
+        """
+        Initialiser le parseur (un par relevé)
+
+        Args:
+            row_gap: Écart relatif entre rangées (STATEMENT_ROW_GAP par défaut)
+        """
+        self.row_gap = row_gap if row_gap is not None else settings.STATEMENT_ROW_GAP
+        self.columns: Optional[np.ndarray] = None
+        self.column_names: List[str] = []
+        self.year: Optional[int] = None
+        # Mois de la dernière date lue (passage à l'année suivante ou précédente)
+        self.month: Optional[int] = None
+        self.currency: Optional[str] = None
+        self.balance: Optional[float] = None
+        self.opening_balance: Optional[float] = None
+        self.closing_balance: Optional[float] = None
+        self.pages = 0
+        self.transactions = 0
+        self.total_debit = 0.0
+        self.total_credit = 0.0
+        self.inconsistent_balances = 0
+        self.dropped_rows = 0
+
+    def parse_page(self, lines: List[Dict]) -> List[Dict]:
+        """
+        Extraire les opérations d'une page
+
+        Args:
+            lines: Lignes de OCRService.extract_text, dans n'importe quel ordre
+
+        Returns:
+            Opérations typées: date, value_date, label, debit, credit, balance,
+            amount (mouvement signé, non signé si le sens est inconnu), page, bbox
+        """
+        self.pages += 1
+        if not lines:
+            return []
+
+        boxes = line_boxes(lines)
+        texts = [line['text'].strip() for line in lines]
+        self._scan_context(texts)
+
+        rows = cluster_rows(boxes, self.row_gap)
+        height = max(float(np.median(boxes[:, 3] - boxes[:, 1])), 1.0)
+        # Lecture rangée par rangée, de gauche à droite
+        order = np.lexsort((boxes[:, 0], rows))
+        starts = np.flatnonzero(np.diff(rows[order], prepend=-1))
+        groups = np.split(order, starts[1:])
+
+        transactions: List[Dict] = []
+        for cells in groups:
+            if self._read_header(cells, boxes, texts):
+                continue
+            row = self._read_row(cells, boxes, texts, lines)
+            if row is None:
+                continue
+            if row.get('continuation'):
+                # Libellé sur plusieurs lignes: rattaché à l'opération juste au-dessus (pas aux pieds de page)
+                previous = transactions[-1] if transactions else None
+                if previous and row['label'] and row['bbox'][1] - previous['bbox'][3] < height:
+                    previous['label'] = f"{previous['label']} {row['label']}".strip()
+                    previous['bbox'][3] = row['bbox'][3]
+                continue
+            transactions.append(self._finish(row))
+        return transactions
+
+    def summary(self) -> Dict:
+        """
+        Synthèse du relevé (après la dernière page)
+
+        Returns:
+            Pages, opérations, totaux, soldes, contrôle de cohérence
+            (ancien solde + crédits - débits = nouveau solde) et rangées
+            ignorées (montants sans date lisible)
+        """
+        balanced = None
+        if self.opening_balance is not None and self.closing_balance is not None:
+            expected = self.opening_balance + self.total_credit - self.total_debit
+            balanced = abs(expected - self.closing_balance) < 0.005
+        return {
+            'pages': self.pages,
+            'transactions': self.transactions,
+            'currency': self.currency,
+            'total_debit': round(self.total_debit, 2),
+            'total_credit': round(self.total_credit, 2),
+            'opening_balance': self.opening_balance,
+            'closing_balance': self.closing_balance,
+            'balanced': balanced,
+            'inconsistent_balances': self.inconsistent_balances,
+            'dropped_rows': self.dropped_rows,
+            'columns_detected': self.columns is not None,
+        }
+
+    def _scan_context(self, texts: List[str]):
+        """Relever le mois et l'année (dates courtes) et la devise du relevé"""
+        for text in texts:
+            if self.year is None:
+                match = _YEAR.search(text)
+                if match and 1 <= int(match.group(1)) <= 12:
+                    self.month, self.year = int(match.group(1)), int(match.group(2))
+                else:
+                    match = _MONTH_YEAR.search(text)
+                    if match:
+                        self.month, self.year = FRENCH_MONTHS[match.group(1).lower()], int(match.group(2))
+            if self.currency is None:
+                for symbol, code in CURRENCIES.items():
+                    if re.search(rf'(?<!\w){re.escape(symbol)}(?!\w)', text):
+                        self.currency = code
+                        break
+
+    def _read_header(self, cells: np.ndarray, boxes: np.ndarray, texts: List[str]) -> bool:
+        """Détecter une rangée d'en-têtes et mémoriser l'étendue des colonnes"""
+        names = [_column_name(texts[cell]) for cell in cells]
+        found = {name for name in names if name is not None}
+        if len(found) < 3 or not found & {'debit', 'credit'}:
+            return False
+
+        keep = [index for index, name in enumerate(names) if name is not None]
+        self.columns = boxes[cells[keep]][:, [0, 2]]
+        self.column_names = [names[index] for index in keep]
+        return True
+
+    def _read_row(self, cells: np.ndarray, boxes: np.ndarray, texts: List[str], lines: List[Dict]) -> Optional[Dict]:
+        """Typer les cellules d'une rangée (None pour les rangées hors tableau)"""
+        row_texts = [texts[cell] for cell in cells]
+        joined = ' '.join(row_texts)
+        if _TOTAL_LINE.search(joined):
+            return None
+
+        if self.columns is not None:
+            names = [self.column_names[index] for index in assign_columns(boxes[cells], self.columns)]
+        else:
+            names = [None] * len(cells)
+
+        dates, labels, amounts = {}, [], []
+        for text, name in zip(row_texts, names):
+            date = self._parse_date(text)
+            if date is not None and name in (None, 'date', 'value_date'):
+                key = name or ('value_date' if 'date' in dates else 'date')
+                if key not in dates:
+                    dates[key] = date
+                    continue
+            amount = parse_amount(text)
+            if amount is not None and name not in ('date', 'value_date', 'label'):
+                amounts.append((name, amount))
+                continue
+            labels.append(text)
+        label = ' '.join(labels)
+
+        box = boxes[cells]
+        bbox = [float(box[:, 0].min()), float(box[:, 1].min()), float(box[:, 2].max()), float(box[:, 3].max())]
+        if _BALANCE_LINE.search(label):
+            if amounts:
+                # Solde hors tableau: ancien solde avant la première opération, nouveau solde ensuite
+                value = amounts[-1][1]
+                balance = value['value'] * (value['sign'] or 1)
+                if self.transactions == 0 and self.opening_balance is None:
+                    self.opening_balance = balance
+                else:
+                    self.closing_balance = balance
+                self.balance = balance
+            return None
+        if 'date' not in dates:
+            if amounts:
+                # Opération probable sans date lisible (ou sans année connue): signalée dans la synthèse
+                self.dropped_rows += 1
+                logger.debug(f"Rangée de relevé sans date ignorée: {joined}")
+                return None
+            return {'continuation': True, 'label': label, 'bbox': bbox}
+        return {
+            'date': dates['date'],
+            'value_date': dates.get('value_date'),
+            'label': label,
+            'amounts': amounts,
+            'confidence': round(min(lines[cell]['confidence'] for cell in cells), 4),
+            'bbox': bbox,
+        }
+
+    def _finish(self, row: Dict) -> Dict:
+        """Répartir les montants d'une opération en débit, crédit et solde"""
+        debit = credit = balance = movement = None
+        unassigned = []
+        for name, amount in row.pop('amounts'):
+            if name == 'debit':
+                debit = amount['value']
+            elif name == 'credit':
+                credit = amount['value']
+            elif name == 'balance':
+                balance = amount['value'] * (amount['sign'] or 1)
+            else:
+                unassigned.append(amount)
+
+        if unassigned:
+            # Sans colonnes: le dernier de plusieurs montants est le solde
+            if len(unassigned) > 1 and balance is None:
+                last = unassigned.pop()
+                balance = last['value'] * (last['sign'] or 1)
+            movement = unassigned[0]
+            sign = movement['sign']
+            if sign is None and balance is not None and self.balance is not None:
+                sign = 1 if balance >= self.balance else -1
+            if sign == -1:
+                debit = movement['value']
+            elif sign == 1:
+                credit = movement['value']
+
+        if debit is not None or credit is not None:
+            amount = (credit or 0.0) - (debit or 0.0)
+            if balance is not None and self.balance is not None and abs(self.balance + amount - balance) >= 0.005:
+                self.inconsistent_balances += 1
+        else:
+            amount = movement['value'] if movement else None
+
+        self.transactions += 1
+        self.total_debit += debit or 0.0
+        self.total_credit += credit or 0.0
+        if balance is not None:
+            self.balance = balance
+        elif self.balance is not None and (debit is not None or credit is not None):
+            self.balance = round(self.balance + amount, 2)
+
+        row.update({'debit': debit, 'credit': credit, 'balance': balance, 'amount': amount, 'page': self.pages})
+        return row
+
+    def _parse_date(self, text: str) -> Optional[str]:
+        """Date ISO d'une cellule (JJ/MM/AAAA, JJ/MM/AA ou JJ/MM avec l'année du relevé)"""
+        match = _DATE_CELL.match(text)
+        if match is None:
+            return None
+        if match.group(3) is None:
+            if self.year is None:
+                return None
+            text = f"{match.group(1)}/{match.group(2)}/{self._year_of(int(match.group(2)))}"
+        normalized = value_normalizer.normalize('date', [text])[0]['normalized']
+        if normalized is not None:
+            self.year, self.month = int(normalized[:4]), int(normalized[5:7])
+        return normalized
+
+    def _year_of(self, month: int) -> int:
+        """Année d'une date courte d'après le mois de la date précédente (relevé à cheval sur deux années)"""
+        if self.month is not None:
+            if self.month - month >= 6:
+                return self.year + 1
+            if month - self.month >= 6:
+                return self.year - 1
+        return self.year
@@ -0,0 +1,74 @@
+import logging
+import threading
+from typing import Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class StorageError(Exception):
+    """Le document n'a pas pu être lu depuis le stockage"""
+
+
+class StorageService:
+    """Lecture des documents stockés par le backend dans MinIO"""
+
+    def __init__(self):
+        """Initialiser le service (le client MinIO est créé au premier accès)"""
+        self._client = None
+        self._lock = threading.Lock()
+
+    def fetch(self, object_name: str, bucket: Optional[str] = None) -> bytes:
+        """
+        Lire le contenu d'un document
+
+        Args:
+            object_name: Nom de l'objet (ex: clients/<id>/documents/<uuid>-passeport.png)
+            bucket: Bucket MinIO (par défaut celui du backend)
+
+        Returns:
+            Contenu du document en bytes
+
+        Raises:
+            StorageError: Si le document est introuvable, trop volumineux ou illisible
+        """
+        bucket = bucket or settings.MINIO_BUCKET
+        client = self._get_client()
+        try:
+            stat = client.stat_object(bucket, object_name)
+            if stat.size > settings.MAX_FILE_SIZE:
+                raise StorageError(f"Document {object_name} trop volumineux ({stat.size} octets)")
+
+            response = client.get_object(bucket, object_name)
+            try:
+                return response.read()
+            finally:
+                response.close()
+                response.release_conn()
+        except StorageError:
+            raise
+        except Exception as e:
+            logger.error(f"Erreur lors de la lecture de {bucket}/{object_name}: {str(e)}")
+            raise StorageError(f"Document {bucket}/{object_name} illisible: {str(e)}")
+
+    def _get_client(self):
+        """Créer le client MinIO (dépendance optionnelle, importée au premier accès)"""
+        with self._lock:
+            if self._client is None:
+                try:
+                    from minio import Minio
+                except ImportError:
+                    raise StorageError("Le paquet minio n'est pas installé")
+
+                self._client = Minio(
+                    f"{settings.MINIO_ENDPOINT}:{settings.MINIO_PORT}",
+                    access_key=settings.MINIO_ACCESS_KEY,
+                    secret_key=settings.MINIO_SECRET_KEY,
+                    secure=settings.MINIO_SECURE,
+                )
+            return self._client
+
+
+# Instance globale du service de stockage
+storage_service = StorageService()
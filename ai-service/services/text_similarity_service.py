@@ -0,0 +1,422 @@
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config import settings
+from services.metrics_service import metrics_service
+
+logger = logging.getLogger(__name__)
+
+# Fonctions de hachage universelles h(x) = (a * x + b) mod p, tronquées à 32 bits
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Multiplicateur FNV-1a: combinaison des lignes d'une bande en une clé 64 bits
+_BAND_PRIME = np.uint64(0x100000001B3)
+
+# Shingles traités par bloc lors du calcul des signatures (mémoire bornée)
+_SIGNATURE_CHUNK = 4096
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize_text(text: str) -> List[str]:
+    """Mots du texte en minuscules, sans accents"""
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return _TOKEN_PATTERN.findall(''.join(char for char in decomposed if not unicodedata.combining(char)))
+
+
+def shingle_hashes(text: str, size: int) -> np.ndarray:
+    """
+    Empreintes 32 bits des shingles (suites de size mots) d'un texte
+
+    Args:
+        text: Texte du document
+        size: Nombre de mots par shingle
+
+    Returns:
+        Empreintes uniques (un texte plus court que size forme un seul shingle)
+    """
+    tokens = normalize_text(text)
+    if not tokens:
+        return np.empty(0, dtype=np.uint64)
+    count = max(1, len(tokens) - size + 1)
+    shingles = {' '.join(tokens[start:start + size]) for start in range(count)}
+    return np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+
+
+class MinHasher:
+    """Signatures MinHash: minimum de chaque permutation sur les shingles du document"""
+
+    def __init__(self, num_perm: int, seed: int = 1):
+        """
+        Initialiser les permutations
+
+        Args:
+            num_perm: Nombre de permutations (taille de la signature)
+            seed: Graine des permutations (identique dans tous les processus)
+        """
+        self.num_perm = num_perm
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, int(MERSENNE_PRIME), num_perm, dtype=np.uint64)
+
+    def signature(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Calculer la signature d'un ensemble de shingles
+
+        Args:
+            hashes: Empreintes des shingles
+
+        Returns:
+            Signature de num_perm entiers 32 bits
+        """
+        signature = np.full(self.num_perm, MAX_HASH, dtype=np.uint64)
+        for start in range(0, len(hashes), _SIGNATURE_CHUNK):
+            chunk = hashes[start:start + _SIGNATURE_CHUNK, np.newaxis]
+            values = ((chunk * self.a + self.b) % MERSENNE_PRIME) & MAX_HASH
+            np.minimum(signature, values.min(axis=0), out=signature)
+        return signature.astype(np.uint32)
+
+
+class LSHIndex:
+    """
+    Index LSH de signatures MinHash
+
+    La signature est découpée en bandes de rows valeurs: deux documents de
+    similarité s partagent au moins une bande avec une probabilité
+    1 - (1 - s^rows)^bands. Chaque bande est indexée par un tableau trié de
+    clés 64 bits (recherche dichotomique); les ajouts récents sont conservés
+    dans des dictionnaires puis fusionnés par lots. Les candidats sont classés
+    par similarité estimée sur la signature complète.
+    """
+
+    def __init__(self, num_perm: int, bands: int, merge_threshold: int = 4096):
+        """
+        Initialiser l'index
+
+        Args:
+            num_perm: Taille des signatures
+            bands: Nombre de bandes (diviseur de num_perm)
+            merge_threshold: Taille minimale des ajouts en attente avant fusion
+        """
+        if num_perm % bands:
+            raise ValueError(f"{num_perm} permutations ne se répartissent pas en {bands} bandes")
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.merge_threshold = merge_threshold
+        # Signatures et clés de bande dans des tableaux à capacité doublée (ajout en temps amorti constant)
+        self._signatures = np.empty((1024, num_perm), dtype=np.uint32)
+        self._band_keys = np.empty((1024, bands), dtype=np.uint64)
+        self._size = 0
+        self._merged = 0
+        self._keys = [np.empty(0, dtype=np.uint64) for _ in range(bands)]
+        self._order = [np.empty(0, dtype=np.int64) for _ in range(bands)]
+        self._pending: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return self._size
+
+    def band_keys(self, signatures: np.ndarray) -> np.ndarray:
+        """Clés de bande de chaque signature (tableau documents x bandes)"""
+        rows = signatures.reshape(len(signatures), self.bands, self.rows).astype(np.uint64)
+        keys = np.zeros(rows.shape[:2], dtype=np.uint64)
+        for row in range(self.rows):
+            keys = (keys ^ rows[:, :, row]) * _BAND_PRIME
+        return keys
+
+    def add(self, signatures: np.ndarray):
+        """Ajouter des signatures (positions attribuées dans l'ordre d'ajout)"""
+        count = len(signatures)
+        if self._size + count > len(self._signatures):
+            capacity = max(2 * len(self._signatures), self._size + count)
+            self._signatures = self._grow(self._signatures, capacity)
+            self._band_keys = self._grow(self._band_keys, capacity)
+        keys = self.band_keys(signatures)
+        self._signatures[self._size:self._size + count] = signatures
+        self._band_keys[self._size:self._size + count] = keys
+
+        start = self._size
+        self._size += count
+
+        # Fusion par lots proportionnels à l'index: coût amorti constant par ajout.
+        # Les lots importants sont fusionnés directement, sans passer par les dictionnaires
+        if count >= self.merge_threshold or self._size - self._merged >= max(self.merge_threshold, self._merged // 32):
+            self._merge()
+            return
+        for position, document_keys in enumerate(keys.tolist(), start):
+            for band, key in enumerate(document_keys):
+                self._pending[band].setdefault(key, []).append(position)
+
+    def search(self, signature: np.ndarray, threshold: float) -> Tuple[List[Tuple[int, float]], int]:
+        """
+        Rechercher les documents de similarité estimée >= threshold
+
+        Args:
+            signature: Signature du document recherché
+            threshold: Similarité de Jaccard estimée minimale
+
+        Returns:
+            (position, similarité) triés par similarité décroissante, nombre de candidats comparés
+        """
+        keys = self.band_keys(signature[np.newaxis])[0]
+        found = []
+        for band, key in enumerate(keys):
+            start = np.searchsorted(self._keys[band], key, side='left')
+            end = np.searchsorted(self._keys[band], key, side='right')
+            if end > start:
+                found.append(self._order[band][start:end])
+            pending = self._pending[band].get(int(key))
+            if pending:
+                found.append(np.array(pending, dtype=np.int64))
+        if not found:
+            return [], 0
+
+        candidates = np.unique(np.concatenate(found))
+        similarities = (self._signatures[candidates] == signature).mean(axis=1)
+        keep = similarities >= threshold
+        ranked = sorted(
+            zip(candidates[keep].tolist(), similarities[keep].tolist()), key=lambda match: -match[1]
+        )
+        return ranked, len(candidates)
+
+    def _grow(self, values: np.ndarray, capacity: int) -> np.ndarray:
+        """Copier un tableau dans un tableau de capacité supérieure"""
+        grown = np.empty((capacity, values.shape[1]), dtype=values.dtype)
+        grown[:self._size] = values[:self._size]
+        return grown
+
+    def _merge(self):
+        """Intégrer les ajouts en attente aux tableaux triés"""
+        added = self._band_keys[self._merged:self._size]
+        positions = np.arange(self._merged, self._size, dtype=np.int64)
+        for band in range(self.bands):
+            order = np.argsort(added[:, band], kind='stable')
+            keys = np.concatenate([self._keys[band], added[order, band]])
+            # Deux séquences déjà triées: le tri stable (timsort) les fusionne en temps linéaire
+            merged = np.argsort(keys, kind='stable')
+            self._keys[band] = keys[merged]
+            self._order[band] = np.concatenate([self._order[band], positions[order]])[merged]
+            self._pending[band] = {}
+        self._merged = self._size
+
+
+class TextSimilarityService:
+    """
+    Similarité des documents d'un corpus (textes KYC et AML)
+
+    Chaque document indexé est découpé en shingles de mots, résumé une seule
+    fois par une signature MinHash puis ajouté à un index LSH: la recherche
+    des quasi-doublons ne compare que les documents partageant une bande de
+    signature, sans reparser le corpus. Si SIMILARITY_INDEX_PATH est défini,
+    les signatures sont ajoutées à un fichier partagé par tous les processus.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialiser le service
+
+        Args:
+            path: Fichier d'index (None = mémoire uniquement)
+        """
+        self.path = path
+        self.shingle_size = settings.SIMILARITY_SHINGLE_SIZE
+        self.hasher = MinHasher(settings.SIMILARITY_NUM_PERM)
+        self.index = LSHIndex(settings.SIMILARITY_NUM_PERM, settings.SIMILARITY_LSH_BANDS)
+        self.record_dtype = np.dtype([
+            ('document_id', 'S64'),
+            ('indexed_at', '<f8'),
+            ('signature', '<u4', (settings.SIMILARITY_NUM_PERM,)),
+        ])
+        self._document_ids: List[str] = []
+        self._indexed_at: List[float] = []
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def signature(self, text: str) -> Tuple[np.ndarray, int]:
+        """
+        Calculer la signature MinHash d'un texte
+
+        Args:
+            text: Texte du document
+
+        Returns:
+            Signature et nombre de shingles
+        """
+        hashes = shingle_hashes(text, self.shingle_size)
+        return self.hasher.signature(hashes), len(hashes)
+
+    def search(self, text: str, threshold: Optional[float] = None, limit: Optional[int] = None) -> Dict:
+        """
+        Rechercher les documents indexés proches d'un texte
+
+        Args:
+            text: Texte du document
+            threshold: Similarité de Jaccard estimée minimale (SIMILARITY_THRESHOLD par défaut)
+            limit: Nombre maximum de documents retournés (SIMILARITY_MAX_MATCHES par défaut)
+
+        Returns:
+            Documents proches, du plus similaire au moins similaire
+        """
+        try:
+            with metrics_service.track('nlp') as track:
+                with track.stage('minhash'):
+                    signature, shingles = self.signature(text)
+
+                with track.stage('lsh_search'):
+                    with self._lock:
+                        self._sync()
+                        matches, candidates = self._matches(signature, shingles, threshold, limit)
+                        indexed = len(self.index)
+
+            return {
+                'shingles': shingles,
+                'matches': matches,
+                'candidates': candidates,
+                'indexed_documents': indexed,
+            }
+
+        except Exception as e:
+            logger.error(f"Erreur lors de la recherche de documents similaires: {str(e)}")
+            raise
+
+    def index_documents(
+        self,
+        documents: List[Tuple[str, str]],
+        threshold: Optional[float] = None,
+        limit: Optional[int] = None,
+    ) -> Dict:
+        """
+        Indexer des documents en signalant leurs quasi-doublons déjà indexés
+
+        Chaque document est comparé à l'index avant d'y être ajouté: les
+        doublons au sein d'un même lot sont donc détectés.
+
+        Args:
+            documents: (identifiant, texte) de chaque document
+            threshold: Similarité de Jaccard estimée minimale
+            limit: Nombre maximum de quasi-doublons par document
+
+        Returns:
+            Quasi-doublons de chaque document et taille de l'index
+        """
+        try:
+            with metrics_service.track('nlp') as track:
+                with track.stage('minhash'):
+                    signatures = [self.signature(text) for _, text in documents]
+
+                results = []
+                with track.stage('lsh_index'):
+                    with self._lock:
+                        self._sync()
+                        for (document_id, _), (signature, shingles) in zip(documents, signatures):
+                            duplicates, _ = self._matches(signature, shingles, threshold, limit)
+                            results.append({
+                                'document_id': document_id,
+                                'shingles': shingles,
+                                'duplicates': duplicates,
+                            })
+                            # Un texte vide n'a pas de shingle: sa signature ne serait comparable à rien
+                            if shingles:
+                                self._register(document_id, signature)
+                        indexed = len(self.index)
+
+            logger.info(f"{len(documents)} documents indexés pour la recherche de similarité")
+            return {'documents': results, 'indexed_documents': indexed}
+
+        except Exception as e:
+            logger.error(f"Erreur lors de l'indexation des documents: {str(e)}")
+            raise
+
+    def status(self) -> Dict:
+        """Retourner la taille et les paramètres de l'index"""
+        with self._lock:
+            self._sync()
+            return {
+                'indexed_documents': len(self.index),
+                'shingle_size': self.shingle_size,
+                'num_perm': self.hasher.num_perm,
+                'bands': self.index.bands,
+                'rows': self.index.rows,
+                'threshold': settings.SIMILARITY_THRESHOLD,
+            }
+
+    def _matches(
+        self,
+        signature: np.ndarray,
+        shingles: int,
+        threshold: Optional[float],
+        limit: Optional[int],
+    ) -> Tuple[List[Dict], int]:
+        """Documents indexés proches d'une signature (un seul résultat par identifiant)"""
+        if not shingles:
+            return [], 0
+        threshold = settings.SIMILARITY_THRESHOLD if threshold is None else threshold
+        limit = limit or settings.SIMILARITY_MAX_MATCHES
+
+        ranked, candidates = self.index.search(signature, threshold)
+        matches, seen = [], set()
+        for position, similarity in ranked:
+            document_id = self._document_ids[position]
+            if document_id in seen:
+                continue
+            seen.add(document_id)
+            matches.append({
+                'document_id': document_id,
+                'similarity': round(similarity, 4),
+                'indexed_at': datetime.fromtimestamp(self._indexed_at[position], timezone.utc).isoformat(),
+            })
+            if len(matches) >= limit:
+                break
+        return matches, candidates
+
+    def _register(self, document_id: str, signature: np.ndarray):
+        """Enregistrer une signature (dans le fichier partagé s'il est configuré)"""
+        record = np.zeros(1, dtype=self.record_dtype)
+        record['document_id'] = document_id.encode()[:64]
+        record['indexed_at'] = time.time()
+        record['signature'] = signature
+        if self.path is None:
+            self._append(record)
+            return
+
+        # Écriture en ajout d'un enregistrement de taille fixe: atomique entre processus
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+        try:
+            os.write(fd, record.tobytes())
+        finally:
+            os.close(fd)
+        self._sync()
+
+    def _sync(self):
+        """Intégrer les enregistrements ajoutés au fichier depuis la dernière lecture"""
+        if self.path is None or not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        size -= size % self.record_dtype.itemsize
+        if size <= self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            records = np.frombuffer(f.read(size - self._offset), dtype=self.record_dtype)
+        self._offset = size
+        self._append(records)
+
+    def _append(self, records: np.ndarray):
+        """Ajouter des enregistrements à l'index en mémoire"""
+        self.index.add(records['signature'])
+        self._document_ids.extend(value.decode(errors='replace') for value in records['document_id'])
+        self._indexed_at.extend(records['indexed_at'].tolist())
+
+
+# Instance globale de l'index de similarité du corpus
+text_similarity_service = TextSimilarityService(settings.SIMILARITY_INDEX_PATH)
@@ -0,0 +1,206 @@
+import logging
+import os
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from config import settings
+
+logger = logging.getLogger(__name__)
+
+# Bibliothèques dont les pools de threads sont limités
+LIBRARIES = ('blas', 'paddle', 'opencv', 'torch')
+
+# Variables lues au chargement des bibliothèques (OpenMP: Paddle, torch; BLAS: numpy, spaCy/thinc)
+THREAD_ENV_VARS = (
+    'OMP_NUM_THREADS',
+    'MKL_NUM_THREADS',
+    'OPENBLAS_NUM_THREADS',
+    'NUMEXPR_NUM_THREADS',
+    'VECLIB_MAXIMUM_THREADS',
+)
+
+
+def available_cores() -> int:
+    """
+    Nombre de coeurs utilisables par le processus
+
+    Tient compte de l'affinité CPU et du quota cgroup (conteneurs limités en CPU).
+    """
+    try:
+        cores = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cores = os.cpu_count() or 1
+
+    try:
+        # cgroup v2: "<quota> <période>" ou "max <période>"
+        with open('/sys/fs/cgroup/cpu.max') as f:
+            quota, period = f.read().split()
+        if quota != 'max':
+            cores = min(cores, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cores
+
+
+def node_processes() -> int:
+    """Processus servant sur le nœud (THREAD_BUDGET_PROCESSES, sinon WEB_CONCURRENCY, sinon 1)"""
+    return settings.THREAD_BUDGET_PROCESSES or int(os.environ.get('WEB_CONCURRENCY') or 1)
+
+
+def _engine_concurrency() -> int:
+    """Appels de moteurs simultanés par processus (taille du pool de l'ordonnanceur)"""
+    from services.scheduler_service import ENGINES
+    return sum(
+        settings.SCHEDULER_ENGINE_CONCURRENCY.get(engine, settings.SCHEDULER_MAX_CONCURRENCY)
+        for engine in ENGINES
+    )
+
+
+@dataclass
+class ThreadBudget:
+    """Répartition des coeurs: processus, appels simultanés et threads par bibliothèque"""
+
+    cores: int
+    processes: int
+    concurrency: int
+    threads: Dict[str, int] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict:
+        """Retourner la répartition"""
+        return {
+            'cores': self.cores,
+            'processes': self.processes,
+            'concurrency': self.concurrency,
+            'threads': dict(self.threads),
+        }
+
+
+def compute_budget(
+    processes: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    cores: Optional[int] = None,
+) -> ThreadBudget:
+    """
+    Calculer les threads de chaque bibliothèque
+
+    Les coeurs sont partagés entre les processus du nœud, puis entre les appels
+    de moteurs simultanés d'un processus: chaque appel dispose de ses propres
+    threads intra-opération. OpenCV est en plus partagé entre les vérifications
+    parallèles d'une même image.
+
+    Args:
+        processes: Processus servant sur le nœud (THREAD_BUDGET_PROCESSES,
+            sinon WEB_CONCURRENCY, sinon 1)
+        concurrency: Appels de moteurs simultanés par processus (par défaut,
+            la concurrence totale de l'ordonnanceur)
+        cores: Coeurs du nœud (THREAD_BUDGET_CORES, sinon coeurs disponibles)
+
+    Returns:
+        Répartition des threads
+    """
+    cores = cores or settings.THREAD_BUDGET_CORES or available_cores()
+    processes = processes or node_processes()
+    concurrency = concurrency or settings.THREAD_BUDGET_CONCURRENCY or _engine_concurrency()
+
+    per_call = max(1, cores // (processes * concurrency))
+    threads = {
+        'blas': per_call,
+        'paddle': per_call,
+        'torch': per_call,
+        'opencv': max(1, per_call // max(1, settings.VERIFICATION_CHECK_WORKERS)),
+    }
+    threads.update({
+        library: count for library, count in settings.THREAD_BUDGET_OVERRIDES.items() if library in LIBRARIES
+    })
+    return ThreadBudget(cores=cores, processes=processes, concurrency=concurrency, threads=threads)
+
+
+def check_workers(budget: Optional[ThreadBudget]) -> int:
+    """
+    Threads de vérification par image compatibles avec une répartition
+
+    VERIFICATION_CHECK_WORKERS, limité aux coeurs attribués à un processus
+    (les processus du pool de vérification par lot ne se partagent pas plus
+    de threads que de coeurs).
+    """
+    if budget is None:
+        return settings.VERIFICATION_CHECK_WORKERS
+    return max(1, min(settings.VERIFICATION_CHECK_WORKERS, budget.cores // budget.processes))
+
+
+class ThreadBudgetService:
+    """Application de la répartition des threads aux bibliothèques de calcul"""
+
+    def __init__(self):
+        """Initialiser le service (aucune limite avant configure)"""
+        self.budget: Optional[ThreadBudget] = None
+
+    def configure(
+        self,
+        processes: Optional[int] = None,
+        concurrency: Optional[int] = None,
+        cores: Optional[int] = None,
+    ) -> Optional[ThreadBudget]:
+        """
+        Calculer et appliquer la répartition des threads
+
+        À appeler au démarrage du processus, avant l'import de numpy, Paddle et
+        torch: les variables d'environnement ne sont lues qu'au chargement.
+        Les bibliothèques déjà chargées sont limitées à chaud (threadpoolctl
+        pour BLAS/OpenMP, torch.set_num_threads).
+
+        Args:
+            processes: Processus servant sur le nœud
+            concurrency: Appels de moteurs simultanés par processus
+            cores: Coeurs du nœud
+
+        Returns:
+            Répartition appliquée, None si THREAD_BUDGET_ENABLED est désactivé
+        """
+        if not settings.THREAD_BUDGET_ENABLED:
+            return None
+
+        budget = compute_budget(processes, concurrency, cores)
+        for name in THREAD_ENV_VARS:
+            os.environ[name] = str(budget.threads['blas'])
+
+        import cv2
+        cv2.setNumThreads(budget.threads['opencv'])
+
+        try:
+            from threadpoolctl import threadpool_limits
+            threadpool_limits(limits=budget.threads['blas'])
+        except ImportError:
+            pass
+
+        # torch n'est pas importé ici (import coûteux): limité seulement s'il est déjà chargé
+        torch = sys.modules.get('torch')
+        if torch is not None:
+            torch.set_num_threads(budget.threads['torch'])
+
+        self.budget = budget
+        logger.info(f"Répartition des threads appliquée: {budget.to_dict()}")
+        return budget
+
+    def threads(self, library: str) -> Optional[int]:
+        """
+        Threads alloués à une bibliothèque
+
+        Args:
+            library: blas, paddle, opencv ou torch
+
+        Returns:
+            Nombre de threads, None si aucune répartition n'est appliquée
+        """
+        if self.budget is None:
+            return None
+        return self.budget.threads[library]
+
+    def status(self) -> Optional[Dict]:
+        """Retourner la répartition appliquée"""
+        return self.budget.to_dict() if self.budget is not None else None
+
+
+# Instance globale du service de répartition des threads
+thread_budget_service = ThreadBudgetService()
@@ -0,0 +1,419 @@
+import csv
+import io
+import logging
+import os
+import re
+import time
+from collections import Counter
+from typing import BinaryIO, Dict, Iterator, List, Optional, Union
+
+import numpy as np
+
+from config import settings
+from services.client_profile_service import ClientProfileService
+from services.columnar_export import _pyarrow
+from services.risk_lexicon import term_weights
+
+logger = logging.getLogger(__name__)
+
+# Colonnes reconnues des fichiers de transactions (seule amount est obligatoire)
+TRANSACTION_COLUMNS = ('transaction_id', 'client_id', 'date', 'amount', 'currency', 'country', 'counterparty', 'memo')
+
+# Formats de fichiers acceptés, par extension
+TRANSACTION_FORMATS = {'.csv': 'csv', '.txt': 'csv', '.parquet': 'parquet', '.pq': 'parquet'}
+
+# Contribution de chaque indicateur au score (0-100)
+FEATURE_WEIGHTS = {
+    'risk_terms': 35,
+    'high_amount': 25,
+    'structuring': 20,
+    'round_amount': 10,
+    'high_risk_country': 20,
+    'counterparty_terms': 15,
+    'unknown_counterparty': 5,
+}
+
+# Conventions d'écriture des montants: auto (déduite de chaque valeur), fr (1.234,56), en (1,234.56)
+AMOUNT_LOCALES = ('auto', 'fr', 'en')
+
+# Ignoré dans les montants: espaces (sauf saut de ligne), apostrophes, symboles et codes devises
+_AMOUNT_NOISE = (' ', '\t', '\r', '\xa0', '\u2009', '\u202f', "'", '€', '$', '£', 'EUR', 'USD', 'GBP')
+
+# Poids cumulé des termes d'un libellé pour lequel l'indicateur risk_terms est maximal
+TERM_SATURATION = 10.0
+
+
+def transaction_format(filename: str) -> Optional[str]:
+    """Format d'un fichier de transactions d'après son extension (None si non supporté)"""
+    return TRANSACTION_FORMATS.get(os.path.splitext(filename or '')[1].lower())
+
+
+def iter_csv_chunks(source: BinaryIO, chunk_rows: int) -> Iterator[Dict[str, list]]:
+    """
+    Lire un fichier CSV par blocs de lignes
+
+    Le séparateur (virgule ou point-virgule) est déduit de la ligne d'en-tête.
+
+    Args:
+        source: Fichier binaire
+        chunk_rows: Lignes par bloc
+
+    Yields:
+        Colonnes du bloc (valeurs texte)
+    """
+    stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    header = stream.readline()
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    columns = [name.strip().lower() for name in next(csv.reader([header], delimiter=delimiter))]
+    reader = csv.reader(stream, delimiter=delimiter)
+
+    while True:
+        rows = [row for _, row in zip(range(chunk_rows), reader) if row]
+        if not rows:
+            break
+        width = len(columns)
+        # Lignes incomplètes complétées, colonnes surnuméraires ignorées
+        rows = [row if len(row) == width else (row + [''] * width)[:width] for row in rows]
+        yield dict(zip(columns, map(list, zip(*rows))))
+
+
+def iter_parquet_chunks(source: Union[str, BinaryIO], chunk_rows: int) -> Iterator[Dict[str, Union[list, np.ndarray]]]:
+    """
+    Lire un fichier Parquet par lots de lignes (groupes de lignes lus à la demande)
+
+    Args:
+        source: Chemin ou fichier binaire
+        chunk_rows: Lignes par bloc
+
+    Yields:
+        Colonnes du bloc (montants en tableau numpy, autres colonnes en listes)
+    """
+    pa = _pyarrow()
+    parquet_file = pa.parquet.ParquetFile(source)
+    available = {name.lower(): name for name in parquet_file.schema_arrow.names}
+    selected = [available[name] for name in TRANSACTION_COLUMNS if name in available]
+
+    for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=selected):
+        chunk = {}
+        for name in selected:
+            column = batch.column(name)
+            if name.lower() == 'amount' and (pa.types.is_floating(column.type) or pa.types.is_integer(column.type)):
+                chunk[name.lower()] = column.to_numpy(zero_copy_only=False).astype(np.float64)
+            else:
+                chunk[name.lower()] = ['' if value is None else str(value) for value in column.to_pylist()]
+        yield chunk
+
+
+def iter_transaction_chunks(source: Union[str, BinaryIO], file_format: str, chunk_rows: int) -> Iterator[Dict]:
+    """Lire un fichier de transactions CSV ou Parquet par blocs"""
+    if file_format == 'parquet':
+        return iter_parquet_chunks(source, chunk_rows)
+    if isinstance(source, str):
+        return _iter_csv_path(source, chunk_rows)
+    return iter_csv_chunks(source, chunk_rows)
+
+
+def _iter_csv_path(path: str, chunk_rows: int) -> Iterator[Dict[str, list]]:
+    """Lire un fichier CSV désigné par son chemin"""
+    with open(path, 'rb') as f:
+        yield from iter_csv_chunks(f, chunk_rows)
+
+
+def parse_amount(value: str, locale: str = 'auto') -> float:
+    """
+    Convertir un montant texte (NaN si invalide)
+
+    La valeur est interprétée seule, indépendamment des autres lignes du
+    fichier. Espaces, apostrophes et devises sont ignorés. En mode auto, une
+    valeur acceptée par float() est conservée telle quelle ("1.500" = 1,5;
+    "0.125" = 0,125); sinon, avec un point et une virgule, le dernier est le
+    séparateur décimal ("1.234,56", "1,234.56"), une virgule seule est
+    décimale ("1234,5") et un séparateur répété sépare les milliers
+    ("1,234,567", "1.234.567").
+
+    Args:
+        value: Montant tel qu'écrit dans le fichier
+        locale: auto, fr (point = milliers, virgule = décimales) ou en (virgule = milliers)
+    """
+    return _parse_cleaned(_strip_amount_noise(value.replace('\n', ' ')), locale)
+
+
+def _strip_amount_noise(text: str) -> str:
+    """Retirer espaces, apostrophes et devises (les sauts de ligne sont conservés)"""
+    for noise in _AMOUNT_NOISE:
+        text = text.replace(noise, '')
+    return text
+
+
+def _parse_cleaned(text: str, locale: str) -> float:
+    """Convertir un montant débarrassé des espaces et devises (voir parse_amount)"""
+    if locale == 'fr':
+        text = text.replace('.', '').replace(',', '.')
+    elif locale == 'en':
+        text = text.replace(',', '')
+    else:
+        if ',' not in text:
+            # float() refuse toujours la virgule: essai direct inutile sinon
+            try:
+                return float(text)
+            except ValueError:
+                pass
+        dots, commas = text.count('.'), text.count(',')
+        if dots and commas:
+            decimal = '.' if text.rfind('.') > text.rfind(',') else ','
+            text = text.replace(',' if decimal == '.' else '.', '').replace(',', '.')
+        elif commas == 1:
+            text = text.replace(',', '.')
+        else:
+            text = text.replace(',', '').replace('.', '')
+    try:
+        return float(text)
+    except ValueError:
+        return np.nan
+
+
+def parse_amounts(values: Union[list, np.ndarray], locale: str = 'auto') -> np.ndarray:
+    """
+    Convertir une colonne de montants en tableau numpy (NaN si invalide)
+
+    Chaque valeur est convertie par parse_amount (une fois par valeur
+    distincte): le résultat d'une cellule ne dépend pas du reste du bloc.
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'fiu':
+        return values.astype(np.float64)
+    if not len(values):
+        return np.empty(0, dtype=np.float64)
+    if locale != 'fr':
+        # Colonne entièrement numérique: conversion directe, identique à parse_amount
+        try:
+            return np.array(values, dtype=np.float64)
+        except ValueError:
+            pass
+
+    # Espaces et devises retirés en une passe sur la colonne jointe (valeur par valeur: les
+    # sauts de ligne sont conservés), puis une conversion par valeur distincte
+    cleaned = _strip_amount_noise('\n'.join(str(value).replace('\n', ' ') for value in values)).split('\n')
+    parsed = {text: _parse_cleaned(text, locale) for text in set(cleaned)}
+    return np.array(list(map(parsed.__getitem__, cleaned)), dtype=np.float64)
+
+
+class TransactionScorer:
+    """
+    Scoring de risque AML de transactions, bloc par bloc
+
+    Les indicateurs de chaque bloc sont calculés sur des tableaux numpy:
+    montant élevé, fractionnement juste sous le seuil, montant rond, pays à
+    risque, contrepartie absente. Les libellés (memo) et les contreparties
+    sont parcourus en une seule recherche d'expression régulière par bloc
+    (valeurs jointes), avec les lexiques de l'analyse NLP. Seuls le bloc
+    courant et les compteurs de la synthèse sont conservés en mémoire.
+    """
+
+    def __init__(
+        self,
+        min_score: float = 0.0,
+        profiles: Optional[ClientProfileService] = None,
+        amount_locale: Optional[str] = None,
+    ):
+        """
+        Initialiser le scoring (un par fichier)
+
+        Args:
+            min_score: Score minimal des transactions retournées
+            profiles: Profils clients mis à jour à chaque bloc (colonne client_id), None sinon
+            amount_locale: Écriture des montants texte (AMOUNT_LOCALES, AML_AMOUNT_LOCALE par défaut)
+        """
+        self.min_score = min_score
+        self.profiles = profiles
+        self.amount_locale = amount_locale or settings.AML_AMOUNT_LOCALE
+        self.high_amount = settings.AML_HIGH_AMOUNT
+        self.high_risk_countries = np.array([country.upper() for country in settings.AML_HIGH_RISK_COUNTRIES])
+        self.term_weights = term_weights()
+        self._terms = re.compile(
+            r'(?<!\w)(' + '|'.join(re.escape(term) for term in sorted(self.term_weights, key=len, reverse=True)) + r')(?!\w)'
+        )
+        self._weights = np.array(list(FEATURE_WEIGHTS.values()), dtype=np.float64)
+        self.rows = 0
+        self.returned = 0
+        self.invalid_amounts = 0
+        self.score_total = 0.0
+        self.flag_counts = dict.fromkeys(FEATURE_WEIGHTS, 0)
+        self.started = time.perf_counter()
+
+    def score_chunk(self, chunk: Dict) -> List[Dict]:
+        """
+        Scorer un bloc de transactions
+
+        Args:
+            chunk: Colonnes du bloc (iter_transaction_chunks)
+
+        Returns:
+            Transactions dont le score atteint min_score: ligne, identifiants,
+            score (0-100), indicateurs déclenchés et termes de risque trouvés
+        """
+        if 'amount' not in chunk:
+            raise ValueError("Colonne amount absente du fichier de transactions")
+        amounts = np.abs(parse_amounts(chunk['amount'], self.amount_locale))
+        count = len(amounts)
+        empty = [''] * count
+
+        term_scores, terms = self._match_terms(chunk.get('memo', empty))
+        counterparties = chunk.get('counterparty', empty)
+        counterparty_scores, counterparty_terms = self._match_terms(counterparties)
+        countries = np.array([value.strip().upper() for value in chunk.get('country', empty)])
+
+        valid = ~np.isnan(amounts)
+        amounts = np.where(valid, amounts, 0.0)
+        features = np.column_stack([
+            np.minimum(term_scores / TERM_SATURATION, 1.0),
+            amounts >= self.high_amount,
+            (amounts >= self.high_amount * 0.9) & (amounts < self.high_amount),
+            (amounts >= 1000) & (np.mod(amounts, 1000) == 0),
+            np.isin(countries, self.high_risk_countries) if len(self.high_risk_countries) else np.zeros(count, bool),
+            counterparty_scores > 0,
+            np.array([not value.strip() for value in counterparties]) if 'counterparty' in chunk else np.zeros(count, bool),
+        ]).astype(np.float64)
+        scores = np.round(np.minimum(features @ self._weights, 100.0), 2)
+
+        offset = self.rows
+        self.rows += count
+        self.invalid_amounts += int(count - valid.sum())
+        self.score_total += float(scores.sum())
+        for name, total in zip(FEATURE_WEIGHTS, np.count_nonzero(features, axis=0).tolist()):
+            self.flag_counts[name] += total
+        if self.profiles is not None and 'client_id' in chunk:
+            self.profiles.update_many(
+                self._profile_deltas(chunk, amounts, valid, scores, features, term_scores, terms)
+            )
+
+        selected = np.flatnonzero(scores >= self.min_score)
+        self.returned += len(selected)
+        names = list(FEATURE_WEIGHTS)
+        transaction_ids = chunk.get('transaction_id')
+        client_ids = chunk.get('client_id')
+        results = []
+        for index, score, flags in zip(selected.tolist(), scores[selected].tolist(), features[selected] > 0):
+            results.append({
+                'row': offset + index,
+                'transaction_id': transaction_ids[index] if transaction_ids is not None else None,
+                'client_id': client_ids[index] if client_ids is not None else None,
+                'risk_score': score,
+                'flags': [names[column] for column in np.flatnonzero(flags)],
+                'terms': terms(index) + counterparty_terms(index),
+            })
+        return results
+
+    def summary(self) -> Dict:
+        """Synthèse du scoring (après le dernier bloc)"""
+        return {
+            'rows': self.rows,
+            'returned': self.returned,
+            'invalid_amounts': self.invalid_amounts,
+            'mean_score': round(self.score_total / self.rows, 2) if self.rows else None,
+            'flags': self.flag_counts,
+            'duration_seconds': round(time.perf_counter() - self.started, 3),
+        }
+
+    def _profile_deltas(self, chunk: Dict, amounts: np.ndarray, valid: np.ndarray, scores: np.ndarray,
+                        features: np.ndarray, term_scores: np.ndarray, terms) -> Dict[str, Dict]:
+        """
+        Incréments des profils clients d'un bloc, agrégés par client avec numpy
+
+        Returns:
+            Incrément de chaque client du bloc (lignes sans client_id ignorées)
+        """
+        clients: Dict[str, int] = {}
+        codes = np.fromiter(
+            (clients.setdefault(client.strip(), len(clients)) for client in chunk['client_id']),
+            dtype=np.int64,
+            count=len(amounts),
+        )
+        count = len(clients)
+        valid_codes = codes[valid]
+        valid_amounts = amounts[valid]
+        minimums = np.full(count, np.inf)
+        maximums = np.full(count, -np.inf)
+        np.minimum.at(minimums, valid_codes, valid_amounts)
+        np.maximum.at(maximums, valid_codes, valid_amounts)
+        best_scores = np.full(count, -np.inf)
+        np.maximum.at(best_scores, codes, scores)
+
+        columns = {
+            'transactions': np.bincount(codes, minlength=count),
+            'amount_count': np.bincount(valid_codes, minlength=count),
+            'amount_total': np.bincount(valid_codes, weights=valid_amounts, minlength=count),
+            'amount_squares': np.bincount(valid_codes, weights=valid_amounts ** 2, minlength=count),
+            'score_total': np.bincount(codes, weights=scores, minlength=count),
+        }
+        columns = {name: values.tolist() for name, values in columns.items()}
+        flag_counts = np.stack(
+            [np.bincount(codes, weights=features[:, column] > 0, minlength=count) for column in range(features.shape[1])],
+            axis=1,
+        ).astype(np.int64).tolist()
+
+        per_client = {name: [Counter() for _ in range(count)] for name in ('risk_terms', 'counterparties', 'countries')}
+        for name, column in (('counterparties', 'counterparty'), ('countries', 'country')):
+            if column in chunk:
+                for (code, value), total in Counter(zip(codes.tolist(), chunk[column])).items():
+                    if value.strip():
+                        per_client[name][code][value.strip()] += total
+        for row in np.flatnonzero(term_scores > 0).tolist():
+            per_client['risk_terms'][codes[row]].update(terms(row))
+
+        names = list(FEATURE_WEIGHTS)
+        deltas = {}
+        for client, code in clients.items():
+            if not client:
+                continue
+            has_amounts = columns['amount_count'][code] > 0
+            deltas[client] = {
+                'transactions': columns['transactions'][code],
+                'risk_terms': dict(per_client['risk_terms'][code]),
+                'counterparties': dict(per_client['counterparties'][code]),
+                'countries': dict(per_client['countries'][code]),
+                'flags': {names[column]: total for column, total in enumerate(flag_counts[code]) if total},
+                'amounts': {
+                    'count': columns['amount_count'][code],
+                    'total': columns['amount_total'][code],
+                    'sum_squares': columns['amount_squares'][code],
+                    'min': float(minimums[code]) if has_amounts else None,
+                    'max': float(maximums[code]) if has_amounts else None,
+                },
+                'scores': {
+                    'count': columns['transactions'][code],
+                    'total': columns['score_total'][code],
+                    'max': float(best_scores[code]),
+                },
+            }
+        return deltas
+
+    def _match_terms(self, values: List[str]):
+        """
+        Rechercher les termes de risque dans une colonne de texte
+
+        Les libellés se répètent (commerçants, virements récurrents): seules les
+        valeurs distinctes du bloc sont parcourues, jointes pour une seule
+        recherche d'expression régulière.
+
+        Returns:
+            Poids cumulé des termes par ligne, et fonction donnant les termes d'une ligne
+        """
+        distinct: Dict[str, int] = {}
+        codes = np.fromiter((distinct.setdefault(value, len(distinct)) for value in values), dtype=np.int64, count=len(values))
+        texts = list(distinct)
+        starts = np.cumsum([0] + [len(text) + 1 for text in texts[:-1]])
+
+        positions, found = [], []
+        for match in self._terms.finditer('\n'.join(texts).lower()):
+            positions.append(match.start())
+            found.append(match.group())
+        if not found:
+            return np.zeros(len(values)), lambda row: []
+
+        owners = np.searchsorted(starts, positions, side='right') - 1
+        weights = np.array([self.term_weights[term] for term in found], dtype=np.float64)
+        terms_by_text: Dict[int, List[str]] = {}
+        for owner, term in zip(owners.tolist(), found):
+            terms_by_text.setdefault(owner, []).append(term)
+        text_scores = np.bincount(owners, weights=weights, minlength=len(texts))
+        return text_scores[codes], lambda row: terms_by_text.get(int(codes[row]), [])
@@ -0,0 +1,258 @@
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Dict, List, Optional
+
+from config import settings
+from services.name_keys import jaro_winkler, name_keys
+
+logger = logging.getLogger(__name__)
+
+# Similarité minimale de deux mots de même clé phonétique (Mohammed / Muhammad)
+PHONETIC_SIMILARITY = 0.9
+
+# Noms dont les clés sont conservées en mémoire (noms recherchés fréquemment)
+KEY_CACHE_SIZE = 100000
+
+
+def name_similarity(query: Dict, candidate: Dict) -> float:
+    """
+    Similarité de deux noms à partir de leurs clés (voir name_keys)
+
+    Chaque mot du nom le plus court est apparié au mot le plus proche de
+    l'autre (Jaro-Winkler, au moins PHONETIC_SIMILARITY si les clés
+    phonétiques coïncident); les mots en trop pénalisent légèrement le score.
+    """
+    if query['key'] == candidate['key']:
+        return 1.0
+    short, long = (query, candidate) if len(query['tokens']) <= len(candidate['tokens']) else (candidate, query)
+    if not short['tokens']:
+        return 0.0
+
+    total = 0.0
+    for token, keys in zip(short['tokens'], short['phonetic']):
+        best = 0.0
+        for other, other_keys in zip(long['tokens'], long['phonetic']):
+            similarity = jaro_winkler(token, other)
+            if similarity < PHONETIC_SIMILARITY and set(keys) & set(other_keys):
+                similarity = PHONETIC_SIMILARITY
+            best = max(best, similarity)
+        total += best
+    coverage = len(short['tokens']) / len(long['tokens'])
+    return total / len(short['tokens']) * (0.9 + 0.1 * coverage)
+
+
+class WatchlistScreeningService:
+    """
+    Filtrage de noms contre des listes de surveillance (sanctions, PPE...)
+
+    Les noms et leurs alias sont translittérés (cyrillique, arabe), débarrassés
+    des accents et des particules, et chaque mot réduit à ses clés phonétiques,
+    une seule fois par nom. Un index de blocage associe chaque clé aux noms
+    qui la contiennent: seuls les noms partageant des blocs avec le nom
+    recherché sont comparés (Jaro-Winkler par mot), jamais toute la liste.
+    Si WATCHLIST_PATH est défini, la liste est lue depuis ce fichier JSONL et
+    les entrées ajoutées y sont écrites (partagées par tous les processus).
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        """
+        Initialiser le service
+
+        Args:
+            path: Fichier JSONL de la liste (None = mémoire uniquement)
+        """
+        self.path = path
+        self._entries: List[Dict] = []
+        # Par position: entrée de rattachement, forme de surface et clés de chaque nom ou alias
+        self._names: List[Dict] = []
+        # Clé phonétique -> positions des noms (index de blocage)
+        self._blocks: Dict[str, List[int]] = {}
+        # Mots triés -> positions des noms (correspondance exacte, même dans un bloc ignoré)
+        self._exact: Dict[str, List[int]] = {}
+        self._key_cache: Dict[str, Dict] = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+
+    def add_entries(self, entries: List[Dict]) -> int:
+        """
+        Ajouter des entrées à la liste
+
+        Args:
+            entries: Entrées: name (obligatoire), aliases, entry_id, list_name, entity_type
+
+        Returns:
+            Nombre d'entrées ajoutées
+        """
+        entries = [entry for entry in entries if entry.get('name')]
+        if not entries:
+            return 0
+
+        with self._lock:
+            if self.path is None:
+                self._apply(entries)
+                return len(entries)
+
+            # Écriture en ajout de lignes complètes: les entrées des processus ne s'entremêlent pas
+            data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries).encode('utf-8')
+            fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+            self._sync()
+        return len(entries)
+
+    def screen(self, names: List[str], threshold: Optional[float] = None, limit: Optional[int] = None) -> List[List[Dict]]:
+        """
+        Rechercher des noms dans la liste
+
+        Args:
+            names: Noms recherchés (tout alphabet)
+            threshold: Similarité minimale (WATCHLIST_THRESHOLD par défaut)
+            limit: Correspondances retournées par nom (WATCHLIST_MAX_MATCHES par défaut)
+
+        Returns:
+            Pour chaque nom: entrées correspondantes par similarité décroissante
+        """
+        threshold = settings.WATCHLIST_THRESHOLD if threshold is None else threshold
+        limit = limit or settings.WATCHLIST_MAX_MATCHES
+        with self._lock:
+            self._sync()
+            if not self._names:
+                return [[] for _ in names]
+            return [self._screen(name, threshold, limit) for name in names]
+
+    def is_empty(self) -> bool:
+        """Indiquer si la liste ne contient aucune entrée"""
+        with self._lock:
+            self._sync()
+            return not self._entries
+
+    def status(self) -> Dict:
+        """Retourner la taille de la liste et de l'index de blocage"""
+        with self._lock:
+            self._sync()
+            return {
+                'entries': len(self._entries),
+                'names': len(self._names),
+                'blocks': len(self._blocks),
+                'largest_block': max((len(block) for block in self._blocks.values()), default=0),
+            }
+
+    def _keys(self, name: str) -> Dict:
+        """Clés d'un nom recherché (mémorisées, verrou détenu)"""
+        keys = self._key_cache.get(name)
+        if keys is None:
+            if len(self._key_cache) >= KEY_CACHE_SIZE:
+                self._key_cache.clear()
+            keys = self._key_cache[name] = name_keys(name)
+        return keys
+
+    def _screen(self, name: str, threshold: float, limit: int) -> List[Dict]:
+        """Rechercher un nom (verrou détenu)"""
+        query = self._keys(name)
+        if not query['tokens']:
+            return []
+
+        # Nombre de mots du nom recherché partageant un bloc avec chaque nom de la liste
+        shared = Counter()
+        # Mots dont tous les blocs sont trop grands (prénoms courants: Mohammed, Ahmed...)
+        skipped = 0
+        for token_keys in query['phonetic']:
+            positions = set()
+            oversized = False
+            for key in token_keys:
+                block = self._blocks.get(key)
+                if block is None:
+                    continue
+                if len(block) > settings.WATCHLIST_MAX_BLOCK:
+                    oversized = True
+                    continue
+                positions.update(block)
+            if oversized and not positions:
+                skipped += 1
+            shared.update(positions)
+        for position in self._exact.get(query['key'], ()):
+            shared[position] = len(query['tokens'])
+
+        best: Dict[int, Dict] = {}
+        for position, count in shared.items():
+            candidate = self._names[position]
+            # Deux mots en commun au moins (un seul pour les noms d'un mot), moins les mots
+            # dont les blocs ont été ignorés: leur correspondance est vérifiée par le score
+            if count < max(1, min(2, len(query['tokens']), len(candidate['tokens'])) - skipped):
+                continue
+            score = name_similarity(query, candidate)
+            entry = candidate['entry']
+            if score >= threshold and score > best.get(entry, {}).get('score', 0.0):
+                best[entry] = {'score': score, 'matched_name': candidate['name']}
+
+        matches = sorted(best.items(), key=lambda item: item[1]['score'], reverse=True)[:limit]
+        return [
+            {
+                'entry_id': self._entries[entry]['entry_id'],
+                'name': self._entries[entry]['name'],
+                'matched_name': match['matched_name'],
+                'list_name': self._entries[entry]['list_name'],
+                'entity_type': self._entries[entry]['entity_type'],
+                'score': round(match['score'], 4),
+            }
+            for entry, match in matches
+        ]
+
+    def _sync(self):
+        """Intégrer les entrées ajoutées au fichier depuis la dernière lecture"""
+        if self.path is None or not os.path.exists(self.path):
+            return
+        size = os.path.getsize(self.path)
+        if size <= self._offset:
+            return
+
+        with open(self.path, 'rb') as f:
+            f.seek(self._offset)
+            data = f.read(size - self._offset)
+        # Dernière ligne éventuellement en cours d'écriture: relue à la prochaine synchronisation
+        data = data[:data.rfind(b'\n') + 1]
+        self._offset += len(data)
+
+        entries = []
+        for line in data.splitlines():
+            if not line.strip():
+                continue
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning("Entrée de liste de surveillance illisible ignorée")
+        self._apply(entries)
+        logger.info(f"Liste de surveillance: {len(self._entries)} entrées, {len(self._names)} noms indexés")
+
+    def _apply(self, entries: List[Dict]):
+        """Indexer des entrées (dans l'ordre du fichier)"""
+        for entry in entries:
+            position = len(self._entries)
+            aliases = entry.get('aliases') or []
+            if isinstance(aliases, str):
+                aliases = [alias for alias in aliases.split(';') if alias.strip()]
+            self._entries.append({
+                'entry_id': str(entry.get('entry_id') or f"wl_{position}"),
+                'name': entry['name'],
+                'list_name': entry.get('list_name'),
+                'entity_type': entry.get('entity_type'),
+            })
+
+            for name in dict.fromkeys([entry['name'], *aliases]):
+                keys = name_keys(name)
+                if not keys['tokens']:
+                    continue
+                name_position = len(self._names)
+                self._names.append({'entry': position, 'name': name, **keys})
+                self._exact.setdefault(keys['key'], []).append(name_position)
+                for key in {key for token_keys in keys['phonetic'] for key in token_keys}:
+                    self._blocks.setdefault(key, []).append(name_position)
+
+
+# Instance globale du filtrage par listes de surveillance
+watchlist_service = WatchlistScreeningService(settings.WATCHLIST_PATH)
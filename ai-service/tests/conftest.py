@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Les modules du service s'importent depuis ai-service/ (comme main.py, cli/ et benchmarks/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,67 @@
+import json
+import os
+
+from services.client_profile_service import ClientProfileService, amount_summary
+
+
+def delta(index):
+    return {'texts': 1, 'countries': {f"C{index % 5}": 1}, 'amounts': amount_summary([index, 2 * index])}
+
+
+def without_timestamps(profile):
+    return {key: value for key, value in profile.items() if key not in ('created_at', 'updated_at')}
+
+
+def test_profiles_aggregate_increments():
+    service = ClientProfileService()
+    service.update('c1', {'texts': 1, 'counterparties': {'ACME': 2}, 'amounts': amount_summary([10, 30])})
+    service.update('c1', {
+        'transactions': 3,
+        'counterparties': {'ACME': 1, 'Globex': 1},
+        'scores': {'count': 1, 'total': 40, 'max': 40},
+    })
+
+    profile = service.get('c1')
+    assert profile['texts'] == 1 and profile['transactions'] == 3
+    assert profile['counterparties'] == [{'value': 'ACME', 'count': 3}, {'value': 'Globex', 'count': 1}]
+    assert profile['amounts'] == {'count': 2, 'total': 40.0, 'mean': 20.0, 'std': 10.0, 'min': 10.0, 'max': 30.0}
+    assert profile['risk_score'] == {'count': 1, 'mean': 40.0, 'max': 40}
+    assert service.get('inconnu') is None
+
+
+def test_snapshot_truncates_the_log_and_keeps_processes_consistent(tmp_path):
+    path = str(tmp_path / 'profiles.jsonl')
+    first = ClientProfileService(path, snapshot_bytes=2000)
+    second = ClientProfileService(path, snapshot_bytes=2000)
+    reference = ClientProfileService()
+    for index in range(60):
+        (first if index % 2 else second).update(f"c{index % 3}", delta(index))
+        reference.update(f"c{index % 3}", delta(index))
+
+    assert os.path.exists(f"{path}.snapshot")
+    assert os.path.getsize(path) < 2000
+    restarted = ClientProfileService(path, snapshot_bytes=2000)
+    for client_id in ('c0', 'c1', 'c2'):
+        expected = without_timestamps(reference.get(client_id))
+        for service in (first, second, restarted):
+            assert without_timestamps(service.get(client_id)) == expected
+
+
+def test_interrupted_snapshot_does_not_count_increments_twice(tmp_path):
+    path = str(tmp_path / 'profiles.jsonl')
+    service = ClientProfileService(path, snapshot_bytes=0)
+    for index in range(5):
+        service.update('c1', delta(index))
+
+    # Arrêt après l'écriture de l'instantané, avant le remplacement du journal
+    stat = os.stat(path)
+    snapshot = {
+        'log': [stat.st_dev, stat.st_ino],
+        'offset': stat.st_size,
+        'profiles': {client_id: profile.state() for client_id, profile in service._profiles.items()},
+    }
+    with open(f"{path}.snapshot", 'w', encoding='utf-8') as f:
+        json.dump(snapshot, f)
+    service.update('c1', delta(5))
+
+    assert ClientProfileService(path, snapshot_bytes=0).get('c1')['texts'] == 6
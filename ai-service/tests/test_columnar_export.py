@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+pytest.importorskip('pyarrow')
+
+from services.columnar_export import ColumnarResultWriter, next_part, read_processed_ids  # noqa: E402
+
+
+def record(index, success=True):
+    if not success:
+        return {'id': f"doc-{index}", 'success': False, 'error': 'illisible', 'duration_seconds': 0.1}
+    return {
+        'id': f"doc-{index}",
+        'success': True,
+        'data': {
+            'ocr': {'full_text': 'DUPONT', 'document_type': 'passport', 'lines': [{'confidence': 0.9}]},
+            'kyc_entities': {'iban': [{'text': 'FR76 3000', 'start': 0, 'end': 9, 'normalized': 'FR763000'}]},
+        },
+        'duration_seconds': 0.1,
+    }
+
+
+@pytest.mark.parametrize('output_format', ['parquet', 'arrow'])
+def test_resume_reads_finalized_parts(tmp_path, output_format):
+    writer = ColumnarResultWriter(str(tmp_path), output_format, row_group_size=2, row_groups_per_part=2)
+    for index in range(5):
+        writer.write(record(index, success=index != 3))
+    writer.close()
+
+    extension = 'parquet' if output_format == 'parquet' else 'arrow'
+    assert sorted(os.listdir(tmp_path)) == [
+        f"{kind}-{part:05d}.{extension}" for kind in ('documents', 'entities') for part in range(2)
+    ]
+    assert read_processed_ids(str(tmp_path), output_format, retry_failed=False) == {f"doc-{i}" for i in range(5)}
+    assert read_processed_ids(str(tmp_path), output_format, retry_failed=True) == {'doc-0', 'doc-1', 'doc-2', 'doc-4'}
+
+
+def test_crash_loses_only_the_open_part(tmp_path):
+    writer = ColumnarResultWriter(str(tmp_path), 'parquet', row_group_size=2, row_groups_per_part=2)
+    for index in range(4):
+        writer.write(record(index))
+    writer.close()
+    # Arrêt brutal pendant la partie suivante: fichier sans pied de page
+    finalized = (tmp_path / 'documents-00000.parquet').read_bytes()
+    (tmp_path / 'documents-00001.parquet').write_bytes(finalized[:len(finalized) // 2])
+
+    assert read_processed_ids(str(tmp_path), 'parquet', retry_failed=False) == {f"doc-{i}" for i in range(4)}
+    # La partie illisible n'est pas écrasée par la reprise
+    assert next_part(str(tmp_path), 'parquet') == 2
+
+
+def test_next_part_follows_highest_index(tmp_path):
+    assert next_part(str(tmp_path), 'parquet') == 0
+    names = ('documents-00000.parquet', 'documents-00004.parquet', 'entities-00007.parquet', 'documents-00009.arrow')
+    for name in names:
+        (tmp_path / name).write_bytes(b'')
+
+    # Une partie manquante (00001-00003) ne fait pas réutiliser un numéro existant
+    assert next_part(str(tmp_path), 'parquet') == 8
+    writer = ColumnarResultWriter(str(tmp_path), 'parquet', row_group_size=1)
+    writer.write(record(0))
+    writer.close()
+    assert (tmp_path / 'documents-00008.parquet').stat().st_size > 0
@@ -0,0 +1,69 @@
+import os
+
+import pytest
+
+spacy = pytest.importorskip('spacy')
+
+from services.doc_cache import DocCache  # noqa: E402
+
+TEXT = 'Jean Dupont a viré 1500 EUR vers Lyon. ' * 30
+
+
+@pytest.fixture(scope='module')
+def nlp():
+    return spacy.blank('fr')
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return DocCache(str(tmp_path / 'docs'), max_bytes=10 * 1024 * 1024, min_chars=100)
+
+
+def test_key_depends_on_model_version_and_text(cache):
+    path = cache._path('fr_core_news_lg-3.7.0', TEXT)
+    assert path == cache._path('fr_core_news_lg-3.7.0', TEXT)
+    assert path.startswith(cache.directory) and path.endswith('.spacy')
+    assert os.path.basename(os.path.dirname(path)) == os.path.basename(path)[:2]
+    assert len({path, cache._path('fr_core_news_lg-3.8.0', TEXT), cache._path('fr_core_news_lg-3.7.0', TEXT + '.')}) == 3
+
+
+def test_enabled_for_short_texts_and_setting(cache, monkeypatch):
+    assert cache.enabled_for(TEXT)
+    assert not cache.enabled_for('Jean Dupont')
+    monkeypatch.setattr('services.doc_cache.settings.DOC_CACHE_ENABLED', False)
+    assert not cache.enabled_for(TEXT)
+
+
+def test_round_trip_and_model_version_miss(cache, nlp):
+    assert cache.get(nlp, 'v1', TEXT) is None
+    cache.put('v1', TEXT, nlp(TEXT))
+
+    doc = cache.get(nlp, 'v1', TEXT)
+    assert doc.text == TEXT
+    assert [token.text for token in doc] == [token.text for token in nlp(TEXT)]
+    # Nouvelle version du modèle: le Doc est réanalysé
+    assert cache.get(nlp, 'v2', TEXT) is None
+
+
+def test_unreadable_entry_is_a_miss(cache, nlp):
+    path = cache._path('v1', TEXT)
+    os.makedirs(os.path.dirname(path))
+    with open(path, 'wb') as f:
+        f.write(b'incomplet')
+    assert cache.get(nlp, 'v1', TEXT) is None
+
+
+def test_prune_removes_least_recently_used(cache, nlp):
+    texts = [f"{index} {TEXT}" for index in range(3)]
+    for text in texts[:2]:
+        cache.put('v1', text, nlp(text))
+    paths = [cache._path('v1', text) for text in texts]
+    os.utime(paths[0], (1000, 1000))
+    os.utime(paths[1], (2000, 2000))
+    # Lecture: le premier texte devient le plus récemment utilisé
+    assert cache.get(nlp, 'v1', texts[0]) is not None
+
+    cache.max_bytes = int(2.5 * os.path.getsize(paths[0]))
+    cache.put('v1', texts[2], nlp(texts[2]))
+    assert [os.path.exists(path) for path in paths] == [True, False, True]
+    assert cache._size == cache._disk_usage() <= cache.max_bytes
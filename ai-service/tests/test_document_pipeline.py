@@ -0,0 +1,43 @@
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+
+from services import document_pipeline as pipeline_module
+from services.document_pipeline import DocumentPipeline, resolve_stages
+from services.scheduler_service import ExecutionContext
+
+
+@pytest.fixture
+def engine_calls(monkeypatch):
+    calls = []
+
+    def call(engine, method, *args):
+        calls.append((engine, method, args[1:]))
+        if method == 'extract_document_data':
+            return {'full_text': 'DUPONT', 'document_type': 'passport'}
+        return {'engine': engine}
+
+    monkeypatch.setattr(pipeline_module.engine_registry, 'call', call)
+    return calls
+
+
+def document_bytes():
+    return cv2.imencode('.png', np.full((32, 48, 3), 255, dtype=np.uint8))[1].tobytes()
+
+
+def test_resolve_stages_adds_dependencies():
+    assert resolve_stages(['kyc_entities', 'verification']) == ['ocr', 'verification', 'kyc_entities']
+    with pytest.raises(ValueError):
+        resolve_stages(['signature'])
+
+
+@pytest.mark.parametrize('document_type, verification_type', [('id_card', 'id_card'), (None, 'passport')])
+def test_process_registers_the_submission(engine_calls, document_type, verification_type):
+    result = asyncio.run(DocumentPipeline().process(
+        document_bytes(), ['ocr', 'verification'], ExecutionContext(), document_type, 'doc-42'
+    ))
+    assert result['image'] == {'width': 48, 'height': 32}
+    # Nouvelle soumission: enregistrée dans l'index des doublons sous l'identifiant de l'appelant
+    assert ('document_verification', 'verify_document', (verification_type, True, 'doc-42')) in engine_calls
@@ -0,0 +1,51 @@
+import asyncio
+
+import pytest
+
+from services.engine_registry import EngineRegistry, EngineUnavailableError
+
+
+class Engine:
+    def __init__(self):
+        self.warmed_up = False
+
+    def warmup(self):
+        self.warmed_up = True
+
+    def ping(self):
+        return 'pong'
+
+
+def broken():
+    raise RuntimeError('modèle absent')
+
+
+@pytest.mark.parametrize('loading', ['eager', 'lazy'])
+def test_ready_only_once_every_engine_is_warmed_up(monkeypatch, loading):
+    monkeypatch.setattr('services.engine_registry.settings.ENGINE_LOADING', loading)
+    registry = EngineRegistry()
+    registry.register('ocr', Engine)
+    registry.register('nlp', Engine)
+    assert not registry.is_ready()
+
+    # Premier appel: seul le moteur sollicité est chargé et préchauffé
+    assert registry.call('ocr', 'ping') == 'pong'
+    assert registry.get('ocr').warmed_up
+    assert registry.status()['nlp']['status'] == 'pending'
+    assert not registry.is_ready()
+
+    asyncio.run(registry.load_sequentially() if loading == 'lazy' else registry.load_all())
+    assert registry.is_ready()
+    assert all(engine['warmed_up'] for engine in registry.status().values())
+
+
+def test_failed_engine_is_never_ready():
+    registry = EngineRegistry()
+    registry.register('ocr', Engine)
+    registry.register('ner', broken)
+    asyncio.run(registry.load_sequentially())
+
+    assert not registry.is_ready()
+    assert registry.status()['ner'] == dict(registry.status()['ner'], status='failed', error='modèle absent')
+    with pytest.raises(EngineUnavailableError):
+        registry.get('ner')
@@ -0,0 +1,111 @@
+import pytest
+
+spacy = pytest.importorskip('spacy')
+
+from services.entity_resolution_service import EntityResolutionService, normalize_mention, tokens_agree  # noqa: E402
+
+LONG_NAME = (
+    'Compagnie Internationale de Financement et de Participations Industrielles '
+    'et Commerciales du Grand Est'
+)
+
+
+@pytest.fixture(scope='module')
+def nlp():
+    # Pipeline vide: embeddings par trigrammes de caractères uniquement
+    return spacy.blank('fr')
+
+
+def test_normalize_mention_ignores_order_accents_and_legal_form():
+    assert normalize_mention('SARL Dupont & Fils') == normalize_mention('Dupont et Fils SARL') == 'dupont et fils'
+    assert normalize_mention('Société Générale SA') == 'generale societe'
+
+
+def test_tokens_agree():
+    assert tokens_agree('dupond jean', 'dupont jean', 'PER')
+    assert not tokens_agree('dupont', 'dupont jean', 'PER')
+    assert not tokens_agree('jean martin', 'jeanne martin', 'PER')
+    assert tokens_agree('dupont', 'dupont fils', 'ORG')
+
+
+def test_resolve_by_key_then_by_vector(nlp):
+    service = EntityResolutionService(nlp=nlp)
+    created, = service.resolve([('SARL Dupont & Fils', 'ORG')], register=True)
+    assert created['method'] == 'new'
+
+    same, = service.resolve([('Dupont et Fils SARL', 'ORG')])
+    assert same == {'entity_id': created['entity_id'], 'method': 'key', 'similarity': 1.0}
+
+    person, = service.resolve([('Jean Dupont', 'PER')], register=True)
+    typo, = service.resolve([('Jean Dupond', 'PER')])
+    assert typo['entity_id'] == person['entity_id'] and typo['method'] == 'vector'
+    # Même clé, autre type: entité distincte
+    assert service.resolve([('Dupont et Fils', 'PER')])[0]['entity_id'] is None
+
+
+def test_lookup_without_register_creates_nothing(nlp):
+    service = EntityResolutionService(nlp=nlp)
+    assert service.resolve([('Banque Martin', 'ORG')]) == [{'entity_id': None, 'method': None, 'similarity': None}]
+    assert service.status()['entities'] == 0
+
+    service.resolve([('Jean Dupont', 'PER')], register=True)
+    service.resolve([('Jean Dupond', 'PER')])
+    entity = service.get_entity(service.resolve([('Jean Dupont', 'PER')])[0]['entity_id'])
+    assert entity['aliases'] == ['dupont jean']
+
+    # Avec register, la variante est conservée sans créer d'entité
+    service.resolve([('Jean Dupond', 'PER')], register=True)
+    assert service.get_entity(entity['entity_id'])['aliases'] == ['dupont jean', 'dupond jean']
+    assert service.status()['entities'] == 1
+
+
+def test_instances_share_the_index_file(tmp_path, nlp):
+    path = str(tmp_path / 'entities.bin')
+    first = EntityResolutionService(path, nlp=nlp)
+    second = EntityResolutionService(path, nlp=nlp)
+
+    created, = first.resolve([('Banque Martin', 'ORG')], register=True)
+    assert second.resolve([('Martin Banque', 'ORG')])[0]['entity_id'] == created['entity_id']
+
+    # Entité créée en parallèle: la première écrite l'emporte dans les deux processus
+    other, = second.resolve([('Groupe Durand', 'ORG')], register=True)
+    again, = first.resolve([('Groupe Durand', 'ORG')], register=True)
+    assert again['entity_id'] == other['entity_id'] and again['method'] == 'key'
+
+    restarted = EntityResolutionService(path, nlp=nlp)
+    assert restarted.status()['entities'] == 0
+    assert restarted.resolve([('Groupe Durand', 'ORG')])[0]['entity_id'] == other['entity_id']
+    assert restarted.status()['entities'] == 2
+
+
+@pytest.mark.parametrize('path', [None, 'entities.bin'])
+def test_long_and_multibyte_names_are_stored_whole(tmp_path, nlp, path):
+    path = str(tmp_path / path) if path else None
+    service = EntityResolutionService(path, nlp=nlp)
+    name = 'Общество с ограниченной ответственностью Северо-Западная Инвестиционная Компания'
+    assert len(normalize_mention(LONG_NAME).encode()) > 96
+
+    created = service.resolve([(LONG_NAME, 'ORG'), (name, 'ORG')], register=True)
+    assert [item['method'] for item in created] == ['new', 'new']
+    assert service.resolve([(LONG_NAME, 'ORG'), (name, 'ORG')]) == [
+        {'entity_id': item['entity_id'], 'method': 'key', 'similarity': 1.0} for item in created
+    ]
+
+    reader = EntityResolutionService(path, nlp=nlp) if path else service
+    assert reader.resolve([(name, 'ORG')])[0]['entity_id'] == created[1]['entity_id']
+    entity = reader.get_entity(created[1]['entity_id'])
+    assert entity['name'] == name and entity['aliases'] == [normalize_mention(name)]
+
+
+def test_partially_written_record_is_read_on_next_sync(tmp_path, nlp):
+    path = tmp_path / 'entities.bin'
+    writer = EntityResolutionService(str(path), nlp=nlp)
+    created, = writer.resolve([(LONG_NAME, 'ORG')], register=True)
+    complete = path.read_bytes()
+
+    # Enregistrement en cours d'écriture par un autre processus
+    path.write_bytes(complete[:len(complete) - 10])
+    reader = EntityResolutionService(str(path), nlp=nlp)
+    assert reader.resolve([(LONG_NAME, 'ORG')])[0]['entity_id'] is None
+    path.write_bytes(complete)
+    assert reader.resolve([(LONG_NAME, 'ORG')])[0]['entity_id'] == created['entity_id']
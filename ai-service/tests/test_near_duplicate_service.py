@@ -0,0 +1,83 @@
+import cv2
+import numpy as np
+import pytest
+
+from services.near_duplicate_service import HammingIndex, NearDuplicateService, hamming_distances
+
+
+def brute_force(hashes, value, radius):
+    distances = [bin(int(other) ^ value).count('1') for other in hashes]
+    return sorted((position, distance) for position, distance in enumerate(distances) if distance <= radius)
+
+
+def clustered_hashes(rng, count, centers=20):
+    """Empreintes groupées autour de quelques centres (documents retouchés), plus du bruit"""
+    bases = rng.integers(0, 2 ** 63, size=centers, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+    hashes = []
+    for index in range(count):
+        value = int(bases[index % centers])
+        for bit in rng.choice(64, size=rng.integers(0, 14), replace=False):
+            value ^= 1 << int(bit)
+        hashes.append(value)
+    return np.array(hashes, dtype=np.uint64)
+
+
+def test_hamming_distances_match_popcount():
+    rng = np.random.default_rng(0)
+    hashes = rng.integers(0, 2 ** 63, size=100, dtype=np.uint64)
+    value = int(hashes[0]) ^ 0xFF00000000000001
+    assert hamming_distances(value, hashes).tolist() == [bin(int(other) ^ value).count('1') for other in hashes]
+
+
+@pytest.mark.parametrize('radius', [0, 3, 4, 8, 11])
+def test_search_matches_brute_force(radius):
+    rng = np.random.default_rng(radius)
+    hashes = clustered_hashes(rng, 3000)
+    # Petit seuil de fusion: une partie des empreintes est dans les tableaux triés, le reste en file
+    index = HammingIndex(merge_threshold=512)
+    for start in range(0, len(hashes), 700):
+        index.add(hashes[start:start + 700])
+    assert len(index) == len(hashes)
+    assert index._pending and len(index._hashes)
+
+    for value in list(hashes[:40]) + list(clustered_hashes(rng, 10)):
+        value = int(value)
+        found = index.search(value, radius)
+        assert sorted(found) == brute_force(hashes, value, radius)
+        assert [distance for _, distance in found] == sorted(distance for _, distance in found)
+
+
+def test_search_on_empty_index():
+    assert HammingIndex().search(123, 8) == []
+
+
+def document_image(seed):
+    rng = np.random.default_rng(seed)
+    return cv2.resize(rng.integers(0, 256, size=(40, 64), dtype=np.uint8), (512, 320), interpolation=cv2.INTER_CUBIC)
+
+
+def test_service_registers_only_new_submissions(tmp_path):
+    path = str(tmp_path / 'index.bin')
+    service = NearDuplicateService(path)
+    image = document_image(1)
+
+    first = service.check(image, None, 'passport', register=True, document_id='doc-1')
+    assert not first['detected'] and first['indexed_submissions'] == 1
+
+    # Re-vérification du même document: ni doublon de lui-même, ni nouvel enregistrement
+    again = service.check(image, None, 'passport', register=True, document_id='doc-1')
+    assert not again['detected'] and again['indexed_submissions'] == 1
+
+    # Le même visuel sous un autre identifiant est signalé
+    retouched = image.copy()
+    retouched[10:20, 10:60] = 255
+    other = service.check(retouched, None, 'passport', register=True, document_id='doc-2')
+    assert other['detected']
+    assert other['matches'][0]['document_id'] == 'doc-1'
+
+    # Recherche seule (défaut): rien n'est enregistré
+    lookup = service.check(document_image(2), None, 'id_card')
+    assert not lookup['detected'] and lookup['indexed_submissions'] == 2
+
+    # Un autre processus relit le fichier partagé
+    assert NearDuplicateService(path).check(image, None, 'passport')['indexed_submissions'] == 2
@@ -0,0 +1,74 @@
+import pytest
+
+from services.normalization import (
+    ValueNormalizer,
+    normalize_amounts,
+    normalize_dates,
+    normalize_ibans,
+    normalize_phone_numbers,
+)
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('05/01/2024', '2024-01-05'),
+    ('05-01-24', '2024-01-05'),
+    ('01.02.70', '1970-02-01'),
+    ('5 janvier 2024', '2024-01-05'),
+    ('1er mars 2024', '2024-03-01'),
+    ('15 févr. 2023', '2023-02-15'),
+    ('Né le 3 decembre 1985 à Lyon', '1985-12-03'),
+    ('29/02/2024', '2024-02-29'),
+    ('29/02/2023', None),
+    ('29/02/1900', None),
+    ('29/02/2000', '2000-02-29'),
+    ('31/04/2024', None),
+    ('12/13/2024', None),
+    ('aucune date', None),
+])
+def test_normalize_dates(value, expected):
+    assert normalize_dates([value]) == [{'normalized': expected}]
+
+
+def test_normalize_dates_keeps_positions():
+    values = ['inconnue', '01/01/2024', '31/02/2024', '2 mai 2024']
+    assert [result['normalized'] for result in normalize_dates(values)] == [None, '2024-01-01', None, '2024-05-02']
+    assert normalize_dates([]) == []
+
+
+@pytest.mark.parametrize('value, amount, currency', [
+    ('1500,00 EUR', 1500.0, 'EUR'),
+    ('1 500,00 €', 1500.0, 'EUR'),
+    ('1.234.567,89 EUR', 1234567.89, 'EUR'),
+    ('1,500.00 USD', 1500.0, 'USD'),
+    ('Virement de 12 € reçu', 12.0, 'EUR'),
+])
+def test_normalize_amounts(value, amount, currency):
+    assert normalize_amounts([value]) == [
+        {'normalized': f"{amount:.2f} {currency}", 'amount': amount, 'currency': currency},
+    ]
+
+
+def test_normalize_amounts_without_currency_is_rejected():
+    assert normalize_amounts(['100', 'sans montant']) == [{'normalized': None, 'amount': None, 'currency': None}] * 2
+
+
+def test_normalize_phone_numbers_and_ibans():
+    assert normalize_phone_numbers(['+33 6 12-34-56-78', '(01) 23.45.67.89', '']) == [
+        {'normalized': '+33612345678'}, {'normalized': '0123456789'}, {'normalized': ''},
+    ]
+    assert normalize_ibans(['fr76 3000 6000 0112 3456 7890 189', 'DE89370400440532013000']) == [
+        {'normalized': 'FR7630006000011234567890189'}, {'normalized': 'DE89370400440532013000'},
+    ]
+
+
+def test_value_normalizer_memoizes_distinct_values():
+    normalizer = ValueNormalizer(max_entries=3)
+    results = normalizer.normalize('date', ['01/01/2024', '02/01/2024', '01/01/2024'])
+    assert [result['normalized'] for result in results] == ['2024-01-01', '2024-01-02', '2024-01-01']
+    assert results[0] is results[2]
+    assert len(normalizer._memo['date']) == 2
+
+    # Mémoire vidée au-delà de max_entries, résultats inchangés
+    results = normalizer.normalize('date', ['03/01/2024', '04/01/2024', '01/01/2024'])
+    assert [result['normalized'] for result in results] == ['2024-01-03', '2024-01-04', '2024-01-01']
+    assert len(normalizer._memo['date']) <= 3
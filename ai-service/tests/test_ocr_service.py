@@ -0,0 +1,10 @@
+import pytest
+
+pytest.importorskip('paddleocr')
+
+from services.ocr_service import OCRService  # noqa: E402
+
+
+def test_extract_fields_amounts_with_symbol_currencies():
+    fields = OCRService._extract_fields(None, 'Total 100,00 € - frais 5,00 $ - solde 250.50 EUR', [])
+    assert fields['amounts'] == ['100,00 €', '5,00 $', '250.50 EUR']
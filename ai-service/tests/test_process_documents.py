@@ -0,0 +1,64 @@
+import io
+import tarfile
+import zipfile
+
+from cli.process_documents import ResultWriter, iter_documents, load_checkpoint
+
+EXTENSIONS = ('.png', '.jpg')
+
+
+def test_iter_documents_reads_only_requested_files(tmp_path, monkeypatch):
+    source = tmp_path / 'kyc'
+    (source / 'b').mkdir(parents=True)
+    (source / 'a.png').write_bytes(b'a')
+    (source / 'b' / 'c.jpg').write_bytes(b'c')
+    (source / 'notes.txt').write_bytes(b'x')
+
+    opened = []
+    real_open = open
+
+    def tracking_open(path, *args, **kwargs):
+        opened.append(str(path))
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', tracking_open)
+    documents = list(iter_documents(str(source), EXTENSIONS))
+    assert [document_id for document_id, _ in documents] == ['a.png', 'b/c.jpg']
+    assert opened == []
+    assert documents[1][1]() == b'c'
+    assert opened == [str(source / 'b' / 'c.jpg')]
+
+
+def test_iter_documents_from_archives(tmp_path):
+    zip_path = tmp_path / 'lot.zip'
+    with zipfile.ZipFile(zip_path, 'w') as archive:
+        archive.writestr('z/2.png', b'2')
+        archive.writestr('1.png', b'1')
+        archive.writestr('readme.txt', b'-')
+    assert [(document_id, load()) for document_id, load in iter_documents(str(zip_path), EXTENSIONS)] == [
+        ('lot.zip!1.png', b'1'), ('lot.zip!z/2.png', b'2'),
+    ]
+
+    tar_path = tmp_path / 'lot.tar.gz'
+    with tarfile.open(tar_path, 'w:gz') as archive:
+        for name, content in (('1.png', b'1'), ('2.jpg', b'22')):
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    # Archive compressée: seul le document 2.jpg est lu, le premier est ignoré (reprise)
+    documents = iter_documents(str(tar_path), EXTENSIONS)
+    assert [load() for document_id, load in documents if document_id.endswith('2.jpg')] == [b'22']
+
+
+def test_resume_drops_a_torn_last_line(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    lines = ['{"id": "a", "success": true}\n', '{"id": "b", "success": false}\n', '{"id": "c", "succ']
+    path.write_text(''.join(lines), encoding='utf-8')
+    assert load_checkpoint(str(path), retry_failed=True) == {'a'}
+
+    writer = ResultWriter(str(path), append=True, fsync_every=1)
+    writer.write({'id': 'c', 'success': True})
+    writer.close()
+
+    assert path.read_text(encoding='utf-8').splitlines()[-1] == '{"id": "c", "success": true}'
+    assert load_checkpoint(str(path), retry_failed=False) == {'a', 'b', 'c'}
@@ -0,0 +1,80 @@
+import json
+
+import numpy as np
+import pytest
+
+from services.response_format import (
+    MEDIA_TYPE_MSGPACK,
+    ResponseOptions,
+    encode,
+    format_payload,
+    parse_field_paths,
+)
+
+OCR_RESULT = {
+    'full_text': 'PASSEPORT DUPONT',
+    'document_type': 'passport',
+    'lines': [
+        {
+            'text': 'PASSEPORT',
+            'type': 'text',
+            'confidence': 0.987654321,
+            'bbox': [[10.4, 20.6], [110.0, 20.6], [110.0, 40.2], [10.4, 40.2]],
+        },
+        {
+            'text': 'DUPONT',
+            'type': 'text',
+            'confidence': np.float32(0.5),
+            'bbox': np.array([[0, 0], [5, 0], [5, 5], [0, 5]], dtype=np.float32),
+        },
+    ],
+    'extracted_fields': {'surname': 'DUPONT', 'expiry_date': None, 'score': np.int64(3)},
+}
+
+
+def test_compact_mode_flattens_boxes_rounds_and_drops_redundant_fields():
+    compact = format_payload(OCR_RESULT, ResponseOptions(compact=True))
+
+    assert 'full_text' not in compact
+    assert all('type' not in line for line in compact['lines'])
+    assert compact['lines'][0]['bbox'] == [10, 21, 110, 21, 110, 40, 10, 40]
+    assert compact['lines'][1]['bbox'] == [0, 0, 5, 0, 5, 5, 0, 5]
+    assert compact['lines'][0]['confidence'] == 0.9877
+    assert compact['lines'][1]['confidence'] == 0.5
+    # Valeurs nulles omises, entiers numpy convertis
+    assert compact['extracted_fields'] == {'surname': 'DUPONT', 'score': 3}
+    # Le texte complet se reconstruit à partir des lignes
+    assert ' '.join(line['text'] for line in compact['lines']) == OCR_RESULT['full_text']
+
+
+def test_compact_mode_does_not_modify_the_result():
+    format_payload(OCR_RESULT, ResponseOptions(compact=True))
+    assert OCR_RESULT['full_text'] == 'PASSEPORT DUPONT'
+    assert OCR_RESULT['lines'][0]['type'] == 'text'
+
+
+def test_full_mode_only_drops_requested_fields():
+    options = ResponseOptions(exclude=parse_field_paths(['lines.bbox', ' extracted_fields.score ', '']))
+    result = format_payload(OCR_RESULT, options)
+
+    assert result['full_text'] == OCR_RESULT['full_text']
+    assert [set(line) for line in result['lines']] == [{'text', 'type', 'confidence'}] * 2
+    assert result['extracted_fields'] == {'surname': 'DUPONT', 'expiry_date': None}
+    assert format_payload(OCR_RESULT, ResponseOptions()) is OCR_RESULT
+
+
+def test_excluded_path_matches_nested_suffix_only():
+    payload = {'type': 'passport', 'lines': [{'type': 'text', 'text': 'A'}]}
+    result = format_payload(payload, ResponseOptions(exclude=parse_field_paths(['lines.type'])))
+    assert result == {'type': 'passport', 'lines': [{'text': 'A'}]}
+
+
+def test_encode_json_and_msgpack_roundtrip():
+    compact = format_payload(OCR_RESULT, ResponseOptions(compact=True))
+    assert json.loads(encode(compact)) == compact
+
+    msgpack = pytest.importorskip('msgpack')
+    payload = {'scores': np.array([1.5, 2.5]), 'count': np.int32(2), 'tags': {'a'}}
+    assert msgpack.unpackb(encode(payload, MEDIA_TYPE_MSGPACK), raw=False) == {
+        'scores': [1.5, 2.5], 'count': 2, 'tags': ['a'],
+    }
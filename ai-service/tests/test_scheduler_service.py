@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+import pytest
+
+from services.scheduler_service import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    DeadlineExceededError,
+    EngineSaturatedError,
+    EngineScheduler,
+    ExecutionContext,
+    SchedulerService,
+)
+
+
+def make_scheduler(max_concurrency=1, max_queued=16, batch_limit=1, interactive_weight=3, batch_weight=1):
+    return EngineScheduler(
+        'ocr',
+        max_concurrency=max_concurrency,
+        max_queued=max_queued,
+        class_limits={PRIORITY_INTERACTIVE: max_concurrency, PRIORITY_BATCH: batch_limit},
+        class_weights={PRIORITY_INTERACTIVE: interactive_weight, PRIORITY_BATCH: batch_weight},
+    )
+
+
+async def served_order(scheduler, queued):
+    """Occuper l'unique créneau, mettre des requêtes en file, puis noter l'ordre de service"""
+    await scheduler.acquire(PRIORITY_INTERACTIVE)
+    order = []
+
+    async def request(priority):
+        await scheduler.acquire(priority)
+        order.append(priority)
+
+    tasks = [asyncio.create_task(request(priority)) for priority in queued]
+    await asyncio.sleep(0)
+    running = PRIORITY_INTERACTIVE
+    for _ in queued:
+        scheduler.release(running)
+        await asyncio.sleep(0)
+        running = order[-1]
+    scheduler.release(running)
+    await asyncio.gather(*tasks)
+    return order
+
+
+def test_weighted_round_robin_favours_interactive_without_starving_batch():
+    scheduler = make_scheduler()
+    queued = [PRIORITY_BATCH] * 4 + [PRIORITY_INTERACTIVE] * 4
+    order = asyncio.run(served_order(scheduler, queued))
+
+    # Poids 3:1: trois requêtes interactives pour une requête batch
+    assert order[:4].count(PRIORITY_INTERACTIVE) == 3
+    assert order[:4].count(PRIORITY_BATCH) == 1
+    assert sorted(order) == sorted(queued)
+    assert scheduler.in_flight == 0 and scheduler.queue_depth == 0
+
+
+def test_fifo_within_a_class():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        await scheduler.acquire(PRIORITY_INTERACTIVE)
+        order = []
+
+        async def request(index):
+            await scheduler.acquire(PRIORITY_INTERACTIVE)
+            order.append(index)
+            scheduler.release(PRIORITY_INTERACTIVE)
+
+        tasks = [asyncio.create_task(request(index)) for index in range(5)]
+        await asyncio.sleep(0)
+        scheduler.release(PRIORITY_INTERACTIVE)
+        await asyncio.gather(*tasks)
+        return order
+
+    assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+
+
+def test_batch_class_limit_leaves_slots_for_interactive():
+    scheduler = make_scheduler(max_concurrency=3, batch_limit=1)
+
+    async def scenario():
+        await scheduler.acquire(PRIORITY_BATCH)
+        second_batch = asyncio.create_task(scheduler.acquire(PRIORITY_BATCH))
+        await asyncio.sleep(0)
+        # Le second lot attend alors que des créneaux restent libres
+        assert not second_batch.done()
+        assert scheduler.snapshot()['classes'][PRIORITY_BATCH] == {
+            'limit': 1, 'weight': 1, 'in_flight': 1, 'queued': 1,
+        }
+
+        await asyncio.wait_for(scheduler.acquire(PRIORITY_INTERACTIVE), timeout=1)
+        await asyncio.wait_for(scheduler.acquire(PRIORITY_INTERACTIVE), timeout=1)
+        assert scheduler.in_flight == 3
+
+        scheduler.release(PRIORITY_BATCH)
+        await asyncio.wait_for(second_batch, timeout=1)
+        assert scheduler.snapshot()['classes'][PRIORITY_BATCH]['in_flight'] == 1
+
+    asyncio.run(scenario())
+
+
+def test_service_run_executes_in_a_slot_and_records_latency():
+    service = SchedulerService()
+    try:
+        result = asyncio.run(service.run('nlp', ExecutionContext(), lambda a, b=0: a + b, 2, b=3))
+        snapshot = service.snapshot()['nlp']
+        assert result == 5
+        assert snapshot['in_flight'] == 0
+        assert snapshot['latency_ms']['samples'] == 1
+    finally:
+        service.shutdown()
+
+
+def test_full_queue_is_rejected_with_retry_after():
+    scheduler = make_scheduler(max_queued=2)
+
+    async def scenario():
+        await scheduler.acquire(PRIORITY_INTERACTIVE)
+        scheduler.record(elapsed=2.5, latency=2.5)
+        waiting = [asyncio.create_task(scheduler.acquire(PRIORITY_INTERACTIVE)) for _ in range(2)]
+        await asyncio.sleep(0)
+
+        with pytest.raises(EngineSaturatedError) as error:
+            await scheduler.acquire(PRIORITY_BATCH)
+        # Trois traitements de 2,5 s devant la requête rejetée
+        assert error.value.retry_after == 8
+        assert scheduler.queue_depth == 2
+
+        for task in waiting:
+            task.cancel()
+        await asyncio.gather(*waiting, return_exceptions=True)
+        assert scheduler.queue_depth == 0
+
+    asyncio.run(scenario())
+
+
+def test_expired_deadline_is_rejected_before_queueing():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        with pytest.raises(DeadlineExceededError):
+            await scheduler.acquire(PRIORITY_INTERACTIVE, deadline=time.time() - 1)
+        assert scheduler.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_deadline_reached_in_queue_frees_the_queue_slot():
+    scheduler = make_scheduler()
+
+    async def scenario():
+        await scheduler.acquire(PRIORITY_INTERACTIVE)
+        with pytest.raises(DeadlineExceededError):
+            await scheduler.acquire(PRIORITY_BATCH, deadline=time.time() + 0.05)
+        assert scheduler.queue_depth == 0
+
+        scheduler.release(PRIORITY_INTERACTIVE)
+        assert scheduler.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_service_rejects_expired_request_without_running_it():
+    service = SchedulerService()
+    calls = []
+    try:
+        with pytest.raises(DeadlineExceededError):
+            asyncio.run(service.run('ner', ExecutionContext(deadline=time.time() - 1), calls.append, 1))
+        with pytest.raises(ValueError):
+            asyncio.run(service.run('ner', ExecutionContext(priority='urgent'), calls.append, 1))
+        assert calls == []
+        assert service.snapshot()['ner']['in_flight'] == 0
+    finally:
+        service.shutdown()
+
+
+def test_queued_batch_does_not_reject_interactive():
+    scheduler = make_scheduler(max_queued=2)
+
+    async def scenario():
+        await scheduler.acquire(PRIORITY_BATCH)
+        batch = [asyncio.create_task(scheduler.acquire(PRIORITY_BATCH)) for _ in range(2)]
+        await asyncio.sleep(0)
+        with pytest.raises(EngineSaturatedError):
+            await scheduler.acquire(PRIORITY_BATCH)
+
+        # File pleine de batch: l'interactif est encore admis, et servi en premier
+        interactive = asyncio.create_task(scheduler.acquire(PRIORITY_INTERACTIVE))
+        await asyncio.sleep(0)
+        assert scheduler.queue_depth == 3
+        scheduler.release(PRIORITY_BATCH)
+        await interactive
+        assert not any(task.done() for task in batch)
+
+        for task in batch:
+            task.cancel()
+        await asyncio.gather(*batch, return_exceptions=True)
+
+    asyncio.run(scenario())
@@ -0,0 +1,52 @@
+from services.statement_table import StatementTableParser, parse_amount
+
+
+def line(x, y, text):
+    return {'bbox': [[x, y], [x + 80, y], [x + 80, y + 10], [x, y + 10]], 'text': text, 'confidence': 0.9}
+
+
+def page(title, rows):
+    """Page sans en-tête de colonnes: un titre puis une rangée par opération"""
+    lines = [line(0, 0, title)]
+    for index, cells in enumerate(rows):
+        lines.extend(line(column * 100, 40 + index * 20, text) for column, text in enumerate(cells))
+    return lines
+
+
+def test_parse_amount():
+    assert parse_amount('1 234,56') == {'value': 1234.56, 'sign': None}
+    assert parse_amount('-12,00 €') == {'value': 12.0, 'sign': -1}
+    assert parse_amount('45,10 CR') == {'value': 45.1, 'sign': 1}
+    assert parse_amount('VIR SEPA') is None
+
+
+def test_year_carries_over_december_to_january_across_pages():
+    parser = StatementTableParser()
+    transactions = parser.parse_page(page('Relevé de décembre 2023', [
+        ['28/12', 'CB ACME', '12,00 -'],
+        ['31/12', 'VIR SALAIRE', '1 500,00 +'],
+        ['02/01', 'CB BOULANGERIE', '3,00 -'],
+    ]))
+    transactions += parser.parse_page(page('Page 2', [['05/01', 'PRLV EDF', '45,10 -']]))
+
+    assert [transaction['date'] for transaction in transactions] == [
+        '2023-12-28', '2023-12-31', '2024-01-02', '2024-01-05',
+    ]
+    assert parser.summary()['total_debit'] == 60.1
+    assert parser.summary()['dropped_rows'] == 0
+
+
+def test_short_dates_before_a_january_statement_date_belong_to_previous_year():
+    parser = StatementTableParser()
+    transactions = parser.parse_page(page('Arrêté au 14/01/2024', [
+        ['15/12', 'CB', '1,00 -'], ['02/01', 'CB', '2,00 -'],
+    ]))
+    assert [transaction['date'] for transaction in transactions] == ['2023-12-15', '2024-01-02']
+
+
+def test_rows_with_amounts_but_no_usable_date_are_reported():
+    parser = StatementTableParser()
+    # Ni date complète ni mois en toutes lettres: l'année des dates courtes est inconnue
+    assert parser.parse_page(page('Relevé de compte', [['15/12', 'CB', '1,00 -'], ['CB sans date', '7,00 -']])) == []
+    assert parser.summary()['dropped_rows'] == 2
+    assert parser.summary()['transactions'] == 0
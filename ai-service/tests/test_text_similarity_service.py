@@ -0,0 +1,106 @@
+import numpy as np
+
+from services.text_similarity_service import LSHIndex, MinHasher, TextSimilarityService, shingle_hashes
+
+VOCABULARY = [f"mot{index}" for index in range(5000)]
+
+
+def random_text(rng, words=200):
+    return ' '.join(rng.choice(VOCABULARY, size=words))
+
+
+def edit_words(rng, text, count):
+    words = text.split()
+    for position in rng.choice(len(words), size=count, replace=False):
+        words[position] = rng.choice(VOCABULARY)
+    return ' '.join(words)
+
+
+def jaccard(first, second):
+    first, second = set(first.tolist()), set(second.tolist())
+    return len(first & second) / len(first | second)
+
+
+def test_shingles_ignore_case_and_accents():
+    assert np.array_equal(
+        np.sort(shingle_hashes("Virement reçu de la Société Générale", 3)),
+        np.sort(shingle_hashes("virement RECU de la societe generale", 3)),
+    )
+    assert len(shingle_hashes("trop court", 5)) == 1
+    assert len(shingle_hashes("", 5)) == 0
+
+
+def test_minhash_estimates_jaccard_similarity():
+    rng = np.random.default_rng(0)
+    hasher = MinHasher(256)
+    for shared in (0, 50, 100, 150, 200):
+        common = rng.integers(0, 2 ** 32, size=shared, dtype=np.uint64)
+        first = np.concatenate([common, rng.integers(0, 2 ** 32, size=200 - shared, dtype=np.uint64)])
+        second = np.concatenate([common, rng.integers(0, 2 ** 32, size=200 - shared, dtype=np.uint64)])
+        estimate = (hasher.signature(first) == hasher.signature(second)).mean()
+        assert abs(estimate - jaccard(first, second)) < 0.08
+
+
+def test_lsh_recall_on_near_duplicates():
+    rng = np.random.default_rng(1)
+    hasher = MinHasher(128)
+    originals = [random_text(rng) for _ in range(300)]
+    # 1 à 9 mots modifiés sur 200: chaque mot modifie au plus 5 shingles de 5 mots
+    duplicates = [edit_words(rng, text, int(rng.integers(1, 10))) for text in originals[:100]]
+
+    index = LSHIndex(128, 32, merge_threshold=64)
+    signatures = np.array([hasher.signature(shingle_hashes(text, 5)) for text in originals])
+    for start in range(0, len(signatures), 50):
+        index.add(signatures[start:start + 50])
+
+    found = 0
+    expected = 0
+    for position, text in enumerate(duplicates):
+        signature = hasher.signature(shingle_hashes(text, 5))
+        true_similarity = jaccard(shingle_hashes(text, 5), shingle_hashes(originals[position], 5))
+        matches, candidates = index.search(signature, threshold=0.5)
+        assert candidates < len(originals) // 3
+        # Aucun faux positif: les documents aléatoires ne partagent presque aucun shingle
+        assert all(match == position for match, _ in matches)
+        if true_similarity >= 0.6:
+            expected += 1
+            found += any(match == position for match, _ in matches)
+    assert expected >= 50
+    assert found / expected >= 0.95
+
+
+def test_pending_and_merged_additions_give_the_same_results():
+    rng = np.random.default_rng(2)
+    hasher = MinHasher(128)
+    texts = [random_text(rng, 30) for _ in range(200)]
+    signatures = np.array([hasher.signature(shingle_hashes(text, 3)) for text in texts])
+
+    merged = LSHIndex(128, 32)
+    merged.add(signatures)
+    incremental = LSHIndex(128, 32, merge_threshold=37)
+    for signature in signatures:
+        incremental.add(signature[np.newaxis])
+    assert incremental._merged < len(incremental)
+
+    for signature in signatures[::7]:
+        assert merged.search(signature, 0.3) == incremental.search(signature, 0.3)
+
+
+def test_index_documents_flags_duplicates_within_a_batch(tmp_path):
+    rng = np.random.default_rng(3)
+    text = random_text(rng, 120)
+    path = str(tmp_path / 'corpus.bin')
+    service = TextSimilarityService(path)
+
+    result = service.index_documents([
+        ('a', text), ('b', edit_words(rng, text, 2)), ('c', random_text(rng, 120)), ('d', ''),
+    ])
+    duplicates = {document['document_id']: document['duplicates'] for document in result['documents']}
+    assert duplicates['a'] == [] and duplicates['c'] == [] and duplicates['d'] == []
+    assert [match['document_id'] for match in duplicates['b']] == ['a']
+    # Le texte vide n'est pas indexé
+    assert result['indexed_documents'] == 3
+
+    # Index partagé: un autre processus retrouve les documents
+    other = TextSimilarityService(path).search(text)
+    assert [match['document_id'] for match in other['matches']] == ['a', 'b']
@@ -0,0 +1,79 @@
+import io
+import math
+
+import numpy as np
+import pytest
+
+from services.transaction_scoring import TransactionScorer, iter_csv_chunks, parse_amount, parse_amounts
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('1500', 1500.0),
+    ('0.125', 0.125),
+    ('1.500', 1.5),
+    ('1.234,56', 1234.56),
+    ('1,234.56', 1234.56),
+    ('1234,5', 1234.5),
+    ('1,234,567', 1234567.0),
+    ('1.234.567', 1234567.0),
+    ("1'234.50", 1234.5),
+    ('1 234,56 €', 1234.56),
+    ('-45,10 EUR', -45.1),
+    ('$ 99.99', 99.99),
+])
+def test_parse_amount_auto(value, expected):
+    assert parse_amount(value) == expected
+
+
+@pytest.mark.parametrize('value, locale, expected', [
+    ('1.500', 'fr', 1500.0),
+    ('1.234,56', 'fr', 1234.56),
+    ('1,500', 'en', 1500.0),
+    ('1,234.56', 'en', 1234.56),
+    ('0.125', 'en', 0.125),
+])
+def test_parse_amount_with_locale(value, locale, expected):
+    assert parse_amount(value, locale) == expected
+
+
+@pytest.mark.parametrize('value', ['', 'N/A', '12..5,3,1'])
+def test_parse_amount_invalid_is_nan(value):
+    assert math.isnan(parse_amount(value))
+
+
+def test_parse_amounts_does_not_depend_on_the_other_values():
+    values = ['1.500', '1.234,56', '0.125', '100 €', 'N/A', '1,5']
+    parsed = parse_amounts(values)
+    np.testing.assert_array_equal(parsed, [1.5, 1234.56, 0.125, 100.0, np.nan, 1.5])
+
+    # Même résultat pour chaque valeur seule et quel que soit l'ordre du bloc
+    np.testing.assert_array_equal(parsed, [parse_amounts([value])[0] for value in values])
+    np.testing.assert_array_equal(parse_amounts(values[::-1]), parsed[::-1])
+
+
+def test_parse_amounts_numeric_columns_and_locales():
+    assert parse_amounts(np.array([1, 2, 3])).dtype == np.float64
+    assert parse_amounts(['1.500', '2.250']).tolist() == [1.5, 2.25]
+    assert parse_amounts(['1.500', '2.250'], 'fr').tolist() == [1500.0, 2250.0]
+    assert parse_amounts(['1,500', '2,250'], 'en').tolist() == [1500.0, 2250.0]
+    assert parse_amounts([], 'fr').tolist() == []
+
+
+def test_score_chunk_flags():
+    csv_file = io.BytesIO(
+        'transaction_id;client_id;amount;country;counterparty;memo\n'
+        't1;c1;9 500,00;FR;ACME SARL;facture\n'
+        't2;c1;12 000,00;KP;;espèces\n'
+        't3;c2;12,50;FR;Boulangerie;pain\n'.encode('utf-8')
+    )
+    scorer = TransactionScorer()
+    results = []
+    for chunk in iter_csv_chunks(csv_file, chunk_rows=2):
+        results.extend(scorer.score_chunk(chunk))
+
+    by_id = {result['transaction_id']: result for result in results}
+    assert by_id['t1']['flags'] == ['structuring']
+    assert {'high_amount', 'round_amount', 'high_risk_country', 'unknown_counterparty'} <= set(by_id['t2']['flags'])
+    assert by_id['t3']['flags'] == [] and by_id['t3']['risk_score'] == 0
+    assert [result['row'] for result in results] == [0, 1, 2]
+    assert scorer.summary()['rows'] == 3 and scorer.summary()['invalid_amounts'] == 0
@@ -0,0 +1,134 @@
+import pytest
+
+from services.name_keys import fold_name, jaro_winkler, name_keys, name_tokens, phonetic_keys, transliterate
+from services.watchlist_service import WatchlistScreeningService, name_similarity
+
+
+@pytest.mark.parametrize('name, expected', [
+    ('Михаил Горбачёв', 'mikhail gorbachev'),
+    ('Щукин', 'shchukin'),
+    ('محمد', 'mhmd'),
+    ('وليد', 'wlid'),
+    ('يوسف', 'yusf'),
+])
+def test_transliterate(name, expected):
+    assert transliterate(name) == expected
+
+
+def test_name_tokens_fold_accents_and_drop_particles():
+    assert fold_name('Jean-François Müller') == 'jean-francois muller'
+    assert name_tokens('M. Jean-François de la Tour') == ['jean', 'francois', 'tour']
+    assert name_tokens('Mohammed Al-Baghdadi') == ['mohammed', 'baghdadi']
+    assert name_tokens('البغدادي') == ['bghdadi']
+    # Un nom composé uniquement de particules est conservé
+    assert name_tokens('De La') == ['de', 'la']
+
+
+@pytest.mark.parametrize('first, second', [
+    ('mohammed', 'muhammad'),
+    ('mohammed', 'mukhammad'),
+    ('mohammed', 'mhmd'),
+    ('baghdadi', 'bagdadi'),
+    ('alexander', 'aleksandr'),
+    ('mikhail', 'michail'),
+    ('philippe', 'filip'),
+])
+def test_phonetic_keys_group_transliteration_variants(first, second):
+    assert set(phonetic_keys(first)) & set(phonetic_keys(second))
+
+
+def test_phonetic_keys_separate_different_names():
+    assert not set(phonetic_keys('martin')) & set(phonetic_keys('morales'))
+    assert phonetic_keys('a') == ('a',)
+
+
+def test_name_keys_ignore_word_order():
+    assert name_keys('Karim Benali')['key'] == name_keys('BENALI Karim')['key'] == 'benali karim'
+
+
+def test_jaro_winkler():
+    assert jaro_winkler('martha', 'marhta') == pytest.approx(0.9611, abs=1e-4)
+    assert jaro_winkler('dixon', 'dicksonx') == pytest.approx(0.8133, abs=1e-4)
+    assert jaro_winkler('abc', 'abc') == 1.0
+    assert jaro_winkler('abc', '') == 0.0
+    assert jaro_winkler('abc', 'xyz') == 0.0
+
+
+def test_name_similarity():
+    assert name_similarity(name_keys('Karim Benali'), name_keys('Benali Karim')) == 1.0
+    assert name_similarity(name_keys('Muhammad Bagdadi'), name_keys('Mohammed Al-Baghdadi')) >= 0.9
+    assert name_similarity(name_keys('Pierre Martin'), name_keys('Karim Benali')) < 0.6
+
+
+WATCHLIST = [
+    {'name': 'Mohammed Al-Baghdadi', 'entry_id': 'UN-1', 'list_name': 'UN', 'entity_type': 'person'},
+    {'name': 'Mikhail Gorbachev', 'aliases': 'Michail Gorbatschow;M. Gorbatchev', 'entry_id': 'EU-7'},
+    {'name': 'Karim Benali', 'entry_id': 'FR-3'},
+    {'name': 'Jean Dupont', 'entry_id': 'FR-4'},
+    {'name': ''},
+]
+
+
+@pytest.fixture
+def watchlist():
+    service = WatchlistScreeningService()
+    assert service.add_entries(WATCHLIST) == 4
+    return service
+
+
+@pytest.mark.parametrize('query', [
+    'Мухаммад Багдади', 'محمد البغدادي', 'Muhammad Bagdadi', 'BAGHDADI Mohammed',
+])
+def test_screen_matches_across_scripts_and_word_order(watchlist, query):
+    matches = watchlist.screen([query])[0]
+    assert [match['entry_id'] for match in matches] == ['UN-1']
+    assert matches[0]['list_name'] == 'UN' and matches[0]['score'] >= 0.85
+
+
+def test_screen_matches_aliases_once_per_entry(watchlist):
+    matches = watchlist.screen(['Michail Gorbatschow', 'Горбачёв Михаил'])
+    assert [match['matched_name'] for match in matches[0]] == ['Michail Gorbatschow']
+    assert [match['entry_id'] for match in matches[1]] == ['EU-7']
+
+
+def test_screen_rejects_unrelated_names(watchlist):
+    assert watchlist.screen(['Pierre Martin', 'Jeanne Durand', '', '123']) == [[], [], [], []]
+    assert watchlist.screen(['Karim Benali'], threshold=1.01) == [[]]
+
+
+def test_blocking_limits_comparisons(watchlist):
+    status = watchlist.status()
+    # Noms et alias indexés séparément; aucune clé phonétique partagée par plus de deux noms
+    assert (status['entries'], status['names'], status['largest_block']) == (4, 6, 2)
+
+
+def test_shared_watchlist_file(tmp_path):
+    path = str(tmp_path / 'watchlist.jsonl')
+    writer = WatchlistScreeningService(path)
+    reader = WatchlistScreeningService(path)
+    assert reader.is_empty()
+
+    writer.add_entries(WATCHLIST[:2])
+    # Ligne en cours d'écriture par un autre processus: ignorée jusqu'à ce qu'elle soit complète
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write('{"name": "Karim')
+    assert [match['entry_id'] for match in reader.screen(['Muhammad Bagdadi'])[0]] == ['UN-1']
+    assert reader.status()['entries'] == 2
+
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(' Benali"}\n')
+    assert reader.screen(['Karim Benali'])[0][0]['entry_id'] == 'wl_2'
+
+
+def test_oversized_blocks_do_not_count_against_shared_tokens(monkeypatch):
+    service = WatchlistScreeningService()
+    service.add_entries([
+        {'name': 'Mohamed al-Baghdadi', 'entry_id': 'UN-1'},
+        {'name': 'Ahmed Karimi', 'entry_id': 'UN-2'},
+        {'name': 'Mahmoud Haddad', 'entry_id': 'UN-3'},
+        {'name': 'Hamid Nasser', 'entry_id': 'UN-4'},
+    ])
+    # Bloc 'md' (Mohammed, Ahmed, Mahmoud, Hamid) ignoré: Baghdadi suffit à retrouver le candidat
+    monkeypatch.setattr('services.watchlist_service.settings.WATCHLIST_MAX_BLOCK', 3)
+    assert [match['entry_id'] for match in service.screen(['Muhammad Baghdadi'])[0]] == ['UN-1']
+    assert service.screen(['Mohammed Dupont', 'Mohammed']) == [[], []]